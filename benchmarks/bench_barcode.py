@@ -0,0 +1,154 @@
+"""
+Barcode Scan Benchmark
+Measures what the barcode/QR fast path costs the detection loop: decode time per
+640x480 frame for a tray with produce only, a QR pack and an EAN-13 pack, with each
+detector, and the average cost per tick of `BarcodeReader.scan` on a steady tray
+(camera noise only) with and without rescan gating.
+
+Usage:
+    python benchmarks/bench_barcode.py [--frames 100] [--ticks 300]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.barcode import LINEAR_AVAILABLE, QR_AVAILABLE, BarcodeReader  # noqa: E402
+
+
+CODE = '5901234123457'
+
+# EAN-13 digit patterns (1 = bar): L and G codes for the left half, R for the right
+_L = ['0001101', '0011001', '0010011', '0111101', '0100011',
+      '0110001', '0101111', '0111011', '0110111', '0001011']
+_G = ['0100111', '0110011', '0011011', '0100001', '0011101',
+      '0111001', '0000101', '0010001', '0001001', '0010111']
+_R = ['1110010', '1100110', '1101100', '1000010', '1011100',
+      '1001110', '1010000', '1000100', '1001000', '1110100']
+# The first digit selects the L/G parity of the next six
+_PARITY = ['LLLLLL', 'LLGLGG', 'LLGGLG', 'LLGGGL', 'LGLLGG',
+           'LGGLLG', 'LGGGLL', 'LGLGLG', 'LGLGGL', 'LGGLGL']
+
+
+def tray_frame(height=480, width=640, seed=0):
+    """A textured tray with produce-like blobs and no code on it."""
+    rng = np.random.default_rng(seed)
+    frame = cv2.resize(rng.integers(60, 200, (height // 16, width // 16, 3), dtype=np.uint8),
+                       (width, height), interpolation=cv2.INTER_CUBIC)
+    for _ in range(6):
+        center = (int(rng.integers(80, width - 80)), int(rng.integers(80, height - 80)))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.circle(frame, center, int(rng.integers(30, 70)), color, -1)
+    return frame
+
+
+def ean13_image(code, module=2, height=120):
+    """Black-on-white EAN-13 symbol with quiet zones."""
+    digits = [int(d) for d in code]
+    bits = '101'
+    for digit, parity in zip(digits[1:7], _PARITY[digits[0]]):
+        bits += (_L if parity == 'L' else _G)[digit]
+    bits += '01010'
+    bits += ''.join(_R[digit] for digit in digits[7:])
+    bits += '101'
+    row = np.array([0 if bit == '1' else 255 for bit in '0' * 11 + bits + '0' * 11], dtype=np.uint8)
+    image = np.repeat(np.tile(np.repeat(row, module), (height, 1))[:, :, None], 3, axis=2)
+    return np.pad(image, ((20, 20), (0, 0), (0, 0)), constant_values=255)
+
+
+def qr_image(code, size=160):
+    """Black-on-white QR symbol."""
+    symbol = cv2.QRCodeEncoder.create().encode(code)
+    symbol = cv2.resize(symbol, (size, size), interpolation=cv2.INTER_NEAREST)
+    symbol = np.pad(symbol, 16, constant_values=255)
+    return cv2.cvtColor(symbol, cv2.COLOR_GRAY2BGR)
+
+
+def with_pack(frame, label):
+    """The tray with a label pasted in the middle."""
+    frame = frame.copy()
+    height, width = label.shape[:2]
+    y, x = (frame.shape[0] - height) // 2, (frame.shape[1] - width) // 2
+    frame[y:y + height, x:x + width] = label
+    return frame
+
+
+def with_noise(frame, rng):
+    """Sensor noise on an otherwise unchanged frame."""
+    return cv2.add(frame, rng.integers(0, 6, frame.shape, dtype=np.uint8))
+
+
+def lookup(code):
+    """Catalog lookup: the benchmark pack is the only known code."""
+    return 'orange_juice_1l' if code == CODE else None
+
+
+def decode_ms(reader, frame, repeat):
+    """Return (ms per decode, codes found) for one reader and frame."""
+    found = reader.decode(frame)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        reader.decode(frame)
+    return (time.perf_counter() - start) / repeat * 1000, len(found)
+
+
+def steady_tray(reader, frame, ticks, seed=0):
+    """Return (ms per tick, fraction of ticks decoded) for scans of a steady tray."""
+    rng = np.random.default_rng(seed)
+    frames = [with_noise(frame, rng) for _ in range(16)]
+    scans = reader.scans
+    start = time.perf_counter()
+    for tick in range(ticks):
+        reader.scan(frames[tick % len(frames)], lookup)
+    elapsed = time.perf_counter() - start
+    return elapsed / ticks * 1000, (reader.scans - scans) / ticks
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark barcode/QR scanning')
+    parser.add_argument('--frames', type=int, default=100, help='Decodes per configuration')
+    parser.add_argument('--ticks', type=int, default=300, help='Detection ticks per steady-tray run')
+    parser.add_argument('--rescan-every', type=int, default=10)
+    args = parser.parse_args()
+
+    if not QR_AVAILABLE:
+        print("✗ OpenCV has no QR detector; nothing to benchmark")
+        return 1
+
+    tray = tray_frame()
+    trays = [('produce only', tray), ('QR pack', with_pack(tray, qr_image(CODE)))]
+    detectors = [('QR', dict(qr=True, linear=False))]
+    if LINEAR_AVAILABLE:
+        trays.append(('EAN-13 pack', with_pack(tray, ean13_image(CODE))))
+        detectors += [('EAN/UPC', dict(qr=False, linear=True)), ('both', dict(qr=True, linear=True))]
+
+    print("=" * 64)
+    print("BARCODE SCAN BENCHMARK (640x480 frames)")
+    print("=" * 64)
+    print(f"{'tray':<16}{'detectors':<12}{'ms/decode':>12}{'codes':>8}")
+    for tray_name, frame in trays:
+        for detector_name, options in detectors:
+            ms, found = decode_ms(BarcodeReader(**options), frame, args.frames)
+            print(f"{tray_name:<16}{detector_name:<12}{ms:>12.2f}{found:>8}")
+
+    print("-" * 64)
+    print(f"{f'steady tray, {args.ticks} ticks':<38}{'ms/tick':>12}{'decoded':>9}")
+    for tray_name, frame in trays:
+        for rescan_every in (1, args.rescan_every):
+            reader = BarcodeReader(rescan_every=rescan_every)
+            ms, decoded = steady_tray(reader, frame, args.ticks)
+            name = f"{tray_name}, rescan_every={rescan_every}"
+            print(f"{name:<38}{ms:>12.2f}{decoded:>9.0%}")
+    print("=" * 64)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Billing Engine Benchmark
+Times `BillingEngine.compute_bill` on large bills and checks every result
+against a straightforward line-by-line `Decimal` reference implementation.
+
+Usage:
+    python benchmarks/bench_billing.py [--lines 1000 5000 20000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.billing import BillingEngine, to_paise  # noqa: E402
+
+
+CATALOG = {
+    'apple': {'price_per_kg': 150, 'category': 'fruits', 'tax_rate': 0.05},
+    'banana': {'price_per_kg': 60, 'category': 'fruits', 'tax_rate': 0.05},
+    'orange': {'price_per_kg': 80, 'category': 'fruits', 'tax_rate': 0.05, 'discount': 0.1},
+    'mango': {'price_per_kg': 120, 'category': 'fruits', 'tax_rate': 0.12},
+    'tomato': {'price_per_kg': 41.5, 'category': 'vegetables', 'tax_rate': 0.0},
+    'onion': {'price_per_kg': 33.33, 'category': 'vegetables', 'tax_rate': 0.025},
+    'kiwi': {'price_per_kg': 250, 'category': 'exotic', 'tax_rate': 0.18},
+    'juice': {'unit_price': 45.5, 'category': 'packaged', 'tax_rate': 0.12, 'discount': 0.05},
+}
+
+CENT = Decimal('0.01')
+
+
+def reference_total(lines, discount_percent, rounding_unit):
+    """Slow Decimal implementation used to validate the engine."""
+    groups = {}
+    subtotal = Decimal(0)
+    for line in lines:
+        record = CATALOG.get(line['fruit'])
+        if record is None:
+            continue
+        if 'unit_price' in record:
+            gross = Decimal(str(record['unit_price'])) * line.get('quantity', 1)
+        else:
+            grams = Decimal(str(line['weight']))
+            gross = (Decimal(str(record['price_per_kg'])) * grams / 1000).quantize(CENT, ROUND_HALF_UP)
+        line_discount = (gross * Decimal(str(record.get('discount', 0)))).quantize(CENT, ROUND_HALF_UP)
+        net = gross - line_discount
+        key = (record['category'], Decimal(str(record['tax_rate'])))
+        groups[key] = groups.get(key, Decimal(0)) + net
+        subtotal += net
+
+    bill_discount = (subtotal * Decimal(discount_percent) / 100).quantize(CENT, ROUND_HALF_UP)
+
+    # Largest remainder allocation of the bill discount, as the engine does
+    keys = sorted(groups)
+    paise = {key: int(groups[key] * 100) for key in keys}
+    total_paise = sum(paise.values())
+    discount_paise = int(bill_discount * 100)
+    shares = {key: paise[key] * discount_paise for key in keys}
+    parts = {key: (shares[key] // total_paise if total_paise else 0) for key in keys}
+    remainder = discount_paise - sum(parts.values())
+    for key in sorted(keys, key=lambda k: -(shares[k] % total_paise) if total_paise else 0)[:remainder]:
+        parts[key] += 1
+
+    tax = Decimal(0)
+    for key in keys:
+        taxable = groups[key] - Decimal(parts[key]) / 100
+        tax += (taxable * key[1]).quantize(CENT, ROUND_HALF_UP)
+
+    exact = subtotal - bill_discount + tax
+    unit = Decimal(rounding_unit) / 100
+    return (exact / unit).quantize(Decimal(1), ROUND_HALF_UP) * unit
+
+
+def make_bill(count, rng):
+    """Generate a random bill with `count` lines."""
+    products = list(CATALOG) + ['unknown']
+    return [
+        {'fruit': rng.choice(products), 'weight': round(rng.uniform(5, 5000), 2),
+         'quantity': rng.randint(1, 6)}
+        for _ in range(count)
+    ]
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark the billing engine')
+    parser.add_argument('--lines', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    engine = BillingEngine(CATALOG, rounding_unit=to_paise(0.5))
+
+    print("=" * 60)
+    print("BILLING ENGINE BENCHMARK")
+    print("=" * 60)
+    print(f"{'lines':>8} {'best ms':>10} {'lines/s':>12} {'validated':>10}")
+
+    for count in args.lines:
+        lines = make_bill(count, rng)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            bill = engine.compute_bill(lines, discount='7.5%')
+            timings.append(time.perf_counter() - start)
+
+        expected = reference_total(lines, '7.5', engine.rounding_unit)
+        ok = Decimal(str(bill['total'])) == expected
+        best = min(timings)
+        print(f"{count:>8} {best * 1000:>10.2f} {count / best:>12.0f} {'yes' if ok else 'NO':>10}")
+        if not ok:
+            print(f"  engine total {bill['total']} != reference {expected}")
+            sys.exit(1)
+
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Readings Journal Benchmark
+Measures saves/second for concurrent writers, comparing the old
+open-append-close-per-save pattern with `ReadingsJournal` in its
+group-commit configurations.
+
+Usage:
+    python benchmarks/bench_journal.py [--threads 1 4 16] [--saves 500]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.journal import ReadingsJournal  # noqa: E402
+
+
+RECORD = {
+    'fruit': 'apple',
+    'weight': 1403.0,
+    'price': 210.45,
+    'confidence': 71.3,
+    'timestamp': '2026-02-06T11:14:48.290555',
+}
+
+
+class OpenPerSaveWriter:
+    """The pre-journal behaviour: open in append mode for every save."""
+
+    def __init__(self, path, fsync):
+        self.path = path
+        self.fsync = fsync
+        self.lock = threading.Lock()
+
+    def append(self, record):
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def close(self):
+        pass
+
+
+def run(writer, threads, saves):
+    """Run `threads` writers doing `saves` appends each; return saves/second."""
+    def worker():
+        for _ in range(saves):
+            writer.append(RECORD)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return threads * saves / elapsed
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark the readings journal')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--saves', type=int, default=500, help='Saves per thread')
+    parser.add_argument('--dir', default=None, help='Directory to write to (default: temp dir)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(dir=args.dir)
+    path = os.path.join(workdir, 'readings.json')
+
+    configs = [
+        ('open per save, no fsync', lambda: OpenPerSaveWriter(path, fsync=False)),
+        ('open per save, fsync', lambda: OpenPerSaveWriter(path, fsync=True)),
+        ('journal, batch 32', lambda: ReadingsJournal(path, os.path.join(workdir, 'archive'),
+                                                      fsync_batch=32, durable=False)),
+        ('journal, durable', lambda: ReadingsJournal(path, os.path.join(workdir, 'archive'),
+                                                     durable=True)),
+    ]
+
+    print("=" * 72)
+    print("READINGS JOURNAL BENCHMARK (saves/second)")
+    print("=" * 72)
+    header = f"{'configuration':<28}" + ''.join(f"{f'{t} thr':>11}" for t in args.threads)
+    print(header)
+
+    try:
+        for name, factory in configs:
+            row = f"{name:<28}"
+            for threads in args.threads:
+                if os.path.exists(path):
+                    os.remove(path)
+                writer = factory()
+                rate = run(writer, threads, args.saves)
+                stats = writer.stats() if hasattr(writer, 'stats') else None
+                writer.close()
+                row += f"{rate:>11.0f}"
+                if stats and threads == args.threads[-1]:
+                    row += f"   ({stats['records_per_sync']} rec/fsync)"
+            print(row)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("=" * 72)
+
+
+if __name__ == '__main__':
+    main()
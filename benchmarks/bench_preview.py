@@ -0,0 +1,89 @@
+"""
+Preview Encoder Benchmark
+Compares the old inline full-resolution JPEG path with `PreviewEncoder` at
+different preview widths and backends: encode time and bytes per frame.
+
+Usage:
+    python benchmarks/bench_preview.py [--frames 200] [--widths 640 480 320]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.preview import PreviewEncoder, TURBOJPEG_AVAILABLE, draw_overlays  # noqa: E402
+
+
+DETECTIONS = [('apple', 0.82, (120, 90, 330, 300)), ('banana', 0.61, (360, 200, 600, 420))]
+
+
+def camera_frame(height=480, width=640, seed=0):
+    """A textured 640x480 test frame (pure noise would not compress like a camera image)."""
+    rng = np.random.default_rng(seed)
+    frame = cv2.resize(rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8),
+                       (width, height), interpolation=cv2.INTER_CUBIC)
+    noise = rng.integers(0, 12, frame.shape, dtype=np.uint8)
+    return cv2.add(frame, noise)
+
+
+def inline_encode(frame, quality):
+    """The pre-encoder behaviour: annotate and encode the full-resolution frame."""
+    frame = frame.copy()
+    draw_overlays(frame, DETECTIONS, 153.2)
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
+
+def measure(encode, frames, repeat):
+    """Return (ms per frame, bytes per frame) for an encode callable."""
+    sizes = []
+    start = time.perf_counter()
+    for i in range(repeat):
+        sizes.append(len(encode(frames[i % len(frames)])))
+    elapsed = time.perf_counter() - start
+    return elapsed / repeat * 1000, sum(sizes) / len(sizes)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark preview encoding')
+    parser.add_argument('--frames', type=int, default=200, help='Frames per configuration')
+    parser.add_argument('--widths', type=int, nargs='+', default=[640, 480, 320])
+    parser.add_argument('--quality', type=int, default=80)
+    args = parser.parse_args()
+
+    frames = [camera_frame(seed=i) for i in range(8)]
+
+    configs = [('inline full-res (old)', lambda f: inline_encode(f, args.quality))]
+    backends = [('opencv', 'jpeg'), ('webp', 'webp')]
+    if TURBOJPEG_AVAILABLE:
+        backends.insert(1, ('turbojpeg', 'jpeg'))
+    encoders = []
+    for width in args.widths:
+        for backend, fmt in backends:
+            encoder = PreviewEncoder(width=width, backend=backend, fmt=fmt)
+            encoders.append(encoder)
+            configs.append((f"{encoder.backend} {width}px",
+                            lambda f, e=encoder: e.encode(f, DETECTIONS, 153.2, args.quality)))
+
+    print("=" * 60)
+    print("PREVIEW ENCODER BENCHMARK (640x480 source)")
+    print("=" * 60)
+    print(f"{'configuration':<26}{'ms/frame':>12}{'KB/frame':>12}")
+    for name, encode in configs:
+        ms, size = measure(encode, frames, args.frames)
+        print(f"{name:<26}{ms:>12.2f}{size / 1024:>12.1f}")
+    print("=" * 60)
+
+    for encoder in encoders:
+        encoder.stop()
+
+
+if __name__ == '__main__':
+    main()
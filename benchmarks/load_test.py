@@ -0,0 +1,588 @@
+"""
+Load Test
+Simulates N Socket.IO dashboard viewers and M cashiers against a server and
+reports HTTP latency percentiles for /save, /bill and /bill/clear, telemetry
+delivery lag, dropped delta events and the server's CPU and memory use.
+
+By default a station is started locally in simulated mode: the real app runs
+with the scale and the detector replaced by canned readings that cycle through
+a few products, so the broadcast path and the billing routes carry realistic
+traffic without hardware. Saved readings, the inventory and invoices go to a
+temporary directory. Use --url to load an already running station instead
+(add --pid to sample its CPU and memory).
+
+Delivery lag is measured against the `ts` of each delta, so it is only
+meaningful when the server and the load generator share a clock.
+
+Usage:
+    python benchmarks/load_test.py [--viewers 50] [--cashiers 4] [--duration 30]
+    python benchmarks/load_test.py --rate 2 --json run.json --compare baseline.json
+    python benchmarks/load_test.py --url http://localhost:5000 --pid 1234
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests  # noqa: E402
+import socketio  # noqa: E402
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+try:
+    import websocket  # noqa: F401  (websocket-client, used by socketio.Client)
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    WEBSOCKET_AVAILABLE = False
+
+
+# (product, detector confidence, grams) placed on the tray in turn
+CANNED_READINGS = [
+    ('apple', 0.91, 182.0),
+    ('banana', 0.87, 455.0),
+    ('orange', 0.83, 231.0),
+    ('mango', 0.78, 318.0),
+    ('kiwi', 0.94, 96.0),
+]
+HOLD_SECONDS = 2.0
+PERCENTILES = (50, 90, 99)
+ENDPOINTS = ('save', 'bill', 'clear')
+
+
+# ---------------------------------------------------------------------------
+# Simulated station (runs in the server subprocess)
+# ---------------------------------------------------------------------------
+
+class CannedStation:
+    """Stands in for the scale and the detector of a station without hardware."""
+
+    def __init__(self, detector, readings=CANNED_READINGS, hold=HOLD_SECONDS):
+        self.detector = detector
+        self.readings = readings
+        self.hold = hold
+        self.started = time.monotonic()
+
+    def current(self):
+        """Reading on the tray right now, with the weight settling in."""
+        elapsed = time.monotonic() - self.started
+        fruit, confidence, grams = self.readings[int(elapsed / self.hold) % len(self.readings)]
+        settle = min(1.0, (elapsed % self.hold) / (self.hold / 4))
+        # Small oscillation so the telemetry channel keeps sending weight deltas
+        wobble = 1.5 * math.sin(elapsed * 7.0)
+        return fruit, confidence, grams * settle + wobble
+
+    def read_weight(self):
+        """Replacement for the station's Arduino read."""
+        return max(0.0, self.current()[2])
+
+    def detection_loop(self):
+        """Replacement for the station's detection thread."""
+        detector = self.detector
+        while detector.running:
+            fruit, confidence, _ = self.current()
+            with detector.detection_lock:
+                detector.detected_fruit = fruit
+                detector.detection_confidence = confidence
+                detector.detection_boxes = []
+                detector.detection_frame_time = time.time()
+            time.sleep(0.05)
+
+
+def serve(port):
+    """Run the station in simulated mode (the --serve subprocess)."""
+    import demo_exp  # monkey-patches eventlet; only ever imported in this process
+
+    detector = demo_exp.detector
+    station = CannedStation(detector)
+    # Threads are created from these attributes in start()
+    detector._read_weight_from_arduino = station.read_weight
+    detector.detection_loop = station.detection_loop
+    detector.start()
+    print(f"✓ Simulated station on port {port}", flush=True)
+    try:
+        demo_exp.socketio.run(demo_exp.app, host='127.0.0.1', port=port, log_output=False)
+    finally:
+        detector.cleanup()
+
+
+def _free_port():
+    """Internal: An unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir, timeout=180.0, script=None, args=(), env=None):
+    """
+    Start a simulated station and wait until it answers.
+
+    Args:
+        workdir (str): Directory for the journal, inventory and invoices
+        timeout (float): Seconds to wait (model loading can be slow)
+        script (str): Script whose --serve mode runs the station (default: this one)
+        args (list): Extra arguments for the --serve command
+        env (dict): Extra environment variables (e.g. SBS_* settings)
+
+    Returns:
+        tuple: (subprocess.Popen, base URL, log path)
+    """
+    port = _free_port()
+    env = dict(os.environ,
+               SBS_JOURNAL__PATH=os.path.join(workdir, 'readings.json'),
+               SBS_JOURNAL__ARCHIVE_DIR=os.path.join(workdir, 'readings_archive'),
+               SBS_INVENTORY__DB_PATH=os.path.join(workdir, 'inventory.db'),
+               SBS_SYNC__DB_PATH=os.path.join(workdir, 'outbox.db'),
+               SBS_SYNC__ENDPOINT='null',
+               SBS_ANALYTICS__STORE_DIR=os.path.join(workdir, 'analytics'),
+               SBS_PATHS__INVOICES_DIR=os.path.join(workdir, 'invoices'),
+               SBS_CLUSTER__MESSAGE_QUEUE='null',
+               PYTHONUNBUFFERED='1', **(env or {}))
+    log_path = os.path.join(workdir, 'server.log')
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(script or __file__), '--serve', '--port', str(port),
+             *args],
+            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if requests.get(f"{url}/metrics", timeout=2).ok:
+                return process, url, log_path
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    with open(log_path) as log:
+        tail = log.read()[-2000:]
+    raise RuntimeError(f"Server did not start (log: {log_path})\n{tail}")
+
+
+def stop_server(process):
+    """Terminate the station subprocess."""
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+# ---------------------------------------------------------------------------
+# Load generator
+# ---------------------------------------------------------------------------
+
+class Recorder:
+    """Thread-safe latency samples and counters."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.counts = defaultdict(int)
+
+    def sample(self, name, value):
+        with self.lock:
+            self.samples[name].append(value)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] += amount
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(values)))
+    return values[rank - 1]
+
+
+def summarize(values, scale=1000.0):
+    """Count, percentiles and max of a list of seconds (reported in milliseconds)."""
+    values = sorted(values)
+    summary = {'count': len(values)}
+    for pct in PERCENTILES:
+        value = percentile(values, pct)
+        summary[f'p{pct}'] = round(value * scale, 2) if value is not None else None
+    summary['max'] = round(values[-1] * scale, 2) if values else None
+    return summary
+
+
+class Viewer:
+    """One dashboard client applying snapshot/delta events like dashboard.js."""
+
+    def __init__(self, url, transports, recorder):
+        self.url = url
+        self.transports = transports
+        self.recorder = recorder
+        self.version = None
+        self.client = socketio.Client(reconnection=False)
+        self.client.on('snapshot', self._on_snapshot)
+        self.client.on('delta', self._on_delta)
+
+    def connect(self):
+        """Connect and wait for the first snapshot; True on success."""
+        started = time.perf_counter()
+        try:
+            self.client.connect(self.url, transports=self.transports, wait_timeout=10)
+        except (socketio.exceptions.ConnectionError, ValueError) as e:
+            self.recorder.count('connect_errors')
+            self.recorder.count(f'connect_error: {e}')
+            return False
+        self.recorder.sample('connect', time.perf_counter() - started)
+        return True
+
+    def disconnect(self):
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+
+    def _on_snapshot(self, snapshot):
+        self.version = snapshot['v']
+        self.recorder.count('snapshots')
+
+    def _on_delta(self, delta):
+        self.recorder.sample('lag', time.time() - delta['ts'])
+        self.recorder.count('deltas')
+        if self.version is None:
+            # Waiting for the snapshot requested after a gap
+            self.recorder.count('discarded')
+            return
+        if delta['base'] != self.version:
+            # Missed deltas (or out of order): the dashboard asks for a resync
+            self.recorder.count('dropped', max(delta['base'] - self.version, 1))
+            self.recorder.count('resyncs')
+            self.version = None
+            self.client.emit('resync')
+            return
+        self.version = delta['v']
+
+
+def _call(session, recorder, name, method, url, **kwargs):
+    """Internal: Time one request and classify its outcome"""
+    started = time.perf_counter()
+    try:
+        response = session.request(method, url, timeout=30, **kwargs)
+    except requests.RequestException:
+        recorder.count(f'{name}.errors')
+        return
+    recorder.sample(name, time.perf_counter() - started)
+    if response.status_code != 200:
+        recorder.count(f'{name}.errors')
+        return
+    try:
+        ok = response.json().get('success', True)
+    except ValueError:
+        ok = False
+    # e.g. /save with nothing on the tray, /bill right after a clear
+    recorder.count(f'{name}.ok' if ok else f'{name}.rejected')
+
+
+def cashier(index, url, recorder, stop, rate, bill_every, clear_every):
+    """
+    Save readings, fetch the bill and clear it, like a cashier at the counter.
+
+    Args:
+        index (int): Cashier number (sent as ?cashier=load-<n>)
+        url (str): Server base URL
+        recorder (Recorder): Shared results
+        stop (threading.Event): Set when the run is over
+        rate (float): Saves per second (0 = back to back)
+        bill_every (int): GET /bill after every Nth save (0 = never)
+        clear_every (int): POST /bill/clear after every Nth save (0 = never)
+    """
+    session = requests.Session()
+    interval = 1.0 / rate if rate else 0.0
+    next_save = time.monotonic()
+    saves = 0
+    while not stop.is_set():
+        _call(session, recorder, 'save', 'POST', f"{url}/save",
+              params={'cashier': f'load-{index}'})
+        saves += 1
+        if bill_every and saves % bill_every == 0:
+            _call(session, recorder, 'bill', 'GET', f"{url}/bill")
+        if clear_every and saves % clear_every == 0:
+            _call(session, recorder, 'clear', 'POST', f"{url}/bill/clear")
+        if interval:
+            next_save += interval
+            stop.wait(max(0.0, next_save - time.monotonic()))
+    session.close()
+
+
+class ResourceSampler:
+    """Samples a process's CPU and RSS on a background thread."""
+
+    def __init__(self, pid, interval=0.5):
+        self.process = psutil.Process(pid) if PSUTIL_AVAILABLE and pid else None
+        self.interval = interval
+        self.cpu = []
+        self.rss = []
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.process is None:
+            return self
+        self.process.cpu_percent(None)  # prime the counter
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.cpu.append(self.process.cpu_percent(None))
+                self.rss.append(self.process.memory_info().rss)
+            except psutil.Error:
+                break
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def summary(self):
+        if not self.cpu:
+            return None
+        mb = 1024.0 * 1024.0
+        return {
+            'cpu_mean': round(sum(self.cpu) / len(self.cpu), 1),
+            'cpu_max': round(max(self.cpu), 1),
+            'rss_start_mb': round(self.rss[0] / mb, 1),
+            'rss_end_mb': round(self.rss[-1] / mb, 1),
+            'rss_max_mb': round(max(self.rss) / mb, 1),
+        }
+
+
+def _telemetry_version(url):
+    """Internal: Telemetry deltas sent by the server so far (None if unavailable)"""
+    try:
+        return requests.get(f"{url}/metrics", timeout=10).json()['telemetry']['deltas_sent']
+    except (requests.RequestException, ValueError, KeyError):
+        return None
+
+
+def run(url, pid, viewers, cashiers, duration, rate, bill_every, clear_every, transports):
+    """
+    Run one load test against a server.
+
+    Returns:
+        dict: Results (see report())
+    """
+    recorder = Recorder()
+
+    clients = [Viewer(url, transports, recorder) for _ in range(viewers)]
+    connectors = [threading.Thread(target=client.connect) for client in clients]
+    for thread in connectors:
+        thread.start()
+    for thread in connectors:
+        thread.join()
+    connected = [client for client in clients if client.client.connected]
+
+    sampler = ResourceSampler(pid).start()
+    deltas_before = _telemetry_version(url)
+    # Connect-time snapshots are not part of the measured window
+    with recorder.lock:
+        recorder.samples.pop('lag', None)
+        recorder.counts.pop('deltas', None)
+        recorder.counts.pop('snapshots', None)
+
+    stop = threading.Event()
+    workers = [threading.Thread(target=cashier,
+                                args=(i + 1, url, recorder, stop, rate, bill_every, clear_every))
+               for i in range(cashiers)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    stop.wait(duration)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    # Let the last deltas arrive before counting them
+    time.sleep(0.5)
+    deltas_after = _telemetry_version(url)
+    sampler.stop()
+
+    closers = [threading.Thread(target=client.disconnect) for client in connected]
+    for thread in closers:
+        thread.start()
+    for thread in closers:
+        thread.join()
+
+    counts = dict(recorder.counts)
+    server_deltas = (deltas_after - deltas_before
+                     if deltas_before is not None and deltas_after is not None else None)
+    results = {
+        'config': {'viewers': viewers, 'cashiers': cashiers, 'duration': duration,
+                   'rate': rate, 'bill_every': bill_every, 'clear_every': clear_every,
+                   'transport': transports[0]},
+        'elapsed': round(elapsed, 2),
+        'viewers_connected': len(connected),
+        'connect': summarize(recorder.samples.get('connect', [])),
+        'http': {},
+        'events': {
+            'lag': summarize(recorder.samples.get('lag', [])),
+            'server_deltas': server_deltas,
+            'expected': server_deltas * len(connected) if server_deltas is not None else None,
+            'received': counts.get('deltas', 0),
+            'dropped': counts.get('dropped', 0),
+            'discarded': counts.get('discarded', 0),
+            'resyncs': counts.get('resyncs', 0),
+        },
+        'server': sampler.summary(),
+        'errors': {name: value for name, value in counts.items() if name.startswith('connect_error:')},
+    }
+    for name in ENDPOINTS:
+        summary = summarize(recorder.samples.get(name, []))
+        summary.update(ok=counts.get(f'{name}.ok', 0), rejected=counts.get(f'{name}.rejected', 0),
+                       errors=counts.get(f'{name}.errors', 0),
+                       rps=round(summary['count'] / elapsed, 1) if elapsed else 0.0)
+        results['http'][name] = summary
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def _ms(value):
+    """Internal: Format milliseconds for the table"""
+    return f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+
+
+def report(results):
+    """Print a results table."""
+    config = results['config']
+    print("=" * 78)
+    print(f"LOAD TEST: {config['viewers']} viewers ({results['viewers_connected']} connected, "
+          f"{config['transport']}), {config['cashiers']} cashiers, {results['elapsed']:.0f} s")
+    print("=" * 78)
+    header = f"{'endpoint':<14}{'req/s':>8}" + ''.join(f"{f'p{p} ms':>9}" for p in PERCENTILES)
+    print(header + f"{'max ms':>9}{'ok':>8}{'rejected':>10}{'errors':>8}")
+    for name, row in results['http'].items():
+        print(f"{name:<14}{row['rps']:>8.1f}" + ''.join(_ms(row[f'p{p}']) for p in PERCENTILES)
+              + _ms(row['max']) + f"{row['ok']:>8}{row['rejected']:>10}{row['errors']:>8}")
+    print("-" * 78)
+    events = results['events']
+    lag = events['lag']
+    print(f"{'delta lag':<14}{'':>8}" + ''.join(_ms(lag[f'p{p}']) for p in PERCENTILES) + _ms(lag['max']))
+    connect = results['connect']
+    print(f"{'connect':<14}{'':>8}" + ''.join(_ms(connect[f'p{p}']) for p in PERCENTILES)
+          + _ms(connect['max']))
+    print(f"deltas: {events['received']} received of {events['expected']} expected "
+          f"({events['server_deltas']} sent per client), {events['dropped']} dropped, "
+          f"{events['resyncs']} resyncs, {events['discarded']} discarded while resyncing")
+    server = results['server']
+    if server:
+        print(f"server: CPU mean {server['cpu_mean']}% / max {server['cpu_max']}%, "
+              f"RSS {server['rss_start_mb']} -> {server['rss_end_mb']} MB (max {server['rss_max_mb']} MB)")
+    else:
+        print("server: CPU/RSS not sampled (needs psutil and a local server or --pid)")
+    for name, value in results['errors'].items():
+        print(f"✗ {name} ({value}x)")
+    print("=" * 78)
+
+
+def compare(results, baseline):
+    """Print p50/p99 changes against a previous run's JSON results."""
+    print(f"{'vs baseline':<14}{'p50 ms':>10}{'change':>9}{'p99 ms':>10}{'change':>9}")
+    rows = [(name, results['http'][name], baseline.get('http', {}).get(name, {}))
+            for name in ENDPOINTS]
+    rows.append(('delta lag', results['events']['lag'], baseline.get('events', {}).get('lag', {})))
+    for name, current, previous in rows:
+        line = f"{name:<14}"
+        for key in ('p50', 'p99'):
+            now, before = current.get(key), previous.get(key)
+            change = f"{(now - before) / before * 100:+.0f}%" if now is not None and before else '-'
+            line += _ms(now).rjust(10) + f"{change:>9}"
+        print(line)
+    print("=" * 78)
+
+
+def main():
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description='Load test the billing server')
+    parser.add_argument('--viewers', type=int, default=50, help='Socket.IO dashboard clients')
+    parser.add_argument('--cashiers', type=int, default=4, help='Concurrent cashiers')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of load')
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help='Saves per second per cashier (0 = back to back)')
+    parser.add_argument('--bill-every', type=int, default=5, help='GET /bill every N saves')
+    parser.add_argument('--clear-every', type=int, default=20, help='POST /bill/clear every N saves')
+    parser.add_argument('--transport', choices=['auto', 'websocket', 'polling'], default='auto',
+                        help='Socket.IO transport (auto: websocket if websocket-client is installed)')
+    parser.add_argument('--url', default=None, help='Existing server (default: start a simulated one)')
+    parser.add_argument('--pid', type=int, default=None, help='Server PID to sample with --url')
+    parser.add_argument('--json', default=None, help='Write results to this file')
+    parser.add_argument('--compare', default=None, help='Baseline results file from --json')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=5000, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return 0
+
+    transport = args.transport
+    if transport == 'auto':
+        transport = 'websocket' if WEBSOCKET_AVAILABLE else 'polling'
+    elif transport == 'websocket' and not WEBSOCKET_AVAILABLE:
+        print("✗ The websocket transport needs websocket-client (pip install websocket-client)")
+        return 1
+
+    process = None
+    workdir = None
+    url, pid = args.url, args.pid
+    try:
+        if url is None:
+            workdir = tempfile.mkdtemp(prefix='sbs-load-')
+            print("Starting simulated station...")
+            process, url, _ = start_server(workdir)
+            pid = process.pid
+            print(f"✓ Station up at {url}")
+        results = run(url.rstrip('/'), pid, args.viewers, args.cashiers, args.duration,
+                      args.rate, args.bill_every, args.clear_every, [transport])
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        if process is not None:
+            stop_server(process)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report(results)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Results written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,377 @@
+"""
+Soak Test
+Runs the full pipeline for hours on replayed inputs and fails if memory or
+thread counts keep growing.
+
+A station is started in a subprocess. Camera frames come from a video file or
+an image directory (synthetic tray frames by default) and are fed through the
+real capture supervisor at the camera frame rate, in a loop. Weights come from
+a readings journal or a file of gram values (canned readings by default). The
+real detection, broadcast and preview threads run on top. A few dashboard
+viewers and a slow cashier keep the Socket.IO and /save paths busy.
+
+Allocation tracing is enabled via `memory.tracemalloc_frames`. Every
+--interval seconds the test reads `GET /admin/memory`, the same report
+production stations serve, and prints RSS, thread, greenlet and traced-memory
+counts. At the end it applies growth detection to the samples taken after the
+warm-up. It exits with status 1 on sustained growth and prints the allocation
+sites that grew the most since the warm-up.
+
+Usage:
+    python benchmarks/soak_test.py [--duration 4h] [--interval 60] [--warmup 10m]
+    python benchmarks/soak_test.py --frames recording.mp4 --weights readings.json --json soak.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+import requests
+
+from load_test import (WEBSOCKET_AVAILABLE, CannedStation, Recorder, Viewer, cashier,
+                       start_server, stop_server)
+
+from src.memory import MB, detect_growth  # noqa: E402
+
+
+FRAME_SIZE = (640, 480)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+# ---------------------------------------------------------------------------
+# Replayed inputs (run in the server subprocess)
+# ---------------------------------------------------------------------------
+
+def synthetic_frames(count=90, size=FRAME_SIZE, scenes=3):
+    """Tray-like frames: a few scenes with a coloured item and sensor noise."""
+    rng = np.random.default_rng(7)
+    width, height = size
+    colors = [(40, 40, 200), (30, 200, 230), (40, 140, 250), (60, 180, 60)]
+    frames = []
+    for i in range(count):
+        scene = i * scenes // count
+        frame = np.full((height, width, 3), 185, np.uint8)
+        cv2.ellipse(frame, (width // 2 + 40 * scene, height // 2), (90, 70), 0, 0, 360,
+                    colors[scene % len(colors)], -1)
+        noise = rng.integers(-6, 7, frame.shape, dtype=np.int16)
+        frames.append(np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def load_frames(path, limit=300, size=FRAME_SIZE):
+    """
+    Load frames to replay from a video file or a directory of images.
+
+    Args:
+        path (str): Video file or image directory
+        limit (int): Maximum frames kept in memory
+        size (tuple): Frames are resized to this (width, height)
+
+    Returns:
+        list: BGR frames
+    """
+    frames = []
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names[:limit]:
+            frame = cv2.imread(os.path.join(path, name))
+            if frame is not None:
+                frames.append(cv2.resize(frame, size))
+    else:
+        capture = cv2.VideoCapture(path)
+        while len(frames) < limit:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames.append(cv2.resize(frame, size))
+        capture.release()
+    if not frames:
+        raise ValueError(f"no frames in {path}")
+    return frames
+
+
+def load_weights(path):
+    """
+    Load gram values to replay: a readings journal (JSON lines with 'weight')
+    or one number per line.
+    """
+    weights = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                weight = json.loads(line).get('weight')
+            else:
+                weight = float(line.split(',')[0])
+            if weight is not None:
+                weights.append(float(weight))
+    if not weights:
+        raise ValueError(f"no weights in {path}")
+    return weights
+
+
+class ReplayCapture:
+    """cv2.VideoCapture stand-in that loops over recorded frames at a fixed rate."""
+
+    def __init__(self, frames, fps=30):
+        self.frames = frames
+        self.fps = fps
+        self.position = 0
+        self.next_time = time.monotonic()
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        delay = self.next_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        # Like a live camera: frames missed while not reading are gone, not queued
+        self.next_time = max(self.next_time + 1.0 / self.fps, time.monotonic())
+        frame = self.frames[self.position % len(self.frames)]
+        self.position += 1
+        # A real capture decodes into a fresh buffer every frame
+        return True, frame.copy()
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.frames[0].shape[1]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.frames[0].shape[0]
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0.0
+
+    def release(self):
+        self.opened = False
+
+
+class ReplayScale:
+    """Replays recorded gram values, one per scale read."""
+
+    def __init__(self, weights):
+        self.weights = weights
+        self.position = 0
+
+    def read_weight(self):
+        weight = self.weights[self.position % len(self.weights)]
+        self.position += 1
+        return weight
+
+
+def serve(port, frames_path, weights_path):
+    """Run the station on replayed inputs (the --serve subprocess)."""
+    import demo_exp  # monkey-patches eventlet; only ever imported in this process
+
+    detector = demo_exp.detector
+    frames = load_frames(frames_path) if frames_path else synthetic_frames()
+    detector.camera.capture_factory = lambda index: ReplayCapture(frames, detector.camera.fps)
+    canned = CannedStation(detector)
+    detector.scale.read_weight = (ReplayScale(load_weights(weights_path)).read_weight
+                                  if weights_path else canned.read_weight)
+    if detector.model is None:
+        # No model to run on the frames: keep the billing path busy with canned detections
+        print("✗ No model loaded; using canned detections")
+        detector.detection_loop = canned.detection_loop
+    detector.start()
+    print(f"✓ Replaying {len(frames)} frames on port {port}", flush=True)
+    try:
+        demo_exp.socketio.run(demo_exp.app, host='127.0.0.1', port=port, log_output=False)
+    finally:
+        detector.cleanup()
+
+
+# ---------------------------------------------------------------------------
+# Soak driver
+# ---------------------------------------------------------------------------
+
+def parse_duration(text):
+    """Seconds from '90', '45s', '30m' or '4h'."""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    text = str(text).strip().lower()
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def fetch_memory(url, top=10, reset=False, history=False):
+    """GET /admin/memory; returns the report dict."""
+    params = {'top': top}
+    if reset:
+        params['reset'] = 1
+    if history:
+        params['history'] = 1
+    response = requests.get(f"{url}/admin/memory", params=params, timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+
+def _line(elapsed, sample):
+    """Internal: One progress line"""
+    def mb(value):
+        return f"{value / MB:8.1f}" if value is not None else f"{'-':>8}"
+    greenlets = sample.get('greenlets')
+    return (f"{elapsed / 60:7.1f} min  RSS {mb(sample['rss'])} MB  traced {mb(sample['traced'])} MB  "
+            f"threads {sample['threads'] or '-':>3}  greenlets {greenlets if greenlets is not None else '-':>5}")
+
+
+def soak(url, duration, interval, warmup, limit_mb, viewers, rate, transport):
+    """
+    Drive the station and collect memory reports.
+
+    Returns:
+        tuple: (samples after warm-up, final report)
+    """
+    recorder = Recorder()
+    clients = [Viewer(url, [transport], recorder) for _ in range(viewers)]
+    for client in clients:
+        client.connect()
+    stop = threading.Event()
+    worker = threading.Thread(target=cashier, args=(1, url, recorder, stop, rate, 5, 50), daemon=True)
+    worker.start()
+
+    started = time.monotonic()
+    samples = []
+    baseline_set = False
+    try:
+        while True:
+            elapsed = time.monotonic() - started
+            past_warmup = elapsed >= warmup
+            # The allocation baseline is taken once the warm-up is over
+            report = fetch_memory(url, reset=past_warmup and not baseline_set)
+            baseline_set = baseline_set or past_warmup
+            if past_warmup:
+                samples.append(report['sample'])
+            print(_line(elapsed, report['sample']) + ('' if past_warmup else '  (warm-up)'), flush=True)
+            if elapsed >= duration:
+                break
+            time.sleep(min(interval, max(0.1, duration - elapsed)))
+    finally:
+        stop.set()
+        worker.join()
+        for client in clients:
+            client.disconnect()
+
+    final = fetch_memory(url, top=15)
+    errors = {name: count for name, count in recorder.counts.items() if name.endswith('.errors')}
+    final['load'] = {'saves': len(recorder.samples.get('save', [])), 'errors': errors,
+                     'deltas': recorder.counts.get('deltas', 0),
+                     'dropped': recorder.counts.get('dropped', 0)}
+    return samples, final
+
+
+def verdicts(samples, limit_mb):
+    """Growth verdicts over the post-warm-up samples."""
+    result = {
+        'rss': detect_growth(samples, 'rss', limit_mb, MB),
+        'threads': detect_growth(samples, 'threads', 1.0, 1),
+        'greenlets': detect_growth(samples, 'greenlets', 10.0, 1),
+    }
+    if any(sample.get('traced') is not None for sample in samples):
+        result['traced'] = detect_growth(samples, 'traced', limit_mb, MB)
+    return result
+
+
+def main():
+    """Run the soak test."""
+    parser = argparse.ArgumentParser(description='Soak test the detection pipeline')
+    parser.add_argument('--duration', default='1h', help='Total run time (e.g. 90m, 4h)')
+    parser.add_argument('--interval', default='60', help='Seconds between memory reports')
+    parser.add_argument('--warmup', default='10m', help='Time excluded from growth detection')
+    parser.add_argument('--limit-mb', type=float, default=5.0,
+                        help='RSS / traced growth in MB per hour that fails the test')
+    parser.add_argument('--frames', default=None, help='Video file or image directory to replay')
+    parser.add_argument('--weights', default=None, help='Readings journal or grams-per-line file')
+    parser.add_argument('--trace-depth', type=int, default=1,
+                        help='tracemalloc traceback depth (0 = RSS and counts only)')
+    parser.add_argument('--viewers', type=int, default=3, help='Socket.IO dashboard clients')
+    parser.add_argument('--rate', type=float, default=0.5, help='Saves per second')
+    parser.add_argument('--json', default=None, help='Write samples and verdicts to this file')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=5000, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.frames, args.weights)
+        return 0
+
+    duration = parse_duration(args.duration)
+    interval = parse_duration(args.interval)
+    warmup = parse_duration(args.warmup)
+    serve_args = []
+    if args.frames:
+        serve_args += ['--frames', os.path.abspath(args.frames)]
+    if args.weights:
+        serve_args += ['--weights', os.path.abspath(args.weights)]
+    env = {
+        'SBS_MEMORY__TRACEMALLOC_FRAMES': str(args.trace_depth),
+        'SBS_MEMORY__SAMPLE_INTERVAL': str(max(1.0, interval)),
+        'SBS_MEMORY__WARMUP': str(warmup),
+        'SBS_MEMORY__GROWTH_LIMIT_MB': str(args.limit_mb),
+    }
+
+    workdir = tempfile.mkdtemp(prefix='sbs-soak-')
+    process = None
+    try:
+        print("Starting station on replayed inputs...")
+        process, url, log_path = start_server(workdir, script=__file__, args=serve_args, env=env)
+        print(f"✓ Station up at {url} (log: {log_path})")
+        print("=" * 78)
+        samples, final = soak(url, duration, interval, warmup, args.limit_mb, args.viewers,
+                              args.rate, 'websocket' if WEBSOCKET_AVAILABLE else 'polling')
+        if process.poll() is not None:
+            print(f"✗ Station exited with status {process.returncode}")
+            return 1
+    except (RuntimeError, requests.RequestException) as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        if process is not None:
+            stop_server(process)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = verdicts(samples, args.limit_mb)
+    print("=" * 78)
+    for name, verdict in results.items():
+        mark = '✗' if verdict['growing'] else '✓'
+        print(f"{mark} {name:<10} slope {verdict['slope_per_hour']} /h, "
+              f"increase {verdict['increase']} over {verdict['samples']} samples")
+    print(f"load: {final['load']['saves']} saves, {final['load']['deltas']} deltas, "
+          f"{final['load']['dropped']} dropped, errors {final['load']['errors'] or 'none'}")
+
+    growing = [name for name, verdict in results.items() if verdict['growing']]
+    diff = final['tracemalloc']['diff']
+    if diff:
+        print("-" * 78)
+        print("Allocation growth since warm-up:")
+        for entry in diff[:10]:
+            print(f"  {entry['size_diff_kb']:+10.1f} KB {entry['count_diff']:+8d} blocks  "
+                  f"{entry['location']}")
+    print("=" * 78)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'samples': samples, 'verdicts': results, 'final': final}, f, indent=2)
+        print(f"✓ Results written to {args.json}")
+    if growing:
+        print(f"✗ FAIL: sustained growth in {', '.join(growing)}")
+        return 1
+    print("✓ PASS: no sustained growth")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
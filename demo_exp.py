@@ -1,65 +1,128 @@
 import eventlet
 eventlet.monkey_patch()
 
-from flask import Flask, render_template_string
+from flask import Flask, request, send_from_directory
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
-import cv2
 import numpy as np
-import serial
 import time
 import threading
-import base64
-import re
+from collections import deque
 from datetime import datetime
+import io
+import os
+import sys
 import json
 from ultralytics import YOLO
 
-app = Flask(__name__)
+from src.adaptive import DEFAULT_LEVELS, AdaptiveController
+from src.analytics import AnalyticsStore, journal_sources, query_args
+from src.barcode import BarcodeReader
+from src.billing import BillingEngine, from_paise
+from src.calibration import CalibrationError, CalibrationProfile, profile_path
+from src.bus import BusError, StationBus
+from src.camera import CameraSupervisor
+from src.config import ConfigWatcher, load_config, load_products
+from src.inventory import InventoryError, InventoryLedger, parse_stock_csv
+from src.invoice import InvoiceRenderer, InvoiceWorkerPool
+from src.journal import JournalError, ReadingsJournal
+from src.memory import MemoryMonitor
+from src.model_registry import ModelRegistry, RegistryError
+from src.power import IDLE, PowerManager
+from src.preview import PreviewEncoder
+from src.scale import AutoZero, ScaleConnection
+from src.static_assets import StaticAssets
+from src.sync import BILL_CLEARED, READING, SyncOutbox
+from src.telemetry import FrameChangeDetector, TelemetryChannel
+from src.tracing import Tracer
+from src.detection_cache import DetectionCache
+from src.detector import NO_PRODUCT, build_class_lookup, select_detections, best_detection
+
+# The dashboard is served from memory, precompressed (see src/static_assets.py)
+app = Flask(__name__, static_folder=None)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+static_assets = StaticAssets()
+# In cluster mode emits go through the message queue to the web workers (src/web_worker.py)
+message_queue = load_config().get('cluster', {}).get('message_queue')
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet', message_queue=message_queue)
 
 class ImprovedFruitDetectionSystem:
-    def __init__(self, arduino_port='COM3', baud_rate=9600, camera_index=0):
+    def __init__(self, arduino_port=None, baud_rate=None, camera_index=None):
         print("\n" + "="*60)
         print("AI POWERED SMART BILLING SYSTEM")
         print("="*60 + "\n")
         
-        # Initialize YOLO model
+        # Settings file + SBS_<SECTION>__<KEY> environment overrides; arguments win
+        self.settings = load_config()
+        self.config_watcher = ConfigWatcher(settings=self.settings)
+        scale_settings = self.settings.get('scale', {})
+        camera_settings = self.settings.get('camera', {})
+        if arduino_port is None:
+            arduino_port = scale_settings.get('port', 'auto')
+        if baud_rate is None:
+            baud_rate = scale_settings.get('baud_rate', 9600)
+        if camera_index is None:
+            camera_index = camera_settings.get('index', 0)
+        
+        # Per-stage spans keyed by camera frame sequence, dumped via /admin/trace
+        tracing_settings = self.settings.get('tracing', {})
+        self.tracer = Tracer(
+            capacity=tracing_settings.get('capacity', 20000),
+            sample_every=tracing_settings.get('sample_every', 1),
+            enabled=tracing_settings.get('enabled', True))
+        
+        # RSS/thread history for leak detection; allocation snapshots via /admin/memory
+        memory_settings = self.settings.get('memory', {})
+        self.memory = MemoryMonitor(
+            interval=memory_settings.get('sample_interval', 60.0),
+            history=memory_settings.get('history', 1440),
+            tracemalloc_frames=memory_settings.get('tracemalloc_frames', 0),
+            growth_limit_mb=memory_settings.get('growth_limit_mb', 5.0),
+            warmup=memory_settings.get('warmup', 600.0))
+        
+        # Initialize YOLO model (active registry version, else the configured base model)
         print("Loading AI model (this may take a minute)...")
+        self.model_registry = ModelRegistry(self.settings.get('paths', {}).get('models_dir', 'models'))
+        self.model_version = None
+        self.model_classes = None
         try:
-            self.model = YOLO('yolov8n.pt')
-            print("✓ AI model loaded successfully!")
+            self.model, self.model_version, self.model_classes = self._load_model(
+                self.settings.get('yolo', {}).get('model_version'))
+            print(f"✓ AI model loaded successfully! ({self.model_version or 'base model'})")
         except Exception as e:
             print(f"✗ Model loading failed: {e}")
             self.model = None
         
-        # Initialize Arduino
+        # Initialize Arduino (scans ports for the scale banner, reconnects with backoff)
         print("Connecting to Arduino...")
-        try:
-            self.arduino = serial.Serial(arduino_port, baud_rate, timeout=1)
-            time.sleep(2)
-            print("✓ Arduino connected successfully!")
-        except Exception as e:
-            print(f"✗ Arduino connection failed: {e}")
-            print("  Weight readings will show 0.00")
-            self.arduino = None
+        self.scale = ScaleConnection(
+            port=arduino_port,
+            baud_rate=baud_rate,
+            stale_after=scale_settings.get('stale_after', 5.0),
+            backoff_max=scale_settings.get('reconnect_backoff_max', 30.0))
+        if not self.scale.connect():
+            print("  Weight readings will show 0.00 until the scale is found")
         
         # Initialize camera
         print("Connecting to camera...")
-        self.cap = cv2.VideoCapture(camera_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        self.camera = CameraSupervisor(
+            index=camera_index,
+            resolution=camera_settings.get('resolution', [640, 480]),
+            fps=camera_settings.get('fps', 30),
+            fourcc=camera_settings.get('format', 'MJPG'),
+            rotation=camera_settings.get('rotation', 0),
+            stall_timeout=camera_settings.get('stall_timeout', 2.0),
+            tracer=self.tracer)
         
-        if self.cap.isOpened():
+        if self.camera.open():
             print("✓ Camera connected successfully!")
         else:
-            print("✗ Camera connection failed!")
+            print("✗ Camera connection failed! (retrying in the background)")
         
         # Shared data with thread safety
         self.frame_buffer = None
+        self.frame_time = 0.0
+        self.frame_seq = 0
         self.frame_lock = threading.Lock()
         
         self.current_weight = 0.0
@@ -67,6 +130,11 @@ class ImprovedFruitDetectionSystem:
         
         self.detected_fruit = 'none'
         self.detection_confidence = 0.0
+        self.detection_boxes = []
+        self.detection_quantity = 1
+        self.detection_code = None
+        self.detection_frame_time = 0.0
+        self.detection_seq = 0
         self.detection_lock = threading.Lock()
         
         # Fruit mapping
@@ -96,7 +164,146 @@ class ImprovedFruitDetectionSystem:
             'none': 0
         }
         
-        self.confidence_threshold = 0.3
+        # Billing engine (exact paise arithmetic, tax/discount/rounding from config)
+        self.billing = BillingEngine.from_settings(self.fruit_prices, load_products(), self.settings)
+        
+        # Saved readings go through a crash-safe, group-committed journal
+        journal_settings = self.settings.get('journal', {})
+        self.journal = ReadingsJournal(
+            path=journal_settings.get('path', 'readings.json'),
+            archive_dir=journal_settings.get('archive_dir', 'readings_archive'),
+            fsync_batch=journal_settings.get('fsync_batch', 8),
+            fsync_interval=journal_settings.get('fsync_interval', 0.2),
+            durable=journal_settings.get('durable', True),
+            sync_timeout=journal_settings.get('sync_timeout', 5.0))
+        
+        # Stock on hand, decremented as readings are billed; low stock is broadcast
+        inventory_settings = self.settings.get('inventory', {})
+        self.inventory = InventoryLedger(
+            path=inventory_settings.get('db_path', 'data/inventory.db'),
+            flush_interval=inventory_settings.get('flush_interval', 0.5),
+            batch_size=inventory_settings.get('batch_size', 64),
+            default_reorder_level=inventory_settings.get('default_reorder_level', 0.0),
+            on_low_stock=self._on_low_stock)
+        
+        # Committed transactions queue in a local outbox and are shipped to head office
+        sync_settings = self.settings.get('sync', {})
+        self.sync = SyncOutbox(
+            station=self.settings.get('station', {}).get('id', 'default'),
+            endpoint=sync_settings.get('endpoint'),
+            path=sync_settings.get('db_path', 'data/outbox.db'),
+            token=sync_settings.get('token'),
+            batch_size=sync_settings.get('batch_size', 200),
+            interval=sync_settings.get('interval', 5.0),
+            max_bytes_per_second=sync_settings.get('max_bytes_per_second', 32768),
+            backoff_max=sync_settings.get('backoff_max', 300.0),
+            timeout=sync_settings.get('timeout', 15.0),
+            keep_acked=sync_settings.get('keep_acked', 10000))
+        
+        # Adapts detection rate, inference size and preview quality to measured load
+        performance = self.settings.get('performance', {})
+        self.adaptive = AdaptiveController(
+            target_latency=performance.get('target_latency_ms', 250) / 1000.0,
+            cpu_target=performance.get('cpu_target', 85),
+            levels=performance.get('levels'),
+            enabled=performance.get('adaptive', True))
+        
+        # Near-identical tray frames reuse the previous detection instead of a model pass
+        cache_settings = self.settings.get('detection_cache', {})
+        self.detection_cache = DetectionCache(
+            max_entries=cache_settings.get('max_entries', 32),
+            max_distance=cache_settings.get('max_distance', 4),
+            ttl=cache_settings.get('ttl', 5.0),
+            roi=cache_settings.get('roi'),
+            enabled=cache_settings.get('enabled', True))
+        
+        # Packaged goods are identified by their barcode/QR code instead of a model pass
+        barcode_settings = self.settings.get('barcode', {})
+        self.barcode_reader = BarcodeReader(
+            roi=barcode_settings.get('roi') or cache_settings.get('roi'),
+            qr=barcode_settings.get('qr', True),
+            linear=barcode_settings.get('linear', True),
+            enabled=barcode_settings.get('enabled', True),
+            rescan_every=barcode_settings.get('rescan_every', 10))
+        
+        # Columnar sales history for /analytics
+        self.station_id = self.settings.get('station', {}).get('id', 'default')
+        
+        # Bus to the web workers: snapshot store, read-only views and forwarded
+        # HTTP requests (cluster mode only)
+        cluster_settings = self.settings.get('cluster', {})
+        self.bus = None
+        self.view_interval = cluster_settings.get('publish_interval', 1.0)
+        if cluster_settings.get('message_queue'):
+            self.bus = StationBus(cluster_settings['message_queue'], self.station_id,
+                                  timeout=cluster_settings.get('request_timeout', 10.0))
+        
+        # Parks capture, inference and streaming while nobody is watching and the
+        # tray is empty; viewer counts are only known here in single-process mode
+        power_settings = self.settings.get('power', {})
+        self.power = PowerManager(
+            idle_after=power_settings.get('idle_after', 30.0),
+            weight_threshold=power_settings.get('weight_threshold', 5.0),
+            watchdog_interval=power_settings.get('watchdog_interval', 2.0),
+            enabled=power_settings.get('enabled', True) and self.bus is None,
+            on_change=self._on_power_change)
+        self.analytics = AnalyticsStore(
+            self.settings.get('analytics', {}).get('store_dir', 'data/analytics'))
+        
+        # Invoice rendering runs in a background worker pool
+        self.invoices_dir = self.settings.get('paths', {}).get('invoices_dir', 'invoices')
+        self.invoice_renderer = InvoiceRenderer(self.settings, self.invoices_dir)
+        self.invoice_pool = InvoiceWorkerPool(
+            self.invoice_renderer, self.settings.get('invoice', {}).get('workers', 2))
+        
+        yolo_settings = self.settings.get('yolo', {})
+        self.confidence_threshold = yolo_settings.get('confidence', 0.3)
+        self.iou_threshold = yolo_settings.get('iou_threshold', 0.7)
+        self.device = yolo_settings.get('device')
+        
+        # Host-side correction of the sketch's grams: the fitted profile from
+        # `python -m src.calibration` if there is one, else (raw - offset) * factor
+        self.scale_factor = scale_settings.get('calibration_factor', 1.0)
+        self.scale_offset = scale_settings.get('offset', 0.0)
+        self.scale_profile_path = scale_settings.get('profile') or profile_path(self.station_id)
+        self.scale_profile = None
+        self.scale_profile_mtime = None
+        self._load_scale_profile()
+        
+        # Recent uncalibrated readings, served to the calibration tool by /scale/raw
+        self.raw_weights = deque(maxlen=256)
+        self.raw_count = 0
+        
+        # Slow zero drift on an empty tray is corrected without a manual tare
+        self.auto_zero = AutoZero(
+            band=scale_settings.get('zero_band', 2.0),
+            window=scale_settings.get('zero_window', 1.5),
+            tolerance=scale_settings.get('zero_tolerance', 0.3),
+            rate=scale_settings.get('zero_rate', 0.5),
+            enabled=scale_settings.get('auto_zero', True))
+        self.command_timeout = scale_settings.get('command_timeout', 5.0)
+        
+        # Class id -> catalog index table, rebuilt whenever a model is loaded
+        self.catalog = [name for name in self.fruit_prices if name != 'none']
+        self.class_lookup = None
+        self._build_class_lookup()
+        
+        # Delta-only telemetry for dashboard clients
+        telemetry_settings = self.settings.get('telemetry', {})
+        self.telemetry = TelemetryChannel(min_interval=telemetry_settings.get('min_interval', 0.1))
+        self.frame_gate = FrameChangeDetector(
+            threshold=telemetry_settings.get('frame_change_threshold', 3.0),
+            max_age=telemetry_settings.get('frame_max_age', 10.0))
+        self.latest_frame = ""
+        
+        # Preview frames are downscaled, annotated and encoded on their own thread
+        preview_settings = self.settings.get('preview', {})
+        self.preview = PreviewEncoder(
+            width=preview_settings.get('width', 480),
+            backend=preview_settings.get('backend', 'auto'),
+            fmt=preview_settings.get('format', 'jpeg'),
+            tracer=self.tracer)
+        self.preview_seq = 0
         
         self.current_data = {
             'fruit': 'none',
@@ -111,6 +318,7 @@ class ImprovedFruitDetectionSystem:
         self.weight_thread = None
         self.detection_thread = None
         self.broadcast_thread = None
+        self.config_thread = None
         
         print("\n" + "="*60)
         print("System initialized successfully!")
@@ -119,207 +327,409 @@ class ImprovedFruitDetectionSystem:
     def capture_frames(self):
         """Thread 1: Continuously capture frames from camera"""
         print("✓ Camera capture thread started\n")
+        # The supervisor reads the device on its own OS thread; pick up its newest frame
+        self.camera.start()
+        last_sequence = 0
         while self.running:
-            ret, frame = self.cap.read()
-            if ret:
-                with self.frame_lock:
+            sequence, frame, frame_time = self.camera.latest()
+            if sequence != last_sequence:
+                last_sequence = sequence
+                with self.tracer.lock(self.frame_lock, 'wait frame_lock', sequence):
                     self.frame_buffer = frame
-            time.sleep(0.01)  # ~100 FPS capture
+                    self.frame_time = frame_time
+                    self.frame_seq = sequence
+            if self.power.is_idle:
+                # Watchdog reads only; woken at once when the station becomes active
+                self.power.wait(self.power.watchdog_interval)
+            else:
+                time.sleep(0.01)  # ~100 polls per second
     
     def weight_reading_loop(self):
         """Thread 2: Continuously read weight from Arduino"""
         print("✓ Weight reading thread started\n")
         while self.running:
-            weight = self._read_weight_from_arduino()
-            with self.weight_lock:
-                self.current_weight = weight
+            with self.tracer.span('scale.read', cat='scale'):
+                weight = self._read_weight_from_arduino()
+            if weight is not None:
+                with self.tracer.lock(self.weight_lock, 'wait weight_lock'):
+                    self.current_weight = weight
+                # Weight activity keeps the station awake (or wakes it)
+                self.power.weight(weight)
             time.sleep(0.15)  # Read weight ~6-7 times per second
     
     def detection_loop(self):
         """Thread 3: Continuously detect fruits from captured frames"""
         print("✓ Fruit detection thread started\n")
         while self.running:
+            # No inference while idle
+            if self.power.is_idle:
+                self.power.wait(1.0)
+                continue
+            
             # Get latest frame
-            with self.frame_lock:
+            with self.tracer.lock(self.frame_lock, 'wait frame_lock', self.frame_seq):
                 if self.frame_buffer is None:
                     time.sleep(0.05)
                     continue
                 frame = self.frame_buffer.copy()
+                frame_time = self.frame_time
+                seq = self.frame_seq
             
-            # Detect fruit
-            fruit, confidence = self._detect_fruit_from_frame(frame)
+            # Detect fruit (cached result if the tray looks the same as a recent frame)
+            started = time.perf_counter()
+            imgsz = self.adaptive.current()['imgsz']
+            with self.tracer.span('detect', seq, imgsz=imgsz) as span:
+                # A catalog code on the tray identifies the item and YOLO is skipped.
+                # Checked ahead of the detection cache, whose tray hash cannot tell
+                # two similar-looking packs apart; the reader only decodes again
+                # when the tray changes
+                with self.tracer.span('detect.barcode', seq):
+                    scanned = self.barcode_reader.scan(frame, self.billing.lookup_barcode)
+                cached = None
+                if scanned is not None:
+                    fruit, quantity, code, boxes = scanned
+                    confidence = 1.0
+                else:
+                    quantity, code = 1, None
+                    key = self.detection_cache.key(frame)
+                    cached = self.detection_cache.get(key, imgsz) if self.model is not None else None
+                    if cached is not None:
+                        fruit, confidence, boxes = cached
+                    else:
+                        model_started = time.perf_counter()
+                        with self.tracer.span('detect.model', seq):
+                            fruit, confidence, boxes = self._detect_fruit_from_frame(frame)
+                        self.detection_cache.put(key, (fruit, confidence, boxes), imgsz)
+                        # Only model passes tell the controller about inference cost
+                        self.adaptive.record_inference(time.perf_counter() - model_started)
+                span.set(cached=cached is not None, fruit=fruit, barcode=code)
+            elapsed = time.perf_counter() - started
             
             # Update detection results
-            with self.detection_lock:
+            with self.tracer.lock(self.detection_lock, 'wait detection_lock', seq):
                 self.detected_fruit = fruit
                 self.detection_confidence = confidence
+                self.detection_boxes = boxes
+                self.detection_quantity = quantity
+                self.detection_code = code
+                self.detection_frame_time = frame_time
+                self.detection_seq = seq
             
-            time.sleep(0.05)  # ~20 FPS detection
+            # Detection rate follows the adaptive controller (~20 FPS at full quality)
+            time.sleep(max(0.0, self.adaptive.current()['detect_interval'] - elapsed))
     
     def broadcast_loop(self):
         """Thread 4: Continuously broadcast combined data to web interface"""
         print("✓ Broadcast thread started\n")
+        last_frame_time = 0.0
+        last_views = 0.0
+        level = self.adaptive.current()
         while self.running:
-            # Gather all data (thread-safe)
-            with self.weight_lock:
+            # Web workers answer /metrics and stock reads from these, idle or not
+            if self.bus and time.monotonic() - last_views >= self.view_interval:
+                self._publish_views()
+                last_views = time.monotonic()
+            # No encoding or broadcasting while idle (no viewers, empty tray)
+            if self.power.is_idle:
+                self.power.wait(1.0)
+                continue
+            tick_start = time.perf_counter()
+            
+            # Gather all data (thread-safe); spans belong to the frame being broadcast
+            seq = self.detection_seq
+            with self.tracer.lock(self.weight_lock, 'wait weight_lock', seq):
                 weight = self.current_weight
             
-            with self.detection_lock:
+            with self.tracer.lock(self.detection_lock, 'wait detection_lock', seq):
                 fruit = self.detected_fruit
                 confidence = self.detection_confidence
+                boxes = self.detection_boxes
+                quantity = self.detection_quantity
+                code = self.detection_code
+                frame_time = self.detection_frame_time
             
-            # Calculate price
-            price = self.calculate_price(fruit, weight)
-            
-            # Get processed frame for display
-            frame_base64 = self._get_display_frame()
+            # Calculate price (fixed-price products by the piece, the rest by weight)
+            fixed = self.billing.is_fixed_price(fruit)
+            price = self.calculate_price(fruit, weight, quantity)
             
-            # Update current data
-            self.current_data = {
+            values = {
                 'fruit': fruit,
                 'weight': round(weight, 2),
                 'price': round(price, 2),
                 'confidence': round(confidence * 100, 1),
-                'timestamp': datetime.now().isoformat(),
-                'frame': frame_base64
+                'pricing': 'unit' if fixed else 'weight',
+                'quantity': quantity if fixed else None,
+                'barcode': code,
+                'currency_symbol': self.billing.currency_symbol,
             }
+            data_changed = self.telemetry.update(values)
+            
+            # Re-encode the preview only when the picture or the overlay data changed;
+            # encoding happens on the preview thread and is picked up on a later tick
+            with self.tracer.lock(self.frame_lock, 'wait frame_lock', seq):
+                raw_frame = self.frame_buffer
+                raw_seq = self.frame_seq
+            if raw_frame is not None and (self.frame_gate.changed(raw_frame) or data_changed):
+                self.preview.submit(raw_frame, boxes, weight, level['jpeg_quality'], seq=raw_seq)
+            seq, encoded = self.preview.get_latest()
+            if seq != self.preview_seq:
+                self.preview_seq = seq
+                self.latest_frame = encoded
+                self.telemetry.update({'frame': encoded, 'frame_type': self.preview.mime_type},
+                                      force=True)
+            
+            # Update current data
+            self.current_data = dict(values, timestamp=datetime.now().isoformat(), frame=self.latest_frame)
+            
+            # Broadcast only what changed since the last delta
+            delta = self.telemetry.flush()
+            if delta:
+                with self.tracer.span('emit', seq, cat='web', fields=len(delta['changes'])):
+                    socketio.emit('delta', delta)
+                if self.bus:
+                    self._publish_snapshot()
             
-            # Broadcast to all connected clients
-            socketio.emit('update_data', self.current_data)
+            # End-to-end latency (capture -> broadcast) of each new detection result
+            if frame_time and frame_time != last_frame_time:
+                self.adaptive.record_latency(time.time() - frame_time)
+                last_frame_time = frame_time
+            level = self.adaptive.update()
             
             # Console output
-            if fruit != "none":
-                print(f"[LIVE] {fruit.upper()} | Weight: {weight:.2f}g | Price: ₹{price:.2f} | Conf: {confidence*100:.1f}%")
-            else:
-                print(f"[LIVE] No fruit detected | Weight: {weight:.2f}g")
+            if delta and set(delta['changes']) - {'frame'}:
+                if fixed:
+                    print(f"[LIVE] {fruit.upper()} x{quantity} | Barcode: {code} | Price: ₹{price:.2f}")
+                elif fruit != "none":
+                    print(f"[LIVE] {fruit.upper()} | Weight: {weight:.2f}g | Price: ₹{price:.2f} | Conf: {confidence*100:.1f}%")
+                else:
+                    print(f"[LIVE] No fruit detected | Weight: {weight:.2f}g")
             
-            time.sleep(0.1)  # 10 updates per second
+            # Preview rate follows the adaptive controller (10 updates per second at full quality)
+            time.sleep(max(0.0, 1.0 / level['preview_fps'] - (time.perf_counter() - tick_start)))
     
-    def _read_weight_from_arduino(self):
-        """Internal: Read weight from Arduino"""
-        if not self.arduino or not self.arduino.is_open:
-            return 0.0
-            
+    def _on_low_stock(self, stock):
+        """Internal: Tell the dashboards a product reached its reorder level"""
+        print(f"✗ Low stock: {stock['product']} {stock['on_hand']:.0f} {stock['unit']} "
+              f"(reorder at {stock['reorder_level']:.0f} {stock['unit']})")
+        socketio.emit('low_stock', stock)
+    
+    def _on_power_change(self, state):
+        """Internal: Throttle the camera to a watchdog read while idle"""
+        if state == IDLE:
+            self.camera.throttle(self.power.watchdog_interval)
+            print(f"✓ Idle: no viewers and an empty tray; camera read every "
+                  f"{self.power.watchdog_interval:g}s, detection and preview paused")
+        else:
+            self.camera.throttle(None)
+            print(f"✓ Active again ({self.power.last_wake_reason})")
+    
+    def _publish_snapshot(self):
+        """Internal: Store the telemetry snapshot for clients connecting to web workers"""
         try:
-            # Arduino streams continuously; read a line (Serial timeout=1s)
-            for _ in range(2):
-                response = self.arduino.readline().decode('utf-8', errors='ignore').strip()
-
-                # Response format is "Weight: X.X g"
-                if "Weight:" in response:
-                    try:
-                        after_label = response.split("Weight:", 1)[1]
-                        match = re.search(r"[-+]?\d*\.?\d+", after_label)
-                        if match:
-                            return abs(float(match.group(0)))
-                    except (ValueError, IndexError):
-                        continue
-
-            # No new data; keep last known weight
-            with self.weight_lock:
-                return self.current_weight
-                
+            self.bus.publish_snapshot(self.telemetry.snapshot())
         except Exception as e:
-            return 0.0
+            print(f"✗ Snapshot publish failed: {e}")
+    
+    def _publish_views(self):
+        """Internal: Store /metrics and stock levels for web workers to serve without a round trip"""
+        try:
+            self.bus.publish_view('metrics', _metrics())
+            self.bus.publish_view('inventory', self.inventory.levels())
+        except Exception as e:
+            print(f"✗ View publish failed: {e}")
+    
+    def config_watch_loop(self):
+        """Thread 5: Apply edits to config/settings.json while running"""
+        print("✓ Config watcher thread started\n")
+        while self.running:
+            self._load_scale_profile()
+            self.memory.tick()
+            change = self.config_watcher.poll()
+            if change:
+                settings, live, restart = change
+                self.apply_settings(settings)
+                if live:
+                    print(f"✓ Config reloaded: {', '.join(live)}")
+                if restart:
+                    print(f"✗ Restart required to apply: {', '.join(restart)}")
+            time.sleep(2.0)
+    
+    def apply_settings(self, settings):
+        """
+        Apply the live-tunable settings (see src.config.LIVE_SECTIONS).
+        
+        Args:
+            settings (dict): Validated settings
+        """
+        self.settings = settings
+        yolo_settings = settings.get('yolo', {})
+        self.confidence_threshold = yolo_settings.get('confidence', 0.3)
+        self.iou_threshold = yolo_settings.get('iou_threshold', 0.7)
+        
+        scale_settings = settings.get('scale', {})
+        self.scale_factor = scale_settings.get('calibration_factor', 1.0)
+        self.scale_offset = scale_settings.get('offset', 0.0)
+        self.auto_zero.enabled = scale_settings.get('auto_zero', True)
+        self.auto_zero.band = scale_settings.get('zero_band', 2.0)
+        self.auto_zero.window = scale_settings.get('zero_window', 1.5)
+        self.auto_zero.tolerance = scale_settings.get('zero_tolerance', 0.3)
+        self.auto_zero.rate = scale_settings.get('zero_rate', 0.5)
+        self.command_timeout = scale_settings.get('command_timeout', 5.0)
+        
+        performance = settings.get('performance', {})
+        self.adaptive.enabled = performance.get('adaptive', True)
+        self.adaptive.target_latency = performance.get('target_latency_ms', 250) / 1000.0
+        self.adaptive.cpu_target = performance.get('cpu_target', 85)
+        self.adaptive.levels = performance.get('levels') or DEFAULT_LEVELS
+        self.adaptive.level = 0 if not self.adaptive.enabled else min(
+            self.adaptive.level, len(self.adaptive.levels) - 1)
+        
+        telemetry_settings = settings.get('telemetry', {})
+        self.telemetry.min_interval = telemetry_settings.get('min_interval', 0.1)
+        self.frame_gate.threshold = telemetry_settings.get('frame_change_threshold', 3.0)
+        self.frame_gate.max_age = telemetry_settings.get('frame_max_age', 10.0)
+        
+        self.preview.width = settings.get('preview', {}).get('width', 480)
+        
+        tracing_settings = settings.get('tracing', {})
+        self.tracer.enabled = tracing_settings.get('enabled', True)
+        self.tracer.sample_every = max(1, tracing_settings.get('sample_every', 1))
+        self.tracer.resize(tracing_settings.get('capacity', 20000))
+        
+        memory_settings = settings.get('memory', {})
+        self.memory.interval = memory_settings.get('sample_interval', 60.0)
+        self.memory.growth_limit_mb = memory_settings.get('growth_limit_mb', 5.0)
+        self.memory.warmup = memory_settings.get('warmup', 600.0)
+        self.memory.resize(memory_settings.get('history', 1440))
+        self.memory.set_tracemalloc(memory_settings.get('tracemalloc_frames', 0))
+        
+        cache_settings = settings.get('detection_cache', {})
+        self.detection_cache.enabled = cache_settings.get('enabled', True)
+        self.detection_cache.max_distance = cache_settings.get('max_distance', 4)
+        self.detection_cache.ttl = cache_settings.get('ttl', 5.0)
+        self.detection_cache.clear()
+        
+        barcode_settings = settings.get('barcode', {})
+        self.barcode_reader.enabled = barcode_settings.get('enabled', True)
+        self.barcode_reader.rescan_every = max(1, int(barcode_settings.get('rescan_every', 10)))
+        
+        power_settings = settings.get('power', {})
+        self.power.idle_after = power_settings.get('idle_after', 30.0)
+        self.power.weight_threshold = power_settings.get('weight_threshold', 5.0)
+        self.power.watchdog_interval = power_settings.get('watchdog_interval', 2.0)
+        self.power.set_enabled(power_settings.get('enabled', True) and self.bus is None)
+        if self.power.is_idle:
+            self.camera.throttle(self.power.watchdog_interval)
+    
+    def _read_weight_from_arduino(self):
+        """Internal: Read weight from Arduino (None keeps the last reading)"""
+        weight = self.scale.read_weight()
+        if weight is None:
+            # Never bill against a stale weight from a scale that went away
+            return None if self.scale.is_connected else 0.0
+        self.raw_weights.append(weight)
+        self.raw_count += 1
+        if self.scale_profile is not None:
+            weight = self.scale_profile.apply(weight)
+        else:
+            weight = (weight - self.scale_offset) * self.scale_factor
+        return abs(self.auto_zero.update(weight))
+    
+    def _load_scale_profile(self):
+        """Internal: (Re)load the calibration profile when its file changes"""
+        try:
+            mtime = os.stat(self.scale_profile_path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self.scale_profile_mtime:
+            return
+        self.scale_profile_mtime = mtime
+        if mtime is None:
+            if self.scale_profile is not None:
+                print(f"✗ Calibration profile {self.scale_profile_path} removed; using calibration_factor")
+            self.scale_profile = None
+            return
+        try:
+            self.scale_profile = CalibrationProfile.load(self.scale_profile_path)
+            print(f"✓ Calibration profile loaded: {self.scale_profile.model}, "
+                  f"RMSE {self.scale_profile.rmse or 0:.2f} g ({self.scale_profile_path})")
+        except (CalibrationError, OSError) as e:
+            print(f"✗ Calibration profile rejected: {e}")
     
     def _detect_fruit_from_frame(self, frame):
-        """Internal: Detect fruit from frame"""
+        """Internal: Detect fruit from frame; also returns the boxes for the preview"""
         if self.model is None or frame is None:
-            return "none", 0
+            return "none", 0, []
         
         try:
-            results = self.model(frame, conf=self.confidence_threshold, verbose=False)
+            results = self.model(frame, conf=self.confidence_threshold, iou=self.iou_threshold,
+                                 imgsz=self.adaptive.current()['imgsz'], device=self.device,
+                                 verbose=False)
             
             detected_fruit = "none"
             max_confidence = 0
+            boxes = []
             
             for result in results:
-                boxes = result.boxes
+                catalog_index, confidences, xyxy = select_detections(
+                    result, self.class_lookup, with_boxes=True)
+                index, confidence = best_detection(catalog_index, confidences)
                 
-                for box in boxes:
-                    class_id = int(box.cls[0])
-                    class_name = result.names[class_id].lower()
-                    confidence = float(box.conf[0])
-                    
-                    if class_name in self.fruit_mapping:
-                        fruit_name = self.fruit_mapping[class_name]
-                        
-                        if confidence > max_confidence:
-                            max_confidence = confidence
-                            detected_fruit = fruit_name
+                if index != NO_PRODUCT and confidence > max_confidence:
+                    max_confidence = confidence
+                    detected_fruit = self.catalog[index]
+                
+                for index, conf, box in zip(catalog_index.tolist(), confidences.tolist(),
+                                            xyxy.astype(int).tolist()):
+                    boxes.append((self.catalog[index], conf, box))
             
-            return detected_fruit, max_confidence
+            return detected_fruit, max_confidence, boxes
             
         except Exception as e:
-            return "none", 0
+            return "none", 0, []
+    
+    def _build_class_lookup(self):
+        """Internal: Resolve model class ids to catalog indices once per model load"""
+        if self.model is None:
+            self.class_lookup = None
+            return
+        self.class_lookup = build_class_lookup(
+            self.model.names, self._class_mapping(self.model_classes), self.catalog)
+    
+    def _class_mapping(self, classes):
+        """Internal: Label mapping for a model; produce models name our products directly"""
+        if classes:
+            return {name: name for name in classes}
+        return self.fruit_mapping
     
-    def _get_display_frame(self):
-        """Internal: Get processed frame with overlays for display"""
-        with self.frame_lock:
-            if self.frame_buffer is None:
-                return ""
-            frame = self.frame_buffer.copy()
+    def _load_model(self, version=None):
+        """Internal: Load a registered model version, or yolo.model if none is registered"""
+        version, path, entry = self.model_registry.resolve(version)
+        if entry is None:
+            path = self.settings.get('yolo', {}).get('model', 'yolov8n.pt')
+        model = YOLO(path, task='detect')
+        return model, version, entry['classes'] if entry else None
+    
+    def switch_model(self, version=None):
+        """
+        Load a registered model version and start detecting with it.
         
-        with self.detection_lock:
-            fruit = self.detected_fruit
-            confidence = self.detection_confidence
+        Args:
+            version (str): Registry version (None = the active version)
         
-        with self.weight_lock:
-            weight = self.current_weight
+        Returns:
+            str: The loaded version
+        """
+        model, version, classes = self._load_model(version)
+        lookup = build_class_lookup(model.names, self._class_mapping(classes), self.catalog)
         
-        # Run detection again to draw boxes
-        if self.model is not None:
-            try:
-                results = self.model(frame, conf=self.confidence_threshold, verbose=False)
-                
-                for result in results:
-                    boxes = result.boxes
-                    
-                    for box in boxes:
-                        class_id = int(box.cls[0])
-                        class_name = result.names[class_id].lower()
-                        conf = float(box.conf[0])
-                        
-                        if class_name in self.fruit_mapping:
-                            fruit_name = self.fruit_mapping[class_name]
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            
-                            # Color based on confidence
-                            if conf > 0.7:
-                                color = (0, 255, 0)
-                            elif conf > 0.5:
-                                color = (0, 255, 255)
-                            else:
-                                color = (0, 165, 255)
-                            
-                            # Draw box
-                            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
-                            
-                            # Draw label
-                            label = f"{fruit_name.upper()} {conf:.2f}"
-                            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
-                            
-                            cv2.rectangle(frame, (x1, y1 - label_size[1] - 10), 
-                                        (x1 + label_size[0], y1), color, -1)
-                            
-                            cv2.putText(frame, label, (x1, y1 - 5),
-                                      cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
-            except:
-                pass
-        
-        # Add status overlay
-        cv2.putText(frame, "AI Detection Active", (10, 30),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        
-        # Show weight on video
-        cv2.putText(frame, f"Weight: {weight:.2f}g", (10, 60),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-        
-        # Encode to base64
-        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-        frame_base64 = base64.b64encode(buffer).decode('utf-8')
-        
-        return frame_base64
+        # Swap model and lookup together; cached results belong to the old model
+        with self.detection_lock:
+            self.model, self.class_lookup = model, lookup
+            self.model_version, self.model_classes = version, classes
+        self.detection_cache.clear()
+        print(f"✓ Switched to model {version or 'base model'}")
+        return version
     
     def get_weight(self):
         """Get current weight (thread-safe)"""
@@ -327,24 +737,32 @@ class ImprovedFruitDetectionSystem:
             return self.current_weight
     
     def tare_scale(self):
-        """Reset scale to zero"""
-        if self.arduino and self.arduino.is_open:
-            try:
-                self.arduino.write(b'T')
-                time.sleep(0.5)
-                # Clear the weight immediately
-                with self.weight_lock:
-                    self.current_weight = 0.0
-                return True
-            except Exception as e:
-                print(f"Tare error: {e}")
-        return False
+        """
+        Ask the scale to zero itself without waiting for the acknowledgement.
+        
+        Returns:
+            ScaleCommand: Completes when the sketch replies 'Tared!' or times out;
+            the outcome is also broadcast as a 'scale_command' event
+        """
+        command = self.scale.tare(timeout=self.command_timeout)
+        command.add_callback(self._on_tare_done)
+        return command
     
-    def calculate_price(self, fruit, weight_grams):
-        """Calculate price based on weight and fruit type"""
-        price_per_kg = self.fruit_prices.get(fruit.lower(), 0)
-        weight_kg = weight_grams / 1000.0
-        return price_per_kg * weight_kg
+    def _on_tare_done(self, command):
+        """Internal: Apply an acknowledged tare and tell the dashboards"""
+        if command.ok:
+            # The sketch's new zero is exact; drop the tracked drift and the stale weight
+            self.auto_zero.reset()
+            with self.weight_lock:
+                self.current_weight = 0.0
+            print("✓ Scale tared")
+        else:
+            print(f"✗ Tare failed: {command.error}")
+        socketio.emit('scale_command', command.to_dict())
+    
+    def calculate_price(self, fruit, weight_grams, quantity=1):
+        """Calculate price based on weight and fruit type (per piece for fixed-price products)"""
+        return from_paise(self.billing.line_amount(fruit, weight_grams, quantity))
     
     def start(self):
         """Start all threads for simultaneous operation"""
@@ -371,6 +789,11 @@ class ImprovedFruitDetectionSystem:
             self.broadcast_thread.daemon = True
             self.broadcast_thread.start()
             
+            # Thread 5: Live config reload
+            self.config_thread = threading.Thread(target=self.config_watch_loop, name="ConfigThread")
+            self.config_thread.daemon = True
+            self.config_thread.start()
+            
             print("\n" + "="*60)
             print("ALL THREADS STARTED - SIMULTANEOUS OPERATION ACTIVE")
             print("="*60 + "\n")
@@ -386,534 +809,375 @@ class ImprovedFruitDetectionSystem:
             self.detection_thread.join(timeout=2)
         if self.broadcast_thread:
             self.broadcast_thread.join(timeout=2)
+        if self.config_thread:
+            self.config_thread.join(timeout=2)
     
     def cleanup(self):
         """Clean up resources"""
         self.stop()
-        if self.cap:
-            self.cap.release()
-        if self.arduino and self.arduino.is_open:
-            self.arduino.close()
-
-# *** CONFIGURE THESE VALUES ***
-ARDUINO_PORT = 'COM3'  # Change to your port!
-CAMERA_INDEX = 0
-
-detector = ImprovedFruitDetectionSystem(
-    arduino_port=ARDUINO_PORT,
-    baud_rate=9600,
-    camera_index=CAMERA_INDEX
-)
-
-HTML_TEMPLATE = '''
-<!DOCTYPE html>
-<html>
-<head>
-    <title>AI Powered Smart Billing System</title>
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <script src="https://cdn.socket.io/4.5.4/socket.io.min.js"></script>
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        body {
-            font-family: 'Segoe UI', system-ui, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }
-        .container { max-width: 1600px; margin: 0 auto; }
-        .header {
-            text-align: center;
-            color: white;
-            margin-bottom: 30px;
-            animation: fadeIn 1s;
-        }
-        .header h1 { 
-            font-size: 2.8em; 
-            margin-bottom: 10px; 
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-        }
-        .ai-badge {
-            display: inline-block;
-            background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-            padding: 8px 20px;
-            border-radius: 20px;
-            font-size: 0.9em;
-            font-weight: bold;
-            margin-top: 10px;
-            animation: pulse 2s infinite;
-        }
-        .dashboard {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 20px;
-            margin-bottom: 20px;
-        }
-        .card {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-            transition: transform 0.3s;
-            animation: slideUp 0.5s;
-        }
-        .card:hover { transform: translateY(-5px); }
-        .card-title {
-            font-size: 1em;
-            color: #666;
-            margin-bottom: 15px;
-            font-weight: 600;
-        }
-        .card-value {
-            font-size: 2.5em;
-            font-weight: bold;
-            text-align: center;
-            margin: 15px 0;
-            transition: all 0.3s;
-        }
-        .fruit-value { color: #e74c3c; }
-        .weight-value { color: #3498db; }
-        .price-value { color: #27ae60; }
-        .confidence-value { color: #9b59b6; }
-        .confidence-bar {
-            width: 100%;
-            height: 10px;
-            background: #ecf0f1;
-            border-radius: 5px;
-            overflow: hidden;
-            margin-top: 10px;
-        }
-        .confidence-fill {
-            height: 100%;
-            background: linear-gradient(90deg, #e74c3c, #f39c12, #27ae60);
-            transition: width 0.3s;
-            border-radius: 5px;
-        }
-        .video-container {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-            margin-bottom: 20px;
-        }
-        #video-feed {
-            width: 100%;
-            border-radius: 10px;
-            background: #000;
-            min-height: 400px;
-        }
-        .controls {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 15px;
-            margin-top: 20px;
-        }
-        button {
-            padding: 15px 25px;
-            font-size: 1.1em;
-            font-weight: bold;
-            border: none;
-            border-radius: 10px;
-            cursor: pointer;
-            transition: all 0.3s;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        }
-        button:hover { transform: translateY(-2px); }
-        button:active { transform: translateY(0); }
-        .btn-tare { background: #3498db; color: white; }
-        .btn-tare:hover { background: #2980b9; }
-        .btn-save { background: #27ae60; color: white; }
-        .btn-save:hover { background: #229954; }
-        .history {
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-        }
-        table { width: 100%; border-collapse: collapse; }
-        th, td { padding: 12px; text-align: left; border-bottom: 1px solid #eee; }
-        th { background: #f8f9fa; font-weight: 600; }
-        tr:hover { background: #f8f9fa; }
-        .status-live { 
-            background: #d4edda; 
-            color: #155724;
-            padding: 5px 15px;
-            border-radius: 20px;
-            font-size: 0.9em;
-            font-weight: bold;
-            animation: blink 2s infinite;
-        }
-        .system-status {
-            background: #e3f2fd;
-            padding: 15px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-            text-align: center;
-            color: #1565c0;
-            font-weight: bold;
-        }
-        @keyframes fadeIn { from { opacity: 0; } to { opacity: 1; } }
-        @keyframes slideUp { from { opacity: 0; transform: translateY(30px); } to { opacity: 1; transform: translateY(0); } }
-        @keyframes pulse { 0%, 100% { transform: scale(1); } 50% { transform: scale(1.05); } }
-        @keyframes blink { 0%, 100% { opacity: 1; } 50% { opacity: 0.7; } }
-
-        @media print {
-            body { background: #fff; padding: 0; }
-            .container > *:not(#bill-modal) { display: none !important; }
-            #bill-modal { display: block !important; position: static !important; background: none !important; }
-            #bill-modal > div { box-shadow: none !important; max-width: none !important; width: 100% !important; }
-            #bill-modal button { display: none !important; }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🤖 AI Powered Smart Billing System</h1>
-            <div class="ai-badge">⚡ YOLO Deep Learning Model</div>
-            <p style="margin-top: 10px;">Real-time simultaneous detection and weighing</p>
-        </div>
-
-        <div class="system-status">
-            🔄 SIMULTANEOUS MODE: Camera + Weight Sensor + AI Detection Running in Parallel
-        </div>
-
-        <div class="dashboard">
-            <div class="card">
-                <div class="card-title">🍇 Detected Fruit</div>
-                <div class="card-value fruit-value">
-                    <span id="fruit-emoji" style="font-size: 1.5em;">❌</span>
-                    <div id="fruit-display" style="font-size: 0.5em; margin-top: 10px;">None</div>
-                </div>
-            </div>
-            <div class="card">
-                <div class="card-title">⚖️ Weight (Live)</div>
-                <div class="card-value weight-value" id="weight-display">0.00</div>
-                <div style="text-align: center; color: #666; font-size: 0.8em;">grams</div>
-            </div>
-            <div class="card">
-                <div class="card-title">💰 Price</div>
-                <div class="card-value price-value" id="price-display">₹0.00</div>
-            </div>
-            <div class="card">
-                <div class="card-title">🎯 AI Confidence</div>
-                <div class="card-value confidence-value" id="confidence-display">0%</div>
-                <div class="confidence-bar">
-                    <div class="confidence-fill" id="confidence-bar" style="width: 0%"></div>
-                </div>
-            </div>
-        </div>
-
-        <div class="video-container">
-            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 15px;">
-                <div class="card-title" style="margin: 0;">📹 Live AI Detection Feed</div>
-                <span class="status-live">● LIVE</span>
-            </div>
-            <img id="video-feed" src="" alt="Loading AI model...">
-            <div class="controls">
-                <button class="btn-save" onclick="saveReading()">💾 Save Reading</button>
-                <button class="btn-save" onclick="generateBill()">🧾 Generate Bill</button>
-            </div>
-        </div>
-
-        <div class="history">
-            <div class="card-title">📊 Recent Measurements</div>
-            <div style="overflow-x: auto;">
-                <table>
-                    <thead>
-                        <tr>
-                            <th>Time</th>
-                            <th>Fruit</th>
-                            <th>Confidence</th>
-                            <th style="text-align: right;">Weight (g)</th>
-                            <th style="text-align: right;">Price (₹)</th>
-                        </tr>
-                    </thead>
-                    <tbody id="history-body">
-                        <tr>
-                            <td colspan="5" style="text-align: center; color: #999; padding: 40px;">
-                                No measurements saved yet. Place fruit and click "Save Reading"
-                            </td>
-                        </tr>
-                    </tbody>
-                </table>
-            </div>
-        </div>
-
-        <div id="bill-modal" style="display: none; position: fixed; inset: 0; background: rgba(0,0,0,0.5); align-items: center; justify-content: center;">
-            <div style="background: white; width: 90%; max-width: 700px; border-radius: 12px; padding: 20px; box-shadow: 0 20px 40px rgba(0,0,0,0.3);">
-                <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
-                    <div style="font-weight: 700; font-size: 1.2em;">🧾 Bill Summary</div>
-                    <div>
-                        <button onclick="printBill()" style="background: #27ae60; color: white;">Download PDF / Print</button>
-                        <button onclick="clearBill()" style="background: #e74c3c; color: white;">Clear Bill</button>
-                        <button onclick="closeBill()" style="background: #eee; color: #333;">Close</button>
-                    </div>
-                </div>
-                <div id="bill-content" style="max-height: 400px; overflow: auto; font-size: 0.95em;"></div>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        const socket = io();
-        let history = [];
-        let updateCount = 0;
-        let lastUpdateTime = Date.now();
-        
-        const fruitEmojis = {
-            'apple': '🍎', 'banana': '🍌', 'orange': '🍊', 'mango': '🥭',
-            'grape': '🍇', 'watermelon': '🍉', 'strawberry': '🍓',
-            'pineapple': '🍍', 'kiwi': '🥝', 'pear': '🍐',
-            'peach': '🍑', 'lemon': '🍋', 'pomegranate': '🍎', 'none': '❌'
-        };
-
-        socket.on('connect', () => {
-            console.log('✓ Connected to server - Simultaneous mode active');
-        });
-
-        socket.on('update_data', (data) => {
-            updateCount++;
-            const now = Date.now();
-            const fps = 1000 / (now - lastUpdateTime);
-            lastUpdateTime = now;
-            
-            console.log(`Update #${updateCount} | FPS: ${fps.toFixed(1)} | Fruit: ${data.fruit} | Weight: ${data.weight}g`);
-            
-            // Update all displays with smooth animation
-            document.getElementById('fruit-emoji').textContent = fruitEmojis[data.fruit] || '🍇';
-            document.getElementById('fruit-display').textContent = 
-                data.fruit.charAt(0).toUpperCase() + data.fruit.slice(1);
-            document.getElementById('weight-display').textContent = data.weight.toFixed(2);
-            document.getElementById('price-display').textContent = '₹' + data.price.toFixed(2);
-            document.getElementById('confidence-display').textContent = data.confidence + '%';
-            document.getElementById('confidence-bar').style.width = data.confidence + '%';
-            
-            // Update video feed
-            if (data.frame) {
-                document.getElementById('video-feed').src = 'data:image/jpeg;base64,' + data.frame;
-            }
-        });
-
-        socket.on('disconnect', () => {
-            console.log('✗ Disconnected from server');
-        });
-
-        function tare() {
-            if (confirm('Reset scale to zero?')) {
-                fetch('/tare', { method: 'POST' })
-                    .then(r => r.json())
-                    .then(data => {
-                        alert(data.message);
-                        console.log('Tare successful');
-                    })
-                    .catch(err => {
-                        console.error('Tare error:', err);
-                        alert('Error resetting scale');
-                    });
-            }
-        }
+        self.preview.stop()
+        self.invoice_pool.stop()
+        self.journal.close()
+        self.inventory.close()
+        self.sync.close()
+        self.camera.stop()
+        self.scale.close()
 
-        function saveReading() {
-            fetch('/save', { method: 'POST' })
-                .then(r => r.json())
-                .then(data => {
-                    if (data.success) {
-                        addToHistory(data.data);
-                        alert('✓ Reading saved successfully!');
-                    } else {
-                        alert('✗ ' + data.message);
-                    }
-                })
-                .catch(err => {
-                    console.error('Save error:', err);
-                    alert('Error saving reading');
-                });
-        }
-
-        function addToHistory(data) {
-            history.unshift(data);
-            if (history.length > 10) history.pop();
-            
-            document.getElementById('history-body').innerHTML = history.map(entry => `
-                <tr>
-                    <td>${new Date(entry.timestamp).toLocaleString()}</td>
-                    <td>
-                        <span style="font-size: 1.3em;">${fruitEmojis[entry.fruit] || '🍇'}</span>
-                        <span style="text-transform: capitalize; margin-left: 8px; font-weight: 500;">${entry.fruit}</span>
-                    </td>
-                    <td><span style="color: #9b59b6; font-weight: bold;">${entry.confidence}%</span></td>
-                    <td style="text-align: right; font-weight: 500;">${entry.weight.toFixed(2)}</td>
-                    <td style="text-align: right; color: #27ae60; font-weight: bold;">₹${entry.price.toFixed(2)}</td>
-                </tr>
-            `).join('');
-        }
-
-        function generateBill() {
-            fetch('/bill')
-                .then(r => r.json())
-                .then(data => {
-                    if (!data.success) {
-                        alert(data.message || 'No saved readings found');
-                        return;
-                    }
-
-                    const rows = data.items.map((item, idx) => `
-                        <tr>
-                            <td>${idx + 1}</td>
-                            <td style="text-transform: capitalize;">${item.fruit}</td>
-                            <td style="text-align: right;">${item.weight.toFixed(2)}</td>
-                            <td style="text-align: right;">₹${item.price.toFixed(2)}</td>
-                        </tr>
-                    `).join('');
-
-                    const html = `
-                        <div style="margin-bottom: 10px; color: #666;">Generated: ${new Date(data.generated_at).toLocaleString()}</div>
-                        <table style="width: 100%; border-collapse: collapse;">
-                            <thead>
-                                <tr>
-                                    <th style="text-align: left;">#</th>
-                                    <th style="text-align: left;">Fruit</th>
-                                    <th style="text-align: right;">Weight (g)</th>
-                                    <th style="text-align: right;">Price (₹)</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                ${rows}
-                            </tbody>
-                            <tfoot>
-                                <tr>
-                                    <td colspan="3" style="text-align: right; font-weight: 700; padding-top: 10px;">Total</td>
-                                    <td style="text-align: right; font-weight: 700; padding-top: 10px;">₹${data.total.toFixed(2)}</td>
-                                </tr>
-                            </tfoot>
-                        </table>
-                    `;
-
-                    document.getElementById('bill-content').innerHTML = html;
-                    document.getElementById('bill-modal').style.display = 'flex';
-                })
-                .catch(err => {
-                    console.error('Bill error:', err);
-                    alert('Error generating bill');
-                });
-        }
-
-        function closeBill() {
-            document.getElementById('bill-modal').style.display = 'none';
-        }
-
-        function printBill() {
-            window.print();
-        }
-
-        function clearBill() {
-            if (!confirm('Clear all saved readings?')) return;
-            fetch('/bill/clear', { method: 'POST' })
-                .then(r => r.json())
-                .then(data => {
-                    if (data.success) {
-                        alert('Bill cleared');
-                        document.getElementById('bill-content').innerHTML = '';
-                        history = [];
-                        document.getElementById('history-body').innerHTML = `
-                            <tr>
-                                <td colspan="5" style="text-align: center; color: #999; padding: 40px;">
-                                    No measurements saved yet. Place fruit and click "Save Reading"
-                                </td>
-                            </tr>
-                        `;
-                    } else {
-                        alert(data.message || 'Failed to clear bill');
-                    }
-                })
-                .catch(err => {
-                    console.error('Clear bill error:', err);
-                    alert('Error clearing bill');
-                });
-        }
-
-        // Show connection status
-        window.addEventListener('load', () => {
-            console.log('🚀 Web interface loaded');
-            console.log('⚡ Waiting for data stream...');
-        });
-    </script>
-</body>
-</html>
-'''
+# Ports, camera and tuning come from config/settings.json (or SBS_* environment overrides)
+detector = ImprovedFruitDetectionSystem()
 
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    return static_assets.response('index.html')
+
+@app.route('/static/<path:filename>')
+def static_file(filename):
+    return static_assets.response(filename)
 
 @app.route('/tare', methods=['POST'])
 def tare():
-    success = detector.tare_scale()
-    return {'success': success, 'message': '✓ Scale reset to zero' if success else '✗ Failed to reset scale'}
+    command = detector.tare_scale()
+    # ?wait=1 blocks (cooperatively) until the scale answers; otherwise reply right away
+    if request.args.get('wait') == '1':
+        command.wait(command.timeout + 1.0)
+    if command.done and not command.ok:
+        return {'success': False, 'message': f'✗ Failed to reset scale: {command.error}',
+                'command': command.to_dict()}, 503
+    if command.done:
+        return {'success': True, 'message': '✓ Scale reset to zero', 'command': command.to_dict()}
+    return {'success': True, 'pending': True, 'message': 'Zeroing the scale...',
+            'command': command.to_dict()}, 202
+
+@app.route('/scale/raw', methods=['GET'])
+def scale_raw():
+    """Next `count` uncalibrated readings, for `python -m src.calibration run --server`"""
+    try:
+        count = min(max(int(request.args.get('count', 8)), 1), 200)
+        timeout = min(float(request.args.get('timeout', 30)), 120.0)
+    except ValueError:
+        return {'success': False, 'message': 'count and timeout must be numbers'}, 400
+    start = detector.raw_count
+    deadline = time.monotonic() + timeout
+    while detector.raw_count - start < count and time.monotonic() < deadline:
+        time.sleep(0.1)
+    received = min(detector.raw_count - start, count)
+    if not received:
+        return {'success': False, 'message': 'No readings from the scale'}, 503
+    samples = list(detector.raw_weights)[-received:]
+    return {'success': True, 'samples': samples}
 
 @app.route('/save', methods=['POST'])
 def save_reading():
     data = detector.current_data.copy()
-    if data['fruit'] != 'none' and data['weight'] > 0:
+    body = request.get_json(silent=True) or {}
+    data['station'] = detector.station_id
+    data['cashier'] = request.args.get('cashier') or body.get('cashier') or 'default'
+    # Fixed-price items are billed per piece, so they need no weight on the scale
+    if data['fruit'] != 'none' and (data['weight'] > 0 or data.get('pricing') == 'unit'):
         try:
-            with open('readings.json', 'a') as f:
-                f.write(json.dumps(data) + '\n')
-            return {'success': True, 'data': data}
+            try:
+                seq, unsynced = detector.journal.append(data), None
+            except JournalError as e:
+                # Written, so it is on the bill, but it may not survive a power cut
+                seq, unsynced = e.seq, e
+            # Packaged goods leave stock by the piece, weighed ones by the gram
+            pieces = (data.get('quantity') or 1) if data.get('pricing') == 'unit' else None
+            try:
+                stock = detector.inventory.record_sale(
+                    data['fruit'], data['weight'], station=data['station'],
+                    ref=f"{data['station']}:{data['timestamp']}:{seq}", pieces=pieces)
+            except InventoryError as e:
+                # The reading is billed already; a stock unit mismatch must not undo that
+                print(f"✗ Stock not updated: {e}")
+                stock = None
+            # Head office gets the transaction without the preview image
+            detector.sync.append(READING, {key: value for key, value in data.items() if key != 'frame'})
+            if unsynced is not None:
+                return {'success': False, 'data': data, 'stock': stock,
+                        'message': f'Added to the bill, but not confirmed on disk: {unsynced}'}, 503
+            return {'success': True, 'data': data, 'stock': stock}
         except Exception as e:
             return {'success': False, 'message': f'Save error: {str(e)}'}
-    return {'success': False, 'message': 'No valid data (no fruit detected or zero weight)'}
+    return {'success': False, 'message': 'No valid data (no product detected or zero weight)'}
+
+def _load_saved_readings():
+    """Read all saved readings from the journal"""
+    return detector.journal.read_all()
 
 @app.route('/bill', methods=['GET'])
 def generate_bill():
-    items = []
-    try:
-        with open('readings.json', 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    items.append(json.loads(line))
-                except json.JSONDecodeError:
-                    continue
-    except FileNotFoundError:
+    items = _load_saved_readings()
+    if not items:
         return {'success': False, 'message': 'No saved readings found'}
 
+    try:
+        bill = detector.billing.compute_bill(items, discount=request.args.get('discount'))
+    except ValueError as e:
+        return {'success': False, 'message': str(e)}
+    return dict(bill, success=True)
+
+@app.route('/inventory', methods=['GET'])
+def inventory_levels():
+    return {'success': True, 'stock': detector.inventory.levels(low_only=request.args.get('low') == '1')}
+
+@app.route('/inventory/<product>', methods=['GET'])
+def inventory_product(product):
+    stock = detector.inventory.get(product)
+    if stock is None:
+        return {'success': False, 'message': f'No stock record for {product}'}, 404
+    return dict(stock, success=True)
+
+@app.route('/inventory/import', methods=['POST'])
+def inventory_import():
+    """Bulk stock-in from CSV (request body or 'file' upload); ?mode=set for a stocktake"""
+    upload = request.files.get('file')
+    raw = upload.read() if upload else request.get_data()
+    try:
+        rows = parse_stock_csv(raw.decode('utf-8-sig'))
+    except (InventoryError, UnicodeDecodeError) as e:
+        return {'success': False, 'message': str(e)}, 400
+    replace = request.args.get('mode') == 'set'
+    try:
+        count = detector.inventory.stock_in(rows, replace=replace,
+                                            ref=upload.filename if upload else 'import')
+    except InventoryError as e:
+        return {'success': False, 'message': str(e)}, 400
+    except Exception as e:
+        return {'success': False, 'message': f'Import error: {str(e)}'}, 500
+    return {'success': True, 'products': count, 'mode': 'set' if replace else 'add'}
+
+@app.route('/invoice', methods=['POST'])
+def create_invoice():
+    items = _load_saved_readings()
     if not items:
         return {'success': False, 'message': 'No saved readings found'}
 
-    total = sum(item.get('price', 0) for item in items)
+    try:
+        bill = detector.billing.compute_bill(items, discount=request.args.get('discount'))
+        invoice = detector.invoice_renderer.create_invoice(bill)
+    except ValueError as e:
+        return {'success': False, 'message': str(e)}
+    except OSError as e:
+        return {'success': False, 'message': f'Invoice error: {str(e)}'}
 
-    return {
-        'success': True,
-        'items': [
-            {
-                'fruit': item.get('fruit', 'unknown'),
-                'weight': float(item.get('weight', 0)),
-                'price': float(item.get('price', 0))
-            }
-            for item in items
-        ],
-        'total': float(total),
-        'generated_at': datetime.now().isoformat()
-    }
+    job_id = detector.invoice_pool.submit(invoice)
+    return {'success': True, 'job_id': job_id, 'invoice_id': invoice['invoice_id']}
+
+@app.route('/invoice/<job_id>', methods=['GET'])
+def invoice_status(job_id):
+    status = detector.invoice_pool.status(job_id)
+    if status is None:
+        return {'success': False, 'message': 'Unknown invoice job'}, 404
+    status['files'] = [os.path.basename(path) for path in status['files']]
+    return dict(status, success=True)
+
+@app.route('/invoices/<path:filename>', methods=['GET'])
+def download_invoice(filename):
+    return send_from_directory(os.path.abspath(detector.invoices_dir), filename)
 
 @app.route('/bill/clear', methods=['POST'])
 def clear_bill():
     try:
-        open('readings.json', 'w').close()
-        return {'success': True}
+        archived = detector.journal.archive()
+        if archived:
+            detector.analytics.compact_async([archived])
+            detector.sync.append(BILL_CLEARED, {'station': detector.station_id,
+                                                'archive': os.path.basename(archived),
+                                                'timestamp': datetime.now().isoformat()})
+        return {'success': True, 'archived': archived}
     except Exception as e:
         return {'success': False, 'message': f'Clear error: {str(e)}'}
 
+def _analytics_sources():
+    """Journal files holding saved transactions (archives + live journal)"""
+    return journal_sources(detector.journal.path, detector.journal.archive_dir)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return _metrics()
+
+def _metrics():
+    """Pipeline counters served on /metrics (and published to web workers in cluster mode)"""
+    return {
+        'adaptive': detector.adaptive.stats(),
+        'journal': detector.journal.stats(),
+        'telemetry': detector.telemetry.stats(),
+        'preview': detector.preview.stats(),
+        'detection_cache': detector.detection_cache.stats(),
+        'barcode': detector.barcode_reader.stats(),
+        'scale': dict(detector.scale.stats(), auto_zero=detector.auto_zero.stats(),
+                      profile=detector.scale_profile.to_dict() if detector.scale_profile else None),
+        'camera': detector.camera.stats(),
+        'config': detector.config_watcher.stats(),
+        'tracing': detector.tracer.stats(),
+        'static': static_assets.stats(),
+        'bus': detector.bus.stats() if detector.bus else None,
+        'inventory': detector.inventory.stats(),
+        'memory': detector.memory.stats(),
+        'power': detector.power.stats(),
+        'sync': detector.sync.stats(),
+        'invoice_queue': detector.invoice_pool.pending()
+    }
+
+@app.route('/admin/trace', methods=['GET'])
+def admin_trace():
+    """Chrome trace of recent pipeline spans (open in chrome://tracing or ui.perfetto.dev)"""
+    try:
+        seconds = float(request.args['seconds']) if 'seconds' in request.args else None
+    except ValueError:
+        return {'success': False, 'message': 'seconds must be a number'}, 400
+    trace = detector.tracer.export(seconds)
+    if request.args.get('clear') == '1':
+        detector.tracer.clear()
+    filename = f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    return app.response_class(
+        json.dumps(trace), mimetype='application/json',
+        headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/admin/memory', methods=['GET'])
+def admin_memory():
+    """Memory sample, growth verdicts and tracemalloc top/diff (memory.tracemalloc_frames > 0)"""
+    key = request.args.get('key', 'lineno')
+    if key not in ('lineno', 'filename', 'traceback'):
+        return {'success': False, 'message': 'key must be lineno, filename or traceback'}, 400
+    try:
+        limit = min(max(int(request.args.get('top', 20)), 1), 200)
+    except ValueError:
+        return {'success': False, 'message': 'top must be a number'}, 400
+    report = detector.memory.report(limit, key)
+    if request.args.get('reset') == '1':
+        detector.memory.reset_baseline()
+    if request.args.get('history') == '1':
+        report['history'] = detector.memory.history()
+    return dict(report, success=True)
+
+@app.route('/models', methods=['GET'])
+def list_models():
+    registry = detector.model_registry.load()
+    return {
+        'loaded': detector.model_version,
+        'active': registry['active'],
+        'models': registry['models']
+    }
+
+@app.route('/models/<version>/load', methods=['POST'])
+def load_model(version):
+    try:
+        loaded = detector.switch_model(version)
+        return {'success': True, 'loaded': loaded}
+    except RegistryError as e:
+        return {'success': False, 'message': str(e)}, 404
+    except Exception as e:
+        return {'success': False, 'message': f'Model loading failed: {e}'}, 500
+
+@app.route('/analytics', methods=['GET'])
+def analytics_query():
+    start_time = time.perf_counter()
+    # Compaction rewrites partitions on disk: start it off the hub and answer
+    # from what is already compacted
+    compacting = request.args.get('compact') == '1'
+    if compacting:
+        detector.analytics.compact_async(_analytics_sources())
+    try:
+        rows = detector.analytics.query(**query_args(request.args))
+    except ValueError as e:
+        return {'success': False, 'message': str(e)}, 400
+    result = {
+        'success': True,
+        'rows': rows,
+        'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 2)
+    }
+    if compacting:
+        return dict(result, pending=True), 202
+    return result
+
+@app.route('/analytics/compact', methods=['POST'])
+def analytics_compact():
+    detector.analytics.compact_async(_analytics_sources())
+    return {'success': True, 'pending': True, 'message': 'Compacting saved readings...'}, 202
+
 @socketio.on('connect')
 def handle_connect():
     print('✓ New client connected')
-    emit('update_data', detector.current_data)
+    detector.power.client_connected()
+    emit('snapshot', detector.telemetry.snapshot())
+
+@socketio.on('resync')
+def handle_resync():
+    emit('snapshot', detector.telemetry.snapshot())
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print('✗ Client disconnected')
+    detector.power.client_disconnected()
+
+# Hop-by-hop and length headers are recomputed by the web worker
+FORWARD_SKIPPED_HEADERS = {'content-length', 'transfer-encoding', 'connection'}
+
+def _forwarded_environ(request_data):
+    """Internal: WSGI environ for a request forwarded by a web worker"""
+    body = request_data['body']
+    environ = {
+        'REQUEST_METHOD': request_data['method'],
+        'SCRIPT_NAME': '',
+        # WSGI carries the (already URL-decoded) path as latin-1 text
+        'PATH_INFO': request_data['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': request_data['query_string'],
+        'CONTENT_LENGTH': str(len(body)),
+        'SERVER_NAME': 'station',
+        'SERVER_PORT': '0',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if request_data['content_type']:
+        environ['CONTENT_TYPE'] = request_data['content_type']
+    return environ
+
+def _handle_forwarded(request_data):
+    """Internal: Dispatch one forwarded request through the app's WSGI stack and send back the response"""
+    try:
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'], started['headers'] = int(status.split(' ', 1)[0]), headers
+            return lambda data: None
+
+        chunks = app.wsgi_app(_forwarded_environ(request_data), start_response)
+        try:
+            body = b''.join(chunks)
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        headers = {key: value for key, value in started['headers']
+                   if key.lower() not in FORWARD_SKIPPED_HEADERS}
+        detector.bus.reply(request_data, started['status'], body, headers.get('Content-Type'), headers)
+    except Exception as e:
+        print(f"✗ Forwarded {request_data['method']} {request_data['path']} failed: {e}")
+        try:
+            detector.bus.reply(request_data, 500, b'', None)
+        except Exception:
+            pass
+
+def serve_forwarded_requests():
+    """Cluster mode: answer the HTTP requests web workers forward over the bus"""
+    print(f"✓ Serving forwarded requests for station '{detector.station_id}' via {detector.bus.url}")
+    while detector.running:
+        try:
+            request_data = detector.bus.next_request(timeout=1)
+        except BusError as e:
+            print(f"✗ Bus error: {e}")
+            time.sleep(1.0)
+            continue
+        if request_data is not None:
+            # Each request runs in its own green thread so a slow route doesn't block the rest
+            socketio.start_background_task(_handle_forwarded, request_data)
 
 if __name__ == '__main__':
     try:
@@ -925,15 +1189,25 @@ if __name__ == '__main__':
         print("✓ Thread 2: Weight Reading - Running")
         print("✓ Thread 3: Fruit Detection - Running")
         print("✓ Thread 4: Data Broadcasting - Running")
-        print("\n📱 Open your browser and go to:")
-        print("\n   http://localhost:5000")
-        print("\n   Or from another device on same network:")
-        print("   http://YOUR-COMPUTER-IP:5000")
-        print("\n" + "="*60)
-        print("Press Ctrl+C to stop the server")
-        print("="*60 + "\n")
-        
-        socketio.run(app, host='0.0.0.0', port=5000, debug=False)
+        print("✓ Thread 5: Config Reload - Running")
+        server_settings = detector.settings.get('server', {})
+        port = server_settings.get('port', 5000)
+        if detector.bus:
+            # Browsers connect to the web workers; this process only runs the pipeline
+            print("\n📡 Cluster mode: start the web tier with")
+            print("\n   python -m src.web_worker --workers 4")
+            print("\n" + "="*60 + "\n")
+            serve_forwarded_requests()
+        else:
+            print("\n📱 Open your browser and go to:")
+            print(f"\n   http://localhost:{port}")
+            print("\n   Or from another device on same network:")
+            print(f"   http://YOUR-COMPUTER-IP:{port}")
+            print("\n" + "="*60)
+            print("Press Ctrl+C to stop the server")
+            print("="*60 + "\n")
+            
+            socketio.run(app, host=server_settings.get('host', '0.0.0.0'), port=port, debug=False)
     except KeyboardInterrupt:
         print("\n\n🛑 Shutting down...")
         print("Stopping all threads...")
@@ -1,6 +1,11 @@
 """
 Load Cell Calibration Script
 This script helps calibrate the HX711 load cell for accurate weight measurements.
+
+Template for an HX711 wired directly to Raspberry Pi GPIO. For the Arduino-based
+scale used by demo_exp.py, use the multi-point tool instead:
+
+    python -m src.calibration run
 """
 
 import sys
@@ -0,0 +1,6 @@
+"""
+Smart Billing System - source package.
+
+Reusable building blocks for the billing server (`demo_exp.py`) and the
+command-line tools. See `src/README.md` for an overview of each module.
+"""
@@ -0,0 +1,160 @@
+"""
+Module: adaptive.py
+Description: Load-driven controller for detection rate, inference size and preview quality.
+
+The controller walks a ladder of quality levels. Level 0 is full quality; each
+step down trades accuracy and preview smoothness for latency. It measures
+inference time, end-to-end latency (frame capture -> result broadcast) and CPU
+usage, steps down quickly when the latency target is missed and steps back up
+slowly once there is comfortable headroom, so weak hardware degrades gracefully
+instead of falling further and further behind.
+"""
+
+import os
+import time
+from collections import deque
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+DEFAULT_LEVELS = [
+    {'imgsz': 640, 'detect_interval': 0.05, 'jpeg_quality': 80, 'preview_fps': 10},
+    {'imgsz': 512, 'detect_interval': 0.10, 'jpeg_quality': 70, 'preview_fps': 8},
+    {'imgsz': 416, 'detect_interval': 0.20, 'jpeg_quality': 60, 'preview_fps': 5},
+    {'imgsz': 320, 'detect_interval': 0.35, 'jpeg_quality': 50, 'preview_fps': 3},
+]
+
+
+def _percentile(values, fraction):
+    """Internal: Nearest-rank percentile of a small sample"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def cpu_percent():
+    """
+    System-wide CPU usage in percent, or None if it cannot be measured.
+
+    Uses psutil when installed, otherwise the 1-minute load average.
+    """
+    if PSUTIL_AVAILABLE:
+        return psutil.cpu_percent(interval=None)
+    try:
+        return min(100.0, os.getloadavg()[0] / (os.cpu_count() or 1) * 100)
+    except (AttributeError, OSError):
+        return None
+
+
+class AdaptiveController:
+    """Chooses the quality level that keeps latency under a target."""
+
+    def __init__(self, target_latency=0.25, cpu_target=85.0, levels=None, enabled=True,
+                 window=20, degrade_after=1.0, upgrade_after=10.0):
+        """
+        Initialize the controller.
+
+        Args:
+            target_latency (float): End-to-end latency target in seconds
+            cpu_target (float): CPU usage (%) above which to degrade
+            levels (list): Quality ladder, best first (defaults to DEFAULT_LEVELS)
+            enabled (bool): When False the controller stays on level 0
+            window (int): Number of latency samples considered
+            degrade_after (float): Minimum seconds between two downgrades
+            upgrade_after (float): Seconds of headroom required before upgrading
+        """
+        self.target_latency = target_latency
+        self.cpu_target = cpu_target
+        self.levels = levels or DEFAULT_LEVELS
+        self.enabled = enabled
+        self.degrade_after = degrade_after
+        self.upgrade_after = upgrade_after
+
+        self.level = 0
+        self.inference_times = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)
+        self.cpu = None
+        self.last_change = time.monotonic()
+        self.headroom_since = None
+        self.changes = 0
+
+        if PSUTIL_AVAILABLE:
+            psutil.cpu_percent(interval=None)  # prime the counter
+
+    def current(self):
+        """Return the active quality level (dict)."""
+        return self.levels[self.level]
+
+    def record_inference(self, seconds):
+        """Record the duration of one model inference."""
+        self.inference_times.append(seconds)
+
+    def record_latency(self, seconds):
+        """Record one end-to-end (capture -> broadcast) latency."""
+        self.latencies.append(seconds)
+
+    def update(self):
+        """
+        Re-evaluate the quality level from recent measurements.
+
+        Call periodically (e.g. once per broadcast tick).
+
+        Returns:
+            dict: The active quality level
+        """
+        if not self.enabled or not self.latencies:
+            return self.current()
+
+        now = time.monotonic()
+        self.cpu = cpu_percent()
+        latency = _percentile(list(self.latencies), 0.9)
+        overloaded = latency > self.target_latency or (
+            self.cpu is not None and self.cpu > self.cpu_target)
+        comfortable = latency < self.target_latency * 0.6 and (
+            self.cpu is None or self.cpu < self.cpu_target - 20)
+
+        if overloaded:
+            self.headroom_since = None
+            if self.level < len(self.levels) - 1 and now - self.last_change >= self.degrade_after:
+                self._set_level(self.level + 1, now)
+        elif comfortable and self.level > 0:
+            if self.headroom_since is None:
+                self.headroom_since = now
+            elif now - self.headroom_since >= self.upgrade_after:
+                self._set_level(self.level - 1, now)
+        else:
+            self.headroom_since = None
+
+        return self.current()
+
+    def _set_level(self, level, now):
+        """Internal: Switch level and reset the measurement window"""
+        direction = 'Degrading' if level > self.level else 'Restoring'
+        self.level = level
+        self.last_change = now
+        self.headroom_since = None
+        self.changes += 1
+        self.latencies.clear()
+        self.inference_times.clear()
+        settings = self.current()
+        print(f"[ADAPTIVE] {direction} to level {level}: imgsz={settings['imgsz']} "
+              f"detect every {settings['detect_interval'] * 1000:.0f}ms, "
+              f"JPEG q{settings['jpeg_quality']}, preview {settings['preview_fps']} FPS")
+
+    def stats(self):
+        """Return controller state for metrics."""
+        return {
+            'enabled': self.enabled,
+            'level': self.level,
+            'settings': dict(self.current()),
+            'target_latency_ms': round(self.target_latency * 1000, 1),
+            'latency_p90_ms': round(_percentile(list(self.latencies), 0.9) * 1000, 1),
+            'inference_p50_ms': round(_percentile(list(self.inference_times), 0.5) * 1000, 1),
+            'cpu_percent': self.cpu,
+            'level_changes': self.changes,
+        }
@@ -0,0 +1,476 @@
+"""
+Module: analytics.py
+Description: Columnar sales history and vectorised aggregation queries.
+
+Saved readings (the live journal and everything in `readings_archive/`) are
+compacted into one directory per day, with one NumPy `.npy` file per column:
+
+    data/analytics/
+    ├── dictionary.json          # product / station / cashier code tables
+    ├── manifest.json            # how far each source file has been compacted
+    └── day=2026-02-06/
+        ├── ts.npy               # int64 seconds since epoch (local wall time)
+        ├── product.npy          # int32 code into dictionary['product']
+        ├── station.npy          # int32 code into dictionary['station']
+        ├── cashier.npy          # int32 code into dictionary['cashier']
+        ├── weight.npy           # float64 grams
+        └── price.npy            # int64 paise
+
+Queries only touch the partitions in the requested date range and aggregate
+with `np.unique` + `np.bincount`, so months of history answer in milliseconds.
+
+    python -m src.analytics compact
+    python -m src.analytics query --metric weight --group-by product hour --start 2026-02-01
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.billing import to_paise
+from src.utils import native_threading
+
+threading, _ = native_threading()
+
+
+STORE_DIR = 'data/analytics'
+COLUMNS = {
+    'ts': np.int64,
+    'product': np.int32,
+    'station': np.int32,
+    'cashier': np.int32,
+    'weight': np.float64,
+    'price': np.int64,
+}
+DICTIONARY_COLUMNS = ('product', 'station', 'cashier')
+GROUP_KEYS = ('product', 'station', 'cashier', 'day', 'hour', 'hour_of_day')
+METRICS = ('weight', 'revenue', 'count')
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_seconds(timestamp):
+    """Internal: Naive ISO timestamp -> seconds since epoch (wall clock)"""
+    return int((datetime.fromisoformat(timestamp) - EPOCH).total_seconds())
+
+
+def _stage_array(path, array):
+    """Internal: Write an .npy file next to its final path; returns (staged, final)"""
+    staged = path + '.new'
+    with open(staged, 'wb') as f:
+        np.save(f, array)
+    return staged, path
+
+
+def _stage_json(path, value):
+    """Internal: Write a JSON file next to its final path; returns (staged, final)"""
+    staged = path + '.new'
+    with open(staged, 'w') as f:
+        json.dump(value, f)
+    return staged, path
+
+
+class AnalyticsStore:
+    """Day-partitioned columnar store of saved transactions."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        """
+        Open a store (created on first compaction).
+
+        Args:
+            store_dir (str): Root directory of the store
+        """
+        self.store_dir = store_dir
+        self.lock = threading.Lock()
+        self._partitions = {}
+        self._dictionary = None
+        self._dictionary_mtime = None
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def compact(self, sources):
+        """
+        Append new records from JSON-lines source files to the store.
+
+        A source is identified by a hash of its first line, so the live
+        journal and the archive file it later becomes are recognised as the
+        same source and never compacted twice.
+
+        Args:
+            sources (list): Paths of JSON-lines files (journal and archives)
+
+        Returns:
+            int: Number of records added
+        """
+        with self.lock:
+            os.makedirs(self.store_dir, exist_ok=True)
+            self._apply_pending()
+            manifest = self._read_json('manifest.json', {})
+            dictionary = self._read_json('dictionary.json', {name: [] for name in DICTIONARY_COLUMNS})
+            codes = {name: {value: i for i, value in enumerate(dictionary[name])}
+                     for name in DICTIONARY_COLUMNS}
+
+            def encode(name, value):
+                table = codes[name]
+                if value not in table:
+                    table[value] = len(dictionary[name])
+                    dictionary[name].append(value)
+                return table[value]
+
+            by_day = {}
+            added = 0
+            for path in sources:
+                try:
+                    with open(path, 'rb') as f:
+                        first = f.readline()
+                        if not first.endswith(b'\n'):
+                            continue
+                        fingerprint = hashlib.sha1(first).hexdigest()
+                        f.seek(manifest.get(fingerprint, 0))
+                        offset = f.tell()
+                        for line in f:
+                            if not line.endswith(b'\n'):
+                                break
+                            offset += len(line)
+                            try:
+                                record = json.loads(line)
+                                day = record['timestamp'][:10]
+                                row = (
+                                    _epoch_seconds(record['timestamp']),
+                                    encode('product', str(record.get('fruit', 'unknown')).lower()),
+                                    encode('station', str(record.get('station', 'default'))),
+                                    encode('cashier', str(record.get('cashier', 'default'))),
+                                    float(record.get('weight', 0)),
+                                    to_paise(record.get('price', 0)),
+                                )
+                            except (ValueError, KeyError, TypeError):
+                                continue
+                            by_day.setdefault(day, []).append(row)
+                            added += 1
+                        manifest[fingerprint] = offset
+                except FileNotFoundError:
+                    continue
+
+            staged = []
+            for day, rows in by_day.items():
+                staged.extend(self._stage_partition(day, rows))
+            staged.append(_stage_json(self._path('dictionary.json'), dictionary))
+            staged.append(_stage_json(self._path('manifest.json'), manifest))
+            self._commit(staged)
+            for day in by_day:
+                self._partitions.pop(day, None)
+            return added
+
+    def compact_async(self, sources):
+        """
+        Run `compact` on a background OS thread.
+
+        Args:
+            sources (list): Paths of JSON-lines files
+
+        Returns:
+            threading.Thread: The started thread
+        """
+        def run():
+            try:
+                self.compact(sources)
+            except (OSError, ValueError) as e:
+                print(f"✗ Analytics compaction failed: {e}")
+
+        thread = threading.Thread(target=run, name="AnalyticsCompaction")
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _path(self, *parts):
+        """Internal: Path inside the store"""
+        return os.path.join(self.store_dir, *parts)
+
+    def _stage_partition(self, day, rows):
+        """Internal: Stage one day's columns with the new rows appended"""
+        directory = self._path(f"day={day}")
+        os.makedirs(directory, exist_ok=True)
+        staged = []
+        for (name, dtype), values in zip(COLUMNS.items(), zip(*rows)):
+            path = os.path.join(directory, f"{name}.npy")
+            column = np.asarray(values, dtype=dtype)
+            if os.path.exists(path):
+                column = np.concatenate([np.load(path), column])
+            staged.append(_stage_array(path, column))
+        return staged
+
+    def _commit(self, staged):
+        """
+        Internal: Publish staged files as one unit.
+
+        The rename list is written to `pending.json` first, so a crash part
+        way through is finished by the next compaction instead of leaving
+        partitions and manifest out of step (which would duplicate rows).
+        """
+        pending = self._path('pending.json')
+        with open(pending + '.tmp', 'w') as f:
+            json.dump(staged, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pending + '.tmp', pending)
+        self._apply_pending()
+
+    def _apply_pending(self):
+        """Internal: Finish an interrupted commit, if any"""
+        pending = self._path('pending.json')
+        try:
+            with open(pending, 'r') as f:
+                staged = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        for source, target in staged:
+            if os.path.exists(source):
+                os.replace(source, target)
+        os.remove(pending)
+
+    def _read_json(self, name, default):
+        """Internal: Read a JSON metadata file from the store"""
+        try:
+            with open(os.path.join(self.store_dir, name), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return default
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def days(self):
+        """Sorted list of days (YYYY-MM-DD) present in the store."""
+        pattern = os.path.join(self.store_dir, 'day=*')
+        return sorted(os.path.basename(path)[4:] for path in glob.glob(pattern))
+
+    def dictionary(self):
+        """Code tables for the dictionary-encoded columns (cached)."""
+        path = os.path.join(self.store_dir, 'dictionary.json')
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return {name: [] for name in DICTIONARY_COLUMNS}
+        if mtime != self._dictionary_mtime:
+            self._dictionary = self._read_json('dictionary.json', {})
+            self._dictionary_mtime = mtime
+        return self._dictionary
+
+    def _partition(self, day):
+        """Internal: Memory-mapped columns of one day (cached until rewritten)"""
+        directory = os.path.join(self.store_dir, f"day={day}")
+        mtime = os.path.getmtime(os.path.join(directory, 'ts.npy'))
+        cached = self._partitions.get(day)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+                   for name in COLUMNS}
+        self._partitions[day] = (mtime, columns)
+        return columns
+
+    def load(self, start=None, end=None, columns=None):
+        """
+        Concatenate columns of every partition between two days.
+
+        Args:
+            start (str): First day (YYYY-MM-DD), inclusive
+            end (str): Last day (YYYY-MM-DD), inclusive
+            columns (iterable): Column names to load (default: all)
+
+        Returns:
+            dict: Column name -> numpy array
+        """
+        names = list(columns or COLUMNS)
+        selected = [day for day in self.days()
+                    if (start is None or day >= start) and (end is None or day <= end)]
+        parts = [self._partition(day) for day in selected]
+        if not parts:
+            return {name: np.empty(0, dtype=COLUMNS[name]) for name in names}
+        return {name: np.concatenate([part[name] for part in parts]) for name in names}
+
+    def query(self, metric='weight', group_by=('product',), start=None, end=None,
+              product=None, station=None, cashier=None):
+        """
+        Aggregate a metric over groups.
+
+        Args:
+            metric (str): 'weight' (kg), 'revenue' (currency units) or 'count'
+            group_by (tuple): Any of 'product', 'station', 'cashier', 'day',
+                'hour' (hourly time bucket) and 'hour_of_day' (0-23)
+            start (str): First day (YYYY-MM-DD), inclusive
+            end (str): Last day (YYYY-MM-DD), inclusive
+            product (str): Only this product
+            station (str): Only this station
+            cashier (str): Only this cashier
+
+        Returns:
+            list: One dict per group with the group keys and `value`
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}' (expected one of {', '.join(METRICS)})")
+        for key in group_by:
+            if key not in GROUP_KEYS:
+                raise ValueError(f"Unknown group '{key}' (expected any of {', '.join(GROUP_KEYS)})")
+
+        needed = {'ts'} | {key for key in group_by if key in DICTIONARY_COLUMNS}
+        needed |= {name for name, value in (('product', product), ('station', station),
+                                            ('cashier', cashier)) if value is not None}
+        if metric == 'weight':
+            needed.add('weight')
+        elif metric == 'revenue':
+            needed.add('price')
+        columns = self.load(start, end, needed)
+        dictionary = self.dictionary()
+
+        mask = np.ones(len(columns['ts']), dtype=bool)
+        for name, value in (('product', product), ('station', station), ('cashier', cashier)):
+            if value is None:
+                continue
+            values = dictionary.get(name, [])
+            lookup = value.lower() if name == 'product' else value
+            if lookup not in values:
+                return []
+            mask &= columns[name] == values.index(lookup)
+
+        ts = columns['ts'][mask]
+        if metric == 'weight':
+            weights = columns['weight'][mask] / 1000.0
+        elif metric == 'revenue':
+            weights = columns['price'][mask] / 100.0
+        else:
+            weights = np.ones(len(ts))
+
+        key_columns = []
+        for key in group_by:
+            if key in DICTIONARY_COLUMNS:
+                key_columns.append(columns[key][mask].astype(np.int64))
+            elif key == 'day':
+                key_columns.append(ts // 86400)
+            elif key == 'hour':
+                key_columns.append(ts // 3600)
+            else:
+                key_columns.append((ts % 86400) // 3600)
+
+        if not key_columns:
+            return [{'value': round(float(weights.sum()), 3)}] if len(ts) else []
+        if len(ts) == 0:
+            return []
+
+        # Mixed-radix combine the group columns into one int64 key
+        offsets = [column.min() for column in key_columns]
+        sizes = [int(column.max() - offset) + 1 for column, offset in zip(key_columns, offsets)]
+        combined = np.zeros(len(ts), dtype=np.int64)
+        for column, offset, size in zip(key_columns, offsets, sizes):
+            combined = combined * size + (column - offset)
+
+        unique, inverse = np.unique(combined, return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=weights, minlength=len(unique))
+
+        rows = []
+        for code, total in zip(unique.tolist(), totals.tolist()):
+            parts = []
+            for size in reversed(sizes):
+                parts.append(code % size)
+                code //= size
+            parts.reverse()
+            row = {}
+            for key, part, offset in zip(group_by, parts, offsets):
+                row[key] = self._label(key, int(part + offset), dictionary)
+            row['value'] = round(total, 3)
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def _label(key, value, dictionary):
+        """Internal: Human-readable label for a group key"""
+        if key in DICTIONARY_COLUMNS:
+            return dictionary[key][value]
+        if key == 'day':
+            return (EPOCH + timedelta(days=value)).strftime('%Y-%m-%d')
+        if key == 'hour':
+            return (EPOCH + timedelta(hours=value)).strftime('%Y-%m-%dT%H:00')
+        return value
+
+
+def query_args(params):
+    """
+    Keyword arguments for `AnalyticsStore.query` from HTTP query parameters.
+
+    Args:
+        params (Mapping): e.g. `flask.request.args`
+
+    Returns:
+        dict: metric, group_by, start, end, product, station and cashier
+    """
+    return {
+        'metric': params.get('metric', 'weight'),
+        'group_by': tuple(key for key in params.get('group_by', 'product').split(',') if key),
+        'start': params.get('start'),
+        'end': params.get('end'),
+        'product': params.get('product'),
+        'station': params.get('station'),
+        'cashier': params.get('cashier'),
+    }
+
+
+def journal_sources(journal_path='readings.json', archive_dir='readings_archive'):
+    """
+    List the JSON-lines files that hold saved transactions.
+
+    Returns:
+        list: Archived journals (oldest first) followed by the live journal
+    """
+    return sorted(glob.glob(os.path.join(archive_dir, '*.json'))) + [journal_path]
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Smart Billing System sales analytics')
+    parser.add_argument('--store', default=STORE_DIR, help='Analytics store directory')
+    subparsers = parser.add_subparsers(dest='command')
+
+    compact = subparsers.add_parser('compact', help='Compact saved readings into the store')
+    compact.add_argument('--journal', default='readings.json')
+    compact.add_argument('--archive-dir', default='readings_archive')
+
+    query = subparsers.add_parser('query', help='Run an aggregation query')
+    query.add_argument('--metric', choices=METRICS, default='weight')
+    query.add_argument('--group-by', nargs='*', choices=GROUP_KEYS, default=['product'])
+    query.add_argument('--start', help='First day (YYYY-MM-DD)')
+    query.add_argument('--end', help='Last day (YYYY-MM-DD)')
+    query.add_argument('--product')
+    query.add_argument('--station')
+    query.add_argument('--cashier')
+    args = parser.parse_args()
+
+    store = AnalyticsStore(args.store)
+    if args.command == 'compact':
+        start = time.perf_counter()
+        added = store.compact(journal_sources(args.journal, args.archive_dir))
+        print(f"✓ Compacted {added} records in {time.perf_counter() - start:.2f}s")
+        return 0
+    if args.command == 'query':
+        start = time.perf_counter()
+        rows = store.query(args.metric, tuple(args.group_by), args.start, args.end,
+                           args.product, args.station, args.cashier)
+        elapsed = (time.perf_counter() - start) * 1000
+        for row in rows:
+            print('  '.join(f"{key}={value}" for key, value in row.items()))
+        print(f"({len(rows)} rows in {elapsed:.1f} ms)")
+        return 0
+    parser.print_help()
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
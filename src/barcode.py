@@ -0,0 +1,202 @@
+"""
+Module: barcode.py
+Description: Barcode/QR fast path for packaged items on the tray.
+
+Packaged goods carry a code, so there is no need to run the detector on them
+or weigh them. `BarcodeReader` scans the tray region of a frame with OpenCV's
+built-in QR and 1-D barcode (EAN/UPC) detectors. A code that maps to a catalog
+product (products.json `barcode`) becomes the frame's detection at confidence 1.0.
+The detection thread then skips YOLO, and a product with a `unit_price` is
+billed per piece instead of per kg.
+
+The scan runs ahead of the detection cache, whose coarse tray hash cannot
+tell two similar-looking packs apart. Decoding is not free (20-30 ms per
+640x480 frame with both detectors, see benchmarks/bench_barcode.py), so the
+reader only decodes again when the tray changes: while its dHash stays within
+`STEADY_DISTANCE` bits of the last decoded frame, the last result (including
+"no code") is reused, for at most `rescan_every` ticks. Swapping one pack for
+another means a hand over the tray, which changes the hash and forces a scan.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from src.detection_cache import dhash, hamming
+
+
+QR_AVAILABLE = hasattr(cv2, 'QRCodeDetector')
+# cv2.barcode is in the main package from OpenCV 4.8 (opencv-contrib before that)
+LINEAR_AVAILABLE = hasattr(cv2, 'barcode') and hasattr(cv2.barcode, 'BarcodeDetector')
+
+# Bits of tray dHash that sensor noise flips on an unchanged tray
+STEADY_DISTANCE = 2
+
+
+def _to_boxes(points, origin):
+    """Internal: Corner points from OpenCV as (x1, y1, x2, y2) in frame coordinates"""
+    if points is None:
+        return []
+    ox, oy = origin
+    boxes = []
+    for corners in np.asarray(points).reshape(-1, 4, 2):
+        x1, y1 = corners.min(axis=0)
+        x2, y2 = corners.max(axis=0)
+        boxes.append([int(x1) + ox, int(y1) + oy, int(x2) + ox, int(y2) + oy])
+    return boxes
+
+
+class BarcodeReader:
+    """Decodes QR codes and 1-D barcodes in the tray region of camera frames."""
+
+    def __init__(self, roi=None, qr=True, linear=True, enabled=True, rescan_every=10):
+        """
+        Initialize the reader.
+
+        Args:
+            roi (tuple): Tray region (x1, y1, x2, y2) as fractions; None = whole frame
+            qr (bool): Look for QR codes
+            linear (bool): Look for EAN/UPC barcodes
+            enabled (bool): Scan at all
+            rescan_every (int): Decode a steady tray again after this many ticks
+                (1 = decode every frame)
+        """
+        self.roi = tuple(roi) if roi else None
+        self.enabled = enabled
+        self.rescan_every = max(1, int(rescan_every))
+        self.qr = cv2.QRCodeDetector() if qr and QR_AVAILABLE else None
+        self.linear = cv2.barcode.BarcodeDetector() if linear and LINEAR_AVAILABLE else None
+        if linear and not LINEAR_AVAILABLE:
+            print("✗ OpenCV has no barcode module (4.8+ or opencv-contrib); scanning QR codes only")
+
+        self.scans = 0
+        self.hits = 0
+        self.unknown_codes = 0
+        self.last_unknown = None
+        self.last_scan_ms = 0.0
+        self.reused = 0
+
+        # Last decoded tray: its hash, the scan result and ticks it has been reused
+        self.last_hash = None
+        self.last_result = None
+        self.steady_ticks = 0
+
+    @property
+    def active(self):
+        """Whether any detector is available and scanning is enabled."""
+        return self.enabled and (self.qr is not None or self.linear is not None)
+
+    def _crop(self, frame):
+        """Internal: Greyscale tray region and its offset in the frame"""
+        height, width = frame.shape[:2]
+        x1, y1 = 0, 0
+        if self.roi:
+            x1, y1 = int(self.roi[0] * width), int(self.roi[1] * height)
+            frame = frame[y1:int(self.roi[3] * height), x1:int(self.roi[2] * width)]
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame, (x1, y1)
+
+    def decode(self, frame):
+        """
+        Find and decode every code in the tray region.
+
+        Args:
+            frame (numpy.ndarray): BGR frame
+
+        Returns:
+            list: (code, symbology, [x1, y1, x2, y2]) tuples
+        """
+        if not self.active or frame is None:
+            return []
+        started = time.perf_counter()
+        image, origin = self._crop(frame)
+        found = []
+        if self.qr is not None:
+            try:
+                ok, codes, points, _ = self.qr.detectAndDecodeMulti(image)
+            except cv2.error:
+                ok = False
+            if ok:
+                found.extend((code, 'QR', box) for code, box in zip(codes, _to_boxes(points, origin))
+                             if code)
+        if self.linear is not None:
+            try:
+                if hasattr(self.linear, 'detectAndDecodeWithType'):
+                    ok, codes, kinds, points = self.linear.detectAndDecodeWithType(image)
+                else:
+                    ok, codes, kinds, points = self.linear.detectAndDecode(image)
+            except cv2.error:
+                ok = False
+            if ok:
+                found.extend((code, str(kind), box)
+                             for code, kind, box in zip(codes, kinds, _to_boxes(points, origin))
+                             if code)
+        self.scans += 1
+        self.last_scan_ms = (time.perf_counter() - started) * 1000
+        return found
+
+    def scan(self, frame, lookup):
+        """
+        Decode the tray and resolve the codes against the catalog.
+
+        Several copies of one product count as its quantity; a pack that shows
+        both a QR code and an EAN is counted once, since copies are counted per
+        symbology. When different products are on the tray, the first resolved
+        one wins. A steady tray reuses the previous result (see module docstring).
+
+        Args:
+            frame (numpy.ndarray): BGR frame
+            lookup (callable): Code -> product key, or None for unknown codes
+
+        Returns:
+            tuple: (product, quantity, code, boxes) or None if no catalog code was found
+        """
+        if not self.active or frame is None:
+            return None
+        tray = dhash(frame, self.roi)
+        if (self.last_hash is not None and self.steady_ticks + 1 < self.rescan_every
+                and hamming(tray, self.last_hash) <= STEADY_DISTANCE):
+            self.steady_ticks += 1
+            self.reused += 1
+            return self.last_result
+        self.last_hash, self.steady_ticks = tray, 0
+        self.last_result = self._resolve(frame, lookup)
+        return self.last_result
+
+    def _resolve(self, frame, lookup):
+        """Internal: Decode the tray and resolve its codes (see `scan`)"""
+        product = code = None
+        copies = {}
+        boxes = []
+        for text, symbology, box in self.decode(frame):
+            key = lookup(text)
+            if key is None:
+                self.unknown_codes += 1
+                self.last_unknown = text
+                continue
+            if product is None:
+                product, code = key, text
+            if key == product:
+                copies[symbology] = copies.get(symbology, 0) + 1
+                # Same (label, confidence, box) shape as the detector's boxes
+                boxes.append((product, 1.0, box))
+        if product is None:
+            return None
+        self.hits += 1
+        return product, max(copies.values()), code, boxes
+
+    def stats(self):
+        """Return scan counters for metrics."""
+        return {
+            'enabled': self.enabled,
+            'qr': self.qr is not None,
+            'linear': self.linear is not None,
+            'scans': self.scans,
+            'reused': self.reused,
+            'hits': self.hits,
+            'unknown_codes': self.unknown_codes,
+            'last_unknown': self.last_unknown,
+            'last_scan_ms': round(self.last_scan_ms, 2),
+        }
@@ -0,0 +1,381 @@
+"""
+Module: billing.py
+Description: Line pricing, tax, discount and rounding with exact arithmetic.
+
+All money is held as integer paise (1/100 of the currency unit) and weights as
+integer milligrams. Catalog prices and rates are parsed with `Decimal` so that
+values such as 0.05 or 2.80 are taken literally, then converted to integers:
+
+- price_per_kg  -> paise per kg
+- unit_price    -> paise per piece (packaged goods, billed by quantity)
+- tax_rate      -> parts per million
+- discount      -> parts per million
+
+Every division rounds half-up exactly, so a bill computed line by line and a
+bill recomputed in one vectorised pass always agree to the paisa.
+"""
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+import numpy as np
+
+
+PPM = 1000000
+MG_PER_KG = 1000000
+
+
+def to_paise(amount):
+    """
+    Convert a currency amount to integer paise.
+
+    Args:
+        amount (int, float, str or Decimal): Amount in currency units
+
+    Returns:
+        int: Amount in paise, rounded half-up
+    """
+    value = Decimal(str(amount)) * 100
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_ppm(rate):
+    """
+    Convert a fractional rate (e.g. 0.05 for 5%) to parts per million.
+
+    Args:
+        rate (int, float, str or Decimal): Fractional rate
+
+    Returns:
+        int: Rate in parts per million, rounded half-up
+    """
+    value = Decimal(str(rate)) * PPM
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_milligrams(weight_grams):
+    """
+    Convert a weight in grams to integer milligrams.
+
+    Args:
+        weight_grams (float): Weight in grams
+
+    Returns:
+        int: Weight in milligrams, rounded half-up
+    """
+    value = Decimal(str(weight_grams)) * 1000
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_milligrams_array(grams):
+    """
+    Vectorised `to_milligrams`: grams to integer milligrams, rounded half-up.
+
+    Rounding to 6 decimals first removes float noise (2.4999999 -> 2.5) so
+    ties are rounded away from zero exactly as `Decimal(str(w))` would.
+
+    Args:
+        grams (numpy.ndarray): Weights in grams
+
+    Returns:
+        numpy.ndarray: int64 milligrams
+    """
+    scaled = np.round(np.asarray(grams, dtype=np.float64) * 1000, 6)
+    return (np.sign(scaled) * np.floor(np.abs(scaled) + 0.5)).astype(np.int64)
+
+
+def from_paise(paise):
+    """Convert integer paise back to a float for JSON / display."""
+    return round(paise / 100.0, 2)
+
+
+def div_round(numerator, denominator):
+    """
+    Integer division rounding half away from zero.
+
+    Works on Python ints and on NumPy integer arrays alike.
+    """
+    if isinstance(numerator, np.ndarray):
+        sign = np.where(numerator < 0, -1, 1)
+        return sign * ((2 * np.abs(numerator) + denominator) // (2 * denominator))
+    sign = -1 if numerator < 0 else 1
+    return sign * ((2 * abs(numerator) + denominator) // (2 * denominator))
+
+
+class ProductRate:
+    """Integer pricing parameters for one catalog product."""
+
+    __slots__ = ('index', 'key', 'name', 'category', 'price_paise', 'unit_paise',
+                 'tax_ppm', 'discount_ppm')
+
+    def __init__(self, index, key, name, category, price_paise, tax_ppm, discount_ppm,
+                 unit_paise=None):
+        self.index = index
+        self.key = key
+        self.name = name
+        self.category = category
+        self.price_paise = price_paise
+        self.unit_paise = unit_paise
+        self.tax_ppm = tax_ppm
+        self.discount_ppm = discount_ppm
+
+    @property
+    def fixed_price(self):
+        """Whether the product is billed per piece rather than by weight."""
+        return self.unit_paise is not None
+
+
+class BillingEngine:
+    """
+    Prices bills from a product catalog.
+
+    The per-product rate table is built once from the catalog and cached,
+    together with column arrays used for vectorised recomputation of large
+    bills. Call `set_catalog` to replace the catalog; the cache is rebuilt.
+    """
+
+    def __init__(self, catalog, default_tax_rate=0, rounding_unit=1, currency_symbol='₹'):
+        """
+        Initialize the billing engine.
+
+        Args:
+            catalog (dict): Product key -> record with `price_per_kg` (or
+                `unit_price` for packaged goods) and optional `name`,
+                `category`, `tax_rate`, `discount` and `barcode`
+            default_tax_rate (float): Tax rate for products without their own
+            rounding_unit (int): Round bill totals to a multiple of this many
+                paise (1 = no rounding, 100 = nearest whole unit)
+            currency_symbol (str): Symbol used in formatted output
+        """
+        self.default_tax_ppm = to_ppm(default_tax_rate)
+        self.rounding_unit = max(1, int(rounding_unit))
+        self.currency_symbol = currency_symbol
+        self.rates = {}
+        self.barcodes = {}
+        self.set_catalog(catalog)
+
+    @classmethod
+    def from_settings(cls, prices, products=None, settings=None):
+        """
+        Build an engine from the server's price table and the JSON config.
+
+        Args:
+            prices (dict): Product key -> price per kg (the built-in table)
+            products (dict): Optional products.json records; these override
+                or extend the built-in prices and add category/tax/discount
+            settings (dict): Optional settings.json contents
+
+        Returns:
+            BillingEngine: Configured engine
+        """
+        catalog = {key: {'price_per_kg': price} for key, price in prices.items()}
+        for key, record in (products or {}).items():
+            catalog.setdefault(key.lower(), {}).update(record)
+
+        billing = (settings or {}).get('billing', {})
+        return cls(
+            catalog,
+            default_tax_rate=billing.get('tax_rate', 0),
+            rounding_unit=to_paise(billing.get('rounding', 0.01)),
+            currency_symbol=billing.get('currency_symbol', '₹'),
+        )
+
+    def set_catalog(self, catalog):
+        """
+        Replace the catalog and rebuild the cached rate table.
+
+        Args:
+            catalog (dict): Product key -> product record
+        """
+        rates = {}
+        barcodes = {}
+        for index, (key, record) in enumerate(catalog.items()):
+            key = key.lower()
+            tax_rate = record.get('tax_rate')
+            unit_price = record.get('unit_price')
+            codes = record.get('barcode') or []
+            for code in [codes] if isinstance(codes, str) else codes:
+                barcodes[str(code).strip()] = key
+            rates[key] = ProductRate(
+                index=index,
+                key=key,
+                name=record.get('name', key.capitalize()),
+                category=record.get('category', 'general'),
+                price_paise=to_paise(record.get('price_per_kg', 0)),
+                tax_ppm=self.default_tax_ppm if tax_rate is None else to_ppm(tax_rate),
+                discount_ppm=to_ppm(record.get('discount', 0)),
+                unit_paise=None if unit_price is None else to_paise(unit_price),
+            )
+        self.rates = rates
+        self.barcodes = barcodes
+
+        # Column arrays for the vectorised path, indexed by ProductRate.index
+        ordered = sorted(rates.values(), key=lambda rate: rate.index)
+        self._price_column = np.array([rate.price_paise for rate in ordered], dtype=np.int64)
+        self._unit_column = np.array([rate.unit_paise or 0 for rate in ordered], dtype=np.int64)
+        self._fixed_column = np.array([rate.fixed_price for rate in ordered], dtype=bool)
+        self._discount_column = np.array([rate.discount_ppm for rate in ordered], dtype=np.int64)
+        self._groups = sorted({(rate.category, rate.tax_ppm) for rate in ordered})
+        group_ids = {group: gid for gid, group in enumerate(self._groups)}
+        self._group_column = np.array(
+            [group_ids[(rate.category, rate.tax_ppm)] for rate in ordered], dtype=np.int64)
+
+    def lookup_barcode(self, code):
+        """
+        Resolve a scanned barcode or QR payload to a product key.
+
+        Args:
+            code (str): Decoded code
+
+        Returns:
+            str: Product key, or None if the code is not in the catalog
+        """
+        return self.barcodes.get(str(code).strip())
+
+    def is_fixed_price(self, product):
+        """Whether a product is billed per piece (False for unknown products)."""
+        rate = self.rates.get(product.lower())
+        return rate is not None and rate.fixed_price
+
+    def line_amount(self, product, weight_grams, quantity=1):
+        """
+        Price a single line before discount and tax.
+
+        Args:
+            product (str): Product key
+            weight_grams (float): Weight in grams (ignored for fixed-price products)
+            quantity (int): Pieces, for fixed-price products
+
+        Returns:
+            int: Line amount in paise (0 for unknown products)
+        """
+        rate = self.rates.get(product.lower())
+        if rate is None:
+            return 0
+        if rate.fixed_price:
+            return rate.unit_paise * int(quantity)
+        return div_round(rate.price_paise * to_milligrams(weight_grams), MG_PER_KG)
+
+    def compute_bill(self, lines, discount=None):
+        """
+        Price a whole bill.
+
+        Lines are priced in one vectorised pass over integer arrays. Tax is
+        charged per (category, tax rate) group on the group's taxable amount.
+        A bill-level discount is spread across groups in proportion to their
+        amounts (largest remainder) before tax.
+
+        Args:
+            lines (list): Sequence of dicts with `fruit` and `weight` (grams);
+                lines for fixed-price products use `quantity` (default 1) instead
+            discount (str, int or float): Optional bill discount; "10%" is a
+                percentage of the subtotal, a number is a fixed amount
+
+        Returns:
+            dict: JSON-ready bill with items, per-category tax and totals
+        """
+        count = len(lines)
+        keys = [str(line.get('fruit', 'unknown')).lower() for line in lines]
+        known = np.array([key in self.rates for key in keys], dtype=bool)
+        index = np.array([self.rates[key].index if key in self.rates else 0 for key in keys],
+                         dtype=np.int64)
+        grams = np.array([float(line.get('weight', 0)) for line in lines], dtype=np.float64)
+        milligrams = to_milligrams_array(grams)
+        quantity = np.array([int(line.get('quantity') or 1) for line in lines], dtype=np.int64)
+
+        if count:
+            fixed = known & self._fixed_column[index]
+            by_weight = div_round(self._price_column[index] * milligrams, MG_PER_KG)
+            by_unit = self._unit_column[index] * quantity
+            gross = np.where(known, np.where(fixed, by_unit, by_weight), 0)
+            line_discount = div_round(gross * self._discount_column[index], PPM)
+            net = gross - line_discount
+            group = self._group_column[index]
+        else:
+            gross = line_discount = net = group = np.zeros(0, dtype=np.int64)
+            fixed = np.zeros(0, dtype=bool)
+
+        subtotal = int(net.sum())
+        group_net = np.zeros(len(self._groups), dtype=np.int64)
+        np.add.at(group_net, group[known], net[known])
+
+        bill_discount = min(self._bill_discount(discount, subtotal), subtotal)
+        group_discount = _allocate(bill_discount, group_net)
+
+        taxes = []
+        tax_total = 0
+        for gid, (category, tax_ppm) in enumerate(self._groups):
+            if group_net[gid] == 0 or tax_ppm == 0:
+                continue
+            taxable = int(group_net[gid] - group_discount[gid])
+            tax = div_round(taxable * tax_ppm, PPM)
+            tax_total += tax
+            taxes.append({
+                'category': category,
+                'rate': tax_ppm / PPM,
+                'taxable': from_paise(taxable),
+                'tax': from_paise(tax),
+            })
+
+        exact_total = subtotal - bill_discount + tax_total
+        total = div_round(exact_total, self.rounding_unit) * self.rounding_unit
+
+        items = []
+        for i, key in enumerate(keys):
+            if fixed[i]:
+                unit_price = self.rates[key].unit_paise
+            else:
+                unit_price = self.rates[key].price_paise if known[i] else 0
+            items.append({
+                'fruit': key,
+                'weight': float(grams[i]),
+                'quantity': int(quantity[i]) if fixed[i] else None,
+                'pricing': 'unit' if fixed[i] else 'weight',
+                'unit_price': from_paise(unit_price),
+                'gross': from_paise(int(gross[i])),
+                'discount': from_paise(int(line_discount[i])),
+                'price': from_paise(int(net[i])),
+            })
+
+        return {
+            'items': items,
+            'subtotal': from_paise(subtotal),
+            'discount': from_paise(bill_discount),
+            'taxes': taxes,
+            'tax': from_paise(tax_total),
+            'rounding': from_paise(total - exact_total),
+            'total': from_paise(total),
+            'currency_symbol': self.currency_symbol,
+            'generated_at': datetime.now().isoformat(),
+        }
+
+    def _bill_discount(self, discount, subtotal):
+        """Internal: Resolve a bill discount spec to paise"""
+        if discount in (None, '', 0):
+            return 0
+        text = str(discount).strip()
+        try:
+            if text.endswith('%'):
+                return max(0, div_round(subtotal * to_ppm(Decimal(text[:-1]) / 100), PPM))
+            return max(0, to_paise(text))
+        except InvalidOperation:
+            raise ValueError(f"Invalid discount '{text}'")
+
+
+def _allocate(amount, weights):
+    """
+    Split an integer amount in proportion to integer weights.
+
+    Uses the largest remainder method so the parts always sum to `amount`.
+    """
+    parts = np.zeros(len(weights), dtype=np.int64)
+    total = int(weights.sum())
+    if amount == 0 or total <= 0:
+        return parts
+    shares = weights * amount
+    parts = shares // total
+    remainder = amount - int(parts.sum())
+    if remainder:
+        order = np.argsort(-(shares % total), kind='stable')
+        parts[order[:remainder]] += 1
+    return parts
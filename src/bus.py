@@ -0,0 +1,198 @@
+"""
+Module: bus.py
+Description: Local message bus between the station process and the web workers.
+
+In cluster mode the system runs as two kinds of processes sharing a Redis (or
+Redis-compatible) server on localhost:
+
+- the station process (`python demo_exp.py`) owns the camera, scale and model.
+  Its Socket.IO emits go through Flask-SocketIO's message queue, it keeps the
+  latest telemetry snapshot in Redis, publishes read-only views (metrics,
+  stock levels) every `cluster.publish_interval` seconds and executes the
+  HTTP requests forwarded by the web workers
+- web workers (`python -m src.web_worker`) hold the browser connections. They
+  fan the station's events out to their clients, answer `connect`/`resync`
+  from the stored snapshot, serve reads from the published views and forward
+  only the requests that change or need the station's live state
+
+Forwarded requests travel through a Redis list, and each reply comes back on
+its own short-lived key, so any number of workers can share one station.
+
+    sbs:<station>:snapshot       latest {'v', 'ts', 'data'} telemetry snapshot
+    sbs:<station>:view:<name>    latest {'ts', 'data'} of a published view
+    sbs:<station>:requests       list of pending HTTP requests
+    sbs:<station>:reply:<id>     reply to one request (expires after 60 s)
+"""
+
+import base64
+import json
+import time
+import uuid
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+REPLY_TTL = 60
+
+
+class BusError(Exception):
+    """Raised when the bus is unavailable or a request times out."""
+
+
+class StationBus:
+    """Snapshot store and request channel for one station."""
+
+    def __init__(self, url, station_id='default', prefix='sbs', timeout=10.0):
+        """
+        Connect to the bus.
+
+        Args:
+            url (str): Redis URL, e.g. redis://localhost:6379/0
+            station_id (str): Station whose keys to use
+            prefix (str): Key prefix
+            timeout (float): Seconds a forwarded request may take
+        """
+        if not REDIS_AVAILABLE:
+            raise BusError("redis is not installed (pip install redis)")
+        # BLPOP blocks for up to `timeout`; the socket must outlast it
+        self.client = redis.Redis.from_url(url, socket_timeout=timeout + 5)
+        self.url = url
+        self.timeout = timeout
+        base = f"{prefix}:{station_id}"
+        self.snapshot_key = f"{base}:snapshot"
+        self.request_key = f"{base}:requests"
+        self.reply_prefix = f"{base}:reply:"
+        self.view_prefix = f"{base}:view:"
+        self.forwarded = 0
+        self.served = 0
+        self.timeouts = 0
+        self.view_reads = 0
+
+    def publish_snapshot(self, snapshot):
+        """Store the latest telemetry snapshot for newly connecting clients."""
+        self.client.set(self.snapshot_key, json.dumps(snapshot))
+
+    def get_snapshot(self):
+        """
+        Read the latest telemetry snapshot.
+
+        Returns:
+            dict: Snapshot, or an empty version-0 snapshot if none was published
+        """
+        raw = self.client.get(self.snapshot_key)
+        if raw is None:
+            return {'v': 0, 'ts': time.time(), 'data': {}}
+        return json.loads(raw)
+
+    def publish_view(self, name, data):
+        """Store the latest version of a read-only view (e.g. 'metrics') for the workers."""
+        self.client.set(self.view_prefix + name, json.dumps({'ts': time.time(), 'data': data}))
+
+    def get_view(self, name):
+        """
+        Read a published view.
+
+        Returns:
+            dict: {'ts', 'data'}, or None if the station has not published it
+
+        Raises:
+            BusError: If the bus is unavailable
+        """
+        try:
+            raw = self.client.get(self.view_prefix + name)
+        except redis.RedisError as e:
+            raise BusError(f"bus unavailable: {e}")
+        self.view_reads += 1
+        return json.loads(raw) if raw is not None else None
+
+    def forward(self, method, path, query_string=b'', body=b'', content_type=None):
+        """
+        Forward an HTTP request to the station and wait for its response.
+
+        Returns:
+            dict: {'status', 'content_type', 'headers', 'body' (bytes)}
+
+        Raises:
+            BusError: If the bus is down or the station does not answer in time
+        """
+        request_id = uuid.uuid4().hex
+        reply_key = self.reply_prefix + request_id
+        request = json.dumps({
+            'id': request_id,
+            'method': method,
+            'path': path,
+            'query_string': query_string.decode('latin-1'),
+            'body': base64.b64encode(body).decode('ascii'),
+            'content_type': content_type,
+            'reply_to': reply_key,
+            'deadline': time.time() + self.timeout,
+        })
+        try:
+            self.client.rpush(self.request_key, request)
+            self.forwarded += 1
+            item = self.client.blpop([reply_key], timeout=max(1, int(round(self.timeout))))
+        except redis.RedisError as e:
+            raise BusError(f"bus unavailable: {e}")
+        if item is None:
+            self.timeouts += 1
+            raise BusError(f"station did not answer {method} {path} within {self.timeout:g}s")
+        response = json.loads(item[1])
+        response['body'] = base64.b64decode(response['body'])
+        return response
+
+    def next_request(self, timeout=1):
+        """
+        Wait for the next forwarded request.
+
+        Requests whose sender has already given up are dropped.
+
+        Returns:
+            dict: The request with a decoded `body`, or None on timeout
+
+        Raises:
+            BusError: If the bus is unavailable
+        """
+        try:
+            item = self.client.blpop([self.request_key], timeout=timeout)
+        except redis.RedisError as e:
+            raise BusError(f"bus unavailable: {e}")
+        if item is None:
+            return None
+        request = json.loads(item[1])
+        if request.get('deadline', float('inf')) < time.time():
+            return None
+        request['body'] = base64.b64decode(request['body'])
+        return request
+
+    def reply(self, request, status, body=b'', content_type=None, headers=None):
+        """Send the response for a forwarded request."""
+        payload = json.dumps({
+            'status': status,
+            'content_type': content_type,
+            'headers': headers or {},
+            'body': base64.b64encode(body).decode('ascii'),
+        })
+        pipe = self.client.pipeline()
+        pipe.rpush(request['reply_to'], payload)
+        pipe.expire(request['reply_to'], REPLY_TTL)
+        pipe.execute()
+        self.served += 1
+
+    def stats(self):
+        """Return bus counters for metrics."""
+        try:
+            pending = self.client.llen(self.request_key)
+        except redis.RedisError:
+            pending = None
+        return {
+            'url': self.url,
+            'forwarded': self.forwarded,
+            'served': self.served,
+            'timeouts': self.timeouts,
+            'view_reads': self.view_reads,
+            'pending_requests': pending,
+        }
@@ -0,0 +1,398 @@
+"""
+Module: calibration.py
+Description: Multi-point scale calibration with per-scale profiles applied on the host.
+
+The sketch's grams depend on the `calibration_factor` compiled into
+`arduino_code.ino`. Instead of reflashing, the host maps them to true grams
+with a profile fitted from readings at several known reference weights:
+
+    python -m src.calibration run --points 0,100,200,500,1000
+    python -m src.calibration run --server http://localhost:5000 --model quadratic
+    python -m src.calibration show
+
+`run` tares the scale, asks for each reference weight in turn, averages a few
+settled readings, fits a linear or quadratic polynomial with NumPy, prints the
+residuals and stores the profile in `config/scales/<station>.json`. Readings
+can come straight from the serial port (stop the server first) or from a
+running server (`GET /scale/raw`), which also picks the new profile up without
+a restart.
+
+Readings are relative to the sketch's tare, so a profile is applied as
+`f(raw) - f(0)`: an empty, tared tray always reads zero.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+
+
+PROFILES_DIR = 'config/scales'
+MODELS = {'linear': 1, 'quadratic': 2}
+
+# A quadratic term must cut the RMSE by this fraction to be chosen by --model auto
+QUADRATIC_GAIN = 0.3
+
+
+class CalibrationError(ValueError):
+    """Raised for unusable calibration data or profiles."""
+
+
+def profile_path(scale_id, directory=PROFILES_DIR):
+    """Path of the profile for one scale (station id)."""
+    return os.path.join(directory, f"{scale_id}.json")
+
+
+def summarize(reference, samples):
+    """
+    Reduce the readings taken at one reference weight to a calibration point.
+
+    Args:
+        reference (float): True weight in grams
+        samples (list): Raw readings in sketch grams
+
+    Returns:
+        dict: {'reference', 'raw', 'std', 'samples'}
+    """
+    if not samples:
+        raise CalibrationError(f"no readings at {reference:g} g")
+    values = np.asarray(samples, dtype=float)
+    return {
+        'reference': float(reference),
+        'raw': float(values.mean()),
+        'std': float(values.std()),
+        'samples': len(values),
+    }
+
+
+def fit(points, model='linear'):
+    """
+    Fit true grams as a polynomial of the raw readings.
+
+    Args:
+        points (list): Calibration points from `summarize`
+        model (str): 'linear', 'quadratic' or 'auto'
+
+    Returns:
+        dict: {'model', 'coefficients' (constant term first), 'residuals',
+        'rmse', 'max_residual'}
+
+    Raises:
+        CalibrationError: If there are too few distinct points for the model
+    """
+    if model == 'auto':
+        linear = fit(points, 'linear')
+        if len({p['raw'] for p in points}) < 4:
+            return linear
+        quadratic = fit(points, 'quadratic')
+        return quadratic if quadratic['rmse'] < linear['rmse'] * (1 - QUADRATIC_GAIN) else linear
+    if model not in MODELS:
+        raise CalibrationError(f"unknown model '{model}' (use {', '.join(MODELS)} or auto)")
+
+    degree = MODELS[model]
+    raw = np.array([p['raw'] for p in points])
+    reference = np.array([p['reference'] for p in points])
+    if len(np.unique(raw)) < degree + 1:
+        raise CalibrationError(f"a {model} fit needs at least {degree + 1} distinct points")
+
+    coefficients = np.polyfit(raw, reference, degree)[::-1]
+    residuals = reference - np.polyval(coefficients[::-1], raw)
+    return {
+        'model': model,
+        'coefficients': [float(c) for c in coefficients],
+        'residuals': [round(float(r), 3) for r in residuals],
+        'rmse': float(np.sqrt(np.mean(residuals ** 2))),
+        'max_residual': float(np.max(np.abs(residuals))),
+    }
+
+
+class CalibrationProfile:
+    """Polynomial mapping from sketch grams to true grams for one scale."""
+
+    def __init__(self, coefficients, model='linear', scale_id=None, points=(), rmse=None,
+                 max_residual=None, created=None):
+        """
+        Args:
+            coefficients (list): Polynomial coefficients, constant term first
+            model (str): 'linear' or 'quadratic'
+            scale_id (str): Station / scale the profile belongs to
+            points (list): Calibration points it was fitted from
+            rmse (float): Fit RMSE in grams
+            max_residual (float): Largest absolute residual in grams
+            created (str): ISO timestamp
+        """
+        if model not in MODELS or len(coefficients) != MODELS[model] + 1:
+            raise CalibrationError(f"{model} profile needs {MODELS.get(model, 0) + 1} coefficients")
+        if not all(isinstance(c, (int, float)) and math.isfinite(c) for c in coefficients):
+            raise CalibrationError("profile coefficients must be finite numbers")
+        self.coefficients = tuple(float(c) for c in coefficients)
+        self.model = model
+        self.scale_id = scale_id
+        self.points = list(points)
+        self.rmse = rmse
+        self.max_residual = max_residual
+        self.created = created or datetime.now().isoformat(timespec='seconds')
+        self.zero = self._polynomial(0.0)
+
+    @classmethod
+    def from_fit(cls, result, scale_id=None, points=()):
+        """Build a profile from a `fit` result."""
+        return cls(result['coefficients'], result['model'], scale_id, points,
+                   result['rmse'], result['max_residual'])
+
+    def _polynomial(self, raw):
+        """Internal: Evaluate the fitted polynomial (Horner's rule)"""
+        value = 0.0
+        for c in reversed(self.coefficients):
+            value = value * raw + c
+        return value
+
+    def apply(self, raw):
+        """
+        Convert one reading to grams.
+
+        Args:
+            raw (float): Reading from the sketch
+
+        Returns:
+            float: Calibrated weight in grams, zero for a tared empty tray
+        """
+        return self._polynomial(raw) - self.zero
+
+    def to_dict(self):
+        """JSON-friendly representation."""
+        return {
+            'scale_id': self.scale_id,
+            'model': self.model,
+            'coefficients': list(self.coefficients),
+            'rmse': self.rmse,
+            'max_residual': self.max_residual,
+            'points': self.points,
+            'created': self.created,
+        }
+
+    def save(self, path):
+        """Write the profile atomically."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a profile.
+
+        Raises:
+            CalibrationError: If the file is not a valid profile
+            FileNotFoundError: If it does not exist
+        """
+        with open(path, 'r') as f:
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise CalibrationError(f"{path}: {e}")
+        try:
+            return cls(data['coefficients'], data.get('model', 'linear'), data.get('scale_id'),
+                       data.get('points', []), data.get('rmse'), data.get('max_residual'),
+                       data.get('created'))
+        except (KeyError, TypeError) as e:
+            raise CalibrationError(f"{path}: invalid profile ({e})")
+
+
+class SerialSampler:
+    """Takes readings straight from the scale's serial port."""
+
+    def __init__(self, port='auto', baud_rate=9600):
+        """Open the scale port (the server must not be holding it)."""
+        from src.scale import ScaleConnection
+        self.scale = ScaleConnection(port=port, baud_rate=baud_rate)
+        if not self.scale.connect():
+            raise CalibrationError(f"scale not found: {self.scale.last_error}")
+
+    def tare(self, timeout=10.0):
+        """Zero the scale; returns True when acknowledged."""
+        command = self.scale.tare(timeout=timeout)
+        deadline = time.monotonic() + timeout + 1.0
+        while not command.done and time.monotonic() < deadline:
+            self.scale.read_weight()
+        return bool(command.ok)
+
+    def samples(self, count, timeout):
+        """Collect up to `count` new readings within `timeout` seconds."""
+        readings = []
+        deadline = time.monotonic() + timeout
+        while len(readings) < count and time.monotonic() < deadline:
+            weight = self.scale.read_weight()
+            if weight is not None:
+                readings.append(weight)
+        return readings
+
+    def close(self):
+        """Release the port."""
+        self.scale.close()
+
+
+class ServerSampler:
+    """Takes readings through a running server (`GET /scale/raw`)."""
+
+    def __init__(self, url):
+        """
+        Args:
+            url (str): Server base URL, e.g. http://localhost:5000
+        """
+        self.url = url.rstrip('/')
+
+    def _request(self, path, method='GET', timeout=60.0):
+        """Internal: Call the server and decode its JSON reply"""
+        req = urllib.request.Request(self.url + path, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return json.loads(e.read() or b'{}')
+        except OSError as e:
+            raise CalibrationError(f"{self.url}: {e}")
+
+    def tare(self, timeout=10.0):
+        """Zero the scale; returns True when acknowledged."""
+        return bool(self._request('/tare?wait=1', 'POST', timeout + 5).get('success'))
+
+    def samples(self, count, timeout):
+        """Collect up to `count` new readings within `timeout` seconds."""
+        reply = self._request(f'/scale/raw?count={count}&timeout={timeout:g}', timeout=timeout + 5)
+        if not reply.get('success'):
+            raise CalibrationError(reply.get('message', 'server returned no readings'))
+        return reply['samples']
+
+    def close(self):
+        """Nothing to release."""
+
+
+def print_fit(points, result):
+    """Print the calibration points with their residuals."""
+    print(f"\n{'Reference (g)':>14} {'Raw':>12} {'Std':>8} {'N':>4} {'Residual (g)':>13}")
+    for point, residual in zip(points, result['residuals']):
+        print(f"{point['reference']:>14.2f} {point['raw']:>12.3f} {point['std']:>8.3f} "
+              f"{point['samples']:>4d} {residual:>13.3f}")
+    terms = ' + '.join(f"{c:.6g}*r^{i}" if i else f"{c:.6g}"
+                       for i, c in enumerate(result['coefficients']))
+    print(f"\nModel: {result['model']}  grams = {terms}")
+    print(f"RMSE: {result['rmse']:.3f} g   max |residual|: {result['max_residual']:.3f} g")
+
+
+def run(sampler, references, model, count, settle, path, scale_id, max_std):
+    """
+    Interactive calibration session.
+
+    Returns:
+        CalibrationProfile: The saved profile
+    """
+    input("Remove everything from the tray and press ENTER to tare...")
+    if not sampler.tare():
+        raise CalibrationError("the scale did not acknowledge the tare")
+    print("✓ Scale tared")
+
+    points = []
+    for reference in references:
+        while True:
+            input(f"\nPlace {reference:g} g on the tray and press ENTER...")
+            time.sleep(settle)
+            samples = sampler.samples(count, timeout=count * 3.0 + 10)
+            point = summarize(reference, samples)
+            print(f"  raw {point['raw']:.3f} (std {point['std']:.3f}, {point['samples']} readings)")
+            if point['samples'] >= count and point['std'] <= max_std:
+                break
+            answer = input("  ✗ Readings unstable or incomplete. Retry? [Y/n] ").strip().lower()
+            if answer == 'n':
+                break
+        points.append(point)
+
+    result = fit(points, model)
+    print_fit(points, result)
+    profile = CalibrationProfile.from_fit(result, scale_id, points)
+    profile.save(path)
+    print(f"\n✓ Profile saved to {path}")
+    return profile
+
+
+def _parse_references(text):
+    """Internal: '0,100,500' -> [0.0, 100.0, 500.0]"""
+    try:
+        references = [float(value) for value in text.split(',') if value.strip()]
+    except ValueError:
+        raise CalibrationError(f"invalid reference weights '{text}'")
+    if len(references) < 2:
+        raise CalibrationError("give at least two reference weights")
+    return references
+
+
+def main():
+    """Command-line entry point."""
+    from src.config import load_config
+
+    settings = load_config()
+    scale_settings = settings.get('scale', {})
+    station = settings.get('station', {}).get('id', 'default')
+
+    parser = argparse.ArgumentParser(description='Scale calibration')
+    parser.add_argument('--scale-id', default=station, help='Profile name (default: station id)')
+    parser.add_argument('--dir', default=PROFILES_DIR, help='Profile directory')
+    sub = parser.add_subparsers(dest='command')
+    run_parser = sub.add_parser('run', help='Calibrate with known weights')
+    run_parser.add_argument('--points', default='0,100,200,500,1000',
+                            help='Reference weights in grams, comma separated')
+    run_parser.add_argument('--model', default='auto', choices=['linear', 'quadratic', 'auto'])
+    run_parser.add_argument('--samples', type=int, default=8, help='Readings per weight')
+    run_parser.add_argument('--settle', type=float, default=3.0,
+                            help='Seconds to wait after placing a weight')
+    run_parser.add_argument('--max-std', type=float, default=1.0,
+                            help='Largest acceptable reading spread (g)')
+    run_parser.add_argument('--server', help='Read through a running server, e.g. http://localhost:5000')
+    run_parser.add_argument('--port', default=scale_settings.get('port', 'auto'))
+    run_parser.add_argument('--baud-rate', type=int, default=scale_settings.get('baud_rate', 9600))
+    sub.add_parser('show', help='Print the stored profile')
+    args = parser.parse_args()
+
+    path = profile_path(args.scale_id, args.dir)
+    try:
+        if args.command == 'show':
+            profile = CalibrationProfile.load(path)
+            print(f"Profile {path} ({profile.created})")
+            print_fit(profile.points, {
+                'model': profile.model, 'coefficients': profile.coefficients,
+                'residuals': [p['reference'] - profile._polynomial(p['raw']) for p in profile.points],
+                'rmse': profile.rmse or 0.0, 'max_residual': profile.max_residual or 0.0})
+            return 0
+        if args.command == 'run':
+            references = _parse_references(args.points)
+            sampler = ServerSampler(args.server) if args.server else SerialSampler(args.port, args.baud_rate)
+            try:
+                run(sampler, references, args.model, args.samples, args.settle, path,
+                    args.scale_id, args.max_std)
+            finally:
+                sampler.close()
+            return 0
+    except FileNotFoundError:
+        print(f"✗ No profile at {path}")
+        return 1
+    except CalibrationError as e:
+        print(f"✗ {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\nCalibration aborted; nothing saved")
+        return 1
+    parser.print_help()
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
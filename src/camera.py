@@ -0,0 +1,272 @@
+"""
+Module: camera.py
+Description: Supervised camera capture with reopen-on-stall and frame accounting.
+
+`CameraSupervisor` owns the `cv2.VideoCapture` and reads it on a dedicated OS
+thread, so a blocking `read()` never stalls the web server. It
+
+- applies the capture format (MJPG/YUYV), resolution, FPS and rotation from
+  `config/settings.json` and reports what the driver actually negotiated
+- treats a device that delivers no frame for `stall_timeout` seconds as lost,
+  releases it and reopens it with exponential backoff
+- measures the delivered frame rate and estimates dropped frames from gaps
+  between frame timestamps longer than the nominal frame period
+
+Consumers poll `latest()` for the newest frame.
+"""
+
+import time
+from collections import deque
+
+import cv2
+
+from src.utils import native_threading
+
+# cv2 reads block in C code, so capture runs on a real OS thread
+threading, _ = native_threading()
+
+
+ROTATIONS = {
+    90: cv2.ROTATE_90_CLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_COUNTERCLOCKWISE,
+}
+
+
+def decode_fourcc(value):
+    """Turn a CAP_PROP_FOURCC value into its four-character code."""
+    value = int(value)
+    if value <= 0:
+        return None
+    return ''.join(chr((value >> (8 * i)) & 0xFF) for i in range(4))
+
+
+class CameraSupervisor:
+    """Keeps a camera delivering frames and accounts for the ones it did not."""
+
+    def __init__(self, index=0, resolution=(640, 480), fps=30, fourcc='MJPG', rotation=0,
+                 buffer_size=1, stall_timeout=2.0, backoff_initial=0.5, backoff_max=30.0,
+                 window=60, tracer=None, capture_factory=None):
+        """
+        Initialize the supervisor (the device is opened by `open` or `start`).
+
+        Args:
+            index (int or str): Camera index or device path / stream URL
+            resolution (tuple): Requested (width, height)
+            fps (int): Requested frame rate
+            fourcc (str): Capture format, e.g. 'MJPG' or 'YUYV' (None = driver default)
+            rotation (int): Clockwise rotation applied to frames (0, 90, 180, 270)
+            buffer_size (int): Driver frame buffer length (1 = always the newest frame)
+            stall_timeout (float): Seconds without a frame before the device is reopened
+            backoff_initial (float): First reopen delay in seconds
+            backoff_max (float): Upper bound of the reopen delay
+            window (int): Number of frame timestamps the FPS is computed over
+            tracer (Tracer): Records a `camera.read` span per frame (optional)
+            capture_factory (callable): Builds the capture object from `index`
+                (default cv2.VideoCapture; the soak test replays recorded frames)
+        """
+        self.index = index
+        self.resolution = tuple(resolution)
+        self.fps = fps
+        self.fourcc = fourcc
+        self.rotation = ROTATIONS.get(int(rotation or 0))
+        self.buffer_size = buffer_size
+        self.stall_timeout = stall_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.tracer = tracer
+        self.capture_factory = capture_factory or cv2.VideoCapture
+
+        self.capture = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        # Set by throttle(); while not None the device is only read every N seconds
+        self.read_interval = None
+        self.wake_event = threading.Event()
+        self.frame = None
+        self.frame_time = 0.0
+        self.sequence = 0
+
+        self.backoff = backoff_initial
+        self.negotiated = {}
+        self.timestamps = deque(maxlen=window)
+        self.frames = 0
+        self.dropped = 0
+        self.failed_reads = 0
+        self.stalls = 0
+        self.opens = 0
+        self.last_error = None
+
+    @property
+    def is_opened(self):
+        """Whether the device is open."""
+        return self.capture is not None and self.capture.isOpened()
+
+    def open(self):
+        """
+        Open and configure the device.
+
+        Returns:
+            bool: True if the device opened
+        """
+        self.release()
+        capture = self.capture_factory(self.index)
+        if not capture.isOpened():
+            capture.release()
+            self.last_error = f"cannot open camera {self.index}"
+            return False
+
+        # The format must be set before the size for V4L2 to pick the MJPG modes
+        if self.fourcc:
+            capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        capture.set(cv2.CAP_PROP_FPS, self.fps)
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+        self.negotiated = {
+            'fourcc': decode_fourcc(capture.get(cv2.CAP_PROP_FOURCC)),
+            'resolution': [int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))],
+            'fps': capture.get(cv2.CAP_PROP_FPS),
+        }
+        if self.fourcc and self.negotiated['fourcc'] not in (None, self.fourcc):
+            print(f"✗ Camera ignored {self.fourcc}; using {self.negotiated['fourcc']}")
+
+        self.capture = capture
+        self.opens += 1
+        self.timestamps.clear()
+        return True
+
+    def release(self):
+        """Release the device."""
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def start(self):
+        """Start the capture thread."""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._capture_loop, name="CameraSupervisorThread")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop the capture thread and release the device."""
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        self.release()
+
+    def throttle(self, interval):
+        """
+        Read only every `interval` seconds (None = at the device rate).
+
+        Used as a watchdog while the station is idle; lifting the throttle wakes
+        the capture thread immediately.
+
+        Args:
+            interval (float): Seconds between reads, or None
+        """
+        self.read_interval = interval
+        # Gaps around a throttled period are not dropped frames
+        self.timestamps.clear()
+        self.wake_event.set()
+
+    def latest(self):
+        """
+        Return the newest frame.
+
+        Returns:
+            tuple: (sequence number, frame or None, capture timestamp)
+        """
+        with self.lock:
+            return self.sequence, self.frame, self.frame_time
+
+    def _capture_loop(self):
+        """Background thread: read frames, reopen the device when it stalls"""
+        last_frame = time.monotonic()
+        while not self.stop_event.is_set():
+            if not self.is_opened:
+                if self.open():
+                    print(f"✓ Camera {self.index} opened "
+                          f"({self.negotiated['fourcc']} {self.negotiated['resolution'][0]}x"
+                          f"{self.negotiated['resolution'][1]} @ {self.negotiated['fps']:.0f} FPS)")
+                    self.backoff = self.backoff_initial
+                    last_frame = time.monotonic()
+                else:
+                    self.stop_event.wait(self.backoff)
+                    self.backoff = min(self.backoff * 2, self.backoff_max)
+                    continue
+
+            interval = self.read_interval
+            if interval:
+                if self.wake_event.wait(interval):
+                    self.wake_event.clear()
+                if self.stop_event.is_set():
+                    break
+
+            read_start = time.perf_counter()
+            ret, frame = self.capture.read()
+            now = time.monotonic()
+            if not ret or frame is None:
+                self.failed_reads += 1
+                if now - last_frame > self.stall_timeout:
+                    self.stalls += 1
+                    self.last_error = f"no frames for {self.stall_timeout:g}s"
+                    print(f"✗ Camera stalled ({self.last_error}); reopening")
+                    self.release()
+                else:
+                    self.stop_event.wait(0.01)
+                continue
+
+            last_frame = now
+            if self.rotation is not None:
+                frame = cv2.rotate(frame, self.rotation)
+            if interval:
+                self.timestamps.clear()
+            self._count_frame(now)
+            with self.lock:
+                self.frame = frame
+                self.frame_time = time.time()
+                self.sequence += 1
+                sequence = self.sequence
+            if self.tracer is not None and self.tracer.sampled(sequence):
+                self.tracer.record('camera.read', read_start, time.perf_counter(), sequence, 'capture')
+
+    def _count_frame(self, now):
+        """Internal: Update delivery statistics for one frame"""
+        if self.timestamps and self.fps:
+            period = 1.0 / self.fps
+            gap = now - self.timestamps[-1]
+            if gap > 1.5 * period:
+                self.dropped += int(round(gap / period)) - 1
+        self.timestamps.append(now)
+        self.frames += 1
+
+    def actual_fps(self):
+        """Delivered frames per second over the recent window."""
+        if len(self.timestamps) < 2:
+            return 0.0
+        span = self.timestamps[-1] - self.timestamps[0]
+        return (len(self.timestamps) - 1) / span if span > 0 else 0.0
+
+    def stats(self):
+        """Return capture counters for metrics."""
+        return {
+            'opened': self.is_opened,
+            'device': self.index,
+            'requested': {'fourcc': self.fourcc, 'resolution': list(self.resolution),
+                          'fps': self.fps},
+            'negotiated': self.negotiated,
+            'actual_fps': round(self.actual_fps(), 1),
+            'frames': self.frames,
+            'dropped_frames': self.dropped,
+            'failed_reads': self.failed_reads,
+            'stalls': self.stalls,
+            'opens': self.opens,
+            'throttled': self.read_interval,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,373 @@
+"""
+Module: config.py
+Description: Load, validate and live-reload system settings and the product database.
+
+Settings come from `config/settings.json` (see `config/settings.example.json`).
+Any value can be overridden per station through environment variables named
+`SBS_<SECTION>__<KEY>`, parsed as JSON when possible:
+
+    SBS_SCALE__PORT=/dev/ttyUSB0
+    SBS_YOLO__CONFIDENCE=0.4
+    SBS_CAMERA__RESOLUTION=[1280,720]
+
+Known keys are type- and range-checked; a bad value raises `ConfigError`
+naming the key. `ConfigWatcher` re-reads the file when it changes so the
+performance knobs in `LIVE_SECTIONS` can be tuned without a restart.
+"""
+
+import json
+import os
+
+
+SETTINGS_PATH = 'config/settings.json'
+PRODUCTS_PATH = 'config/products.json'
+ENV_PREFIX = 'SBS_'
+
+# Settings applied to a running server on reload; everything else needs a restart
+LIVE_SECTIONS = ('yolo.confidence', 'yolo.iou_threshold', 'performance', 'telemetry',
+                 'preview.width', 'detection_cache', 'scale.calibration_factor', 'scale.offset',
+                 'scale.auto_zero', 'scale.zero_band', 'scale.zero_window', 'scale.zero_tolerance',
+                 'scale.zero_rate', 'scale.command_timeout', 'tracing', 'memory', 'power',
+                 'barcode.enabled', 'barcode.rescan_every')
+
+# Dotted key -> (type(s), minimum, maximum); None means unbounded
+RULES = {
+    'station.id': (str, None, None),
+    'camera.index': ((int, str), None, None),
+    'camera.resolution': (list, None, None),
+    'camera.fps': ((int, float), 1, 240),
+    'camera.format': ((str, type(None)), None, None),
+    'camera.rotation': (int, 0, 270),
+    'camera.stall_timeout': ((int, float), 0.1, None),
+    'yolo.model': (str, None, None),
+    'yolo.model_version': ((str, type(None)), None, None),
+    'yolo.confidence': ((int, float), 0.0, 1.0),
+    'yolo.iou_threshold': ((int, float), 0.0, 1.0),
+    'yolo.device': ((str, type(None)), None, None),
+    'performance.adaptive': (bool, None, None),
+    'performance.target_latency_ms': ((int, float), 1, None),
+    'performance.cpu_target': ((int, float), 1, 100),
+    'performance.levels': ((list, type(None)), None, None),
+    'telemetry.min_interval': ((int, float), 0.0, None),
+    'telemetry.frame_change_threshold': ((int, float), 0.0, 255.0),
+    'telemetry.frame_max_age': ((int, float), 0.0, None),
+    'preview.width': (int, 0, None),
+    'preview.format': (str, None, None),
+    'preview.backend': (str, None, None),
+    'detection_cache.enabled': (bool, None, None),
+    'detection_cache.max_entries': (int, 1, None),
+    'detection_cache.max_distance': (int, 0, 64),
+    'detection_cache.ttl': ((int, float), 0.0, None),
+    'detection_cache.roi': ((list, type(None)), None, None),
+    'barcode.enabled': (bool, None, None),
+    'barcode.qr': (bool, None, None),
+    'barcode.linear': (bool, None, None),
+    'barcode.roi': ((list, type(None)), None, None),
+    'barcode.rescan_every': (int, 1, None),
+    'scale.port': ((str, type(None)), None, None),
+    'scale.baud_rate': (int, 300, None),
+    'scale.calibration_factor': ((int, float), None, None),
+    'scale.offset': ((int, float), None, None),
+    'scale.stale_after': ((int, float), 0.1, None),
+    'scale.reconnect_backoff_max': ((int, float), 0.1, None),
+    'scale.profile': ((str, type(None)), None, None),
+    'scale.command_timeout': ((int, float), 0.5, None),
+    'scale.auto_zero': (bool, None, None),
+    'scale.zero_band': ((int, float), 0.0, None),
+    'scale.zero_window': ((int, float), 0.1, None),
+    'scale.zero_tolerance': ((int, float), 0.0, None),
+    'scale.zero_rate': ((int, float), 0.0, None),
+    'billing.tax_rate': ((int, float), 0.0, 1.0),
+    'billing.rounding': ((int, float), 0.0, None),
+    'journal.fsync_batch': (int, 1, None),
+    'journal.fsync_interval': ((int, float), 0.0, None),
+    'journal.durable': (bool, None, None),
+    'journal.sync_timeout': ((int, float), 0.1, None),
+    'invoice.workers': (int, 1, 64),
+    'inventory.db_path': (str, None, None),
+    'inventory.flush_interval': ((int, float), 0.01, None),
+    'inventory.batch_size': (int, 1, None),
+    'inventory.default_reorder_level': ((int, float), 0.0, None),
+    'server.host': (str, None, None),
+    'server.port': (int, 1, 65535),
+    'tracing.enabled': (bool, None, None),
+    'tracing.capacity': (int, 100, None),
+    'tracing.sample_every': (int, 1, None),
+    'memory.sample_interval': ((int, float), 1, None),
+    'memory.history': (int, 10, None),
+    'memory.tracemalloc_frames': (int, 0, 100),
+    'memory.growth_limit_mb': ((int, float), 0.0, None),
+    'memory.warmup': ((int, float), 0.0, None),
+    'power.enabled': (bool, None, None),
+    'power.idle_after': ((int, float), 1, None),
+    'power.weight_threshold': ((int, float), 0.0, None),
+    'power.watchdog_interval': ((int, float), 0.1, 60),
+    'sync.endpoint': ((str, type(None)), None, None),
+    'sync.token': ((str, type(None)), None, None),
+    'sync.db_path': (str, None, None),
+    'sync.batch_size': (int, 1, 10000),
+    'sync.interval': ((int, float), 0.1, None),
+    'sync.max_bytes_per_second': (int, 0, None),
+    'sync.backoff_max': ((int, float), 1, None),
+    'sync.timeout': ((int, float), 1, None),
+    'sync.keep_acked': (int, 0, None),
+    'cluster.message_queue': ((str, type(None)), None, None),
+    'cluster.request_timeout': ((int, float), 1, None),
+    'cluster.publish_interval': ((int, float), 0.1, None),
+}
+
+CHOICES = {
+    'camera.rotation': (0, 90, 180, 270),
+    'preview.format': ('jpeg', 'webp'),
+    'preview.backend': ('auto', 'opencv', 'turbojpeg'),
+}
+
+# Tray regions given as [x1, y1, x2, y2] fractions of the frame
+ROI_KEYS = ('detection_cache.roi', 'barcode.roi')
+
+LEVEL_KEYS = {
+    'imgsz': (int, 32, 4096),
+    'detect_interval': ((int, float), 0.0, 10.0),
+    'jpeg_quality': (int, 1, 100),
+    'preview_fps': ((int, float), 0.1, 60),
+}
+
+
+class ConfigError(ValueError):
+    """Raised when settings fail validation."""
+
+
+def _check(key, value, kinds, low, high):
+    """Internal: Validate one value against its rule"""
+    # bool is an int subclass; only accept it where bool is the expected type
+    kinds = kinds if isinstance(kinds, tuple) else (kinds,)
+    if isinstance(value, bool) and bool not in kinds or not isinstance(value, kinds):
+        expected = '/'.join('null' if k is type(None) else k.__name__ for k in kinds)
+        raise ConfigError(f"{key}: expected {expected}, got {value!r}")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if low is not None and value < low or high is not None and value > high:
+            raise ConfigError(f"{key}: {value} is outside [{low}, {high}]")
+    if key in CHOICES and value not in CHOICES[key]:
+        raise ConfigError(f"{key}: {value!r} is not one of {', '.join(map(str, CHOICES[key]))}")
+
+
+def _valid_roi(roi):
+    """Internal: Whether a region is four fractions spanning a non-empty area"""
+    if len(roi) != 4 or not all(isinstance(v, (int, float)) and not isinstance(v, bool)
+                                and 0 <= v <= 1 for v in roi):
+        return False
+    x1, y1, x2, y2 = roi
+    return x1 < x2 and y1 < y2
+
+
+def validate(settings):
+    """
+    Check known keys for type and range.
+
+    Args:
+        settings (dict): Parsed settings
+
+    Returns:
+        dict: The same settings
+
+    Raises:
+        ConfigError: On the first invalid value
+    """
+    if not isinstance(settings, dict):
+        raise ConfigError("settings must be a JSON object")
+    for key, (kinds, low, high) in RULES.items():
+        section, name = key.split('.', 1)
+        value = settings.get(section, {})
+        if not isinstance(value, dict):
+            raise ConfigError(f"{section}: expected an object")
+        if name in value:
+            _check(key, value[name], kinds, low, high)
+
+    resolution = settings.get('camera', {}).get('resolution')
+    if resolution is not None and (len(resolution) != 2 or not all(
+            isinstance(v, int) and v > 0 for v in resolution)):
+        raise ConfigError(f"camera.resolution: expected [width, height], got {resolution!r}")
+
+    for key in ROI_KEYS:
+        section, name = key.split('.', 1)
+        roi = settings.get(section, {}).get(name)
+        if roi is not None and not _valid_roi(roi):
+            raise ConfigError(f"{key}: expected [x1, y1, x2, y2] fractions in [0, 1] "
+                              f"with x1 < x2 and y1 < y2, got {roi!r}")
+
+    for i, level in enumerate(settings.get('performance', {}).get('levels') or []):
+        if not isinstance(level, dict):
+            raise ConfigError(f"performance.levels[{i}]: expected an object, got {level!r}")
+        missing = set(LEVEL_KEYS) - set(level)
+        if missing:
+            raise ConfigError(f"performance.levels[{i}]: missing {', '.join(sorted(missing))}")
+        for name, (kinds, low, high) in LEVEL_KEYS.items():
+            _check(f"performance.levels[{i}].{name}", level[name], kinds, low, high)
+    return settings
+
+
+def _parse_env_value(text):
+    """Internal: JSON if it parses, otherwise the raw string"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def apply_env_overrides(settings, environ=None):
+    """
+    Apply `SBS_<SECTION>__<KEY>` environment overrides (in place).
+
+    Args:
+        settings (dict): Parsed settings
+        environ (dict): Environment (defaults to os.environ)
+
+    Returns:
+        list: Dotted keys that were overridden
+    """
+    environ = os.environ if environ is None else environ
+    overridden = []
+    for name in sorted(environ):
+        if not name.startswith(ENV_PREFIX) or '__' not in name:
+            continue
+        path = name[len(ENV_PREFIX):].lower().split('__')
+        target = settings
+        for part in path[:-1]:
+            target = target.setdefault(part, {})
+            if not isinstance(target, dict):
+                raise ConfigError(f"{name}: {part} is not a section")
+        target[path[-1]] = _parse_env_value(environ[name])
+        overridden.append('.'.join(path))
+    return overridden
+
+
+def load_config(config_path=SETTINGS_PATH, environ=None):
+    """
+    Load settings from a JSON file, apply environment overrides and validate.
+
+    Args:
+        config_path (str): Path to settings.json
+        environ (dict): Environment for overrides (defaults to os.environ)
+
+    Returns:
+        dict: Parsed settings, or only the overrides if the file does not exist
+
+    Raises:
+        ConfigError: If the file is not valid JSON or a value is invalid
+    """
+    try:
+        with open(config_path, 'r') as f:
+            settings = json.load(f)
+    except FileNotFoundError:
+        settings = {}
+    except ValueError as e:
+        raise ConfigError(f"{config_path}: {e}")
+    apply_env_overrides(settings, environ)
+    return validate(settings)
+
+
+def load_products(products_path=PRODUCTS_PATH):
+    """
+    Load the product database from a JSON file.
+
+    Args:
+        products_path (str): Path to products.json
+
+    Returns:
+        dict: Product key -> product record, or an empty dict if missing
+    """
+    try:
+        with open(products_path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def changed_keys(old, new, prefix=''):
+    """
+    Dotted keys whose values differ between two settings dicts.
+
+    Returns:
+        list: Sorted keys, e.g. ['camera.fps', 'yolo.confidence']
+    """
+    keys = []
+    for key in set(old) | set(new):
+        a, b = old.get(key), new.get(key)
+        path = f"{prefix}{key}"
+        if isinstance(a, dict) and isinstance(b, dict):
+            keys.extend(changed_keys(a, b, f"{path}."))
+        elif a != b:
+            keys.append(path)
+    return sorted(keys)
+
+
+def is_live(key):
+    """Whether a dotted key can be applied without restarting."""
+    return any(key == live or key.startswith(f"{live}.") for live in LIVE_SECTIONS)
+
+
+class ConfigWatcher:
+    """Re-reads settings.json when its modification time changes."""
+
+    def __init__(self, config_path=SETTINGS_PATH, settings=None):
+        """
+        Initialize the watcher.
+
+        Args:
+            config_path (str): Path to settings.json
+            settings (dict): Currently applied settings
+        """
+        self.config_path = config_path
+        self.settings = settings if settings is not None else load_config(config_path)
+        self.mtime = self._mtime()
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+
+    def _mtime(self):
+        """Internal: Modification time, or None if the file is missing"""
+        try:
+            return os.stat(self.config_path).st_mtime
+        except OSError:
+            return None
+
+    def poll(self):
+        """
+        Reload the settings if the file changed.
+
+        Invalid files are reported and ignored; the previous settings stay active.
+
+        Returns:
+            tuple: (new settings, live keys, restart-only keys), or None if
+            nothing changed
+        """
+        mtime = self._mtime()
+        if mtime == self.mtime:
+            return None
+        self.mtime = mtime
+        try:
+            settings = load_config(self.config_path)
+        except ConfigError as e:
+            self.errors += 1
+            self.last_error = str(e)
+            print(f"✗ Config reload rejected: {e}")
+            return None
+
+        keys = changed_keys(self.settings, settings)
+        if not keys:
+            return None
+        self.settings = settings
+        self.reloads += 1
+        self.last_error = None
+        live = [key for key in keys if is_live(key)]
+        restart = [key for key in keys if not is_live(key)]
+        return settings, live, restart
+
+    def stats(self):
+        """Return reload counters for metrics."""
+        return {
+            'path': self.config_path,
+            'reloads': self.reloads,
+            'rejected': self.errors,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,153 @@
+"""
+Module: detection_cache.py
+Description: LRU cache of detection results keyed by a perceptual hash of the tray.
+
+A product usually sits on the tray for several seconds, so consecutive camera
+frames are nearly identical. `DetectionCache` computes a 64-bit difference
+hash (dHash) of the tray region of interest and returns the previous result
+for any cached frame within `max_distance` differing bits, skipping the model
+pass. Entries expire after `ttl` seconds and the least recently used entry is
+evicted once `max_entries` is reached.
+"""
+
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+_BIT_WEIGHTS = (1 << np.arange(64, dtype=np.uint64)).astype(np.uint64)
+
+
+def dhash(image, roi=None):
+    """
+    64-bit difference hash of a BGR image.
+
+    Args:
+        image (numpy.ndarray): BGR frame
+        roi (tuple): Optional (x1, y1, x2, y2) region as fractions of the frame
+
+    Returns:
+        int: The hash
+    """
+    if roi:
+        height, width = image.shape[:2]
+        x1, y1, x2, y2 = roi
+        image = image[int(y1 * height):int(y2 * height), int(x1 * width):int(x2 * width)]
+    gray = cv2.cvtColor(cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA),
+                        cv2.COLOR_BGR2GRAY)
+    bits = (gray[:, 1:] > gray[:, :-1]).ravel()
+    return int(_BIT_WEIGHTS[bits].sum())
+
+
+def hamming(a, b):
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count('1')
+
+
+class DetectionCache:
+    """Size- and TTL-bounded LRU of detection results with near-match lookup."""
+
+    def __init__(self, max_entries=32, max_distance=4, ttl=5.0, roi=None, enabled=True):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of cached frames
+            max_distance (int): Largest Hamming distance (0-64) counted as a hit
+            ttl (float): Seconds an entry stays valid
+            roi (tuple): Tray region (x1, y1, x2, y2) as fractions; None = whole frame
+            enabled (bool): When False every lookup is a miss
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.max_distance = int(max_distance)
+        self.ttl = float(ttl)
+        self.roi = tuple(roi) if roi else None
+        self.enabled = enabled
+
+        self.entries = OrderedDict()   # hash -> (context, stored_at, result)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.hit_distance_total = 0
+
+    def key(self, frame):
+        """Perceptual hash of a frame's tray region."""
+        return dhash(frame, self.roi)
+
+    def get(self, key, context=None, now=None):
+        """
+        Look up a result for a frame hash.
+
+        Args:
+            key (int): Hash from `key()`
+            context: Extra value that must match exactly (e.g. inference size)
+            now (float): Current time (defaults to time.monotonic())
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic() if now is None else now
+
+        best_key, best_distance = None, self.max_distance + 1
+        for cached_key, (cached_context, stored_at, _) in list(self.entries.items()):
+            if now - stored_at > self.ttl:
+                del self.entries[cached_key]
+                self.expired += 1
+                continue
+            if cached_context != context:
+                continue
+            distance = hamming(key, cached_key)
+            if distance < best_distance:
+                best_key, best_distance = cached_key, distance
+                if distance == 0:
+                    break
+
+        if best_key is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(best_key)
+        self.hits += 1
+        self.hit_distance_total += best_distance
+        return self.entries[best_key][2]
+
+    def put(self, key, result, context=None, now=None):
+        """
+        Store a result for a frame hash.
+
+        Args:
+            key (int): Hash from `key()`
+            result: Detection result to return on later hits
+            context: See `get`
+            now (float): Current time (defaults to time.monotonic())
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic() if now is None else now
+        self.entries[key] = (context, now, result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evicted += 1
+
+    def clear(self):
+        """Drop all entries (e.g. after the model changed)."""
+        self.entries.clear()
+
+    def stats(self):
+        """Return cache counters for metrics."""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'mean_hit_distance': round(self.hit_distance_total / self.hits, 2) if self.hits else 0.0,
+            'expired': self.expired,
+            'evicted': self.evicted,
+        }
@@ -0,0 +1,101 @@
+"""
+Module: detector.py
+Description: Vectorised post-processing of YOLO detection results.
+
+The YOLO model reports class ids from its own label set (COCO for the stock
+`yolov8n.pt`). The billing system only cares about the subset of classes that
+map onto a product in the catalog, so the mapping is resolved once per model
+load into an integer lookup table and every result is then filtered with
+NumPy masking instead of per-box Python code.
+"""
+
+import numpy as np
+
+
+NO_PRODUCT = -1
+
+_EMPTY_INDEX = np.empty(0, dtype=np.intp)
+_EMPTY_CONF = np.empty(0, dtype=np.float32)
+_EMPTY_BOXES = np.empty((0, 4), dtype=np.float32)
+
+
+def build_class_lookup(class_names, fruit_mapping, catalog):
+    """
+    Build the class id -> catalog index lookup table for a loaded model.
+
+    Args:
+        class_names (dict or list): Model label names (`model.names`)
+        fruit_mapping (dict): Lower-case model label -> catalog product name
+        catalog (list): Ordered product names; positions are catalog indices
+
+    Returns:
+        numpy.ndarray: Integer array indexed by class id holding the catalog
+        index of the mapped product, or NO_PRODUCT for unmapped classes
+    """
+    if isinstance(class_names, dict):
+        items = class_names.items()
+    else:
+        items = enumerate(class_names)
+    items = [(int(class_id), str(name).lower()) for class_id, name in items]
+
+    positions = {product: index for index, product in enumerate(catalog)}
+    size = max((class_id for class_id, _ in items), default=-1) + 1
+    lookup = np.full(size, NO_PRODUCT, dtype=np.intp)
+
+    for class_id, name in items:
+        product = fruit_mapping.get(name)
+        if product in positions:
+            lookup[class_id] = positions[product]
+
+    return lookup
+
+
+def select_detections(result, lookup, with_boxes=False):
+    """
+    Filter one YOLO result down to the detections that map to a product.
+
+    The whole `boxes.data` tensor (x1, y1, x2, y2, conf, cls per row) is moved
+    to the host once and processed as arrays.
+
+    Args:
+        result: A single `ultralytics` Results object
+        lookup (numpy.ndarray): Table from `build_class_lookup`
+        with_boxes (bool): Also return the xyxy boxes of the kept detections
+
+    Returns:
+        tuple: (catalog_index, confidence) arrays, plus an (N, 4) xyxy array
+        when `with_boxes` is True
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return (_EMPTY_INDEX, _EMPTY_CONF, _EMPTY_BOXES) if with_boxes else (_EMPTY_INDEX, _EMPTY_CONF)
+
+    data = boxes.data.cpu().numpy()
+    class_ids = data[:, 5].astype(np.intp)
+
+    # Class ids outside the table (e.g. a model swapped under us) never match
+    in_range = class_ids < len(lookup)
+    catalog_index = np.full(len(class_ids), NO_PRODUCT, dtype=np.intp)
+    catalog_index[in_range] = lookup[class_ids[in_range]]
+
+    keep = catalog_index != NO_PRODUCT
+    if with_boxes:
+        return catalog_index[keep], data[keep, 4], data[keep, :4]
+    return catalog_index[keep], data[keep, 4]
+
+
+def best_detection(catalog_index, confidence):
+    """
+    Pick the most confident detection.
+
+    Args:
+        catalog_index (numpy.ndarray): Catalog indices from `select_detections`
+        confidence (numpy.ndarray): Matching confidences
+
+    Returns:
+        tuple: (catalog index or NO_PRODUCT, confidence as float)
+    """
+    if len(confidence) == 0:
+        return NO_PRODUCT, 0.0
+    best = int(np.argmax(confidence))
+    return int(catalog_index[best]), float(confidence[best])
@@ -0,0 +1,360 @@
+"""
+Module: evaluation.py
+Description: Offline accuracy vs. speed evaluation of detector configurations.
+
+Runs YOLO models over a labelled image folder and reports, for every
+combination of model, input size, confidence threshold and class mapping,
+per-product precision/recall, a confusion matrix and inference latency.
+
+Dataset layout (one folder per product, `none` for an empty tray):
+
+    dataset/
+        apple/   img001.jpg ...
+        banana/  ...
+        none/    ...
+
+Each image is scored like the live server scores a frame: the most confident
+detection that maps to a product wins, otherwise the prediction is `none`.
+
+Inference dominates the cost, so every (model, input size) pair is run once
+with the lowest threshold and thresholds/mappings are applied afterwards.
+Images are sharded across worker processes, each pinned to one Torch thread,
+so latencies are comparable single-core numbers.
+
+Usage:
+    python -m src.evaluation dataset/ --models yolov8n.pt yolov8s.pt \\
+        --imgsz 320 416 640 --conf 0.25 0.3 0.5 --mapping identity aliases.json \\
+        --min-precision 0.9 --min-recall 0.85 --output evaluation.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.detector import NO_PRODUCT, build_class_lookup
+
+try:
+    from ultralytics import YOLO
+    ULTRALYTICS_AVAILABLE = True
+except ImportError:
+    ULTRALYTICS_AVAILABLE = False
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+NONE_LABEL = 'none'
+
+# Per-process model cache for worker processes
+_MODELS = {}
+
+
+def load_dataset(root):
+    """
+    List the labelled images in a dataset folder.
+
+    Args:
+        root (str): Folder with one sub-folder per product
+
+    Returns:
+        list: (image path, label) tuples, sorted
+    """
+    samples = []
+    for label in sorted(os.listdir(root)):
+        folder = os.path.join(root, label)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                samples.append((os.path.join(folder, name), label.lower()))
+    return samples
+
+
+def load_mapping(spec):
+    """
+    Load a model label -> product mapping.
+
+    Args:
+        spec (str): 'identity' (every label maps to itself) or a JSON file path
+
+    Returns:
+        tuple: (name, dict or None); None means identity
+    """
+    if spec == 'identity':
+        return spec, None
+    with open(spec, 'r', encoding='utf-8') as f:
+        mapping = json.load(f)
+    return os.path.splitext(os.path.basename(spec))[0], {k.lower(): v for k, v in mapping.items()}
+
+
+def _get_model(model_path):
+    """Internal: Load a model once per worker process"""
+    if model_path not in _MODELS:
+        _MODELS[model_path] = YOLO(model_path)
+    return _MODELS[model_path]
+
+
+def _run_shard(model_path, imgsz, min_conf, paths, device):
+    """
+    Internal: Worker task running one model/input size over a list of images
+
+    Returns:
+        tuple: (class names, per-image (class_ids, confidences) list, latencies)
+    """
+    import cv2
+    import torch
+    torch.set_num_threads(1)
+
+    model = _get_model(model_path)
+    detections = []
+    latencies = []
+    warmed_up = False
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            detections.append((np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)))
+            latencies.append(np.nan)
+            continue
+        if not warmed_up:
+            model(image, conf=min_conf, imgsz=imgsz, device=device, verbose=False)
+            warmed_up = True
+        started = time.perf_counter()
+        results = model(image, conf=min_conf, imgsz=imgsz, device=device, verbose=False)
+        latencies.append(time.perf_counter() - started)
+
+        data = [result.boxes.data.cpu().numpy() for result in results if result.boxes is not None]
+        data = np.concatenate(data) if data else np.empty((0, 6), dtype=np.float32)
+        detections.append((data[:, 5].astype(np.intp), data[:, 4].astype(np.float32)))
+    return dict(model.names), detections, latencies
+
+
+def predict(detections, lookup, catalog, threshold):
+    """
+    Score images the way the live server does.
+
+    Args:
+        detections (list): Per-image (class_ids, confidences) arrays
+        lookup (numpy.ndarray): Class id -> catalog index table
+        catalog (list): Product names
+        threshold (float): Confidence threshold
+
+    Returns:
+        list: Predicted product (or 'none') per image
+    """
+    predictions = []
+    for class_ids, confidences in detections:
+        in_range = class_ids < len(lookup)
+        index = np.full(len(class_ids), NO_PRODUCT, dtype=np.intp)
+        index[in_range] = lookup[class_ids[in_range]]
+        keep = (index != NO_PRODUCT) & (confidences >= threshold)
+        if not keep.any():
+            predictions.append(NONE_LABEL)
+            continue
+        best = np.argmax(np.where(keep, confidences, -1.0))
+        predictions.append(catalog[index[best]])
+    return predictions
+
+
+def score(labels, predictions):
+    """
+    Per-product precision/recall and the confusion matrix.
+
+    Args:
+        labels (list): True label per image
+        predictions (list): Predicted label per image
+
+    Returns:
+        dict: products, per_product metrics, macro averages, accuracy and the
+        confusion matrix (rows = true label, columns = prediction)
+    """
+    classes = sorted((set(labels) | set(predictions)) - {NONE_LABEL}) + [NONE_LABEL]
+    position = {name: i for i, name in enumerate(classes)}
+    matrix = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    np.add.at(matrix, ([position[l] for l in labels], [position[p] for p in predictions]), 1)
+
+    true_positive = np.diag(matrix)
+    predicted = matrix.sum(axis=0)
+    actual = matrix.sum(axis=1)
+    per_product = {}
+    for i, name in enumerate(classes):
+        if name == NONE_LABEL:
+            continue
+        per_product[name] = {
+            'precision': round(float(true_positive[i] / predicted[i]), 4) if predicted[i] else 0.0,
+            'recall': round(float(true_positive[i] / actual[i]), 4) if actual[i] else 0.0,
+            'support': int(actual[i]),
+        }
+
+    products = [name for name in per_product if per_product[name]['support']]
+    return {
+        'classes': classes,
+        'per_product': per_product,
+        'macro_precision': round(float(np.mean([per_product[n]['precision'] for n in products])), 4)
+        if products else 0.0,
+        'macro_recall': round(float(np.mean([per_product[n]['recall'] for n in products])), 4)
+        if products else 0.0,
+        'accuracy': round(float(true_positive.sum() / len(labels)), 4) if labels else 0.0,
+        'confusion_matrix': matrix.tolist(),
+    }
+
+
+def evaluate(samples, models, imgsizes, thresholds, mappings, workers=None, device='cpu'):
+    """
+    Evaluate every configuration.
+
+    Args:
+        samples (list): (image path, label) tuples from `load_dataset`
+        models (list): Model paths
+        imgsizes (list): Inference sizes
+        thresholds (list): Confidence thresholds
+        mappings (list): (name, mapping) tuples from `load_mapping`
+        workers (int): Worker processes (defaults to the CPU count)
+        device (str): Inference device
+
+    Returns:
+        list: One result dict per configuration
+    """
+    if not ULTRALYTICS_AVAILABLE:
+        raise RuntimeError("ultralytics is not installed (pip install ultralytics)")
+
+    workers = workers or os.cpu_count() or 1
+    paths = [path for path, _ in samples]
+    labels = [label for _, label in samples]
+    min_conf = min(thresholds)
+    shard_size = max(1, -(-len(paths) // workers))
+    shards = [paths[i:i + shard_size] for i in range(0, len(paths), shard_size)]
+
+    runs = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            (model, imgsz): [pool.submit(_run_shard, model, imgsz, min_conf, shard, device)
+                             for shard in shards]
+            for model in models for imgsz in imgsizes
+        }
+        for key, shard_futures in futures.items():
+            names, detections, latencies = None, [], []
+            for future in shard_futures:
+                shard_names, shard_detections, shard_latencies = future.result()
+                names = shard_names
+                detections.extend(shard_detections)
+                latencies.extend(shard_latencies)
+            runs[key] = (names, detections, np.array(latencies, dtype=np.float64))
+            print(f"✓ Ran {key[0]} @ {key[1]}px on {len(detections)} images")
+
+    results = []
+    for (model, imgsz), (names, detections, latencies) in runs.items():
+        valid = latencies[~np.isnan(latencies)]
+        latency = {
+            'p50_ms': round(float(np.percentile(valid, 50)) * 1000, 2) if len(valid) else None,
+            'p90_ms': round(float(np.percentile(valid, 90)) * 1000, 2) if len(valid) else None,
+            'mean_ms': round(float(valid.mean()) * 1000, 2) if len(valid) else None,
+        }
+        for mapping_name, mapping in mappings:
+            if mapping is None:
+                mapping = {str(name).lower(): str(name).lower() for name in names.values()}
+            catalog = sorted(set(mapping.values()) - {NONE_LABEL})
+            lookup = build_class_lookup(names, mapping, catalog)
+            for threshold in thresholds:
+                predictions = predict(detections, lookup, catalog, threshold)
+                result = {
+                    'model': model,
+                    'imgsz': imgsz,
+                    'conf': threshold,
+                    'mapping': mapping_name,
+                    'latency': latency,
+                }
+                result.update(score(labels, predictions))
+                results.append(result)
+    return results
+
+
+def recommend(results, min_precision=0.0, min_recall=0.0):
+    """
+    Pick the fastest configuration that meets the accuracy bar.
+
+    Returns:
+        dict: The chosen result, or None if no configuration qualifies
+    """
+    qualifying = [r for r in results
+                  if r['macro_precision'] >= min_precision and r['macro_recall'] >= min_recall
+                  and r['latency']['p50_ms'] is not None]
+    if not qualifying:
+        return None
+    return min(qualifying, key=lambda r: (r['latency']['p50_ms'], -r['accuracy']))
+
+
+def print_report(results, best):
+    """Print a summary table and the confusion matrix of the recommendation."""
+    print("=" * 96)
+    print(f"{'model':<18}{'imgsz':>6}{'conf':>6}  {'mapping':<12}{'precision':>10}{'recall':>8}"
+          f"{'accuracy':>10}{'p50 ms':>9}{'p90 ms':>9}")
+    print("-" * 96)
+    for r in sorted(results, key=lambda r: (r['latency']['p50_ms'] or 0, -r['accuracy'])):
+        marker = ' *' if r is best else ''
+        print(f"{os.path.basename(r['model']):<18}{r['imgsz']:>6}{r['conf']:>6.2f}  "
+              f"{r['mapping']:<12}{r['macro_precision']:>10.3f}{r['macro_recall']:>8.3f}"
+              f"{r['accuracy']:>10.3f}{r['latency']['p50_ms'] or 0:>9.1f}"
+              f"{r['latency']['p90_ms'] or 0:>9.1f}{marker}")
+    print("=" * 96)
+
+    if best is None:
+        print("✗ No configuration meets the accuracy bar")
+        return
+    print(f"✓ Recommended: {best['model']} imgsz={best['imgsz']} conf={best['conf']} "
+          f"mapping={best['mapping']}")
+    print("\nPer product:")
+    for name, metrics in best['per_product'].items():
+        print(f"  {name:<14} precision {metrics['precision']:.3f}  recall {metrics['recall']:.3f}"
+              f"  ({metrics['support']} images)")
+    print("\nConfusion matrix (rows = true, columns = predicted):")
+    width = max(len(name) for name in best['classes']) + 2
+    print(' ' * width + ''.join(f"{name:>{width}}" for name in best['classes']))
+    for name, row in zip(best['classes'], best['confusion_matrix']):
+        print(f"{name:<{width}}" + ''.join(f"{count:>{width}}" for count in row))
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Evaluate detector accuracy vs. speed')
+    parser.add_argument('dataset', help='Folder with one sub-folder of images per product')
+    parser.add_argument('--models', nargs='+', default=['yolov8n.pt'])
+    parser.add_argument('--imgsz', type=int, nargs='+', default=[320, 416, 640])
+    parser.add_argument('--conf', type=float, nargs='+', default=[0.25, 0.3, 0.4, 0.5])
+    parser.add_argument('--mapping', nargs='+', default=['identity'],
+                        help="'identity' or JSON files mapping model labels to products")
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes')
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--min-precision', type=float, default=0.0)
+    parser.add_argument('--min-recall', type=float, default=0.0)
+    parser.add_argument('--output', help='Write the full report as JSON')
+    args = parser.parse_args()
+
+    samples = load_dataset(args.dataset)
+    if not samples:
+        print(f"✗ No labelled images found in {args.dataset}")
+        return 1
+    print(f"✓ {len(samples)} images, labels: {', '.join(sorted(set(l for _, l in samples)))}")
+
+    try:
+        results = evaluate(samples, args.models, args.imgsz, args.conf,
+                           [load_mapping(spec) for spec in args.mapping],
+                           workers=args.workers, device=args.device)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"✗ Evaluation failed: {e}")
+        return 1
+
+    best = recommend(results, args.min_precision, args.min_recall)
+    print_report(results, best)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results, 'recommended': best}, f, indent=2)
+        print(f"\n✓ Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,479 @@
+"""
+Module: inventory.py
+Description: Stock ledger with an in-memory on-hand index and batched SQLite writes.
+
+Every billed item decrements its product's on-hand quantity: weighed products
+are counted in grams, packaged (fixed-price) products in pieces (`unit` 'pc'),
+and the quantity columns below hold the product's own unit. The decrement is
+applied to the in-memory index at once, so stock queries never touch the disk,
+and queued as a movement; a background thread writes queued movements to
+`data/inventory.db` in one transaction per batch, together with the updated
+stock rows, so the database is always consistent with its own movement history.
+
+When a product falls to or below its reorder level, `on_low_stock` is called
+once; it re-arms when stock is replenished above the level. Only products that
+have been stocked (a delivery, stocktake or explicit reorder level) are watched:
+a product billed before it was ever stocked is recorded, with on-hand going
+negative, but raises no alert until stock is imported for it.
+
+Stock deliveries and stocktakes are imported from CSV, with `pieces` instead of
+`grams` for packaged goods:
+
+    product,grams,pieces,reorder_level
+    apple,25000,,5000
+    banana,18000,,
+    orange_juice_1l,,48,6
+
+    python -m src.inventory import deliveries.csv          # add to on-hand
+    python -m src.inventory import stocktake.csv --set     # replace on-hand
+    python -m src.inventory list
+    python -m src.inventory movements --product apple
+"""
+
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from src.utils import native_threading
+
+# SQLite calls block, so the writer runs on a real OS thread
+threading, _ = native_threading()
+
+
+DB_PATH = 'data/inventory.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS stock (
+    product TEXT PRIMARY KEY,
+    on_hand_g REAL NOT NULL DEFAULT 0,
+    reorder_level_g REAL NOT NULL DEFAULT 0,
+    updated TEXT,
+    unit TEXT NOT NULL DEFAULT 'g',
+    tracked INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS movements (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,
+    product TEXT NOT NULL,
+    delta_g REAL NOT NULL,
+    kind TEXT NOT NULL,
+    station TEXT,
+    ref TEXT,
+    unit TEXT NOT NULL DEFAULT 'g'
+);
+CREATE INDEX IF NOT EXISTS movements_product_ts ON movements (product, ts);
+'''
+
+SALE = 'sale'
+STOCK_IN = 'stock_in'
+COUNT = 'count'
+
+GRAMS = 'g'
+PIECES = 'pc'
+
+
+class InventoryError(ValueError):
+    """Raised for invalid stock data."""
+
+
+def _product_key(name):
+    """Internal: Normalise a product name to its catalog key"""
+    return str(name).strip().lower()
+
+
+def parse_stock_csv(text):
+    """
+    Parse a stock import.
+
+    Columns: `product` and `grams` (or `kg`, or `pieces` for packaged goods),
+    optionally `reorder_level` (in the row's unit; empty keeps the current level).
+
+    Args:
+        text (str): CSV contents
+
+    Returns:
+        list: (product, quantity, reorder_level or None, unit) tuples
+
+    Raises:
+        InventoryError: On a missing column or a non-numeric value
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    fields = {name.strip().lower() for name in reader.fieldnames or []}
+    if 'product' not in fields or not fields & {'grams', 'kg', 'pieces'}:
+        raise InventoryError("CSV needs a 'product' column and a 'grams', 'kg' or 'pieces' column")
+
+    rows = []
+    for line, raw in enumerate(reader, start=2):
+        row = {key.strip().lower(): (value or '').strip() for key, value in raw.items() if key}
+        if not row.get('product'):
+            continue
+        try:
+            if row.get('pieces'):
+                quantity, unit = float(row['pieces']), PIECES
+            elif row.get('grams'):
+                quantity, unit = float(row['grams']), GRAMS
+            else:
+                quantity, unit = float(row['kg']) * 1000.0, GRAMS
+            level = float(row['reorder_level']) if row.get('reorder_level') else None
+        except (KeyError, ValueError):
+            raise InventoryError(f"line {line}: quantity and reorder level must be numbers")
+        rows.append((_product_key(row['product']), quantity, level, unit))
+    return rows
+
+
+class InventoryLedger:
+    """On-hand stock per product, persisted as batched ledger movements."""
+
+    def __init__(self, path=DB_PATH, flush_interval=0.5, batch_size=64,
+                 default_reorder_level=0.0, on_low_stock=None):
+        """
+        Open the ledger and load the on-hand index.
+
+        Args:
+            path (str): SQLite database file
+            flush_interval (float): Seconds between background writes
+            batch_size (int): Queued movements that trigger an early write
+            default_reorder_level (float): Reorder level (grams) for new weighed products
+            on_low_stock (callable): Called with a stock dict when a product falls
+                to or below its reorder level
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.default_reorder_level = default_reorder_level
+        self.on_low_stock = on_low_stock
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self._migrate()
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db_lock = threading.Lock()
+
+        # In-memory index: product -> [on_hand, reorder_level, unit, tracked]
+        self.lock = threading.Lock()
+        self.index = {row[0]: [row[1], row[2], row[3], bool(row[4])] for row in self.db.execute(
+            'SELECT product, on_hand_g, reorder_level_g, unit, tracked FROM stock')}
+        self.low = {product for product, (on_hand, level, _, tracked) in self.index.items()
+                    if tracked and on_hand <= level}
+        self.pending = []
+
+        self.flushed_movements = 0
+        self.flushes = 0
+        self.low_stock_events = 0
+        self.last_flush_ms = 0.0
+
+        self.flush_requested = threading.Event()
+        self.running = True
+        self.thread = threading.Thread(target=self._writer, name="InventoryWriterThread")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _migrate(self):
+        """Internal: Add the `unit` and `tracked` columns to ledgers created before them"""
+        for table in ('stock', 'movements'):
+            columns = {row[1] for row in self.db.execute(f'PRAGMA table_info({table})')}
+            if 'unit' not in columns:
+                with self.db:
+                    self.db.execute(f"ALTER TABLE {table} ADD COLUMN unit TEXT NOT NULL DEFAULT 'g'")
+        columns = {row[1] for row in self.db.execute('PRAGMA table_info(stock)')}
+        if 'tracked' not in columns:
+            with self.db:
+                self.db.execute('ALTER TABLE stock ADD COLUMN tracked INTEGER NOT NULL DEFAULT 0')
+                self.db.execute('UPDATE stock SET tracked = 1 WHERE reorder_level_g > 0 OR product IN '
+                                '(SELECT product FROM movements WHERE kind != ?)', (SALE,))
+
+    def _entry(self, product, unit, recount=False):
+        """
+        Internal: Index entry for a product counted in `unit` (caller holds the lock)
+
+        A product keeps the unit it is stocked in. It can only change unit
+        while nothing is on hand, or through a stocktake (`recount`).
+        """
+        entry = self.index.get(product)
+        if entry is None:
+            level = self.default_reorder_level if unit == GRAMS else 0.0
+            entry = self.index[product] = [0.0, level, unit, False]
+        elif entry[2] != unit:
+            if not recount and entry[0] != 0:
+                raise InventoryError(f"{product} is stocked in {entry[2]}, not {unit}")
+            # Levels do not convert between grams and pieces
+            entry[:3] = [0.0, 0.0, unit]
+        return entry
+
+    def _apply(self, product, delta, kind, station=None, ref=None, level=None, unit=GRAMS):
+        """Internal: Update the index and queue the movement (caller holds the lock)"""
+        entry = self._entry(product, unit)
+        entry[0] += delta
+        if level is not None:
+            entry[1] = level
+        if kind != SALE or level is not None:
+            entry[3] = True
+        self.pending.append((datetime.now().isoformat(), product, delta, kind, station, ref,
+                             unit, entry[0], entry[1], entry[3]))
+
+        # Fire once per crossing; re-arm once stock is back above the level.
+        # Never-stocked products have no meaningful level to cross
+        if entry[3] and entry[0] <= entry[1]:
+            if product not in self.low:
+                self.low.add(product)
+                return self._stock(product)
+        else:
+            self.low.discard(product)
+        return None
+
+    def _stock(self, product):
+        """Internal: Stock dict for one product (caller holds the lock)"""
+        on_hand, level, unit, tracked = self.index[product]
+        stock = {'product': product, 'on_hand': round(on_hand, 2), 'reorder_level': round(level, 2),
+                 'unit': unit, 'tracked': tracked, 'low': tracked and on_hand <= level}
+        if unit == GRAMS:
+            stock.update(on_hand_g=stock['on_hand'], reorder_level_g=stock['reorder_level'])
+        return stock
+
+    def _notify(self, events):
+        """Internal: Report low-stock crossings outside the lock"""
+        for event in events:
+            if event is None:
+                continue
+            self.low_stock_events += 1
+            if self.on_low_stock is not None:
+                try:
+                    self.on_low_stock(event)
+                except Exception as e:
+                    print(f"✗ Low-stock handler error: {e}")
+
+    def record_sale(self, product, grams, station=None, ref=None, pieces=None):
+        """
+        Take billed goods out of stock.
+
+        Args:
+            product (str): Product key
+            grams (float): Weight sold (ignored when `pieces` is given)
+            station (str): Station that billed it
+            ref (str): Reference stored with the movement (e.g. journal record)
+            pieces (int): Packs sold, for products counted in pieces
+
+        Returns:
+            dict: Stock after the sale
+
+        Raises:
+            InventoryError: If the product is stocked in the other unit
+        """
+        product = _product_key(product)
+        if pieces is None:
+            delta, unit = -float(grams), GRAMS
+        else:
+            delta, unit = -float(pieces), PIECES
+        with self.lock:
+            event = self._apply(product, delta, SALE, station, ref, unit=unit)
+            stock = self._stock(product)
+            batch_full = len(self.pending) >= self.batch_size
+        self._notify([event])
+        if batch_full:
+            self.flush_requested.set()
+        return stock
+
+    def stock_in(self, rows, replace=False, ref=None):
+        """
+        Apply a delivery or stocktake and write it immediately.
+
+        Args:
+            rows (list): (product, quantity, reorder_level or None[, unit]) tuples;
+                unit is 'g' (default) or 'pc'
+            replace (bool): Set on-hand to `quantity` (stocktake) instead of adding
+            ref (str): Reference stored with the movements (e.g. file name)
+
+        Returns:
+            int: Number of products updated
+
+        Raises:
+            InventoryError: If a delivery is in a different unit than the product's
+                stock; no row of the import is applied then
+        """
+        events = []
+        with self.lock:
+            # All or nothing: a failing row restores the index as it was
+            saved = {_product_key(row[0]): list(self.index.get(_product_key(row[0])) or [])
+                     for row in rows}
+            queued, low = len(self.pending), set(self.low)
+            try:
+                for row in rows:
+                    product, quantity, level = row[:3]
+                    unit = row[3] if len(row) > 3 else GRAMS
+                    product = _product_key(product)
+                    current = self._entry(product, unit, recount=replace)[0]
+                    delta = quantity - current if replace else quantity
+                    events.append(self._apply(product, delta, COUNT if replace else STOCK_IN,
+                                              ref=ref, level=level, unit=unit))
+            except InventoryError:
+                for product, entry in saved.items():
+                    if entry:
+                        self.index[product] = entry
+                    else:
+                        self.index.pop(product, None)
+                del self.pending[queued:]
+                self.low = low
+                raise
+        self._notify(events)
+        self.flush()
+        return len(rows)
+
+    def import_csv(self, path, replace=False):
+        """Import a stock CSV file (see `parse_stock_csv`)."""
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            rows = parse_stock_csv(f.read())
+        return self.stock_in(rows, replace, ref=os.path.basename(path))
+
+    def get(self, product):
+        """
+        Current stock of one product from the in-memory index.
+
+        Returns:
+            dict: Stock, or None for an unknown product
+        """
+        product = _product_key(product)
+        with self.lock:
+            return self._stock(product) if product in self.index else None
+
+    def levels(self, low_only=False):
+        """All products' stock, sorted by product."""
+        with self.lock:
+            return [self._stock(product) for product in sorted(self.index)
+                    if not low_only or product in self.low]
+
+    def movements(self, product=None, limit=50):
+        """
+        Most recent persisted movements.
+
+        Returns:
+            list: Movement dicts, newest first
+        """
+        self.flush()
+        query = 'SELECT ts, product, delta_g, kind, station, ref, unit FROM movements'
+        params = []
+        if product:
+            query += ' WHERE product = ?'
+            params.append(_product_key(product))
+        query += ' ORDER BY id DESC LIMIT ?'
+        params.append(int(limit))
+        with self.db_lock:
+            rows = self.db.execute(query, params).fetchall()
+        return [dict(zip(('ts', 'product', 'delta', 'kind', 'station', 'ref', 'unit'), row))
+                for row in rows]
+
+    def flush(self):
+        """Write queued movements and the resulting stock rows in one transaction."""
+        with self.db_lock:
+            with self.lock:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            # The last queued state of each product is its current stock row
+            latest = {}
+            for ts, product, _, _, _, _, unit, on_hand, level, tracked in batch:
+                latest[product] = (product, on_hand, level, ts, unit, int(tracked))
+            try:
+                with self.db:
+                    self.db.executemany(
+                        'INSERT INTO movements (ts, product, delta_g, kind, station, ref, unit) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?)', [movement[:7] for movement in batch])
+                    self.db.executemany(
+                        'INSERT INTO stock (product, on_hand_g, reorder_level_g, updated, unit, tracked) '
+                        'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(product) DO UPDATE SET '
+                        'on_hand_g = excluded.on_hand_g, reorder_level_g = excluded.reorder_level_g, '
+                        'updated = excluded.updated, unit = excluded.unit, tracked = excluded.tracked',
+                        list(latest.values()))
+            except sqlite3.Error:
+                # Keep the batch for the next attempt, ahead of anything queued since
+                with self.lock:
+                    self.pending = batch + self.pending
+                raise
+            self.flushes += 1
+            self.flushed_movements += len(batch)
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return len(batch)
+
+    def _writer(self):
+        """Background thread: flush every `flush_interval` or when a batch fills up"""
+        while self.running:
+            self.flush_requested.wait(self.flush_interval)
+            self.flush_requested.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"✗ Inventory write failed (will retry): {e}")
+
+    def stats(self):
+        """Return ledger counters for metrics."""
+        with self.lock:
+            products, pending, low = len(self.index), len(self.pending), sorted(self.low)
+        return {
+            'products': products,
+            'low_stock': low,
+            'pending_movements': pending,
+            'flushed_movements': self.flushed_movements,
+            'flushes': self.flushes,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+            'low_stock_events': self.low_stock_events,
+        }
+
+    def close(self):
+        """Flush outstanding movements and close the database."""
+        self.running = False
+        self.flush_requested.set()
+        self.thread.join(timeout=2)
+        self.flush()
+        with self.db_lock:
+            self.db.close()
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Inventory ledger')
+    parser.add_argument('--db', default=DB_PATH, help='Ledger database')
+    sub = parser.add_subparsers(dest='command')
+    importer = sub.add_parser('import', help='Import stock from CSV')
+    importer.add_argument('csv', help='CSV with product, grams|kg|pieces[, reorder_level]')
+    importer.add_argument('--set', action='store_true', help='Replace on-hand (stocktake)')
+    listing = sub.add_parser('list', help='Show on-hand stock')
+    listing.add_argument('--low', action='store_true', help='Only products at or below reorder level')
+    history = sub.add_parser('movements', help='Show recent movements')
+    history.add_argument('--product')
+    history.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command is None:
+        parser.print_help()
+        return 1
+    ledger = InventoryLedger(args.db)
+    try:
+        if args.command == 'import':
+            count = ledger.import_csv(args.csv, replace=args.set)
+            print(f"✓ {'Set' if args.set else 'Added'} stock for {count} products")
+        elif args.command == 'list':
+            print(f"{'Product':20s} {'On hand':>12s} {'Reorder':>12s} Unit")
+            for stock in ledger.levels(low_only=args.low):
+                flag = '  LOW' if stock['low'] else '' if stock['tracked'] else '  (never stocked)'
+                print(f"{stock['product']:20s} {stock['on_hand']:>12.1f} "
+                      f"{stock['reorder_level']:>12.1f} {stock['unit']:4s}{flag}")
+        else:
+            for move in ledger.movements(args.product, args.limit):
+                print(f"{move['ts']}  {move['product']:15s} {move['delta']:>+10.1f} {move['unit']:2s} "
+                      f"{move['kind']:9s} {move['ref'] or ''}")
+    except (InventoryError, OSError) as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        ledger.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,528 @@
+"""
+Module: invoice.py
+Description: Server-side invoice rendering (PDF and text receipts) in a worker pool.
+
+Each invoice is stored as a JSON record next to its rendered files in the
+invoices directory, so any invoice can be re-rendered later (for example in an
+end-of-day batch after a template or printer change):
+
+    python -m src.invoice rerender --date 2026-02-06 --formats pdf txt
+
+Rendering runs on real OS threads even when the server has been monkey patched
+by eventlet, so a slow PDF never stalls the request handlers or the detection
+and broadcast loops.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+from src.utils import native_threading
+
+
+FORMATS = ('pdf', 'txt', 'escpos')
+DEFAULT_FORMATS = ('pdf', 'txt')
+RECEIPT_WIDTH = 42
+MAX_JOB_HISTORY = 500
+
+# ESC/POS control sequences
+ESC_INIT = b'\x1b@'
+ESC_BOLD_ON = b'\x1bE\x01'
+ESC_BOLD_OFF = b'\x1bE\x00'
+ESC_ALIGN_CENTER = b'\x1ba\x01'
+ESC_ALIGN_LEFT = b'\x1ba\x00'
+ESC_FEED_AND_CUT = b'\n\n\n\x1dV\x00'
+
+# Rendering runs on real OS threads even under eventlet
+threading, queue = native_threading()
+
+
+def _printable_symbol(symbol):
+    """Internal: Currency symbol that standard PDF/printer fonts can draw"""
+    try:
+        symbol.encode('latin-1')
+        return symbol
+    except UnicodeEncodeError:
+        return 'Rs.'
+
+
+def _quantity(item, spacer=''):
+    """Internal: Pieces for fixed-price lines, grams for weighed ones"""
+    if item.get('pricing') == 'unit':
+        return f"{item.get('quantity') or 1}{spacer}pc"
+    return f"{item['weight']:.2f}{spacer}g"
+
+
+class InvoiceRenderer:
+    """Renders invoice records to PDF, plain-text and ESC/POS receipts."""
+
+    def __init__(self, settings=None, output_dir='invoices'):
+        """
+        Initialize the renderer.
+
+        Args:
+            settings (dict): settings.json contents (store details, prefix)
+            output_dir (str): Directory invoices are written to
+        """
+        billing = (settings or {}).get('billing', {})
+        self.store_name = billing.get('store_name', 'Smart Store')
+        self.store_address = billing.get('store_address', '')
+        self.store_phone = billing.get('store_phone', '')
+        self.prefix = billing.get('invoice_prefix', 'INV')
+        self.output_dir = output_dir
+        self._sequence = 0
+        self._sequence_lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def create_invoice(self, bill):
+        """
+        Turn a computed bill into an invoice record and persist it.
+
+        Args:
+            bill (dict): Result of `BillingEngine.compute_bill`
+
+        Returns:
+            dict: Invoice record (the bill plus invoice id and store details)
+        """
+        with self._sequence_lock:
+            self._sequence += 1
+            sequence = self._sequence
+        now = datetime.now()
+        invoice = dict(bill)
+        invoice.update({
+            'invoice_id': f"{self.prefix}-{now:%Y%m%d-%H%M%S}-{sequence:04d}",
+            'date': now.isoformat(),
+            'store_name': self.store_name,
+            'store_address': self.store_address,
+            'store_phone': self.store_phone,
+        })
+        with open(self.path_for(invoice['invoice_id'], 'json'), 'w') as f:
+            json.dump(invoice, f, indent=2)
+        return invoice
+
+    def path_for(self, invoice_id, fmt):
+        """Path of an invoice file for the given format extension."""
+        return os.path.join(self.output_dir, f"{invoice_id}.{fmt}")
+
+    def render(self, invoice, formats=DEFAULT_FORMATS):
+        """
+        Render an invoice to each requested format.
+
+        A failure in one format (e.g. reportlab not installed) does not
+        prevent the others from being written.
+
+        Args:
+            invoice (dict): Invoice record
+            formats (tuple): Any of 'pdf', 'txt', 'escpos'
+
+        Returns:
+            tuple: (paths written, {format: error message})
+        """
+        written = []
+        errors = {}
+        for fmt in formats:
+            path = self.path_for(invoice['invoice_id'], fmt)
+            try:
+                if fmt == 'pdf':
+                    self.render_pdf(invoice, path)
+                elif fmt == 'txt':
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(self.render_text(invoice))
+                elif fmt == 'escpos':
+                    with open(path, 'wb') as f:
+                        f.write(self.render_escpos(invoice))
+                else:
+                    raise ValueError(f"Unknown invoice format '{fmt}'")
+            except Exception as e:
+                errors[fmt] = str(e)
+                continue
+            written.append(path)
+        return written, errors
+
+    def _receipt_lines(self, invoice, symbol, width):
+        """Internal: Body lines shared by the text and ESC/POS receipts"""
+        rule = '-' * width
+
+        def row(label, value):
+            return f"{label[:width - len(value) - 1]:<{width - len(value)}}{value}"
+
+        lines = [
+            f"Invoice: {invoice['invoice_id']}",
+            f"Date:    {invoice['date'][:19].replace('T', ' ')}",
+            rule,
+            f"{'Item':<14}{'Qty':>10}{'Rate':>8}{'Amount':>10}",
+        ]
+        for item in invoice['items']:
+            lines.append(
+                f"{item['fruit'].capitalize()[:14]:<14}{_quantity(item):>10}"
+                f"{item.get('unit_price', 0):>8.2f}{item['price']:>10.2f}"
+            )
+        lines.append(rule)
+        lines.append(row('Subtotal', f"{invoice['subtotal']:.2f}"))
+        if invoice.get('discount'):
+            lines.append(row('Discount', f"-{invoice['discount']:.2f}"))
+        for tax in invoice.get('taxes', []):
+            lines.append(row(f"Tax {tax['category']} {tax['rate'] * 100:.2f}%", f"{tax['tax']:.2f}"))
+        if invoice.get('rounding'):
+            lines.append(row('Rounding', f"{invoice['rounding']:.2f}"))
+        lines.append(row('TOTAL', f"{symbol}{invoice['total']:.2f}"))
+        lines.append(rule)
+        return lines
+
+    def _header_lines(self, invoice):
+        """Internal: Store header lines"""
+        lines = [invoice.get('store_name', self.store_name)]
+        if invoice.get('store_address'):
+            lines.append(invoice['store_address'])
+        if invoice.get('store_phone'):
+            lines.append(f"Tel: {invoice['store_phone']}")
+        return lines
+
+    def render_text(self, invoice, width=RECEIPT_WIDTH):
+        """
+        Render a fixed-width plain-text receipt.
+
+        Args:
+            invoice (dict): Invoice record
+            width (int): Receipt width in characters
+
+        Returns:
+            str: Receipt text
+        """
+        symbol = invoice.get('currency_symbol', '')
+        lines = [line.center(width).rstrip() for line in self._header_lines(invoice)]
+        lines.append('-' * width)
+        lines.extend(self._receipt_lines(invoice, symbol, width))
+        lines.append('Thank you for shopping!'.center(width).rstrip())
+        return '\n'.join(lines) + '\n'
+
+    def render_escpos(self, invoice, width=RECEIPT_WIDTH):
+        """
+        Render a receipt as raw ESC/POS bytes for a thermal printer.
+
+        Args:
+            invoice (dict): Invoice record
+            width (int): Printer width in characters
+
+        Returns:
+            bytes: Printer command stream
+        """
+        symbol = _printable_symbol(invoice.get('currency_symbol', ''))
+
+        def encode(text):
+            return (text + '\n').encode('ascii', errors='replace')
+
+        out = [ESC_INIT, ESC_ALIGN_CENTER, ESC_BOLD_ON]
+        header = self._header_lines(invoice)
+        out.append(encode(header[0]))
+        out.append(ESC_BOLD_OFF)
+        out.extend(encode(line) for line in header[1:])
+        out.append(ESC_ALIGN_LEFT)
+        out.append(encode('-' * width))
+        out.extend(encode(line) for line in self._receipt_lines(invoice, symbol, width))
+        out.append(ESC_ALIGN_CENTER)
+        out.append(encode('Thank you for shopping!'))
+        out.append(ESC_FEED_AND_CUT)
+        return b''.join(out)
+
+    def render_pdf(self, invoice, path):
+        """
+        Render an A4 PDF invoice with ReportLab.
+
+        Args:
+            invoice (dict): Invoice record
+            path (str): Output file path
+        """
+        if not REPORTLAB_AVAILABLE:
+            raise RuntimeError("PDF rendering requires reportlab (pip install reportlab)")
+
+        symbol = _printable_symbol(invoice.get('currency_symbol', ''))
+        pdf = canvas.Canvas(path, pagesize=A4)
+        page_width, page_height = A4
+        left, right = 50, page_width - 50
+        y = page_height - 60
+
+        def new_page_if_needed(y):
+            if y < 80:
+                pdf.showPage()
+                return page_height - 60
+            return y
+
+        header = self._header_lines(invoice)
+        pdf.setFont('Helvetica-Bold', 16)
+        pdf.drawString(left, y, header[0])
+        pdf.setFont('Helvetica', 10)
+        for line in header[1:]:
+            y -= 14
+            pdf.drawString(left, y, line)
+
+        y -= 30
+        pdf.setFont('Helvetica-Bold', 11)
+        pdf.drawString(left, y, f"Invoice {invoice['invoice_id']}")
+        pdf.setFont('Helvetica', 10)
+        pdf.drawRightString(right, y, invoice['date'][:19].replace('T', ' '))
+
+        columns = [(left, '#', False), (left + 30, 'Item', False), (right - 200, 'Quantity', True),
+                   (right - 100, f'Rate ({symbol})', True), (right, f'Amount ({symbol})', True)]
+        y -= 30
+        pdf.setFont('Helvetica-Bold', 10)
+        for x, title, align_right in columns:
+            (pdf.drawRightString if align_right else pdf.drawString)(x, y, title)
+        y -= 6
+        pdf.line(left, y, right, y)
+
+        pdf.setFont('Helvetica', 10)
+        for number, item in enumerate(invoice['items'], 1):
+            y = new_page_if_needed(y - 16)
+            per = 'pc' if item.get('pricing') == 'unit' else 'kg'
+            values = [str(number), item['fruit'].capitalize(), _quantity(item, ' '),
+                      f"{item.get('unit_price', 0):.2f}/{per}", f"{item['price']:.2f}"]
+            for (x, _, align_right), value in zip(columns, values):
+                (pdf.drawRightString if align_right else pdf.drawString)(x, y, value)
+
+        y = new_page_if_needed(y - 10)
+        pdf.line(left, y, right, y)
+
+        totals = [('Subtotal', invoice['subtotal'])]
+        if invoice.get('discount'):
+            totals.append(('Discount', -invoice['discount']))
+        for tax in invoice.get('taxes', []):
+            totals.append((f"Tax ({tax['category']}, {tax['rate'] * 100:.2f}%)", tax['tax']))
+        if invoice.get('rounding'):
+            totals.append(('Rounding', invoice['rounding']))
+
+        for label, value in totals:
+            y = new_page_if_needed(y - 16)
+            pdf.drawRightString(right - 100, y, label)
+            pdf.drawRightString(right, y, f"{value:.2f}")
+
+        y = new_page_if_needed(y - 20)
+        pdf.setFont('Helvetica-Bold', 12)
+        pdf.drawRightString(right - 100, y, 'Total')
+        pdf.drawRightString(right, y, f"{symbol}{invoice['total']:.2f}")
+
+        pdf.showPage()
+        pdf.save()
+
+
+class InvoiceWorkerPool:
+    """
+    Background pool that renders invoices from a job queue.
+
+    `submit` returns immediately with a job id; `status` reports progress.
+    """
+
+    def __init__(self, renderer, workers=2, on_done=None):
+        """
+        Initialize and start the worker threads.
+
+        Args:
+            renderer (InvoiceRenderer): Renderer used by every worker
+            workers (int): Number of worker threads
+            on_done (callable): Called on a worker thread with the final status
+                dict of every finished job (kept even after the job leaves the
+                bounded status history)
+        """
+        self.renderer = renderer
+        self.on_done = on_done
+        self.jobs = queue.Queue()
+        self.job_status = OrderedDict()
+        self.status_lock = threading.Lock()
+        self.job_counter = 0
+        self.running = True
+        self.threads = []
+        for i in range(max(1, workers)):
+            thread = threading.Thread(target=self._worker, name=f"InvoiceWorker-{i + 1}")
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, invoice, formats=DEFAULT_FORMATS):
+        """
+        Queue an invoice for rendering.
+
+        Args:
+            invoice (dict): Invoice record from `InvoiceRenderer.create_invoice`
+            formats (tuple): Formats to render
+
+        Returns:
+            str: Job id
+        """
+        with self.status_lock:
+            self.job_counter += 1
+            job_id = f"job-{self.job_counter}"
+            self.job_status[job_id] = {
+                'job_id': job_id,
+                'invoice_id': invoice['invoice_id'],
+                'state': 'queued',
+                'files': [],
+                'error': None,
+                'submitted': time.time(),
+            }
+            while len(self.job_status) > MAX_JOB_HISTORY:
+                self.job_status.popitem(last=False)
+        self.jobs.put((job_id, invoice, tuple(formats)))
+        return job_id
+
+    def status(self, job_id):
+        """Return a copy of a job's status dict, or None if unknown."""
+        with self.status_lock:
+            status = self.job_status.get(job_id)
+            return dict(status) if status else None
+
+    def pending(self):
+        """Number of jobs waiting in the queue."""
+        return self.jobs.qsize()
+
+    def join(self):
+        """Block until every queued job has been processed."""
+        self.jobs.join()
+
+    def stop(self):
+        """Stop the workers after the queue drains."""
+        self.running = False
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join(timeout=2)
+
+    def _update(self, job_id, **fields):
+        """Internal: Update a job's status entry; returns a copy (None if evicted)"""
+        with self.status_lock:
+            status = self.job_status.get(job_id)
+            if status is None:
+                return None
+            status.update(fields)
+            return dict(status)
+
+    def _finish(self, job_id, invoice, **fields):
+        """Internal: Record a job's final state and report it to `on_done`"""
+        status = self._update(job_id, **fields)
+        if self.on_done is None:
+            return
+        if status is None:
+            status = {'job_id': job_id, 'invoice_id': invoice['invoice_id'], 'files': [],
+                      'error': None}
+            status.update(fields)
+        self.on_done(status)
+
+    def _worker(self):
+        """Worker thread: render queued invoices until stopped"""
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                job_id, invoice, formats = job
+                self._update(job_id, state='running')
+                start = time.perf_counter()
+                try:
+                    files, errors = self.renderer.render(invoice, formats)
+                    error = '; '.join(f"{fmt}: {message}" for fmt, message in errors.items())
+                    self._finish(job_id, invoice, state='done' if files else 'failed', files=files,
+                                 error=error or None,
+                                 render_ms=round((time.perf_counter() - start) * 1000, 1))
+                except Exception as e:
+                    self._finish(job_id, invoice, state='failed', error=str(e))
+            finally:
+                self.jobs.task_done()
+
+
+def load_invoice_records(output_dir='invoices', date=None):
+    """
+    Load stored invoice records.
+
+    Args:
+        output_dir (str): Invoices directory
+        date (str): Optional YYYY-MM-DD filter on the invoice date
+
+    Returns:
+        list: Invoice records sorted by invoice id
+    """
+    records = []
+    for path in sorted(glob.glob(os.path.join(output_dir, '*.json'))):
+        try:
+            with open(path, 'r') as f:
+                record = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if 'invoice_id' not in record:
+            continue
+        if date and not record.get('date', '').startswith(date):
+            continue
+        records.append(record)
+    return records
+
+
+def rerender(output_dir='invoices', date=None, formats=DEFAULT_FORMATS, workers=None, settings=None):
+    """
+    Re-render stored invoices in bulk using the worker pool.
+
+    Args:
+        output_dir (str): Invoices directory
+        date (str): Optional YYYY-MM-DD filter
+        formats (tuple): Formats to render
+        workers (int): Worker threads (defaults to the CPU count)
+        settings (dict): settings.json contents
+
+    Returns:
+        list: Final job status dicts
+    """
+    # Results are collected as jobs finish: a large batch outgrows the pool's
+    # bounded status history, so polling `status` afterwards would miss jobs
+    finished = {}
+    renderer = InvoiceRenderer(settings, output_dir)
+    pool = InvoiceWorkerPool(renderer, workers or os.cpu_count() or 2,
+                             on_done=lambda status: finished.__setitem__(status['job_id'], status))
+    jobs = [(pool.submit(record, formats), record) for record in load_invoice_records(output_dir, date)]
+    pool.join()
+    pool.stop()
+    return [finished.get(job_id) or {'job_id': job_id, 'invoice_id': record['invoice_id'],
+                                     'state': 'failed', 'files': [],
+                                     'error': 'job status lost'}
+            for job_id, record in jobs]
+
+
+def main():
+    """Command-line entry point."""
+    from src.config import load_config
+
+    parser = argparse.ArgumentParser(description='Smart Billing System invoice tools')
+    subparsers = parser.add_subparsers(dest='command')
+    bulk = subparsers.add_parser('rerender', help='Re-render stored invoices')
+    bulk.add_argument('--dir', default='invoices', help='Invoices directory')
+    bulk.add_argument('--date', help='Only invoices from this day (YYYY-MM-DD)')
+    bulk.add_argument('--formats', nargs='+', choices=FORMATS, default=list(DEFAULT_FORMATS))
+    bulk.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command != 'rerender':
+        parser.print_help()
+        return 1
+
+    start = time.perf_counter()
+    results = rerender(args.dir, args.date, args.formats, args.workers, load_config())
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results if result['state'] != 'done']
+
+    print(f"✓ Re-rendered {len(results) - len(failed)} of {len(results)} invoices in {elapsed:.2f}s")
+    for result in results:
+        if result.get('error'):
+            print(f"✗ {result['invoice_id']}: {result['error']}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
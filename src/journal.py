@@ -0,0 +1,278 @@
+"""
+Module: journal.py
+Description: Append-only, crash-safe journal for saved readings.
+
+`readings.json` stays a JSON-lines file so existing tools keep working, but it
+is now written through a single long-lived file handle:
+
+- every record is written with one `write()` call, so a crash can at worst
+  leave one torn line at the end of the file
+- fsyncs are group-committed: one fsync covers every record written since
+  the previous one. All fsyncs run on a background OS thread, never on the
+  eventlet hub: a durable append wakes it at once and waits cooperatively
+  for its record to be covered; otherwise it syncs after `fsync_batch`
+  records or `fsync_interval` seconds
+- on startup a torn tail is cut off and kept in a `.torn` file for inspection
+- clearing the bill archives the file instead of truncating it
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+from src.utils import native_threading
+
+# The background syncer runs on a real OS thread so it never blocks the eventlet hub
+threading, _ = native_threading()
+
+
+# A durable wait polls quickly at first (an fsync takes ~0.1 ms on SSDs) and
+# backs off to DURABLE_POLL_INTERVAL
+DURABLE_POLL_START = 0.00005
+DURABLE_POLL_INTERVAL = 0.001
+
+
+class JournalError(Exception):
+    """Raised when a durable append is not on disk in time; `seq` is the written record."""
+
+    def __init__(self, message, seq=None):
+        super().__init__(message)
+        self.seq = seq
+
+
+class ReadingsJournal:
+    """JSON-lines journal with group-committed fsync and archive-on-clear."""
+
+    def __init__(self, path='readings.json', archive_dir='readings_archive',
+                 fsync_batch=8, fsync_interval=0.2, durable=True, sync_timeout=5.0):
+        """
+        Open (and if necessary recover) the journal.
+
+        Args:
+            path (str): Journal file
+            archive_dir (str): Directory cleared journals are moved to
+            fsync_batch (int): Sync after this many unsynced records
+            fsync_interval (float): Sync pending records at least this often (s)
+            durable (bool): Default for `append`: wait until the record is on disk
+            sync_timeout (float): Longest a durable append waits for its fsync (s)
+        """
+        self.path = path
+        self.archive_dir = archive_dir
+        self.fsync_batch = max(1, int(fsync_batch))
+        self.fsync_interval = float(fsync_interval)
+        self.durable = durable
+        self.sync_timeout = float(sync_timeout)
+
+        self.lock = threading.Lock()        # guards the file handle and counters
+        self.sync_lock = threading.Lock()   # held for the duration of an fsync
+        self.sync_requested = threading.Event()
+
+        self.written_seq = 0
+        self.synced_seq = 0
+        self.appends = 0
+        self.syncs = 0
+        self.bytes_written = 0
+        self.recovered_bytes = self.recover()
+
+        self.file = open(self.path, 'ab', buffering=0)
+        self.running = True
+        self.sync_thread = threading.Thread(target=self._sync_loop, name="JournalSyncThread")
+        self.sync_thread.daemon = True
+        self.sync_thread.start()
+
+    def recover(self):
+        """
+        Cut off a torn last record left by a crash.
+
+        Returns:
+            int: Number of bytes removed from the end of the file
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+
+        end = len(data)
+        while end and data[end - 1:end] == b'\x00':
+            end -= 1
+        if end and data[end - 1:end] != b'\n':
+            end = data.rfind(b'\n', 0, end) + 1
+
+        torn = len(data) - end
+        if torn:
+            with open(f"{self.path}.torn", 'ab') as f:
+                f.write(data[end:].rstrip(b'\x00') + b'\n')
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+                f.flush()
+                os.fsync(f.fileno())
+            print(f"✓ Journal recovered: dropped {torn} bytes of torn data from {self.path}")
+        return torn
+
+    def append(self, record, durable=None):
+        """
+        Append one record.
+
+        Args:
+            record (dict): JSON-serialisable record
+            durable (bool): Wait until the record is fsynced (defaults to the
+                journal's `durable` setting)
+
+        Returns:
+            int: Sequence number of the record
+
+        Raises:
+            JournalError: If a durable record was not synced within `sync_timeout`
+                (it is written, but may not survive a power cut)
+        """
+        data = (json.dumps(record) + '\n').encode('utf-8')
+        with self.lock:
+            self.file.write(data)
+            self.written_seq += 1
+            self.appends += 1
+            self.bytes_written += len(data)
+            seq = self.written_seq
+            batch_full = self.written_seq - self.synced_seq >= self.fsync_batch
+
+        if durable is None:
+            durable = self.durable
+        if durable:
+            # Group commit: the sync thread covers every record written before
+            # it wakes; concurrent savers share that one fsync
+            self.sync_requested.set()
+            if not self.wait_for(seq, self.sync_timeout):
+                raise JournalError(f"record {seq} was not synced to disk within "
+                                   f"{self.sync_timeout:g}s", seq)
+        elif batch_full:
+            self.sync_requested.set()
+        return seq
+
+    def wait_for(self, seq, timeout=5.0):
+        """
+        Wait until record `seq` has been fsynced.
+
+        Polls with `time.sleep` so the wait cooperates with eventlet; a
+        failed sync is retried by the background thread.
+
+        Returns:
+            bool: True if the record is durable
+        """
+        deadline = time.monotonic() + timeout
+        interval = DURABLE_POLL_START
+        while self.synced_seq < seq:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(interval)
+            interval = min(interval * 2, DURABLE_POLL_INTERVAL)
+        return True
+
+    def sync(self):
+        """Fsync everything written so far (blocking)."""
+        with self.sync_lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        """Internal: One group commit; caller holds sync_lock"""
+        with self.lock:
+            target = self.written_seq
+            if target == self.synced_seq or self.file.closed:
+                return
+            fd = self.file.fileno()
+        os.fsync(fd)
+        with self.lock:
+            self.synced_seq = max(self.synced_seq, target)
+            self.syncs += 1
+
+    def _sync_loop(self):
+        """Background thread: group-commit pending records"""
+        while self.running:
+            self.sync_requested.wait(self.fsync_interval)
+            self.sync_requested.clear()
+            try:
+                with self.sync_lock:
+                    self._sync_locked()
+            except (OSError, ValueError) as e:
+                print(f"✗ Journal sync error: {e}")
+
+    def read_all(self):
+        """
+        Read every complete record in the journal.
+
+        Returns:
+            list: Decoded records (undecodable lines are skipped)
+        """
+        records = []
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # record still being written
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+    def archive(self):
+        """
+        Move the current journal into the archive and start an empty one.
+
+        Returns:
+            str: Path of the archived file, or None if the journal was empty
+        """
+        with self.sync_lock:
+            self._sync_locked()
+            with self.lock:
+                if self.file.tell() == 0:
+                    return None
+                self.file.close()
+                os.makedirs(self.archive_dir, exist_ok=True)
+                stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+                base = os.path.splitext(os.path.basename(self.path))[0]
+                archived = os.path.join(self.archive_dir, f"{base}-{stamp}.json")
+                os.replace(self.path, archived)
+                self.file = open(self.path, 'ab', buffering=0)
+        _fsync_directory(os.path.dirname(os.path.abspath(self.path)))
+        return archived
+
+    def stats(self):
+        """Return journal counters for metrics."""
+        with self.lock:
+            return {
+                'appends': self.appends,
+                'syncs': self.syncs,
+                'records_per_sync': round(self.synced_seq / self.syncs, 2) if self.syncs else 0,
+                'unsynced': self.written_seq - self.synced_seq,
+                'bytes_written': self.bytes_written,
+                'recovered_bytes': self.recovered_bytes,
+            }
+
+    def close(self):
+        """Sync and close the journal."""
+        self.running = False
+        self.sync_requested.set()
+        self.sync_thread.join(timeout=2)
+        self.sync()
+        with self.lock:
+            self.file.close()
+
+
+def _fsync_directory(path):
+    """Internal: Persist a rename by syncing the directory (POSIX only)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
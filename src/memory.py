@@ -0,0 +1,311 @@
+"""
+Module: memory.py
+Description: Process memory sampling, allocation snapshots and leak detection.
+
+`MemoryMonitor` keeps a history of RSS and thread counts sampled every
+`interval` seconds. `detect_growth()` separates a leak from a warm-up step
+(caches filling, the model loading): a series only counts as growing if it
+keeps rising across the whole window, not just in one jump, and its slope
+exceeds a limit.
+
+With `tracemalloc_frames` > 0 Python allocations are traced, and `report()`
+lists the top allocation sites plus the change since a baseline snapshot.
+The server serves this on `GET /admin/memory`, and the soak test
+(`benchmarks/soak_test.py`) reads the same endpoint. Tracing costs CPU and
+memory, so it is off unless configured.
+"""
+
+import gc
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+from src.utils import native_threading
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+try:
+    import greenlet
+    GREENLET_AVAILABLE = True
+except ImportError:
+    GREENLET_AVAILABLE = False
+
+
+MB = 1024.0 * 1024.0
+
+# Allocation sites that belong to the measurement itself
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>',
+                 '<frozen importlib._bootstrap_external>', '<unknown>')
+
+
+def rss_bytes():
+    """Resident set size of this process in bytes (None if unknown)."""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def os_thread_count():
+    """Number of OS threads in this process (None if unknown)."""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().num_threads()
+    try:
+        return len(os.listdir('/proc/self/task'))
+    except OSError:
+        return None
+
+
+def greenlet_count():
+    """Number of live greenlets; walks the GC heap, so only call it on demand."""
+    if not GREENLET_AVAILABLE:
+        return None
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, greenlet.greenlet))
+
+
+def _slope(points):
+    """Internal: Least-squares slope of (x, y) points"""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var_x:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+def _median(values):
+    """Internal: Median of a non-empty list"""
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+def detect_growth(samples, key='rss', limit_per_hour=5.0, unit=MB, warmup=0.0, min_samples=9):
+    """
+    Decide whether a sampled series shows sustained growth.
+
+    The samples after the warm-up are split into thirds. The series is growing
+    if the median rises from each third to the next and the least-squares slope
+    is above the limit.
+
+    Args:
+        samples (list): Dicts with 'time' and `key`
+        key (str): Field to test ('rss', 'threads', 'traced', ...)
+        limit_per_hour (float): Largest acceptable slope, in `unit` per hour
+        unit (float): Divisor for reporting (MB for byte series, 1 for counts)
+        warmup (float): Seconds at the start of the series to ignore
+        min_samples (int): Fewer samples than this are never reported as growing
+
+    Returns:
+        dict: growing, slope_per_hour, increase (last minus first third median)
+            and samples used
+    """
+    points = [(sample['time'], sample[key]) for sample in samples if sample.get(key) is not None]
+    if points:
+        start = points[0][0] + warmup
+        points = [point for point in points if point[0] >= start]
+    result = {'growing': False, 'slope_per_hour': None, 'increase': None, 'samples': len(points)}
+    if len(points) < max(3, min_samples):
+        return result
+
+    slope = _slope(points) * 3600.0 / unit
+    third = len(points) // 3
+    medians = [_median([y for _, y in part])
+               for part in (points[:third], points[third:-third], points[-third:])]
+    rising = medians[0] < medians[1] < medians[2]
+    result.update(growing=rising and slope > limit_per_hour,
+                  slope_per_hour=round(slope, 3),
+                  increase=round((medians[2] - medians[0]) / unit, 3))
+    return result
+
+
+class MemoryMonitor:
+    """Periodic memory samples plus on-demand allocation snapshots."""
+
+    def __init__(self, interval=60.0, history=1440, tracemalloc_frames=0,
+                 growth_limit_mb=5.0, warmup=600.0):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval (float): Seconds between samples taken by tick()
+            history (int): Samples kept (1440 at 60 s = one day)
+            tracemalloc_frames (int): Traceback depth to trace allocations with (0 = off)
+            growth_limit_mb (float): RSS slope in MB per hour reported as growth
+            warmup (float): Seconds after startup ignored by growth detection
+        """
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+        self.growth_limit_mb = growth_limit_mb
+        self.warmup = warmup
+        self.lock = threading.Lock()
+        self.last_sample = 0.0
+        self.baseline = None
+        self.baseline_time = None
+        self.tracemalloc_frames = 0
+        self.set_tracemalloc(tracemalloc_frames)
+
+    def set_tracemalloc(self, frames):
+        """
+        Start, restart or stop allocation tracing.
+
+        Args:
+            frames (int): Traceback depth (0 stops tracing)
+        """
+        frames = max(0, int(frames))
+        if frames == self.tracemalloc_frames and tracemalloc.is_tracing() == bool(frames):
+            return
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.baseline = None
+        self.tracemalloc_frames = frames
+        if frames:
+            tracemalloc.start(frames)
+            self.reset_baseline()
+
+    def resize(self, history):
+        """Change the number of samples kept, keeping the newest."""
+        if history != self.samples.maxlen:
+            with self.lock:
+                self.samples = deque(self.samples, maxlen=history)
+
+    def sample(self, greenlets=False):
+        """
+        Take one sample and add it to the history.
+
+        Args:
+            greenlets (bool): Also count greenlets (walks the whole heap)
+
+        Returns:
+            dict: time, rss, threads, python_threads, traced, traced_peak[, greenlets]
+        """
+        traced, traced_peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+        sample = {
+            'time': time.time(),
+            'rss': rss_bytes(),
+            'threads': os_thread_count(),
+            'python_threads': native_threading()[0].active_count(),
+            'traced': traced,
+            'traced_peak': traced_peak,
+        }
+        if greenlets:
+            sample['greenlets'] = greenlet_count()
+        with self.lock:
+            self.samples.append(sample)
+            self.last_sample = sample['time']
+        return sample
+
+    def tick(self, now=None):
+        """Take a sample if `interval` has passed since the last one."""
+        now = time.time() if now is None else now
+        if now - self.last_sample >= self.interval:
+            self.sample()
+
+    def history(self):
+        """Copy of the sample history."""
+        with self.lock:
+            return list(self.samples)
+
+    def growth(self):
+        """Growth verdicts for RSS, OS threads and (when traced) Python allocations."""
+        samples = self.history()
+        verdicts = {
+            'rss': detect_growth(samples, 'rss', self.growth_limit_mb, MB, self.warmup),
+            'threads': detect_growth(samples, 'threads', 1.0, 1, self.warmup),
+        }
+        if self.tracemalloc_frames:
+            verdicts['traced'] = detect_growth(samples, 'traced', self.growth_limit_mb, MB, self.warmup)
+        return verdicts
+
+    def _snapshot(self):
+        """Internal: tracemalloc snapshot without the monitor's own allocations"""
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces([tracemalloc.Filter(False, name) for name in IGNORED_FILES])
+
+    def reset_baseline(self):
+        """Use the current allocations as the reference for diff()."""
+        if tracemalloc.is_tracing():
+            self.baseline = self._snapshot()
+            self.baseline_time = time.time()
+
+    def top(self, limit=20, key='lineno'):
+        """
+        Largest allocation sites right now.
+
+        Args:
+            limit (int): Number of sites
+            key (str): 'lineno', 'filename' or 'traceback'
+
+        Returns:
+            list: Dicts with location, size_kb and count (empty when not tracing)
+        """
+        if not tracemalloc.is_tracing():
+            return []
+        return [_stat_to_dict(stat) for stat in self._snapshot().statistics(key)[:limit]]
+
+    def diff(self, limit=20, key='lineno'):
+        """
+        Allocation sites that grew the most since the baseline.
+
+        Returns:
+            list: Dicts with location, size_kb, size_diff_kb, count and count_diff
+        """
+        if not tracemalloc.is_tracing() or self.baseline is None:
+            return []
+        stats = self._snapshot().compare_to(self.baseline, key)
+        return [_stat_to_dict(stat) for stat in stats[:limit]]
+
+    def report(self, limit=20, key='lineno'):
+        """
+        Everything `GET /admin/memory` returns: a fresh sample (with
+        greenlets), growth verdicts, and allocation top/diff when tracing.
+        """
+        sample = self.sample(greenlets=True)
+        return {
+            'sample': sample,
+            'growth': self.growth(),
+            'samples': len(self.samples),
+            'tracemalloc': {
+                'frames': self.tracemalloc_frames,
+                'baseline_time': self.baseline_time,
+                'top': self.top(limit, key),
+                'diff': self.diff(limit, key),
+            },
+        }
+
+    def stats(self):
+        """Return the latest sample and growth flags for metrics."""
+        with self.lock:
+            latest = dict(self.samples[-1]) if self.samples else None
+        return {
+            'latest': latest,
+            'samples': len(self.samples),
+            'tracemalloc_frames': self.tracemalloc_frames,
+            'growing': sorted(name for name, verdict in self.growth().items() if verdict['growing']),
+        }
+
+
+def _stat_to_dict(stat):
+    """Internal: tracemalloc Statistic/StatisticDiff as JSON-friendly dict"""
+    frame = stat.traceback[0]
+    entry = {
+        'location': f"{frame.filename}:{frame.lineno}",
+        'size_kb': round(stat.size / 1024.0, 1),
+        'count': stat.count,
+    }
+    if len(stat.traceback) > 1:
+        entry['traceback'] = [f"{f.filename}:{f.lineno}" for f in stat.traceback]
+    if hasattr(stat, 'size_diff'):
+        entry['size_diff_kb'] = round(stat.size_diff / 1024.0, 1)
+        entry['count_diff'] = stat.count_diff
+    return entry
@@ -0,0 +1,232 @@
+"""
+Module: model_registry.py
+Description: Versioned registry of detection models in `models/`.
+
+`models/registry.json` records every trained model the server can load:
+
+    {
+      "active": "produce-v2",
+      "models": {
+        "produce-v2": {
+          "file": "produce-v2.onnx",
+          "classes": ["apple", "banana", ...],
+          "imgsz": 416,
+          "base": "yolov8n.pt",
+          "sha256": "...",
+          "metrics": {"map50": 0.91, ...},
+          "created_at": "2026-03-02T10:15:00"
+        }
+      }
+    }
+
+Models trained on the catalog's own classes report product names directly,
+so the server maps them one-to-one instead of through `fruit_mapping`.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+
+MODELS_DIR = 'models'
+REGISTRY_FILE = 'registry.json'
+
+
+class RegistryError(Exception):
+    """Raised for unknown versions or invalid registry operations."""
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Reads and updates `models/registry.json`."""
+
+    def __init__(self, models_dir=MODELS_DIR):
+        """
+        Initialize the registry.
+
+        Args:
+            models_dir (str): Directory holding the model files and registry.json
+        """
+        self.models_dir = models_dir
+        self.path = os.path.join(models_dir, REGISTRY_FILE)
+
+    def load(self):
+        """
+        Read the registry.
+
+        Returns:
+            dict: {'active': version or None, 'models': {version: entry}}
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {'active': None, 'models': {}}
+        data.setdefault('active', None)
+        data.setdefault('models', {})
+        return data
+
+    def _save(self, data):
+        """Internal: Atomically replace registry.json"""
+        os.makedirs(self.models_dir, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def versions(self):
+        """Return the registered versions, oldest first."""
+        models = self.load()['models']
+        return sorted(models, key=lambda v: models[v].get('created_at', ''))
+
+    def next_version(self, prefix='produce'):
+        """Return the next free `<prefix>-vN` version name."""
+        numbers = [int(v.rsplit('-v', 1)[1]) for v in self.load()['models']
+                   if v.startswith(f"{prefix}-v") and v.rsplit('-v', 1)[1].isdigit()]
+        return f"{prefix}-v{max(numbers, default=0) + 1}"
+
+    def register(self, version, model_file, classes, imgsz=640, base=None, metrics=None,
+                 activate=False):
+        """
+        Copy a model file into the registry and record it.
+
+        Args:
+            version (str): Version name (must be new)
+            model_file (str): Trained/exported model (.pt, .onnx, ...)
+            classes (list): Class names in class-id order
+            imgsz (int): Input size the model was trained for
+            base (str): Model it was fine-tuned from
+            metrics (dict): Validation metrics
+            activate (bool): Make it the active model
+
+        Returns:
+            dict: The new registry entry
+        """
+        data = self.load()
+        if version in data['models']:
+            raise RegistryError(f"Model version '{version}' already exists")
+
+        os.makedirs(self.models_dir, exist_ok=True)
+        if os.path.isdir(model_file):
+            # Exported model folders (e.g. best_openvino_model) keep their format suffix
+            suffix = os.path.basename(os.path.normpath(model_file)).split('_', 1)[-1]
+            target = f"{version}_{suffix}"
+            shutil.copytree(model_file, os.path.join(self.models_dir, target))
+            checksum = None
+        else:
+            target = version + os.path.splitext(model_file)[1]
+            shutil.copy2(model_file, os.path.join(self.models_dir, target))
+            checksum = file_sha256(os.path.join(self.models_dir, target))
+
+        entry = {
+            'file': target,
+            'classes': list(classes),
+            'imgsz': int(imgsz),
+            'base': base,
+            'sha256': checksum,
+            'metrics': metrics or {},
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        data['models'][version] = entry
+        if activate or data['active'] is None:
+            data['active'] = version
+        self._save(data)
+        return entry
+
+    def activate(self, version):
+        """Make a registered version the one the server loads by default."""
+        data = self.load()
+        if version not in data['models']:
+            raise RegistryError(f"Unknown model version '{version}'")
+        data['active'] = version
+        self._save(data)
+
+    def resolve(self, version=None):
+        """
+        Find the model file for a version.
+
+        Args:
+            version (str): Version name; None means the active version
+
+        Returns:
+            tuple: (version, model path, entry), or (None, None, None) if the
+            registry has no such (or no active) model
+        """
+        data = self.load()
+        version = version or data['active']
+        if version is None:
+            return None, None, None
+        entry = data['models'].get(version)
+        if entry is None:
+            raise RegistryError(f"Unknown model version '{version}'")
+        return version, os.path.join(self.models_dir, entry['file']), entry
+
+    def verify(self, version):
+        """
+        Check a registered file against its recorded checksum.
+
+        Returns:
+            bool: True if the file is intact (or has no checksum)
+        """
+        _, path, entry = self.resolve(version)
+        if entry is None:
+            raise RegistryError("No active model")
+        if not entry.get('sha256'):
+            return os.path.exists(path)
+        return os.path.exists(path) and file_sha256(path) == entry['sha256']
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Smart Billing System model registry')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('list', help='List registered models')
+    activate = subparsers.add_parser('activate', help='Set the active model version')
+    activate.add_argument('version')
+    verify = subparsers.add_parser('verify', help='Check a model file checksum')
+    verify.add_argument('version', nargs='?')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.models_dir)
+    try:
+        if args.command == 'list':
+            data = registry.load()
+            for version in registry.versions():
+                entry = data['models'][version]
+                marker = '*' if version == data['active'] else ' '
+                metrics = ', '.join(f"{k}={v}" for k, v in entry.get('metrics', {}).items())
+                print(f"{marker} {version:<16} {entry['file']:<22} imgsz={entry['imgsz']:<4} "
+                      f"{len(entry['classes'])} classes  {metrics}")
+            return 0
+        if args.command == 'activate':
+            registry.activate(args.version)
+            print(f"✓ Active model: {args.version}")
+            return 0
+        if args.command == 'verify':
+            ok = registry.verify(args.version)
+            print("✓ Checksum OK" if ok else "✗ Model file missing or modified")
+            return 0 if ok else 1
+    except RegistryError as e:
+        print(f"✗ {e}")
+        return 1
+    parser.print_help()
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Module: power.py
+Description: Idle power-save state machine for the pipeline threads.
+
+A station with no dashboard connected and nothing on the scale has nothing to
+show, yet it would keep capturing at the camera rate, running the detector and
+encoding previews. `PowerManager` tracks two activity signals:
+
+    viewers  - connected Socket.IO clients (connect/disconnect handlers)
+    weight   - every scale reading (weight thread)
+
+After `idle_after` seconds with no viewer and the scale at zero it switches to
+IDLE. The pipeline threads then park in `wait()`, and the camera drops to a
+watchdog read every `watchdog_interval` seconds that keeps stall detection
+working. A viewer connecting or the weight moving by `weight_threshold`
+switches back to ACTIVE and sets the wake event, so parked threads resume
+straight away rather than at the end of a sleep.
+"""
+
+import threading
+import time
+
+
+ACTIVE = 'active'
+IDLE = 'idle'
+
+
+class PowerManager:
+    """Switches the station between ACTIVE and IDLE from viewer and scale activity."""
+
+    def __init__(self, idle_after=30.0, weight_threshold=5.0, watchdog_interval=2.0,
+                 enabled=True, on_change=None):
+        """
+        Initialize the state machine (starts ACTIVE).
+
+        Args:
+            idle_after (float): Seconds without viewers or weight before going idle
+            weight_threshold (float): Grams on the scale (or grams of change while
+                idle) that count as activity
+            watchdog_interval (float): Seconds between camera reads while idle
+            enabled (bool): Never go idle when False
+            on_change (callable): Called with the new state on every transition
+        """
+        self.idle_after = idle_after
+        self.weight_threshold = weight_threshold
+        self.watchdog_interval = watchdog_interval
+        self.enabled = enabled
+        self.on_change = on_change
+
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.wake_event.set()
+        self.state = ACTIVE
+        self.clients = 0
+        self.last_activity = time.monotonic()
+        self.idle_weight = 0.0
+        self.state_since = time.monotonic()
+        self.idle_seconds = 0.0
+        self.transitions = 0
+        self.last_wake_reason = None
+
+    @property
+    def is_idle(self):
+        """Whether the pipeline should stay parked."""
+        return self.state == IDLE
+
+    def client_connected(self):
+        """A dashboard connected; wakes the station."""
+        with self.lock:
+            self.clients += 1
+        self.activity('viewer')
+
+    def client_disconnected(self):
+        """A dashboard disconnected; the idle countdown starts with the last one."""
+        with self.lock:
+            self.clients = max(0, self.clients - 1)
+            self.last_activity = time.monotonic()
+
+    def weight(self, grams, now=None):
+        """
+        Feed a scale reading and re-evaluate the state.
+
+        Args:
+            grams (float): Calibrated weight
+            now (float): time.monotonic() reading (defaults to now)
+        """
+        now = time.monotonic() if now is None else now
+        if self.is_idle:
+            # Anything placed on (or taken off) the tray wakes the station
+            if abs(grams - self.idle_weight) >= self.weight_threshold:
+                self.activity('weight', now)
+                return
+        elif abs(grams) >= self.weight_threshold:
+            self.last_activity = now
+        self.update(now, grams)
+
+    def activity(self, reason, now=None):
+        """
+        Record activity and leave IDLE if needed.
+
+        Args:
+            reason (str): Why the station woke ('viewer', 'weight', 'request', ...)
+            now (float): time.monotonic() reading (defaults to now)
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self.last_activity = now
+            if self.state != IDLE:
+                return
+            self.last_wake_reason = reason
+            self._enter(ACTIVE, now)
+        self.wake_event.set()
+        self._notify(ACTIVE)
+
+    def update(self, now=None, grams=0.0):
+        """
+        Go IDLE once nothing has happened for `idle_after` seconds.
+
+        Args:
+            now (float): time.monotonic() reading (defaults to now)
+            grams (float): Current weight, remembered as the idle reference
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if (self.state != ACTIVE or not self.enabled or self.clients
+                    or now - self.last_activity < self.idle_after):
+                return
+            self.idle_weight = grams
+            self.wake_event.clear()
+            self._enter(IDLE, now)
+        self._notify(IDLE)
+
+    def set_enabled(self, enabled):
+        """Turn power saving on or off (turning it off wakes the station)."""
+        self.enabled = enabled
+        if not enabled:
+            self.activity('disabled')
+
+    def wait(self, timeout):
+        """
+        Park the calling thread while IDLE.
+
+        Args:
+            timeout (float): Longest wait in seconds
+
+        Returns:
+            bool: True if the station is ACTIVE again
+        """
+        return self.wake_event.wait(timeout)
+
+    def _enter(self, state, now):
+        """Internal: Switch state (lock held)"""
+        if self.state == IDLE:
+            self.idle_seconds += now - self.state_since
+        self.state = state
+        self.state_since = now
+        self.transitions += 1
+
+    def _notify(self, state):
+        """Internal: Report a transition to the owner"""
+        if self.on_change is not None:
+            self.on_change(state)
+
+    def stats(self):
+        """Return state and counters for metrics."""
+        now = time.monotonic()
+        with self.lock:
+            idle_seconds = self.idle_seconds + (now - self.state_since if self.state == IDLE else 0.0)
+            return {
+                'state': self.state,
+                'enabled': self.enabled,
+                'clients': self.clients,
+                'since': round(now - self.state_since, 1),
+                'idle_seconds': round(idle_seconds, 1),
+                'transitions': self.transitions,
+                'last_wake_reason': self.last_wake_reason,
+            }
@@ -0,0 +1,259 @@
+"""
+Module: preview.py
+Description: Background encoder for the live camera preview.
+
+The broadcast loop used to draw, encode and base64 the full-resolution frame
+inline on every tick. `PreviewEncoder` moves that work to its own OS thread:
+the caller hands over the latest frame plus the overlay data and carries on,
+the worker downscales to the preview width (independent of the inference
+size), draws the boxes found by the detection thread and encodes with the
+configured backend. Only the most recent frame is kept, so a slow encoder
+drops frames instead of building a backlog.
+
+Backends:
+    opencv     JPEG via cv2.imencode (always available)
+    turbojpeg  JPEG via libjpeg-turbo (optional, `pip install PyTurboJPEG`)
+    webp       WebP via cv2.imencode (smaller frames, more CPU)
+"""
+
+import base64
+import time
+from collections import deque
+
+import cv2
+
+from src.utils import native_threading
+
+# Encoding blocks in C code, so it belongs on a real OS thread
+threading, _ = native_threading()
+
+try:
+    from turbojpeg import TurboJPEG
+    TURBOJPEG_AVAILABLE = True
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
+
+MIME_TYPES = {
+    'opencv': 'image/jpeg',
+    'turbojpeg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+
+def confidence_color(confidence):
+    """
+    Box colour (BGR) for a detection confidence.
+
+    Args:
+        confidence (float): Detection confidence (0-1)
+
+    Returns:
+        tuple: BGR colour
+    """
+    if confidence > 0.7:
+        return (0, 255, 0)
+    if confidence > 0.5:
+        return (0, 255, 255)
+    return (0, 165, 255)
+
+
+def draw_overlays(frame, detections, weight, scale=1.0):
+    """
+    Draw detection boxes and the status text onto a frame (in place).
+
+    Args:
+        frame (numpy.ndarray): BGR frame to draw on
+        detections (list): (product, confidence, (x1, y1, x2, y2)) tuples in
+            source-frame coordinates
+        weight (float): Current weight in grams
+        scale (float): Factor from source-frame to `frame` coordinates
+
+    Returns:
+        numpy.ndarray: The same frame
+    """
+    font_scale = max(0.4, 0.8 * scale)
+    thickness = max(1, int(round(2 * scale)))
+
+    for product, confidence, box in detections:
+        x1, y1, x2, y2 = [int(v * scale) for v in box]
+        color = confidence_color(confidence)
+
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness + 1)
+
+        label = f"{product.upper()} {confidence:.2f}"
+        label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+        cv2.rectangle(frame, (x1, y1 - label_size[1] - 10),
+                      (x1 + label_size[0], y1), color, -1)
+        cv2.putText(frame, label, (x1, y1 - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 0, 0), thickness)
+
+    status_scale = max(0.4, 0.7 * scale)
+    cv2.putText(frame, "AI Detection Active", (10, int(30 * scale)),
+                cv2.FONT_HERSHEY_SIMPLEX, status_scale, (0, 255, 0), thickness)
+    cv2.putText(frame, f"Weight: {weight:.2f}g", (10, int(60 * scale)),
+                cv2.FONT_HERSHEY_SIMPLEX, status_scale, (255, 255, 0), thickness)
+    return frame
+
+
+class PreviewEncoder:
+    """Latest-frame-wins preview encoder running on its own thread."""
+
+    def __init__(self, width=480, backend='auto', fmt='jpeg', window=50, tracer=None):
+        """
+        Initialize the encoder and start its worker thread.
+
+        Args:
+            width (int): Preview width in pixels (0 keeps the camera width)
+            backend (str): 'auto', 'opencv' or 'turbojpeg' (JPEG only)
+            fmt (str): 'jpeg' or 'webp'
+            window (int): Number of frames the statistics are computed over
+            tracer (Tracer): Records a `preview.encode` span per frame (optional)
+        """
+        self.width = int(width or 0)
+        self.tracer = tracer
+        self.backend = self._select_backend(backend, fmt)
+        self.mime_type = MIME_TYPES[self.backend]
+        self.turbo = TurboJPEG() if self.backend == 'turbojpeg' else None
+
+        self.condition = threading.Condition()
+        self.job = None
+        self.latest = (0, "")
+        self.submitted = 0
+        self.encoded = 0
+        self.dropped = 0
+        self.errors = 0
+        self.encode_times = deque(maxlen=window)
+        self.sizes = deque(maxlen=window)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._worker, name="PreviewEncoderThread")
+        self.thread.daemon = True
+        self.thread.start()
+
+    @staticmethod
+    def _select_backend(backend, fmt):
+        """Internal: Resolve the requested backend, falling back to OpenCV"""
+        if fmt == 'webp':
+            return 'webp'
+        if fmt != 'jpeg':
+            raise ValueError(f"Unsupported preview format '{fmt}'")
+        if backend in ('auto', 'turbojpeg') and TURBOJPEG_AVAILABLE:
+            try:
+                TurboJPEG()
+                return 'turbojpeg'
+            except (OSError, RuntimeError) as e:
+                # PyTurboJPEG installed but the libjpeg-turbo library is missing
+                if backend == 'turbojpeg':
+                    print(f"✗ libjpeg-turbo unavailable ({e}); using OpenCV JPEG encoder")
+        elif backend == 'turbojpeg':
+            print("✗ PyTurboJPEG not installed; using OpenCV JPEG encoder")
+        return 'opencv'
+
+    def submit(self, frame, detections=(), weight=0.0, quality=80, seq=None):
+        """
+        Queue a frame for encoding, replacing any frame not yet picked up.
+
+        The frame is only read, never modified, so the camera buffer can be
+        passed without copying.
+
+        Args:
+            frame (numpy.ndarray): BGR camera frame
+            detections (list): Boxes to draw, see `draw_overlays`
+            weight (float): Current weight in grams
+            quality (int): Encoder quality (1-100)
+            seq (int): Camera frame sequence number, for tracing
+        """
+        with self.condition:
+            if self.job is not None:
+                self.dropped += 1
+            self.job = (frame, list(detections), weight, int(quality), seq)
+            self.submitted += 1
+            self.condition.notify()
+
+    def get_latest(self):
+        """
+        Return the most recent encoded preview.
+
+        Returns:
+            tuple: (sequence number, base64 string); sequence 0 means none yet
+        """
+        return self.latest
+
+    def encode(self, frame, detections=(), weight=0.0, quality=80):
+        """
+        Downscale, annotate and encode one frame (synchronously).
+
+        Returns:
+            bytes: Encoded image
+        """
+        height, width = frame.shape[:2]
+        scale = 1.0
+        if self.width and width > self.width:
+            scale = self.width / width
+            frame = cv2.resize(frame, (self.width, int(round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()
+        draw_overlays(frame, detections, weight, scale)
+
+        if self.backend == 'turbojpeg':
+            return self.turbo.encode(frame, quality=quality)
+        if self.backend == 'webp':
+            ok, buffer = cv2.imencode('.webp', frame, [cv2.IMWRITE_WEBP_QUALITY, quality])
+        else:
+            ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise RuntimeError(f"{self.backend} encoder failed")
+        return buffer.tobytes()
+
+    def _worker(self):
+        """Background thread: encode the newest submitted frame"""
+        while True:
+            with self.condition:
+                while self.job is None and self.running:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                job, self.job = self.job, None
+
+            *args, seq = job
+            started = time.perf_counter()
+            try:
+                data = self.encode(*args)
+            except Exception as e:
+                self.errors += 1
+                print(f"✗ Preview encode error: {e}")
+                continue
+            finished = time.perf_counter()
+            if self.tracer is not None and self.tracer.sampled(seq):
+                self.tracer.record('preview.encode', started, finished, seq, 'preview',
+                                   {'bytes': len(data), 'backend': self.backend})
+            self.encode_times.append(finished - started)
+            self.sizes.append(len(data))
+            self.encoded += 1
+            self.latest = (self.encoded, base64.b64encode(data).decode('ascii'))
+
+    def stats(self):
+        """Return encoder counters for metrics."""
+        times = sorted(self.encode_times)
+        sizes = list(self.sizes)
+        return {
+            'backend': self.backend,
+            'mime_type': self.mime_type,
+            'width': self.width,
+            'submitted': self.submitted,
+            'encoded': self.encoded,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'encode_ms_p50': round(times[len(times) // 2] * 1000, 2) if times else 0.0,
+            'encode_ms_max': round(times[-1] * 1000, 2) if times else 0.0,
+            'bytes_per_frame': int(sum(sizes) / len(sizes)) if sizes else 0,
+        }
+
+    def stop(self):
+        """Stop the worker thread."""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join(timeout=2)
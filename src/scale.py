@@ -0,0 +1,525 @@
+"""
+Module: scale.py
+Description: Self-healing serial connection to the HX711 weighing scale.
+
+The Arduino sketch prints `HX711 Scale Ready` on reset and then streams
+`Weight: X.X g` lines. `ScaleConnection` finds the scale by probing serial
+ports for that banner (or for weight lines, if the board did not reset),
+and when the port disappears or goes silent it reconnects with exponential
+backoff. Reconnect attempts only happen when `read_weight()` is called and
+the backoff has elapsed, so they never stall the camera or web threads.
+
+Commands such as tare are queued with `send_command()` and written by the
+thread that reads the port, which also matches the sketch's acknowledgement
+lines (e.g. `Tared!`) and fails commands that are not acknowledged in time.
+Callers get a `ScaleCommand` they can wait on, or ignore.
+
+`AutoZero` tracks slow zero drift on the host: while the tray is empty and the
+readings are stable it moves the zero point towards them at a limited rate.
+
+State, reconnect counts, command counters and the last error are reported by
+`stats()`.
+"""
+
+import itertools
+import re
+import threading
+import time
+from collections import deque
+
+import serial
+
+try:
+    from serial.tools import list_ports
+    LIST_PORTS_AVAILABLE = True
+except ImportError:
+    LIST_PORTS_AVAILABLE = False
+
+
+BANNER = 'HX711 Scale Ready'
+WEIGHT_PATTERN = re.compile(r"Weight:\s*([-+]?\d*\.?\d+)")
+
+# USB-serial chips used on Arduino boards, tried before other ports
+ARDUINO_HINTS = ('arduino', 'ch340', 'ch341', 'cp210', 'ft232', 'usb serial', 'usb-serial',
+                 'wch', '2341:', '1a86:', '10c4:', '0403:')
+
+# Command name -> (bytes sent, acknowledgement line) understood by arduino_code.ino
+COMMANDS = {
+    'tare': (b't', 'Tared!'),
+}
+
+DISCONNECTED = 'disconnected'
+CONNECTING = 'connecting'
+CONNECTED = 'connected'
+
+
+def parse_weight(line):
+    """
+    Extract the weight from one line of scale output.
+
+    Args:
+        line (str): e.g. "Weight: 153.2 g"
+
+    Returns:
+        float: Weight in grams, or None if the line holds no reading
+    """
+    match = WEIGHT_PATTERN.search(line)
+    if not match:
+        return None
+    try:
+        return float(match.group(1))
+    except ValueError:
+        return None
+
+
+def candidate_ports(preferred=None):
+    """
+    Serial ports to probe, most likely first.
+
+    Args:
+        preferred (str): Port to try first (e.g. the last one that worked)
+
+    Returns:
+        list: Port device names
+    """
+    ports = []
+    if LIST_PORTS_AVAILABLE:
+        found = list(list_ports.comports())
+        likely = [p.device for p in found
+                  if any(hint in f"{p.description} {p.hwid}".lower() for hint in ARDUINO_HINTS)]
+        ports = likely + [p.device for p in found if p.device not in likely]
+    if preferred:
+        ports = [preferred] + [port for port in ports if port != preferred]
+    return ports
+
+
+class ScaleCommand:
+    """A command sent to the sketch and the state of its acknowledgement."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name, payload, ack, timeout):
+        """
+        Args:
+            name (str): Command name, e.g. 'tare'
+            payload (bytes): Bytes written to the port
+            ack (str): Line that confirms the command (None = no acknowledgement)
+            timeout (float): Seconds to wait for the acknowledgement after sending
+        """
+        self.id = next(self._ids)
+        self.name = name
+        self.payload = payload
+        self.ack = ack
+        self.timeout = timeout
+        self.created = time.monotonic()
+        self.sent = None
+        self.deadline = None
+        self.ok = None
+        self.error = None
+        self.reply = None
+        self.callbacks = []
+        self.event = threading.Event()
+
+    @property
+    def done(self):
+        """Whether the command succeeded or failed."""
+        return self.ok is not None
+
+    def wait(self, timeout=None):
+        """
+        Block until the command completes.
+
+        Returns:
+            bool: True if it was acknowledged
+        """
+        self.event.wait(timeout)
+        return bool(self.ok)
+
+    def add_callback(self, callback):
+        """Call `callback(command)` on completion (immediately if already done)."""
+        if self.done:
+            callback(self)
+        else:
+            self.callbacks.append(callback)
+
+    def _finish(self, ok, error=None, reply=None):
+        """Internal: Record the outcome and notify waiters"""
+        if self.done:
+            return
+        self.ok, self.error, self.reply = ok, error, reply
+        self.event.set()
+        for callback in self.callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"✗ Scale command callback error: {e}")
+
+    def to_dict(self):
+        """JSON-friendly state."""
+        return {
+            'id': self.id,
+            'command': self.name,
+            'state': 'pending' if not self.done else ('done' if self.ok else 'failed'),
+            'error': self.error,
+            'reply': self.reply,
+            'elapsed': round(time.monotonic() - self.created, 2),
+        }
+
+
+class AutoZero:
+    """Host-side automatic zero tracking for an empty, stable tray."""
+
+    def __init__(self, band=2.0, window=1.5, tolerance=0.3, rate=0.5, enabled=True):
+        """
+        Initialize the tracker.
+
+        Args:
+            band (float): Only readings within +/- band grams of zero count as empty
+            window (float): Seconds the readings must stay stable before correcting
+            tolerance (float): Maximum spread (grams) of readings in the window
+            rate (float): Maximum zero correction in grams per second
+            enabled (bool): Apply corrections at all
+        """
+        self.band = band
+        self.window = window
+        self.tolerance = tolerance
+        self.rate = rate
+        self.enabled = enabled
+        self.zero = 0.0
+        self.readings = deque()
+        self.last_update = None
+        self.corrections = 0
+
+    def reset(self):
+        """Forget the tracked zero (after a tare the sketch's zero is exact)."""
+        self.zero = 0.0
+        self.readings.clear()
+        self.last_update = None
+
+    def update(self, weight, now=None):
+        """
+        Track one reading and return it relative to the tracked zero.
+
+        Args:
+            weight (float): Calibrated reading in grams
+            now (float): time.monotonic() of the reading
+
+        Returns:
+            float: Zero-corrected weight
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = 0.0 if self.last_update is None else now - self.last_update
+        self.last_update = now
+        if not self.enabled:
+            return weight - self.zero
+
+        self.readings.append((now, weight))
+        while self.readings and now - self.readings[0][0] > self.window:
+            self.readings.popleft()
+
+        values = [value for _, value in self.readings]
+        covered = now - self.readings[0][0] >= self.window * 0.8
+        empty = all(abs(value - self.zero) <= self.band for value in values)
+        stable = max(values) - min(values) <= self.tolerance
+        if covered and empty and stable and elapsed > 0:
+            error = sum(values) / len(values) - self.zero
+            step = max(-self.rate * elapsed, min(self.rate * elapsed, error))
+            if step:
+                self.zero += step
+                self.corrections += 1
+        return weight - self.zero
+
+    def stats(self):
+        """Return tracker state for metrics."""
+        return {
+            'enabled': self.enabled,
+            'zero': round(self.zero, 3),
+            'corrections': self.corrections,
+        }
+
+
+class ScaleConnection:
+    """Serial link to the scale with port discovery and backoff reconnects."""
+
+    def __init__(self, port='auto', baud_rate=9600, banner=BANNER, read_timeout=1.0,
+                 probe_time=4.0, stale_after=5.0, backoff_initial=0.5, backoff_max=30.0):
+        """
+        Initialize the connection (nothing is opened until `connect`).
+
+        Args:
+            port (str): Serial port, or 'auto' to scan all ports
+            baud_rate (int): Baud rate of the sketch
+            banner (str): Line the sketch prints on reset
+            read_timeout (float): Serial read timeout in seconds
+            probe_time (float): Seconds to wait for the banner or a reading per port
+            stale_after (float): Reconnect if no reading arrives for this long
+            backoff_initial (float): First reconnect delay in seconds
+            backoff_max (float): Upper bound of the reconnect delay
+        """
+        self.port = None if port in (None, '', 'auto') else port
+        self.baud_rate = baud_rate
+        self.banner = banner
+        self.read_timeout = read_timeout
+        self.probe_time = probe_time
+        self.stale_after = stale_after
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self.serial = None
+        self.state = DISCONNECTED
+        self.active_port = None
+        self.last_port = self.port
+        self.backoff = backoff_initial
+        self.next_attempt = 0.0
+        self.last_reading = 0.0
+        self.last_error = None
+        self.connects = 0
+        self.reconnects = 0
+        self.failed_attempts = 0
+        self.consecutive_failures = 0
+        self.lines = 0
+        self.unparsed_lines = 0
+
+        # Commands waiting to be written / waiting for their acknowledgement
+        self.command_lock = threading.Lock()
+        self.outbox = deque()
+        self.pending = []
+        self.commands = {'sent': 0, 'acknowledged': 0, 'timed_out': 0, 'failed': 0}
+
+    @property
+    def is_connected(self):
+        """Whether a scale port is open."""
+        return self.state == CONNECTED and self.serial is not None and self.serial.is_open
+
+    def connect(self):
+        """
+        Find and open the scale port.
+
+        Returns:
+            bool: True if connected
+        """
+        self.state = CONNECTING
+        ports = [self.port] if self.port else candidate_ports(self.last_port)
+        if not ports:
+            return self._connect_failed("no serial ports found")
+
+        for port in ports:
+            try:
+                link = serial.Serial(port, self.baud_rate, timeout=self.read_timeout)
+            except (serial.SerialException, OSError, ValueError) as e:
+                self.last_error = f"{port}: {e}"
+                continue
+            if not self._probe(link):
+                self.last_error = f"{port}: no scale banner or readings"
+                link.close()
+                continue
+
+            self.serial = link
+            self.active_port = self.last_port = port
+            self.state = CONNECTED
+            self.backoff = self.backoff_initial
+            self.consecutive_failures = 0
+            self.last_reading = time.monotonic()
+            if self.connects:
+                self.reconnects += 1
+            self.connects += 1
+            print(f"✓ Scale connected on {port}")
+            return True
+
+        return self._connect_failed(self.last_error)
+
+    def _probe(self, link):
+        """Internal: Wait for the banner or a weight line; False if neither arrives"""
+        deadline = time.monotonic() + self.probe_time
+        while time.monotonic() < deadline:
+            try:
+                line = link.readline().decode('utf-8', errors='ignore').strip()
+            except (serial.SerialException, OSError):
+                return False
+            if self.banner in line or parse_weight(line) is not None:
+                return True
+        return False
+
+    def _connect_failed(self, reason):
+        """Internal: Schedule the next attempt with exponential backoff"""
+        if self.consecutive_failures == 0:
+            print(f"✗ Scale connection failed: {reason} (retrying with backoff)")
+        self.state = DISCONNECTED
+        self.failed_attempts += 1
+        self.consecutive_failures += 1
+        self.last_error = reason
+        self.next_attempt = time.monotonic() + self.backoff
+        self.backoff = min(self.backoff * 2, self.backoff_max)
+        return False
+
+    def disconnect(self, reason=None):
+        """Close the port; the next `read_weight` call schedules a reconnect."""
+        if self.serial is not None:
+            try:
+                self.serial.close()
+            except (serial.SerialException, OSError):
+                pass
+        self.serial = None
+        if self.state == CONNECTED:
+            print(f"✗ Scale disconnected from {self.active_port}: {reason}")
+            self.next_attempt = time.monotonic() + self.backoff
+        self.state = DISCONNECTED
+        self.active_port = None
+        if reason:
+            self.last_error = reason
+        self._fail_commands(f"scale disconnected ({reason})" if reason else "scale disconnected")
+
+    def send_command(self, name, payload=None, ack=None, timeout=5.0):
+        """
+        Queue a command for the sketch; it is written by the reading thread.
+
+        Args:
+            name (str): Command name; payload and ack default to `COMMANDS[name]`
+            payload (bytes): Bytes to write
+            ack (str): Acknowledgement line to wait for (None = done once written)
+            timeout (float): Seconds to wait for the acknowledgement
+
+        Returns:
+            ScaleCommand: Already failed if the scale is not connected
+        """
+        if payload is None:
+            payload, ack = COMMANDS[name]
+        command = ScaleCommand(name, payload, ack, timeout)
+        if not self.is_connected:
+            self.commands['failed'] += 1
+            command._finish(False, "scale not connected")
+            return command
+        with self.command_lock:
+            self.outbox.append(command)
+        return command
+
+    def tare(self, timeout=5.0):
+        """
+        Ask the sketch to zero the scale.
+
+        Returns:
+            ScaleCommand: Completes when `Tared!` arrives or the timeout passes
+        """
+        return self.send_command('tare', timeout=timeout)
+
+    def _process_commands(self):
+        """Internal: Write queued commands and expire unacknowledged ones"""
+        now = time.monotonic()
+        with self.command_lock:
+            queued = list(self.outbox)
+            self.outbox.clear()
+            expired = [c for c in self.pending if now > c.deadline]
+            self.pending = [c for c in self.pending if now <= c.deadline]
+        for command in expired:
+            self.commands['timed_out'] += 1
+            command._finish(False, f"no '{command.ack}' within {command.timeout:g}s")
+        for command in queued:
+            if not self.write(command.payload):
+                self.commands['failed'] += 1
+                command._finish(False, self.last_error or "write failed")
+                continue
+            self.commands['sent'] += 1
+            command.sent = now
+            command.deadline = now + command.timeout
+            if command.ack is None:
+                command._finish(True)
+            else:
+                with self.command_lock:
+                    self.pending.append(command)
+
+    def _match_ack(self, line):
+        """Internal: Complete the oldest pending command acknowledged by this line"""
+        with self.command_lock:
+            for command in self.pending:
+                if command.ack in line:
+                    self.pending.remove(command)
+                    break
+            else:
+                return False
+        self.commands['acknowledged'] += 1
+        command._finish(True, reply=line)
+        return True
+
+    def _fail_commands(self, reason):
+        """Internal: Fail every queued and pending command"""
+        with self.command_lock:
+            commands = list(self.outbox) + self.pending
+            self.outbox.clear()
+            self.pending = []
+        for command in commands:
+            self.commands['failed'] += 1
+            command._finish(False, reason)
+
+    def read_weight(self):
+        """
+        Read the newest weight, reconnecting first if necessary.
+
+        Returns:
+            float: Weight in grams, or None if no new reading is available
+        """
+        if not self.is_connected:
+            if time.monotonic() < self.next_attempt or not self.connect():
+                return None
+
+        self._process_commands()
+        if not self.is_connected:
+            return None
+
+        try:
+            # The sketch streams continuously; read a couple of lines at most
+            for _ in range(2):
+                line = self.serial.readline().decode('utf-8', errors='ignore').strip()
+                if not line:
+                    continue
+                self.lines += 1
+                weight = parse_weight(line)
+                if weight is not None:
+                    self.last_reading = time.monotonic()
+                    return weight
+                if not self._match_ack(line):
+                    self.unparsed_lines += 1
+        except (serial.SerialException, OSError) as e:
+            self.disconnect(str(e))
+            return None
+
+        if time.monotonic() - self.last_reading > self.stale_after:
+            self.disconnect(f"no readings for {self.stale_after:.0f}s")
+        return None
+
+    def write(self, data):
+        """
+        Send a command to the sketch.
+
+        Returns:
+            bool: True if written
+        """
+        if not self.is_connected:
+            return False
+        try:
+            self.serial.write(data)
+            return True
+        except (serial.SerialException, OSError) as e:
+            self.disconnect(str(e))
+            return False
+
+    def close(self):
+        """Close the port for good."""
+        self.disconnect()
+
+    def stats(self):
+        """Return connection state and counters for metrics."""
+        now = time.monotonic()
+        return {
+            'state': self.state,
+            'port': self.active_port,
+            'connects': self.connects,
+            'reconnects': self.reconnects,
+            'failed_attempts': self.failed_attempts,
+            'next_attempt_in': round(max(0.0, self.next_attempt - now), 1)
+            if self.state == DISCONNECTED else 0.0,
+            'last_reading_age': round(now - self.last_reading, 1) if self.last_reading else None,
+            'lines': self.lines,
+            'unparsed_lines': self.unparsed_lines,
+            'commands': dict(self.commands, pending=len(self.pending) + len(self.outbox)),
+            'last_error': self.last_error,
+        }
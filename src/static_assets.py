@@ -0,0 +1,277 @@
+"""
+Module: static_assets.py
+Description: Serve the dashboard's static files from memory, precompressed and cache-friendly.
+
+`StaticAssets` reads everything under `static/` once at startup and keeps, per
+file, the raw bytes plus gzip and (if the optional `brotli` package is
+installed) brotli variants, each with its own strong ETag. Responses are
+negotiated on `Accept-Encoding` and answered with 304 when `If-None-Match`
+matches, so a counter tablet reloading the page transfers almost nothing.
+
+References from `index.html` to other assets are rewritten to fingerprinted
+URLs (`/static/js/dashboard.js?v=<etag>`); those are served with a one-year
+immutable cache lifetime, while `index.html` itself is always revalidated.
+Edits to `static/` take effect on restart.
+
+The Socket.IO browser client is vendored (`static/vendor/socket.io.min.js`,
+pinned to SOCKETIO_VERSION and its SHA-384) rather than loaded from the CDN, so the
+dashboard works on store networks without internet access. There is no CDN
+fallback: without the file the dashboard shows a "realtime client missing" error.
+To restore it, or after bumping the pin:
+
+    python -m src.static_assets vendor --force
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+import urllib.request
+
+from flask import Response, request
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+STATIC_DIR = 'static'
+ENTRY_PAGE = 'index.html'
+
+SOCKETIO_VERSION = '4.5.0'
+SOCKETIO_URL = f"https://cdn.socket.io/{SOCKETIO_VERSION}/socket.io.min.js"
+SOCKETIO_PATH = 'vendor/socket.io.min.js'
+# Subresource-integrity hash of the pinned build, as published for the CDN copy;
+# index.html carries the same value in its integrity attribute
+SOCKETIO_INTEGRITY = 'sha384-7EyYLQZgWBi67fBtVxw60/OWl1kjsfrPFcaU0pp0nAh+i8FD068QogUvg85Ewy1k'
+
+# Already-compressed formats (images, fonts) gain nothing from gzip/brotli
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 256
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+class Asset:
+    """One static file with its precompressed variants."""
+
+    __slots__ = ('name', 'mime_type', 'variants')
+
+    def __init__(self, name, data):
+        """
+        Compress the file and compute the ETags.
+
+        Args:
+            name (str): Path relative to the static directory
+            data (bytes): File contents
+        """
+        self.name = name
+        self.mime_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if self.mime_type.startswith('text/') or self.mime_type == 'application/javascript':
+            self.mime_type += '; charset=utf-8'
+
+        # encoding -> (body, etag); identity is always present
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        self.variants = {'identity': (data, digest)}
+        if len(data) >= MIN_COMPRESS_SIZE and self.mime_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                self.variants['gzip'] = (compressed, f"{digest}-gz")
+            if BROTLI_AVAILABLE:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    self.variants['br'] = (compressed, f"{digest}-br")
+
+    @property
+    def version(self):
+        """Content hash used in fingerprinted URLs."""
+        return self.variants['identity'][1]
+
+    def sizes(self):
+        """Bytes per encoding."""
+        return {encoding: len(body) for encoding, (body, _) in self.variants.items()}
+
+
+def integrity(data):
+    """Subresource-integrity value (sha384) of a file's bytes."""
+    return 'sha384-' + base64.b64encode(hashlib.sha384(data).digest()).decode('ascii')
+
+
+def _accepted_encodings(header):
+    """Internal: Encodings the client accepts (q=0 entries are excluded)"""
+    accepted = set()
+    for part in (header or '').split(','):
+        token, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if token and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(token.lower())
+    return accepted
+
+
+def _etag_matches(header, etag):
+    """Internal: Whether an If-None-Match header matches the ETag"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    tags = {tag.strip() for tag in header.split(',')}
+    return f'"{etag}"' in tags or f'W/"{etag}"' in tags
+
+
+class StaticAssets:
+    """In-memory static file server for the dashboard."""
+
+    def __init__(self, root=STATIC_DIR, entry=ENTRY_PAGE):
+        """
+        Load and compress every file under `root`.
+
+        Args:
+            root (str): Static directory
+            entry (str): HTML page whose asset references get fingerprinted
+        """
+        self.root = root
+        self.entry = entry
+        self.assets = {}
+        self.not_modified = 0
+        self.served = {'identity': 0, 'gzip': 0, 'br': 0}
+        self.load()
+
+    def load(self):
+        """(Re)read the static directory."""
+        assets = {}
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                if filename.startswith('.') or filename.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    assets[name] = Asset(name, f.read())
+
+        # Point the entry page at fingerprinted URLs so those can be cached forever
+        if self.entry in assets:
+            html = assets[self.entry].variants['identity'][0].decode('utf-8')
+            for name, asset in assets.items():
+                if name != self.entry:
+                    html = html.replace(f'"/static/{name}"', f'"/static/{name}?v={asset.version}"')
+            assets[self.entry] = Asset(self.entry, html.encode('utf-8'))
+        self.assets = assets
+        client = assets.get(SOCKETIO_PATH)
+        if client is None:
+            print("✗ Socket.IO client missing; the dashboard will have no live updates "
+                  "(run: python -m src.static_assets vendor)")
+        elif integrity(client.variants['identity'][0]) != SOCKETIO_INTEGRITY:
+            print(f"✗ {SOCKETIO_PATH} is not the pinned Socket.IO {SOCKETIO_VERSION}; browsers "
+                  f"will refuse it (run: python -m src.static_assets vendor --force)")
+        return self
+
+    def response(self, name):
+        """
+        Build the response for one asset, honouring Accept-Encoding and If-None-Match.
+
+        Args:
+            name (str): Path relative to the static directory
+
+        Returns:
+            flask.Response: 200, 304 or 404
+        """
+        asset = self.assets.get(name)
+        if asset is None:
+            return Response('Not found', status=404, mimetype='text/plain')
+
+        accepted = _accepted_encodings(request.headers.get('Accept-Encoding'))
+        encoding = next((e for e in ('br', 'gzip') if e in asset.variants and e in accepted),
+                        'identity')
+        body, etag = asset.variants[encoding]
+
+        fingerprinted = request.args.get('v') == asset.version
+        headers = {
+            'ETag': f'"{etag}"',
+            'Cache-Control': IMMUTABLE if fingerprinted else REVALIDATE,
+            'Vary': 'Accept-Encoding',
+        }
+        if _etag_matches(request.headers.get('If-None-Match'), etag):
+            self.not_modified += 1
+            return Response(status=304, headers=headers)
+
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        self.served[encoding] += 1
+        return Response(body, status=200, content_type=asset.mime_type, headers=headers)
+
+    def stats(self):
+        """Return asset sizes and response counters for metrics."""
+        return {
+            'assets': {name: asset.sizes() for name, asset in sorted(self.assets.items())},
+            'brotli': BROTLI_AVAILABLE,
+            'served': dict(self.served),
+            'not_modified': self.not_modified,
+        }
+
+
+def vendor_socketio(root=STATIC_DIR, force=False):
+    """
+    Download the pinned Socket.IO browser client into the static directory.
+
+    Args:
+        root (str): Static directory
+        force (bool): Download even if the file exists
+
+    Returns:
+        str: Path of the vendored file
+
+    Raises:
+        OSError: If the download fails or does not match SOCKETIO_INTEGRITY
+    """
+    path = os.path.join(root, *SOCKETIO_PATH.split('/'))
+    if os.path.exists(path) and not force:
+        print(f"✓ {path} already present")
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with urllib.request.urlopen(SOCKETIO_URL, timeout=30) as source:
+        data = source.read()
+    if integrity(data) != SOCKETIO_INTEGRITY:
+        raise OSError(f"{SOCKETIO_URL} does not match the pinned {SOCKETIO_INTEGRITY}")
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    print(f"✓ Socket.IO client {SOCKETIO_VERSION} saved to {path} ({len(data)} bytes)")
+    return path
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Dashboard static assets')
+    parser.add_argument('--root', default=STATIC_DIR, help='Static directory')
+    sub = parser.add_subparsers(dest='command')
+    vendor = sub.add_parser('vendor', help=f'Download the Socket.IO client {SOCKETIO_VERSION}')
+    vendor.add_argument('--force', action='store_true', help='Replace an existing copy')
+    sub.add_parser('list', help='Show assets and their compressed sizes')
+    args = parser.parse_args()
+
+    if args.command == 'vendor':
+        try:
+            vendor_socketio(args.root, args.force)
+        except OSError as e:
+            print(f"✗ Download failed: {e}")
+            return 1
+        return 0
+    if args.command == 'list':
+        assets = StaticAssets(args.root)
+        for name, asset in sorted(assets.assets.items()):
+            sizes = ', '.join(f"{encoding} {size}" for encoding, size in asset.sizes().items())
+            print(f"{name:40s} {asset.version}  {sizes}")
+        return 0
+    parser.print_help()
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
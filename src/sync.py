@@ -0,0 +1,568 @@
+"""
+Module: sync.py
+Description: Store-to-head-office transaction sync through a local SQLite outbox.
+
+Every committed transaction (a saved reading, a cleared bill) is appended to
+`data/outbox.db` with a monotonically increasing id. The id is assigned in
+memory, and a writer thread commits queued entries in one transaction
+(group commit). A sender thread ships the entries in id order, in gzip
+compressed JSON batches, to `sync.endpoint`:
+
+    POST <endpoint>
+    Content-Encoding: gzip
+    Idempotency-Key: <station>:<first id>-<last id>
+
+    {"station": "...", "first_id": 41, "last_id": 60,
+     "records": [{"id": 41, "kind": "reading", "created": "...", "data": {...}}, ...]}
+
+The server stores records keyed by (station, id) and ignores ones it already
+has, then answers `{"acked": <last id>}`. The highest acked id is persisted, so
+after an outage or a restart sync resumes with the first unacknowledged entry.
+A batch whose ack was lost is simply sent again and deduplicated.
+
+Failures are retried with exponential backoff and jitter, and 429/503
+`Retry-After` is honoured. Uploads are paced to `max_bytes_per_second` and the
+sender thread runs at a lower OS priority, so sync stays out of the way of the
+detection pipeline on a shared uplink and CPU. Acknowledged entries beyond
+`keep_acked` are pruned.
+
+A stand-in for the central server, for tests and staging:
+
+    python -m src.sync serve --port 8765 --db data/central.db [--fail-rate 0.2]
+    python -m src.sync status
+    python -m src.sync push --endpoint http://localhost:8765/sync
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.utils import native_threading
+
+# SQLite and HTTP calls block, so the writer and sender run on real OS threads
+threading, _ = native_threading()
+
+
+DB_PATH = 'data/outbox.db'
+CENTRAL_DB_PATH = 'data/central.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    created TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+CENTRAL_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS transactions (
+    station TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    created TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    received TEXT NOT NULL,
+    PRIMARY KEY (station, id)
+);
+'''
+
+READING = 'reading'
+BILL_CLEARED = 'bill_cleared'
+
+DURABLE_POLL_INTERVAL = 0.001
+SENDER_NICENESS = 10
+
+
+class SyncError(Exception):
+    """Raised when a batch is not accepted by the server."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def encode_batch(station, rows):
+    """
+    Build the compressed request body for outbox rows.
+
+    Args:
+        station (str): Station id
+        rows (list): (id, kind, created, payload JSON) tuples in id order
+
+    Returns:
+        bytes: gzip-compressed JSON
+    """
+    body = {
+        'station': station,
+        'first_id': rows[0][0],
+        'last_id': rows[-1][0],
+        'records': [{'id': entry_id, 'kind': kind, 'created': created, 'data': json.loads(payload)}
+                    for entry_id, kind, created, payload in rows],
+    }
+    return gzip.compress(json.dumps(body, separators=(',', ':')).encode('utf-8'), compresslevel=6)
+
+
+def post_batch(endpoint, station, first_id, last_id, body, token=None, timeout=15.0):
+    """
+    Send one compressed batch.
+
+    Returns:
+        int: Highest id the server acknowledged
+
+    Raises:
+        SyncError: On a network error, a non-2xx answer or a malformed ack
+    """
+    request = urllib.request.Request(endpoint, data=body, method='POST', headers={
+        'Content-Type': 'application/json',
+        'Content-Encoding': 'gzip',
+        'Idempotency-Key': f"{station}:{first_id}-{last_id}",
+    })
+    if token:
+        request.add_header('Authorization', f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            answer = json.loads(response.read().decode('utf-8') or '{}')
+    except urllib.error.HTTPError as e:
+        retry_after = e.headers.get('Retry-After') if e.headers else None
+        try:
+            retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            retry_after = None
+        raise SyncError(f"server answered {e.code}", retry_after)
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise SyncError(f"{type(e).__name__}: {getattr(e, 'reason', e)}")
+    acked = answer.get('acked')
+    if not isinstance(acked, int) or acked < first_id:
+        raise SyncError(f"unexpected ack {acked!r} for {first_id}-{last_id}")
+    return min(acked, last_id)
+
+
+class SyncOutbox:
+    """Durable outbox of committed transactions with a background uploader."""
+
+    def __init__(self, station, endpoint=None, path=DB_PATH, token=None, batch_size=200,
+                 interval=5.0, max_bytes_per_second=32768, backoff_initial=1.0,
+                 backoff_max=300.0, timeout=15.0, keep_acked=10000, flush_interval=0.05):
+        """
+        Open the outbox and start the writer (and, with an endpoint, the sender).
+
+        Args:
+            station (str): Station id sent with every batch
+            endpoint (str): URL batches are POSTed to (None = record only)
+            path (str): SQLite database file
+            token (str): Bearer token for the endpoint
+            batch_size (int): Records per batch
+            interval (float): Seconds between sync rounds when caught up
+            max_bytes_per_second (int): Upload budget (0 = unlimited)
+            backoff_initial (float): First retry delay after a failure
+            backoff_max (float): Upper bound of the retry delay
+            timeout (float): HTTP timeout per batch
+            keep_acked (int): Acknowledged entries kept locally
+            flush_interval (float): Longest a queued entry waits for its commit
+        """
+        self.station = station
+        self.endpoint = endpoint
+        self.path = path
+        self.token = token
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_bytes_per_second = max_bytes_per_second
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.keep_acked = keep_acked
+        self.flush_interval = flush_interval
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db_lock = threading.Lock()
+
+        self.lock = threading.Lock()
+        self.next_id = (self.db.execute('SELECT MAX(id) FROM outbox').fetchone()[0] or 0) + 1
+        self.acked_id = int(self._state('acked_id', 0))
+        self.next_id = max(self.next_id, self.acked_id + 1)
+        self.committed_id = self.next_id - 1
+        self.pending = []
+
+        self.batches_sent = 0
+        self.records_sent = 0
+        self.bytes_sent = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_success = None
+        self.backoff = backoff_initial
+
+        self.running = True
+        self.commit_requested = threading.Event()
+        self.sync_requested = threading.Event()
+        self.writer_thread = threading.Thread(target=self._writer, name="OutboxWriterThread")
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+        self.sender_thread = None
+        if endpoint:
+            self.sender_thread = threading.Thread(target=self._sender, name="SyncSenderThread")
+            self.sender_thread.daemon = True
+            self.sender_thread.start()
+
+    def _state(self, key, default=None):
+        """Internal: Read a persisted sync_state value"""
+        row = self.db.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def append(self, kind, data, durable=True):
+        """
+        Record a committed transaction.
+
+        Args:
+            kind (str): READING or BILL_CLEARED
+            data (dict): JSON-serialisable transaction
+            durable (bool): Wait until the entry is committed to the outbox
+
+        Returns:
+            int: Outbox id of the entry
+        """
+        payload = json.dumps(data, separators=(',', ':'))
+        with self.lock:
+            entry_id = self.next_id
+            self.next_id += 1
+            self.pending.append((entry_id, kind, datetime.now().isoformat(), payload))
+        self.commit_requested.set()
+        if durable:
+            self.wait_for(entry_id)
+        return entry_id
+
+    def wait_for(self, entry_id, timeout=5.0):
+        """
+        Wait until entry `entry_id` is committed.
+
+        Polls with short sleeps, which under eventlet yield to other green threads.
+
+        Returns:
+            bool: True if committed within the timeout
+        """
+        deadline = time.monotonic() + timeout
+        while self.committed_id < entry_id:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(DURABLE_POLL_INTERVAL)
+        return True
+
+    def flush(self):
+        """Commit queued entries in one transaction."""
+        with self.db_lock:
+            with self.lock:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return 0
+            try:
+                with self.db:
+                    self.db.executemany(
+                        'INSERT INTO outbox (id, kind, created, payload) VALUES (?, ?, ?, ?)', batch)
+            except sqlite3.Error:
+                # Keep the batch for the next attempt, ahead of anything queued since
+                with self.lock:
+                    self.pending = batch + self.pending
+                raise
+            self.committed_id = batch[-1][0]
+        if self.endpoint:
+            self.sync_requested.set()
+        return len(batch)
+
+    def _writer(self):
+        """Background thread: commit queued entries as soon as they arrive"""
+        while self.running:
+            self.commit_requested.wait(self.flush_interval)
+            self.commit_requested.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"✗ Outbox write failed (will retry): {e}")
+                time.sleep(self.flush_interval)
+
+    def unacked(self, limit):
+        """Oldest committed entries the server has not acknowledged."""
+        with self.db_lock:
+            return self.db.execute(
+                'SELECT id, kind, created, payload FROM outbox WHERE id > ? ORDER BY id LIMIT ?',
+                (self.acked_id, limit)).fetchall()
+
+    def _ack(self, acked_id):
+        """Internal: Persist the acknowledged id and prune old entries"""
+        with self.db_lock:
+            with self.db:
+                self.db.execute('INSERT INTO sync_state (key, value) VALUES (?, ?) '
+                                'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+                                ('acked_id', str(acked_id)))
+                if self.keep_acked is not None:
+                    self.db.execute('DELETE FROM outbox WHERE id <= ?', (acked_id - self.keep_acked,))
+            self.acked_id = acked_id
+
+    def sync_once(self):
+        """
+        Send one batch of unacknowledged entries.
+
+        Returns:
+            int: Entries acknowledged (0 when caught up)
+
+        Raises:
+            SyncError: When the batch was not accepted
+        """
+        rows = self.unacked(self.batch_size)
+        if not rows:
+            return 0
+        body = encode_batch(self.station, rows)
+        started = time.monotonic()
+        acked = post_batch(self.endpoint, self.station, rows[0][0], rows[-1][0], body,
+                           self.token, self.timeout)
+        self._ack(acked)
+        self.batches_sent += 1
+        self.records_sent += sum(1 for row in rows if row[0] <= acked)
+        self.bytes_sent += len(body)
+        self.last_success = datetime.now().isoformat()
+        self._throttle(len(body), time.monotonic() - started)
+        return sum(1 for row in rows if row[0] <= acked)
+
+    def _throttle(self, sent_bytes, elapsed):
+        """Internal: Pause so uploads average at most max_bytes_per_second"""
+        if self.max_bytes_per_second:
+            delay = sent_bytes / float(self.max_bytes_per_second) - elapsed
+            if delay > 0:
+                self.sync_requested.clear()
+                time.sleep(delay)
+
+    def _sender(self):
+        """Background thread: ship batches, back off on failures"""
+        try:
+            # Below the pipeline threads on Linux (per-thread niceness)
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), SENDER_NICENESS)
+        except (AttributeError, OSError):
+            pass
+        while self.running:
+            try:
+                if self.sync_once():
+                    self.consecutive_failures = 0
+                    self.backoff = self.backoff_initial
+                    continue
+                self.consecutive_failures = 0
+                self.backoff = self.backoff_initial
+                delay = self.interval
+            except (SyncError, sqlite3.Error) as e:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.last_error = str(e)
+                retry_after = getattr(e, 'retry_after', None)
+                delay = max(retry_after or 0.0, self.backoff * random.uniform(0.5, 1.0))
+                if self.consecutive_failures == 1 or self.consecutive_failures % 10 == 0:
+                    print(f"✗ Sync failed ({e}); retrying in {delay:.0f}s")
+                self.backoff = min(self.backoff * 2, self.backoff_max)
+                # New entries must not cut the backoff short
+                self._sleep(delay)
+                continue
+            self.sync_requested.wait(delay)
+            self.sync_requested.clear()
+
+    def _sleep(self, seconds):
+        """Internal: Sleep unless the outbox is closing"""
+        deadline = time.monotonic() + seconds
+        while self.running and time.monotonic() < deadline:
+            time.sleep(min(0.5, deadline - time.monotonic()))
+
+    def stats(self):
+        """Return outbox counters for metrics."""
+        with self.lock:
+            queued = len(self.pending)
+        return {
+            'endpoint': self.endpoint,
+            'last_id': self.committed_id,
+            'acked_id': self.acked_id,
+            'backlog': self.committed_id - self.acked_id,
+            'queued': queued,
+            'batches_sent': self.batches_sent,
+            'records_sent': self.records_sent,
+            'bytes_sent': self.bytes_sent,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+            'last_success': self.last_success,
+        }
+
+    def close(self):
+        """Commit queued entries and stop the threads."""
+        self.running = False
+        self.commit_requested.set()
+        self.sync_requested.set()
+        self.writer_thread.join(timeout=2)
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            print(f"✗ Outbox write failed on close: {e}")
+        if self.sender_thread:
+            self.sender_thread.join(timeout=self.timeout + 1)
+        with self.db_lock:
+            self.db.close()
+
+
+# ---------------------------------------------------------------------------
+# Stand-in central server
+# ---------------------------------------------------------------------------
+
+class CentralStore:
+    """Head-office side: stores batches idempotently by (station, id)."""
+
+    def __init__(self, path=CENTRAL_DB_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(CENTRAL_SCHEMA)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.lock = threading.Lock()
+
+    def store(self, batch):
+        """
+        Store a decoded batch.
+
+        Returns:
+            tuple: (records stored, duplicates ignored)
+        """
+        received = datetime.now().isoformat()
+        rows = [(batch['station'], record['id'], record['kind'], record['created'],
+                 json.dumps(record['data']), received) for record in batch['records']]
+        with self.lock:
+            before = self.db.total_changes
+            with self.db:
+                self.db.executemany('INSERT OR IGNORE INTO transactions '
+                                    '(station, id, kind, created, payload, received) '
+                                    'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            stored = self.db.total_changes - before
+        return stored, len(rows) - stored
+
+    def summary(self):
+        """Per-station record counts and id ranges."""
+        with self.lock:
+            rows = self.db.execute('SELECT station, COUNT(*), MIN(id), MAX(id) FROM transactions '
+                                   'GROUP BY station ORDER BY station').fetchall()
+        return [{'station': station, 'records': count, 'first_id': first, 'last_id': last}
+                for station, count, first, last in rows]
+
+
+def make_handler(store, token=None, fail_rate=0.0):
+    """Request handler class for the stand-in server."""
+
+    class SyncHandler(BaseHTTPRequestHandler):
+        def _reply(self, status, body, headers=None):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._reply(200, {'stations': store.summary()})
+
+        def do_POST(self):
+            if token and self.headers.get('Authorization') != f"Bearer {token}":
+                return self._reply(401, {'error': 'unauthorized'})
+            if fail_rate and random.random() < fail_rate:
+                return self._reply(503, {'error': 'simulated outage'}, {'Retry-After': '1'})
+            raw = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                if self.headers.get('Content-Encoding') == 'gzip':
+                    raw = gzip.decompress(raw)
+                batch = json.loads(raw.decode('utf-8'))
+                stored, duplicates = store.store(batch)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                return self._reply(400, {'error': f'bad batch: {e}'})
+            self._reply(200, {'acked': batch['last_id'], 'stored': stored, 'duplicates': duplicates})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return SyncHandler
+
+
+def serve(host='127.0.0.1', port=8765, path=CENTRAL_DB_PATH, token=None, fail_rate=0.0):
+    """Run the stand-in central server until interrupted."""
+    store = CentralStore(path)
+    server = ThreadingHTTPServer((host, port), make_handler(store, token, fail_rate))
+    print(f"✓ Sync server on http://{host}:{port}/sync storing into {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Transaction sync to head office')
+    parser.add_argument('--db', default=None, help='Outbox (or, for serve, central) database')
+    sub = parser.add_subparsers(dest='command')
+    serve_parser = sub.add_parser('serve', help='Run a stand-in central server')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--token', default=None, help='Require this bearer token')
+    serve_parser.add_argument('--fail-rate', type=float, default=0.0,
+                              help='Fraction of batches answered 503 (outage testing)')
+    sub.add_parser('status', help='Show the outbox backlog')
+    push = sub.add_parser('push', help='Send everything unacknowledged now')
+    push.add_argument('--endpoint', required=True)
+    push.add_argument('--station', default=None, help='Station id (default: from settings)')
+    push.add_argument('--token', default=None)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.host, args.port, args.db or CENTRAL_DB_PATH, args.token, args.fail_rate)
+        return 0
+    if args.command == 'status':
+        outbox = SyncOutbox('status', path=args.db or DB_PATH)
+        stats = outbox.stats()
+        outbox.close()
+        print(f"last id {stats['last_id']}, acked {stats['acked_id']}, backlog {stats['backlog']}")
+        return 0
+    if args.command == 'push':
+        station = args.station
+        if station is None:
+            from src.config import load_config
+            station = load_config().get('station', {}).get('id', 'default')
+        outbox = SyncOutbox(station, path=args.db or DB_PATH)
+        outbox.endpoint, outbox.token = args.endpoint, args.token
+        sent = 0
+        try:
+            while True:
+                count = outbox.sync_once()
+                if not count:
+                    break
+                sent += count
+        except SyncError as e:
+            print(f"✗ Sync failed after {sent} records: {e}")
+            return 1
+        finally:
+            outbox.close()
+        print(f"✓ {sent} records sent")
+        return 0
+    parser.print_help()
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
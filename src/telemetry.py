@@ -0,0 +1,175 @@
+"""
+Module: telemetry.py
+Description: Versioned, delta-only live data channel for dashboard clients.
+
+Clients receive a full `snapshot` when they connect and afterwards only the
+fields that changed, as `delta` events:
+
+    snapshot: {'v': 42, 'data': {'fruit': 'apple', 'weight': 153.2, ...}}
+    delta:    {'base': 42, 'v': 43, 'ts': 1770376488.29, 'changes': {'weight': 160.4}}
+
+A client applies a delta only if `base` equals its own version and asks for a
+fresh snapshot otherwise. Changes are coalesced for at least `min_interval`
+seconds, small numeric jitter is ignored through per-field tolerances and the
+preview frame is only re-sent when the picture actually changes, so an idle
+station sends (almost) nothing.
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+DEFAULT_TOLERANCES = {
+    'weight': 0.5,       # grams
+    'price': 0.01,       # currency units
+    'confidence': 1.0,   # percent
+}
+
+
+class TelemetryChannel:
+    """Tracks published state and produces coalesced deltas."""
+
+    def __init__(self, min_interval=0.1, tolerances=None):
+        """
+        Initialize the channel.
+
+        Args:
+            min_interval (float): Minimum seconds between two deltas
+            tolerances (dict): Field -> smallest numeric change worth sending
+        """
+        self.min_interval = min_interval
+        self.tolerances = dict(DEFAULT_TOLERANCES if tolerances is None else tolerances)
+        self.lock = threading.Lock()
+        self.state = {}
+        self.version = 0
+        self.pending = {}
+        self.last_emit = 0.0
+        self.deltas_sent = 0
+        self.fields_sent = 0
+
+    def update(self, fields, force=False):
+        """
+        Offer new field values.
+
+        Args:
+            fields (dict): Field -> current value
+            force (bool): Queue every field even if unchanged
+
+        Returns:
+            bool: True if anything was queued
+        """
+        queued = False
+        with self.lock:
+            for key, value in fields.items():
+                if force or self._changed(key, value):
+                    self.pending[key] = value
+                    queued = True
+                elif key in self.pending:
+                    # Value moved back within tolerance of what clients have
+                    del self.pending[key]
+        return queued
+
+    def _changed(self, key, value):
+        """Internal: Whether a value differs meaningfully from the published one"""
+        if key not in self.state:
+            return True
+        previous = self.state[key]
+        tolerance = self.tolerances.get(key)
+        if tolerance is not None and isinstance(value, (int, float)) and isinstance(previous, (int, float)):
+            return abs(value - previous) >= tolerance
+        return value != previous
+
+    def has_pending(self):
+        """Whether there are queued changes."""
+        return bool(self.pending)
+
+    def flush(self, now=None):
+        """
+        Publish queued changes if the coalescing interval has elapsed.
+
+        Args:
+            now (float): Current time (defaults to time.time())
+
+        Returns:
+            dict: A delta event payload, or None if there is nothing to send
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            if not self.pending or now - self.last_emit < self.min_interval:
+                return None
+            changes = self.pending
+            self.pending = {}
+            self.state.update(changes)
+            base = self.version
+            self.version += 1
+            self.last_emit = now
+            self.deltas_sent += 1
+            self.fields_sent += len(changes)
+            return {'base': base, 'v': self.version, 'ts': now, 'changes': changes}
+
+    def snapshot(self):
+        """Full published state with its version (for new or resyncing clients)."""
+        with self.lock:
+            return {'v': self.version, 'ts': time.time(), 'data': dict(self.state)}
+
+    def stats(self):
+        """Return channel counters for metrics."""
+        with self.lock:
+            return {
+                'version': self.version,
+                'deltas_sent': self.deltas_sent,
+                'fields_sent': self.fields_sent,
+                'pending_fields': len(self.pending),
+            }
+
+
+class FrameChangeDetector:
+    """Decides whether a camera frame differs visibly from the last one sent."""
+
+    def __init__(self, threshold=3.0, max_age=10.0, size=(32, 24)):
+        """
+        Initialize the detector.
+
+        Args:
+            threshold (float): Mean absolute grey-level difference (0-255) of
+                the downscaled frames that counts as a change
+            max_age (float): Report a change at least this often (seconds)
+            size (tuple): Thumbnail size used for the comparison
+        """
+        self.threshold = threshold
+        self.max_age = max_age
+        self.size = size
+        self.reference = None
+        self.reference_time = 0.0
+
+    def thumbnail(self, frame):
+        """Small greyscale version of a BGR frame."""
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def changed(self, frame, now=None):
+        """
+        Check a frame against the reference.
+
+        The reference is only replaced when a change is reported, so slow
+        drift accumulates until it crosses the threshold.
+
+        Args:
+            frame (numpy.ndarray): BGR frame
+            now (float): Current time (defaults to time.time())
+
+        Returns:
+            bool: True if the frame should be sent
+        """
+        now = time.time() if now is None else now
+        thumb = self.thumbnail(frame)
+        if (self.reference is None
+                or now - self.reference_time >= self.max_age
+                or np.abs(thumb - self.reference).mean() >= self.threshold):
+            self.reference = thumb
+            self.reference_time = now
+            return True
+        return False
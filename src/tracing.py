@@ -0,0 +1,239 @@
+"""
+Module: tracing.py
+Description: Low-overhead span tracing of the pipeline stages with Chrome-trace export.
+
+Each stage a frame passes through (camera read, detection, lock waits, preview
+encoding, Socket.IO emit) is recorded as a span tagged with the camera frame
+sequence number, so one late price can be followed across threads. Spans go
+into a fixed-size ring buffer; the oldest are overwritten, so tracing can stay
+on in production. Frames are sampled by sequence number (every Nth frame), which
+keeps all spans of a sampled frame together.
+
+`export()` returns the Chrome trace event format, which loads in
+chrome://tracing and https://ui.perfetto.dev; the server serves it on
+`GET /admin/trace`.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class _NullSpan:
+    """Span used when tracing is off or the frame is not sampled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Records one timed section on exit."""
+
+    __slots__ = ('tracer', 'name', 'seq', 'cat', 'args', 'start')
+
+    def __init__(self, tracer, name, seq, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.seq = seq
+        self.cat = cat
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.record(self.name, self.start, time.perf_counter(), self.seq, self.cat, self.args)
+        return False
+
+    def set(self, **args):
+        """Attach extra arguments to the span (e.g. a cache hit)."""
+        self.args.update(args)
+
+
+class _LockSpan:
+    """Acquires a lock and records how long the acquire waited."""
+
+    __slots__ = ('tracer', 'lock', 'name', 'seq')
+
+    def __init__(self, tracer, lock, name, seq):
+        self.tracer = tracer
+        self.lock = lock
+        self.name = name
+        self.seq = seq
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self.lock.acquire()
+        self.tracer.record(self.name, start, time.perf_counter(), self.seq, 'lock', {})
+        return self
+
+    def __exit__(self, *exc):
+        self.lock.release()
+        return False
+
+
+class Tracer:
+    """Ring buffer of pipeline spans."""
+
+    def __init__(self, capacity=20000, sample_every=1, enabled=True):
+        """
+        Initialize the tracer.
+
+        Args:
+            capacity (int): Number of spans kept; older spans are overwritten
+            sample_every (int): Trace every Nth frame (1 = every frame)
+            enabled (bool): Record spans at all
+        """
+        self.enabled = enabled
+        self.sample_every = max(1, int(sample_every))
+        self.spans = deque(maxlen=capacity)
+        self.thread_names = {}
+        self.recorded = 0
+        self.pid = os.getpid()
+        # Maps perf_counter() readings to wall-clock time in the export
+        self.origin = time.time() - time.perf_counter()
+
+    @property
+    def capacity(self):
+        """Maximum number of spans kept."""
+        return self.spans.maxlen
+
+    def resize(self, capacity):
+        """Change the ring buffer size, keeping the newest spans."""
+        if capacity != self.spans.maxlen:
+            self.spans = deque(self.spans, maxlen=capacity)
+
+    def sampled(self, seq=None):
+        """Whether spans for this frame sequence number are recorded."""
+        return self.enabled and (seq is None or seq % self.sample_every == 0)
+
+    def span(self, name, seq=None, cat='pipeline', **args):
+        """
+        Time a block of code.
+
+        Usage:
+            with tracer.span('detect', seq, imgsz=640):
+                ...
+
+        Args:
+            name (str): Stage name
+            seq (int): Camera frame sequence number (None for frame-independent work)
+            cat (str): Category shown in the trace viewer
+            **args: Extra arguments stored with the span
+
+        Returns:
+            Context manager
+        """
+        if not self.sampled(seq):
+            return NULL_SPAN
+        return _Span(self, name, seq, cat, args)
+
+    def lock(self, lock, name, seq=None):
+        """
+        Acquire a lock, recording the wait as a span named after the lock.
+
+        Returns:
+            Context manager that holds the lock (the lock itself when not traced)
+        """
+        if not self.sampled(seq):
+            return lock
+        return _LockSpan(self, lock, name, seq)
+
+    def record(self, name, start, end, seq=None, cat='pipeline', args=None):
+        """
+        Store a finished span.
+
+        Args:
+            name (str): Stage name
+            start (float): time.perf_counter() at the start
+            end (float): time.perf_counter() at the end
+            seq (int): Camera frame sequence number
+            cat (str): Category
+            args (dict): Extra arguments
+        """
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        self.spans.append((name, cat, start, end, tid, seq, args))
+        self.recorded += 1
+
+    def clear(self):
+        """Drop all recorded spans."""
+        self.spans.clear()
+
+    def export(self, seconds=None):
+        """
+        Build a Chrome trace of the recorded spans.
+
+        Args:
+            seconds (float): Only include spans that ended in the last N seconds
+
+        Returns:
+            dict: {'traceEvents': [...], 'displayTimeUnit': 'ms', 'otherData': {...}}
+        """
+        spans = list(self.spans)
+        if seconds is not None:
+            cutoff = time.perf_counter() - seconds
+            spans = [span for span in spans if span[3] >= cutoff]
+
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': 0,
+                   'args': {'name': 'smart-billing'}}]
+        events.extend({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                       'args': {'name': name}} for tid, name in list(self.thread_names.items()))
+        for name, cat, start, end, tid, seq, args in spans:
+            event_args = dict(args) if args else {}
+            if seq is not None:
+                event_args['seq'] = seq
+            events.append({
+                'name': name,
+                'cat': cat,
+                'ph': 'X',
+                'ts': round(start * 1e6, 1),
+                'dur': round((end - start) * 1e6, 1),
+                'pid': self.pid,
+                'tid': tid,
+                'args': event_args,
+            })
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'clock_origin_unix': self.origin, 'spans': len(spans),
+                          'sample_every': self.sample_every},
+        }
+
+    def dump(self, path, seconds=None):
+        """
+        Write the Chrome trace to a file.
+
+        Returns:
+            int: Number of spans written
+        """
+        trace = self.export(seconds)
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+        return trace['otherData']['spans']
+
+    def stats(self):
+        """Return tracer state for metrics."""
+        return {
+            'enabled': self.enabled,
+            'sample_every': self.sample_every,
+            'capacity': self.capacity,
+            'buffered': len(self.spans),
+            'recorded': self.recorded,
+        }
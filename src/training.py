@@ -0,0 +1,316 @@
+"""
+Module: training.py
+Description: CPU-friendly fine-tuning pipeline for a produce-only detection model.
+
+The stock `yolov8n.pt` knows 80 COCO classes, only three of which are
+products we sell. This pipeline fine-tunes a small YOLO model on exactly the
+catalog's classes and registers the result in `models/registry.json`:
+
+    1. manifest  - validate a YOLO-format dataset against the catalog, split
+                   it into train/val and write `manifest.json` + `data.yaml`
+    2. train     - fine-tune on CPU with tray-specific augmentation
+    3. export    - export to ONNX/OpenVINO for faster CPU inference and
+                   register the version (optionally activating it)
+
+Dataset layout (YOLO format, one label file per image):
+
+    data/produce/
+        images/  0001.jpg ...
+        labels/  0001.txt ...   (class x_center y_center width height, normalised)
+        classes.txt             (class names in id order)
+
+Usage:
+    python -m src.training manifest data/produce
+    python -m src.training train data/produce/manifest.json --epochs 50 --imgsz 416 \\
+        --export onnx --activate
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+from collections import Counter
+
+from src.config import load_products
+from src.model_registry import ModelRegistry
+
+try:
+    from ultralytics import YOLO
+    ULTRALYTICS_AVAILABLE = True
+except ImportError:
+    ULTRALYTICS_AVAILABLE = False
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Tray images are shot top-down under fixed lighting: any orientation is valid,
+# colour must stay close to real (it separates e.g. lemon from orange) and
+# products appear at a narrow range of scales.
+AUGMENTATION = {
+    'fliplr': 0.5,
+    'flipud': 0.5,
+    'degrees': 180.0,
+    'scale': 0.3,
+    'translate': 0.1,
+    'hsv_h': 0.01,
+    'hsv_s': 0.4,
+    'hsv_v': 0.3,
+    'mosaic': 1.0,
+    'mixup': 0.0,
+}
+
+
+class DatasetError(Exception):
+    """Raised when a dataset does not match the catalog or is malformed."""
+
+
+def catalog_classes(products=None):
+    """
+    Product names the model should detect, in a stable order.
+
+    Args:
+        products (dict): Product catalog (defaults to config/products.json)
+
+    Returns:
+        list: Sorted product names
+    """
+    products = load_products() if products is None else products
+    return sorted(name for name in products if name != 'none')
+
+
+def _file_sha1(path):
+    """Internal: Short content hash used to detect changed images"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def build_manifest(root, classes=None, val_fraction=0.2, seed=0):
+    """
+    Validate a YOLO-format dataset and split it into train/val.
+
+    The split is stratified by each image's first label so small classes
+    appear in both sets. Writes `manifest.json`, `train.txt`, `val.txt` and
+    `data.yaml` into `root`.
+
+    Args:
+        root (str): Dataset folder with images/, labels/ and classes.txt
+        classes (list): Expected class names in id order (defaults to
+            classes.txt); every name must be a product in config/products.json
+            when that file exists
+        val_fraction (float): Fraction of images held out for validation
+        seed (int): Shuffle seed (the split is reproducible)
+
+    Returns:
+        dict: The manifest
+    """
+    images_dir = os.path.join(root, 'images')
+    labels_dir = os.path.join(root, 'labels')
+    if classes is None:
+        with open(os.path.join(root, 'classes.txt'), 'r', encoding='utf-8') as f:
+            classes = [line.strip().lower() for line in f if line.strip()]
+
+    catalog = catalog_classes()
+    unknown = sorted(set(classes) - set(catalog)) if catalog else []
+    if unknown:
+        raise DatasetError(f"Classes not in the product catalog: {', '.join(unknown)}")
+
+    by_class = {}
+    instances = Counter()
+    skipped = []
+    for name in sorted(os.listdir(images_dir)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        image_path = os.path.join(images_dir, name)
+        label_path = os.path.join(labels_dir, os.path.splitext(name)[0] + '.txt')
+        boxes = []
+        if os.path.exists(label_path):
+            with open(label_path, 'r', encoding='utf-8') as f:
+                for line_no, line in enumerate(f, 1):
+                    parts = line.split()
+                    if not parts:
+                        continue
+                    if len(parts) != 5:
+                        raise DatasetError(f"{label_path}:{line_no}: expected 5 values")
+                    class_id = int(parts[0])
+                    if not 0 <= class_id < len(classes):
+                        raise DatasetError(f"{label_path}:{line_no}: class id {class_id} out of range")
+                    if not all(0.0 <= float(v) <= 1.0 for v in parts[1:]):
+                        raise DatasetError(f"{label_path}:{line_no}: coordinates not normalised")
+                    boxes.append(class_id)
+        else:
+            skipped.append(name)  # background image (empty tray)
+        instances.update(boxes)
+        stratum = classes[boxes[0]] if boxes else 'background'
+        by_class.setdefault(stratum, []).append({
+            'image': os.path.relpath(image_path, root),
+            'sha1': _file_sha1(image_path),
+            'boxes': len(boxes),
+        })
+
+    rng = random.Random(seed)
+    train, val = [], []
+    for stratum in sorted(by_class):
+        items = by_class[stratum]
+        rng.shuffle(items)
+        held_out = int(round(len(items) * val_fraction)) if len(items) > 1 else 0
+        val.extend(items[:held_out])
+        train.extend(items[held_out:])
+
+    missing = [name for name in classes if not instances[classes.index(name)]]
+    if missing:
+        print(f"✗ Warning: no labelled instances for {', '.join(missing)}")
+
+    manifest = {
+        'root': os.path.abspath(root),
+        'classes': list(classes),
+        'instances': {name: instances[i] for i, name in enumerate(classes)},
+        'background_images': len(skipped),
+        'val_fraction': val_fraction,
+        'seed': seed,
+        'train': train,
+        'val': val,
+    }
+
+    for split in ('train', 'val'):
+        with open(os.path.join(root, f"{split}.txt"), 'w', encoding='utf-8') as f:
+            for item in manifest[split]:
+                f.write(os.path.join(manifest['root'], item['image']) + '\n')
+    with open(os.path.join(root, 'data.yaml'), 'w', encoding='utf-8') as f:
+        f.write(f"path: {manifest['root']}\n")
+        f.write("train: train.txt\nval: val.txt\n")
+        f.write(f"nc: {len(classes)}\n")
+        f.write("names: [" + ', '.join(json.dumps(name) for name in classes) + "]\n")
+    with open(os.path.join(root, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def train(manifest_path, base='yolov8n.pt', epochs=50, imgsz=416, batch=8, workers=2,
+          device='cpu', project='runs/produce', name=None, augmentation=None):
+    """
+    Fine-tune a YOLO model on a manifest's dataset.
+
+    Args:
+        manifest_path (str): manifest.json written by `build_manifest`
+        base (str): Pretrained weights to start from
+        epochs (int): Training epochs
+        imgsz (int): Training/inference input size
+        batch (int): Batch size (keep small on CPU)
+        workers (int): Data loader workers
+        device (str): 'cpu' or a CUDA device
+        project (str): Output directory for training runs
+        name (str): Run name
+        augmentation (dict): Overrides for AUGMENTATION
+
+    Returns:
+        tuple: (path of best weights, validation metrics dict)
+    """
+    if not ULTRALYTICS_AVAILABLE:
+        raise RuntimeError("ultralytics is not installed (pip install ultralytics)")
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    options = dict(AUGMENTATION)
+    options.update(augmentation or {})
+    model = YOLO(base)
+    model.train(data=os.path.join(manifest['root'], 'data.yaml'), epochs=epochs, imgsz=imgsz,
+                batch=batch, workers=workers, device=device, project=os.path.abspath(project),
+                name=name, exist_ok=True, plots=False, **options)
+
+    best = os.path.join(str(model.trainer.save_dir), 'weights', 'best.pt')
+    metrics = YOLO(best).val(data=os.path.join(manifest['root'], 'data.yaml'),
+                             imgsz=imgsz, device=device, plots=False, verbose=False)
+    return best, {
+        'map50': round(float(metrics.box.map50), 4),
+        'map50_95': round(float(metrics.box.map), 4),
+        'precision': round(float(metrics.box.mp), 4),
+        'recall': round(float(metrics.box.mr), 4),
+        'epochs': epochs,
+        'train_images': len(manifest['train']),
+        'val_images': len(manifest['val']),
+    }
+
+
+def export(weights, fmt='onnx', imgsz=416):
+    """
+    Export trained weights for faster CPU inference.
+
+    Args:
+        weights (str): .pt file
+        fmt (str): 'onnx', 'openvino', 'torchscript' or 'pt' (no export)
+        imgsz (int): Fixed input size baked into the export
+
+    Returns:
+        str: Path of the exported model file or folder
+    """
+    if fmt == 'pt':
+        return weights
+    return YOLO(weights).export(format=fmt, imgsz=imgsz, dynamic=False)
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Train a produce-only detection model')
+    subparsers = parser.add_subparsers(dest='command')
+
+    manifest = subparsers.add_parser('manifest', help='Validate and split a dataset')
+    manifest.add_argument('root')
+    manifest.add_argument('--val-fraction', type=float, default=0.2)
+    manifest.add_argument('--seed', type=int, default=0)
+
+    fit = subparsers.add_parser('train', help='Fine-tune, export and register a model')
+    fit.add_argument('manifest')
+    fit.add_argument('--base', default='yolov8n.pt')
+    fit.add_argument('--epochs', type=int, default=50)
+    fit.add_argument('--imgsz', type=int, default=416)
+    fit.add_argument('--batch', type=int, default=8)
+    fit.add_argument('--workers', type=int, default=2)
+    fit.add_argument('--device', default='cpu')
+    fit.add_argument('--export', default='onnx', choices=['onnx', 'openvino', 'torchscript', 'pt'])
+    fit.add_argument('--version', help='Registry version (default: next produce-vN)')
+    fit.add_argument('--models-dir', default='models')
+    fit.add_argument('--activate', action='store_true', help='Make it the active model')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'manifest':
+            result = build_manifest(args.root, val_fraction=args.val_fraction, seed=args.seed)
+            print(f"✓ {len(result['train'])} train / {len(result['val'])} val images, "
+                  f"{len(result['classes'])} classes")
+            for name, count in result['instances'].items():
+                print(f"  {name:<14} {count} boxes")
+            return 0
+
+        if args.command == 'train':
+            with open(args.manifest, 'r', encoding='utf-8') as f:
+                classes = json.load(f)['classes']
+            weights, metrics = train(args.manifest, base=args.base, epochs=args.epochs,
+                                     imgsz=args.imgsz, batch=args.batch, workers=args.workers,
+                                     device=args.device)
+            print(f"✓ Trained {weights}: mAP50 {metrics['map50']}, mAP50-95 {metrics['map50_95']}")
+            try:
+                exported = export(weights, args.export, args.imgsz)
+            except Exception as e:
+                # e.g. the onnx/openvino packages are missing; the .pt still works
+                print(f"✗ {args.export} export failed ({e}); registering the .pt weights")
+                exported = weights
+            registry = ModelRegistry(args.models_dir)
+            version = args.version or registry.next_version()
+            registry.register(version, exported, classes, imgsz=args.imgsz, base=args.base,
+                              metrics=metrics, activate=args.activate)
+            print(f"✓ Registered {version}" + (" (active)" if args.activate else ""))
+            return 0
+    except (DatasetError, RuntimeError, OSError, ValueError) as e:
+        print(f"✗ {e}")
+        return 1
+
+    parser.print_help()
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""
+Module: utils.py
+Description: Small helpers shared by the server and the command-line tools.
+"""
+
+
+def native_threading():
+    """
+    Return (threading, queue) modules backed by real OS threads.
+
+    Under `eventlet.monkey_patch()` the regular modules create green threads,
+    which share one OS thread with the web server. Work that blocks in C code
+    (rendering, fsync) belongs on a real thread instead.
+
+    Returns:
+        tuple: (threading module, queue module)
+    """
+    try:
+        from eventlet import patcher
+    except ImportError:
+        import queue
+        import threading
+        return threading, queue
+    return patcher.original('threading'), patcher.original('queue')
@@ -0,0 +1,200 @@
+"""
+Module: web_worker.py
+Description: Stateless web worker serving dashboard clients in cluster mode.
+
+Each worker accepts browser connections and lets Flask-SocketIO's message
+queue deliver the station's `delta` events to them. New clients get the
+latest snapshot straight from the bus, and reads are answered without
+involving the station: static files from memory, `/metrics` and
+`GET /inventory` from the views the station publishes on the bus every
+`cluster.publish_interval` seconds, and `/analytics` from the on-disk
+analytics store. Only requests that change state or need the station's live
+state (saving, the bill, tare, compaction, admin) are forwarded to the
+station process (see src/bus.py). Workers keep no state of their own, so the
+web tier can be scaled out across cores independently of detection:
+
+    python demo_exp.py                            # station (cluster.message_queue set)
+    python -m src.web_worker --workers 4          # 4 worker processes on one port
+
+Worker processes share one listening socket (pre-fork), so browsers must use
+the WebSocket transport; the dashboard already does.
+"""
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import os
+import sys
+import time
+
+from eventlet import wsgi
+from flask import Flask, Response, request
+from flask_socketio import SocketIO, emit
+
+from src.analytics import STORE_DIR, AnalyticsStore, query_args
+from src.bus import BusError, StationBus
+from src.config import load_config
+from src.static_assets import StaticAssets
+
+# Hop-by-hop and length headers are recomputed by the worker
+SKIPPED_HEADERS = {'content-length', 'transfer-encoding', 'connection'}
+
+
+def create_app(settings):
+    """
+    Build the worker's Flask app and Socket.IO server.
+
+    Args:
+        settings (dict): Validated settings with cluster.message_queue set
+
+    Returns:
+        tuple: (Flask app, SocketIO, StationBus)
+    """
+    cluster = settings.get('cluster', {})
+    url = cluster.get('message_queue')
+    bus = StationBus(url, settings.get('station', {}).get('id', 'default'),
+                     timeout=cluster.get('request_timeout', 10.0))
+
+    app = Flask(__name__, static_folder=None)
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet', message_queue=url)
+    # Static files are the same on every process; serve them without a bus round trip
+    static_assets = StaticAssets()
+    # Queries only read the memory-mapped partitions the station compacts
+    analytics = AnalyticsStore(settings.get('analytics', {}).get('store_dir', STORE_DIR))
+
+    def view(name):
+        """Internal: Published view data, or a 503 response if the station has not published it"""
+        try:
+            published = bus.get_view(name)
+        except BusError as e:
+            return None, ({'success': False, 'message': str(e)}, 503)
+        if published is None:
+            return None, ({'success': False, 'message': f'Station has not published {name} yet'}, 503)
+        return published, None
+
+    @app.route('/')
+    def index():
+        return static_assets.response('index.html')
+
+    @app.route('/static/<path:filename>')
+    def static_file(filename):
+        return static_assets.response(filename)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        published, error = view('metrics')
+        if error:
+            return error
+        return dict(published['data'], published_age_s=round(time.time() - published['ts'], 2))
+
+    @app.route('/inventory', methods=['GET'])
+    def inventory_levels():
+        published, error = view('inventory')
+        if error:
+            return error
+        stock = published['data']
+        if request.args.get('low') == '1':
+            stock = [entry for entry in stock if entry['low']]
+        return {'success': True, 'stock': stock}
+
+    @app.route('/inventory/<product>', methods=['GET'])
+    def inventory_product(product):
+        published, error = view('inventory')
+        if error:
+            return error
+        key = product.strip().lower()
+        for entry in published['data']:
+            if entry['product'] == key:
+                return dict(entry, success=True)
+        return {'success': False, 'message': f'No stock record for {product}'}, 404
+
+    @app.route('/analytics', methods=['GET'])
+    def analytics_query():
+        # Compaction writes the store; only the station does that
+        if request.args.get('compact') == '1':
+            return forward('analytics')
+        start_time = time.perf_counter()
+        try:
+            rows = analytics.query(**query_args(request.args))
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}, 400
+        return {
+            'success': True,
+            'rows': rows,
+            'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 2)
+        }
+
+    @app.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE'])
+    def forward(path):
+        try:
+            response = bus.forward(request.method, '/' + path, request.query_string,
+                                   request.get_data(), request.content_type)
+        except BusError as e:
+            return {'success': False, 'message': str(e)}, 503
+        headers = {k: v for k, v in response['headers'].items() if k.lower() not in SKIPPED_HEADERS}
+        return Response(response['body'], status=response['status'],
+                        content_type=response['content_type'], headers=headers)
+
+    @app.route('/worker/health', methods=['GET'])
+    def health():
+        return {'pid': os.getpid(), 'bus': bus.stats(), 'static': static_assets.stats()}
+
+    @socketio.on('connect')
+    def handle_connect():
+        emit('snapshot', bus.get_snapshot())
+
+    @socketio.on('resync')
+    def handle_resync():
+        emit('snapshot', bus.get_snapshot())
+
+    return app, socketio, bus
+
+
+def serve(sock, settings):
+    """Run one worker on an already listening socket."""
+    app, _, _ = create_app(settings)
+    print(f"✓ Web worker {os.getpid()} serving")
+    wsgi.server(sock, app, log_output=False)
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Smart Billing System web worker')
+    parser.add_argument('--host', default=None, help='Listen address (default: server.host)')
+    parser.add_argument('--port', type=int, default=None, help='Listen port (default: server.port)')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes sharing the port')
+    args = parser.parse_args()
+
+    settings = load_config()
+    if not settings.get('cluster', {}).get('message_queue'):
+        print("✗ Set cluster.message_queue (e.g. redis://localhost:6379/0) to run web workers")
+        return 1
+
+    server = settings.get('server', {})
+    host = args.host or server.get('host', '0.0.0.0')
+    port = args.port or server.get('port', 5000)
+    sock = eventlet.listen((host, port))
+    print(f"✓ Listening on http://{host}:{port} with {args.workers} worker(s)")
+
+    if args.workers <= 1 or not hasattr(os, 'fork'):
+        serve(sock, settings)
+        return 0
+
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            serve(sock, settings)
+            os._exit(0)
+        children.append(pid)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping web workers")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
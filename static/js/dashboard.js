@@ -0,0 +1,315 @@
+// WebSocket only: any web worker can take the connection without sticky sessions.
+// Without the vendored client the page says so and the buttons still work
+const socket = window.io ? io({transports: ['websocket']}) : {on() {}, emit() {}};
+if (!window.io) {
+    document.getElementById('client-error').hidden = false;
+}
+let history = [];
+let updateCount = 0;
+let lastUpdateTime = Date.now();
+
+const fruitEmojis = {
+    'apple': '🍎', 'banana': '🍌', 'orange': '🍊', 'mango': '🥭',
+    'grape': '🍇', 'watermelon': '🍉', 'strawberry': '🍓',
+    'pineapple': '🍍', 'kiwi': '🥝', 'pear': '🍐',
+    'peach': '🍑', 'lemon': '🍋', 'pomegranate': '🍎', 'none': '❌'
+};
+
+socket.on('connect', () => {
+    console.log('✓ Connected to server - Simultaneous mode active');
+});
+
+// Live state: full snapshot on connect, then versioned deltas
+let state = {};
+let version = null;
+
+// Fixed-price (barcoded) items are counted in pieces instead of weighed
+function itemEmoji(entry) {
+    return entry.pricing === 'unit' ? '📦' : (fruitEmojis[entry.fruit] || '🍇');
+}
+
+// Prices carry the store's configured currency symbol (billing.currency_symbol)
+function money(value, symbol = state.currency_symbol || '') {
+    return symbol + value.toFixed(2);
+}
+
+function itemQuantity(entry) {
+    return entry.pricing === 'unit' ? (entry.quantity || 1) + ' pc' : entry.weight.toFixed(2);
+}
+
+function render(changes) {
+    updateCount++;
+    const now = Date.now();
+    const fps = 1000 / (now - lastUpdateTime);
+    lastUpdateTime = now;
+
+    console.log(`Update #${updateCount} v${version} | FPS: ${fps.toFixed(1)} | Fruit: ${state.fruit} | Weight: ${state.weight}g`);
+
+    // Touch only the displays whose data changed
+    if ('fruit' in changes || 'pricing' in changes || 'quantity' in changes) {
+        document.getElementById('fruit-emoji').textContent = itemEmoji(state);
+        document.getElementById('fruit-display').textContent = 
+            state.fruit.charAt(0).toUpperCase() + state.fruit.slice(1) +
+            (state.pricing === 'unit' ? ' × ' + (state.quantity || 1) : '');
+    }
+    if ('weight' in changes) {
+        document.getElementById('weight-display').textContent = state.weight.toFixed(2);
+    }
+    if ('price' in changes || 'currency_symbol' in changes) {
+        document.getElementById('price-display').textContent = money(state.price);
+    }
+    if ('confidence' in changes) {
+        document.getElementById('confidence-display').textContent = state.confidence + '%';
+        document.getElementById('confidence-bar').style.width = state.confidence + '%';
+    }
+
+    // Update video feed
+    if (changes.frame) {
+        document.getElementById('video-feed').src =
+            'data:' + (state.frame_type || 'image/jpeg') + ';base64,' + changes.frame;
+    }
+}
+
+socket.on('snapshot', (snapshot) => {
+    state = snapshot.data;
+    version = snapshot.v;
+    render(state);
+});
+
+socket.on('delta', (delta) => {
+    if (delta.base !== version) {
+        // Missed an update: ask for a fresh snapshot
+        socket.emit('resync');
+        return;
+    }
+    Object.assign(state, delta.changes);
+    version = delta.v;
+    render(delta.changes);
+});
+
+socket.on('disconnect', () => {
+    console.log('✗ Disconnected from server');
+});
+
+// Products that reached their reorder level since the page loaded
+const lowStock = new Map();
+
+socket.on('low_stock', (stock) => {
+    lowStock.set(stock.product, stock);
+    const alert = document.getElementById('stock-alert');
+    alert.textContent = '📦 Low stock: ' + Array.from(lowStock.values())
+        .map(s => s.unit === 'pc' ? `${s.product} ${s.on_hand} pc`
+                                  : `${s.product} ${(s.on_hand / 1000).toFixed(1)} kg`).join(', ');
+    alert.hidden = false;
+});
+
+function tare() {
+    if (confirm('Reset scale to zero?')) {
+        // The result arrives as a 'scale_command' event once the scale acknowledges it
+        fetch('/tare', { method: 'POST' })
+            .then(r => r.json())
+            .then(data => {
+                if (!data.success || !data.pending) alert(data.message);
+            })
+            .catch(err => {
+                console.error('Tare error:', err);
+                alert('Error resetting scale');
+            });
+    }
+}
+
+socket.on('scale_command', (command) => {
+    if (command.command !== 'tare') return;
+    if (command.state === 'done') {
+        console.log('✓ Scale reset to zero');
+    } else {
+        alert('✗ Failed to reset scale: ' + command.error);
+    }
+});
+
+function saveReading() {
+    fetch('/save', { method: 'POST' })
+        .then(r => r.json())
+        .then(data => {
+            if (data.success) {
+                addToHistory(data.data);
+                alert('✓ Reading saved successfully!');
+            } else {
+                alert('✗ ' + data.message);
+            }
+        })
+        .catch(err => {
+            console.error('Save error:', err);
+            alert('Error saving reading');
+        });
+}
+
+const HISTORY_ROWS = 10;
+
+function historyRow(entry) {
+    // Cloned from the <template> in index.html; values are set as text, never parsed as HTML
+    const row = document.getElementById('history-row').content.firstElementChild.cloneNode(true);
+    row.querySelector('.h-time').textContent = new Date(entry.timestamp).toLocaleString();
+    row.querySelector('.h-emoji').textContent = itemEmoji(entry);
+    row.querySelector('.h-fruit').textContent = entry.fruit;
+    row.querySelector('.h-confidence').textContent = entry.confidence + '%';
+    row.querySelector('.h-weight').textContent = itemQuantity(entry);
+    row.querySelector('.h-price').textContent = money(entry.price);
+    return row;
+}
+
+function addToHistory(data) {
+    // Insert one row and drop the oldest instead of rebuilding the table
+    const body = document.getElementById('history-body');
+    const empty = document.getElementById('history-empty');
+    if (empty) empty.remove();
+    body.insertBefore(historyRow(data), body.firstChild);
+    history.unshift(data);
+    if (history.length > HISTORY_ROWS) {
+        history.pop();
+        body.lastElementChild.remove();
+    }
+}
+
+function resetHistory() {
+    history = [];
+    const body = document.getElementById('history-body');
+    body.textContent = '';
+    body.appendChild(document.getElementById('history-empty-row').content.cloneNode(true));
+}
+
+function generateBill() {
+    fetch('/bill')
+        .then(r => r.json())
+        .then(data => {
+            if (!data.success) {
+                alert(data.message || 'No saved readings found');
+                return;
+            }
+
+            const symbol = data.currency_symbol ?? state.currency_symbol ?? '';
+            const rows = data.items.map((item, idx) => `
+                <tr>
+                    <td>${idx + 1}</td>
+                    <td style="text-transform: capitalize;">${item.fruit}</td>
+                    <td style="text-align: right;">${itemQuantity(item)}</td>
+                    <td style="text-align: right;">${money(item.price, symbol)}</td>
+                </tr>
+            `).join('');
+
+            const html = `
+                <div style="margin-bottom: 10px; color: #666;">Generated: ${new Date(data.generated_at).toLocaleString()}</div>
+                <table style="width: 100%; border-collapse: collapse;">
+                    <thead>
+                        <tr>
+                            <th style="text-align: left;">#</th>
+                            <th style="text-align: left;">Fruit</th>
+                            <th style="text-align: right;">Qty (g / pc)</th>
+                            <th style="text-align: right;">Price (${symbol})</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        ${rows}
+                    </tbody>
+                    <tfoot>
+                        <tr>
+                            <td colspan="3" style="text-align: right; padding-top: 10px;">Subtotal</td>
+                            <td style="text-align: right; padding-top: 10px;">${money(data.subtotal, symbol)}</td>
+                        </tr>
+                        ${data.discount > 0 ? `
+                        <tr>
+                            <td colspan="3" style="text-align: right;">Discount</td>
+                            <td style="text-align: right;">-${money(data.discount, symbol)}</td>
+                        </tr>` : ''}
+                        ${data.taxes.map(tax => `
+                        <tr>
+                            <td colspan="3" style="text-align: right; text-transform: capitalize;">Tax (${tax.category}, ${(tax.rate * 100).toFixed(2)}%)</td>
+                            <td style="text-align: right;">${money(tax.tax, symbol)}</td>
+                        </tr>`).join('')}
+                        ${data.rounding !== 0 ? `
+                        <tr>
+                            <td colspan="3" style="text-align: right;">Rounding</td>
+                            <td style="text-align: right;">${money(data.rounding, symbol)}</td>
+                        </tr>` : ''}
+                        <tr>
+                            <td colspan="3" style="text-align: right; font-weight: 700; padding-top: 10px;">Total</td>
+                            <td style="text-align: right; font-weight: 700; padding-top: 10px;">${money(data.total, symbol)}</td>
+                        </tr>
+                    </tfoot>
+                </table>
+            `;
+
+            document.getElementById('bill-content').innerHTML = html;
+            document.getElementById('bill-modal').style.display = 'flex';
+        })
+        .catch(err => {
+            console.error('Bill error:', err);
+            alert('Error generating bill');
+        });
+}
+
+function closeBill() {
+    document.getElementById('bill-modal').style.display = 'none';
+}
+
+function printBill() {
+    window.print();
+}
+
+function saveInvoice() {
+    fetch('/invoice', { method: 'POST' })
+        .then(r => r.json())
+        .then(data => {
+            if (!data.success) {
+                alert(data.message || 'Failed to create invoice');
+                return;
+            }
+            pollInvoice(data.job_id, 0);
+        })
+        .catch(err => {
+            console.error('Invoice error:', err);
+            alert('Error creating invoice');
+        });
+}
+
+function pollInvoice(jobId, attempt) {
+    fetch('/invoice/' + jobId)
+        .then(r => r.json())
+        .then(job => {
+            if (job.state === 'done') {
+                const pdf = job.files.find(name => name.endsWith('.pdf'));
+                window.open('/invoices/' + (pdf || job.files[0]), '_blank');
+            } else if (job.state === 'failed') {
+                alert('✗ Invoice failed: ' + job.error);
+            } else if (attempt < 40) {
+                setTimeout(() => pollInvoice(jobId, attempt + 1), 250);
+            } else {
+                alert('Invoice ' + job.invoice_id + ' is still rendering');
+            }
+        });
+}
+
+function clearBill() {
+    if (!confirm('Clear all saved readings?')) return;
+    fetch('/bill/clear', { method: 'POST' })
+        .then(r => r.json())
+        .then(data => {
+            if (data.success) {
+                alert('Bill cleared');
+                document.getElementById('bill-content').innerHTML = '';
+                resetHistory();
+            } else {
+                alert(data.message || 'Failed to clear bill');
+            }
+        })
+        .catch(err => {
+            console.error('Clear bill error:', err);
+            alert('Error clearing bill');
+        });
+}
+
+// Show connection status
+window.addEventListener('load', () => {
+    console.log('🚀 Web interface loaded');
+    console.log('⚡ Waiting for data stream...');
+});
@@ -0,0 +1,78 @@
+"""Tests for the adaptive quality controller."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src import adaptive
+from src.adaptive import DEFAULT_LEVELS, AdaptiveController
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(adaptive, 'time', SimpleNamespace(monotonic=clock))
+    monkeypatch.setattr(adaptive, 'cpu_percent', lambda: 30.0)
+    return clock
+
+
+def tick(controller, clock, latency, seconds=1.0):
+    clock.now += seconds
+    controller.record_latency(latency)
+    return controller.update()
+
+
+class TestLevels:
+    def test_degrades_one_step_per_interval(self, clock):
+        controller = AdaptiveController(target_latency=0.25, degrade_after=1.0)
+        assert tick(controller, clock, 0.4) == DEFAULT_LEVELS[1]
+        assert tick(controller, clock, 0.4, seconds=0.5)['imgsz'] == 512
+        assert tick(controller, clock, 0.4)['imgsz'] == 416
+
+    def test_stops_at_lowest_level(self, clock):
+        controller = AdaptiveController(degrade_after=0.0)
+        for _ in range(10):
+            tick(controller, clock, 1.0)
+        assert controller.level == len(DEFAULT_LEVELS) - 1
+
+    def test_restores_after_sustained_headroom(self, clock):
+        controller = AdaptiveController(target_latency=0.25, upgrade_after=10.0)
+        tick(controller, clock, 0.4)
+        for _ in range(10):
+            tick(controller, clock, 0.05)
+        assert controller.level == 1
+        tick(controller, clock, 0.05)
+        assert controller.level == 0 and controller.changes == 2
+
+    def test_middling_latency_holds_the_level(self, clock):
+        """Between 60% and 100% of the target the controller neither degrades nor restores."""
+        controller = AdaptiveController(target_latency=0.25)
+        tick(controller, clock, 0.4)
+        for _ in range(30):
+            tick(controller, clock, 0.2)
+        assert controller.level == 1
+
+    def test_cpu_overload_degrades(self, clock, monkeypatch):
+        monkeypatch.setattr(adaptive, 'cpu_percent', lambda: 97.0)
+        controller = AdaptiveController(cpu_target=85.0)
+        tick(controller, clock, 0.01)
+        assert controller.level == 1 and controller.stats()['cpu_percent'] == 97.0
+
+    def test_disabled_stays_at_full_quality(self, clock):
+        controller = AdaptiveController(enabled=False)
+        assert tick(controller, clock, 5.0) == DEFAULT_LEVELS[0]
+
+    def test_level_change_resets_window(self, clock):
+        controller = AdaptiveController()
+        controller.record_inference(0.1)
+        tick(controller, clock, 0.4)
+        stats = controller.stats()
+        assert (stats['latency_p90_ms'], stats['inference_p50_ms']) == (0.0, 0.0)
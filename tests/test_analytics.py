@@ -0,0 +1,119 @@
+"""Tests for the columnar sales store."""
+
+import json
+import os
+
+import pytest
+
+from src.analytics import AnalyticsStore, journal_sources, query_args
+
+
+def reading(timestamp, fruit, weight, price, station='s1', cashier='asha'):
+    return json.dumps({'timestamp': timestamp, 'fruit': fruit, 'weight': weight,
+                       'price': price, 'station': station, 'cashier': cashier}) + '\n'
+
+
+SALES = [
+    reading('2026-02-06T09:15:00', 'Apple', 500.0, 75.0),
+    reading('2026-02-06T09:40:00', 'banana', 1200.0, 72.0, cashier='ravi'),
+    reading('2026-02-06T17:05:00', 'apple', 250.0, 37.5, station='s2'),
+    reading('2026-02-07T10:00:00', 'apple', 1000.0, 150.0),
+]
+
+
+@pytest.fixture
+def journal(tmp_path):
+    path = tmp_path / 'readings.json'
+    path.write_text(''.join(SALES))
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AnalyticsStore(str(tmp_path / 'analytics'))
+
+
+class TestCompaction:
+    def test_partitions_by_day(self, store, journal):
+        assert store.compact([str(journal)]) == 4
+        assert store.days() == ['2026-02-06', '2026-02-07']
+        assert store.dictionary()['product'] == ['apple', 'banana']
+
+    def test_only_new_lines_are_added(self, store, journal):
+        store.compact([str(journal)])
+        with open(journal, 'a') as f:
+            f.write(reading('2026-02-07T11:00:00', 'banana', 600.0, 36.0))
+        assert store.compact([str(journal)]) == 1
+        assert store.query(metric='count', group_by=()) == [{'value': 5.0}]
+
+    def test_archived_journal_is_not_compacted_twice(self, store, journal, tmp_path):
+        """Clearing the bill renames the journal into the archive; its rows are already in."""
+        store.compact([str(journal)])
+        archive = tmp_path / 'readings_archive'
+        archive.mkdir()
+        os.replace(journal, archive / '2026-02-07T12-00-00.json')
+        journal.write_text(reading('2026-02-08T09:00:00', 'apple', 100.0, 15.0))
+        sources = journal_sources(str(journal), str(archive))
+        assert store.compact(sources) == 1
+        assert store.query(metric='count', group_by=()) == [{'value': 5.0}]
+
+    def test_torn_tail_waits_for_its_newline(self, store, journal):
+        with open(journal, 'a') as f:
+            f.write(reading('2026-02-07T11:00:00', 'banana', 600.0, 36.0)[:30])
+        assert store.compact([str(journal)]) == 4
+        with open(journal, 'a') as f:
+            f.write(reading('2026-02-07T11:00:00', 'banana', 600.0, 36.0)[30:])
+        assert store.compact([str(journal)]) == 1
+
+    def test_compact_async_runs_off_the_caller(self, store, journal):
+        thread = store.compact_async([str(journal)])
+        thread.join(5)
+        assert store.query(metric='count', group_by=()) == [{'value': 4.0}]
+
+    def test_interrupted_commit_is_finished(self, store, journal):
+        store.compact([str(journal)])
+        manifest = os.path.join(store.store_dir, 'manifest.json')
+        with open(manifest + '.new', 'w') as f:
+            json.dump({'staged': 1}, f)
+        with open(os.path.join(store.store_dir, 'pending.json'), 'w') as f:
+            json.dump([[manifest + '.new', manifest]], f)
+        store.compact([])
+        assert not os.path.exists(os.path.join(store.store_dir, 'pending.json'))
+        with open(manifest) as f:
+            assert json.load(f) == {'staged': 1}
+
+
+class TestQuery:
+    @pytest.fixture(autouse=True)
+    def compacted(self, store, journal):
+        store.compact([str(journal)])
+
+    def test_weight_per_product(self, store):
+        assert store.query() == [{'product': 'apple', 'value': 1.75},
+                                 {'product': 'banana', 'value': 1.2}]
+
+    def test_revenue_per_day_and_station(self, store):
+        assert store.query(metric='revenue', group_by=('day', 'station')) == [
+            {'day': '2026-02-06', 'station': 's1', 'value': 147.0},
+            {'day': '2026-02-06', 'station': 's2', 'value': 37.5},
+            {'day': '2026-02-07', 'station': 's1', 'value': 150.0}]
+
+    def test_hour_of_day_with_filters(self, store):
+        assert store.query(metric='count', group_by=('hour_of_day',), product='APPLE',
+                           start='2026-02-06', end='2026-02-06') == [
+            {'hour_of_day': 9, 'value': 1.0}, {'hour_of_day': 17, 'value': 1.0}]
+
+    def test_unknown_filter_value_matches_nothing(self, store):
+        assert store.query(cashier='nobody') == []
+
+    def test_invalid_metric_and_group(self, store):
+        with pytest.raises(ValueError):
+            store.query(metric='margin')
+        with pytest.raises(ValueError):
+            store.query(group_by=('week',))
+
+    def test_query_args_from_request_parameters(self):
+        args = query_args({'metric': 'revenue', 'group_by': 'day,,station', 'cashier': 'ravi'})
+        assert args == {'metric': 'revenue', 'group_by': ('day', 'station'), 'start': None,
+                        'end': None, 'product': None, 'station': None, 'cashier': 'ravi'}
+        assert query_args({})['group_by'] == ('product',)
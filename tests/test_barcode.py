@@ -0,0 +1,63 @@
+"""Tests for the barcode/QR fast path."""
+
+import cv2
+import numpy as np
+import pytest
+
+from src.barcode import QR_AVAILABLE, BarcodeReader
+
+pytestmark = pytest.mark.skipif(not QR_AVAILABLE, reason='OpenCV has no QR detector')
+
+CODE = '5901234123457'
+
+
+def lookup(code):
+    return 'orange_juice_1l' if code == CODE else None
+
+
+def tray(seed=0):
+    rng = np.random.default_rng(seed)
+    return cv2.resize(rng.integers(60, 200, (30, 40, 3), dtype=np.uint8), (640, 480),
+                      interpolation=cv2.INTER_CUBIC)
+
+
+def with_qr(frame, code=CODE):
+    symbol = cv2.resize(cv2.QRCodeEncoder.create().encode(code), (160, 160),
+                        interpolation=cv2.INTER_NEAREST)
+    symbol = cv2.cvtColor(np.pad(symbol, 16, constant_values=255), cv2.COLOR_GRAY2BGR)
+    frame = frame.copy()
+    frame[100:100 + symbol.shape[0], 200:200 + symbol.shape[1]] = symbol
+    return frame
+
+
+class TestScan:
+    def test_catalog_code_identifies_product(self):
+        reader = BarcodeReader(linear=False)
+        product, quantity, code, boxes = reader.scan(with_qr(tray()), lookup)
+        assert (product, quantity, code) == ('orange_juice_1l', 1, CODE)
+        assert boxes[0][:2] == ('orange_juice_1l', 1.0)
+
+    def test_unknown_code_falls_through(self):
+        reader = BarcodeReader(linear=False)
+        assert reader.scan(with_qr(tray(), 'not-in-catalog'), lookup) is None
+        assert reader.stats()['last_unknown'] == 'not-in-catalog'
+
+    def test_steady_tray_reuses_last_result(self):
+        """An unchanged tray is decoded once per `rescan_every` ticks."""
+        reader = BarcodeReader(linear=False, rescan_every=5)
+        frame = with_qr(tray())
+        results = [reader.scan(frame, lookup) for _ in range(10)]
+        assert reader.scans == 2 and reader.stats()['reused'] == 8
+        assert all(result[0] == 'orange_juice_1l' for result in results)
+
+    def test_changed_tray_is_decoded_again(self):
+        reader = BarcodeReader(linear=False, rescan_every=100)
+        assert reader.scan(tray(), lookup) is None
+        assert reader.scan(with_qr(tray()), lookup)[0] == 'orange_juice_1l'
+        assert reader.scans == 2
+
+    def test_disabled_reader_finds_nothing(self):
+        reader = BarcodeReader(linear=False)
+        reader.scan(with_qr(tray()), lookup)
+        reader.enabled = False
+        assert reader.scan(with_qr(tray()), lookup) is None
@@ -0,0 +1,121 @@
+"""Tests for exact billing arithmetic."""
+
+import random
+
+import numpy as np
+import pytest
+
+from src.billing import (BillingEngine, _allocate, div_round, to_milligrams,
+                         to_milligrams_array, to_paise, to_ppm)
+
+
+CATALOG = {
+    'apple': {'price_per_kg': 150, 'category': 'fruits', 'tax_rate': 0.05},
+    'orange': {'price_per_kg': 80, 'category': 'fruits', 'tax_rate': 0.05, 'discount': 0.1},
+    'onion': {'price_per_kg': 33.33, 'category': 'vegetables', 'tax_rate': 0.025},
+    'juice': {'unit_price': 45.5, 'category': 'packaged', 'tax_rate': 0.12,
+              'barcode': ['5901234123457', '123']},
+}
+
+
+@pytest.fixture
+def engine():
+    return BillingEngine(CATALOG)
+
+
+class TestConversions:
+    def test_decimal_literals(self):
+        assert to_paise(2.80) == 280
+        assert to_paise('0.005') == 1
+        assert to_ppm(0.05) == 50000
+        assert to_milligrams(0.0005) == 1
+
+    def test_div_round_half_away_from_zero(self):
+        assert div_round(5, 10) == 1
+        assert div_round(-5, 10) == -1
+        assert div_round(4, 10) == 0
+        assert list(div_round(np.array([5, -5, 15, 14]), 10)) == [1, -1, 2, 1]
+
+    def test_milligram_array_matches_decimal(self):
+        """The vectorised conversion rounds ties like the Decimal one, signs included."""
+        rng = random.Random(7)
+        weights = [round(rng.uniform(-5000, 5000), rng.choice([1, 2, 3])) for _ in range(5000)]
+        weights += [0.0005, 2.0005, 1.0015, -0.0005, -2.0005, 1234.5675]
+        expected = [to_milligrams(w) for w in weights]
+        assert to_milligrams_array(np.array(weights)).tolist() == expected
+
+
+class TestComputeBill:
+    def test_line_amounts_match_line_amount(self, engine):
+        """Every vectorised line equals the single-line price."""
+        rng = random.Random(3)
+        lines = [{'fruit': rng.choice(['apple', 'orange', 'onion']),
+                  'weight': round(rng.uniform(1, 3000), 3)} for _ in range(2000)]
+        bill = engine.compute_bill(lines)
+        for line, item in zip(lines, bill['items']):
+            assert to_paise(item['gross']) == engine.line_amount(line['fruit'], line['weight'])
+
+    def test_tie_weight_rounds_half_up(self, engine):
+        # 1000.0005 g is exactly half a milligram past 1000.000 g
+        weight = 1000.0005
+        bill = engine.compute_bill([{'fruit': 'onion', 'weight': weight}])
+        assert to_paise(bill['items'][0]['gross']) == engine.line_amount('onion', weight)
+
+    def test_tax_discount_and_rounding(self):
+        engine = BillingEngine(CATALOG, rounding_unit=50)
+        bill = engine.compute_bill([{'fruit': 'apple', 'weight': 1000},
+                                    {'fruit': 'orange', 'weight': 500}], discount='10%')
+        # apple 150.00 + orange 40.00 - 10% line discount = 186.00
+        assert bill['subtotal'] == 186.00
+        assert bill['discount'] == 18.60
+        assert bill['tax'] == 8.37          # 5% of 167.40
+        assert bill['total'] == 176.00      # 175.77 to the nearest 0.50
+        assert bill['rounding'] == 0.23
+
+    def test_fixed_discount_capped_at_subtotal(self, engine):
+        bill = engine.compute_bill([{'fruit': 'apple', 'weight': 100}], discount='100')
+        assert bill['discount'] == bill['subtotal'] == 15.00
+        assert bill['total'] == 0
+
+    def test_invalid_discount(self, engine):
+        with pytest.raises(ValueError):
+            engine.compute_bill([{'fruit': 'apple', 'weight': 100}], discount='ten')
+
+    def test_unknown_products_are_free(self, engine):
+        bill = engine.compute_bill([{'fruit': 'durian', 'weight': 900}])
+        assert bill['items'][0]['price'] == 0 and bill['total'] == 0
+
+    def test_empty_bill(self, engine):
+        assert engine.compute_bill([])['total'] == 0
+
+
+class TestFixedPrice:
+    def test_unit_lines_ignore_weight(self, engine):
+        bill = engine.compute_bill([{'fruit': 'juice', 'weight': 1040, 'quantity': 3}])
+        item = bill['items'][0]
+        assert (item['pricing'], item['quantity'], item['gross']) == ('unit', 3, 136.50)
+        assert engine.line_amount('juice', 1040, 3) == 13650
+
+    def test_barcode_lookup(self, engine):
+        assert engine.lookup_barcode(' 5901234123457 ') == 'juice'
+        assert engine.lookup_barcode('123') == 'juice'
+        assert engine.lookup_barcode('999') is None
+
+
+class TestAllocate:
+    def test_parts_sum_to_amount(self):
+        rng = random.Random(11)
+        for _ in range(500):
+            weights = np.array([rng.randint(0, 10000) for _ in range(rng.randint(1, 6))])
+            amount = rng.randint(0, int(weights.sum()))
+            parts = _allocate(amount, weights)
+            assert int(parts.sum()) == (amount if weights.sum() else 0)
+            assert all(parts >= 0)
+
+    def test_largest_remainder(self):
+        assert _allocate(10, np.array([1, 1, 1])).tolist() == [4, 3, 3]
+        assert _allocate(100, np.array([50, 25, 25])).tolist() == [50, 25, 25]
+
+    def test_zero(self):
+        assert _allocate(0, np.array([5, 5])).tolist() == [0, 0]
+        assert _allocate(5, np.array([0, 0])).tolist() == [0, 0]
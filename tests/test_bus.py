@@ -0,0 +1,75 @@
+"""Tests for the station bus (need a Redis server, e.g. SBS_TEST_REDIS=redis://localhost:6379/15)."""
+
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+from src.bus import REDIS_AVAILABLE, BusError, StationBus
+
+REDIS_URL = os.environ.get('SBS_TEST_REDIS', 'redis://localhost:6379/15')
+
+
+def _redis_reachable():
+    if not REDIS_AVAILABLE:
+        return False
+    import redis
+    try:
+        return redis.Redis.from_url(REDIS_URL, socket_timeout=0.5).ping()
+    except redis.RedisError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _redis_reachable(), reason=f'no Redis server at {REDIS_URL}')
+
+
+@pytest.fixture
+def bus():
+    bus = StationBus(REDIS_URL, f'test-{uuid.uuid4().hex}', timeout=1.0)
+    yield bus
+    keys = bus.client.keys(bus.snapshot_key.rsplit(':', 1)[0] + ':*')
+    if keys:
+        bus.client.delete(*keys)
+
+
+class TestViews:
+    def test_unpublished_view_is_none(self, bus):
+        assert bus.get_view('metrics') is None
+
+    def test_published_view_round_trip(self, bus):
+        bus.publish_view('inventory', [{'product': 'apple', 'on_hand': 1200, 'low': False}])
+        view = bus.get_view('inventory')
+        assert view['data'] == [{'product': 'apple', 'on_hand': 1200, 'low': False}]
+        assert time.time() - view['ts'] < 5
+        assert bus.stats()['view_reads'] == 1
+
+    def test_empty_snapshot_before_first_publish(self, bus):
+        assert bus.get_snapshot()['v'] == 0
+
+
+class TestForwarding:
+    def test_request_and_reply_round_trip(self, bus):
+        def station():
+            request = bus.next_request(timeout=1)
+            bus.reply(request, 201, request['body'].upper(), 'text/plain', {'X-Seq': '7'})
+
+        thread = threading.Thread(target=station)
+        thread.start()
+        response = bus.forward('POST', '/save', b'a=1', b'body', 'text/plain')
+        thread.join()
+        assert (response['status'], response['body'], response['headers']) == (201, b'BODY', {'X-Seq': '7'})
+        assert (bus.forwarded, bus.served) == (1, 1)
+
+    def test_unanswered_request_times_out(self, bus):
+        with pytest.raises(BusError):
+            bus.forward('GET', '/bill')
+        assert bus.timeouts == 1
+
+    def test_expired_request_is_dropped(self, bus):
+        """The station skips requests whose worker has already answered 503."""
+        with pytest.raises(BusError):
+            bus.forward('GET', '/bill')
+        time.sleep(0.1)
+        assert bus.next_request(timeout=1) is None
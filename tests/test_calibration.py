@@ -0,0 +1,49 @@
+"""Tests for scale calibration fitting and profiles."""
+
+import pytest
+
+from src.calibration import CalibrationError, CalibrationProfile, fit, summarize
+
+
+def points(pairs):
+    return [summarize(reference, [raw]) for reference, raw in pairs]
+
+
+class TestFit:
+    def test_linear_recovers_gain(self):
+        result = fit(points([(0, 10), (500, 260), (1000, 510)]))
+        profile = CalibrationProfile.from_fit(result)
+        assert result['rmse'] == pytest.approx(0.0, abs=1e-6)
+        # Readings are relative to the tared sketch: raw 0 is an empty tray
+        assert profile.apply(0) == pytest.approx(0.0)
+        assert profile.apply(250) == pytest.approx(500.0)
+
+    def test_auto_prefers_quadratic_for_curved_scales(self):
+        curved = [(g, g + 0.0002 * g * g) for g in (0, 250, 500, 1000, 2000)]
+        assert fit(points([(ref, raw) for raw, ref in curved]), 'auto')['model'] == 'quadratic'
+
+    def test_too_few_points(self):
+        with pytest.raises(CalibrationError):
+            fit(points([(0, 0), (500, 250)]), 'quadratic')
+
+    def test_no_readings(self):
+        with pytest.raises(CalibrationError):
+            summarize(500, [])
+
+
+class TestProfile:
+    def test_round_trip(self, tmp_path):
+        profile = CalibrationProfile([2.0, 1.5], scale_id='station-1')
+        path = str(tmp_path / 'station-1.json')
+        profile.save(path)
+        loaded = CalibrationProfile.load(path)
+        assert loaded.coefficients == (2.0, 1.5)
+        assert loaded.apply(100) == pytest.approx(150.0)
+
+    @pytest.mark.parametrize('content', ['{"model": "linear"', '{"model": "linear"}',
+                                         '{"coefficients": [1, "x"]}'])
+    def test_invalid_profiles(self, tmp_path, content):
+        path = tmp_path / 'bad.json'
+        path.write_text(content)
+        with pytest.raises(CalibrationError):
+            CalibrationProfile.load(str(path))
@@ -0,0 +1,127 @@
+"""Tests for the camera supervisor."""
+
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from src.camera import CameraSupervisor, decode_fourcc
+
+
+class FakeCapture:
+    """cv2.VideoCapture stand-in: `frames` good reads, then nothing."""
+
+    def __init__(self, frames=None, fourcc='MJPG', opened=True):
+        self.remaining = frames
+        self.fourcc = fourcc
+        self.opened = opened
+        self.calls = []
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        self.calls.append(prop)
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FOURCC:
+            return cv2.VideoWriter_fourcc(*self.fourcc)
+        return {cv2.CAP_PROP_FRAME_WIDTH: 640, cv2.CAP_PROP_FRAME_HEIGHT: 480,
+                cv2.CAP_PROP_FPS: 30.0}.get(prop, 0.0)
+
+    def read(self):
+        time.sleep(0.002)
+        if self.remaining is not None:
+            if self.remaining <= 0:
+                return False, None
+            self.remaining -= 1
+        return True, np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def release(self):
+        self.opened = False
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def supervisors():
+    started = []
+    yield started
+    for camera in started:
+        camera.stop()
+
+
+def supervisor(started, captures, **kwargs):
+    captures = iter(captures)
+    camera = CameraSupervisor(capture_factory=lambda index: next(captures),
+                              backoff_initial=0.01, **kwargs)
+    started.append(camera)
+    return camera
+
+
+class TestOpen:
+    def test_format_is_set_before_size(self, supervisors):
+        capture = FakeCapture()
+        assert supervisor(supervisors, [capture]).open()
+        assert capture.calls[:3] == [cv2.CAP_PROP_FOURCC, cv2.CAP_PROP_FRAME_WIDTH,
+                                     cv2.CAP_PROP_FRAME_HEIGHT]
+
+    def test_reports_what_the_driver_negotiated(self, supervisors):
+        camera = supervisor(supervisors, [FakeCapture(fourcc='YUYV')], fourcc='MJPG')
+        camera.open()
+        assert camera.stats()['negotiated'] == {'fourcc': 'YUYV', 'resolution': [640, 480], 'fps': 30.0}
+        assert camera.stats()['requested']['fourcc'] == 'MJPG'
+
+    def test_missing_device(self, supervisors):
+        camera = supervisor(supervisors, [FakeCapture(opened=False)], index=3)
+        assert not camera.open()
+        assert camera.last_error == 'cannot open camera 3'
+
+    def test_decode_fourcc(self):
+        assert decode_fourcc(cv2.VideoWriter_fourcc(*'MJPG')) == 'MJPG'
+        assert decode_fourcc(0) is None
+
+
+class TestCapture:
+    def test_frames_are_delivered_rotated(self, supervisors):
+        camera = supervisor(supervisors, [FakeCapture()], rotation=90)
+        camera.start()
+        assert wait_for(lambda: camera.latest()[0] >= 3)
+        assert camera.latest()[1].shape == (640, 480, 3)
+
+    def test_stalled_camera_is_reopened(self, supervisors):
+        camera = supervisor(supervisors, [FakeCapture(frames=2), FakeCapture()], stall_timeout=0.05)
+        camera.start()
+        assert wait_for(lambda: camera.opens == 2 and camera.latest()[0] > 2)
+        assert camera.stalls == 1 and camera.failed_reads > 0
+
+    def test_device_that_fails_to_open_is_retried(self, supervisors):
+        camera = supervisor(supervisors, [FakeCapture(opened=False), FakeCapture(opened=False), FakeCapture()])
+        camera.start()
+        assert wait_for(lambda: camera.latest()[0] > 0)
+        assert camera.opens == 1
+
+    def test_throttle_and_wake(self, supervisors):
+        camera = supervisor(supervisors, [FakeCapture()])
+        camera.throttle(10.0)
+        camera.start()
+        time.sleep(0.2)
+        assert camera.latest()[0] <= 1
+        camera.throttle(None)
+        assert wait_for(lambda: camera.latest()[0] >= 5, timeout=1.0)
+
+
+class TestFrameAccounting:
+    def test_gaps_count_as_dropped_frames(self):
+        camera = CameraSupervisor(fps=30)
+        for now in (0.0, 1 / 30, 2 / 30, 5 / 30):
+            camera._count_frame(now)
+        assert (camera.frames, camera.dropped) == (4, 2)
+        assert camera.actual_fps() == pytest.approx(18.0)
@@ -0,0 +1,97 @@
+"""Tests for settings validation and environment overrides."""
+
+import json
+import os
+
+import pytest
+
+from src.config import (ConfigError, ConfigWatcher, changed_keys, is_live, load_config,
+                        validate)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestRoi:
+    @pytest.mark.parametrize('key', ['detection_cache', 'barcode'])
+    @pytest.mark.parametrize('roi', [None, [0, 0, 1, 1], [0.2, 0.1, 0.8, 0.9]])
+    def test_valid(self, key, roi):
+        assert validate({key: {'roi': roi}})
+
+    @pytest.mark.parametrize('key', ['detection_cache', 'barcode'])
+    @pytest.mark.parametrize('roi', [[0, 0, 1], [0, 0, 1.5, 1], [0.5, 0, 0.2, 1],
+                                     [True, 0, 1, 1], 'tray'])
+    def test_invalid(self, key, roi):
+        with pytest.raises(ConfigError, match=f'{key}.roi'):
+            validate({key: {'roi': roi}})
+
+
+class TestValidate:
+    def test_example_settings_are_valid(self):
+        with open(os.path.join(ROOT, 'config', 'settings.example.json')) as f:
+            assert validate(json.load(f))
+
+    @pytest.mark.parametrize('settings, message', [
+        ({'camera': {'fps': 'fast'}}, 'camera.fps: expected int/float'),
+        ({'camera': {'fps': 0}}, 'camera.fps: 0 is outside'),
+        ({'power': {'enabled': 1}}, 'power.enabled: expected bool'),
+        ({'sync': {'batch_size': True}}, 'sync.batch_size: expected int'),
+        ({'camera': {'rotation': 45}}, 'camera.rotation: 45 is not one of'),
+        ({'camera': {'resolution': [640]}}, 'camera.resolution'),
+        ({'camera': 'usb'}, 'camera: expected an object'),
+        ({'performance': {'levels': [{'imgsz': 640}]}}, r'performance.levels\[0\]: missing'),
+        ({'performance': {'levels': [[1, 2]]}}, r'performance.levels\[0\]: expected an object'),
+        ({'performance': {'levels': ['low']}}, r'performance.levels\[0\]: expected an object'),
+        ({'performance': {'levels': [{'imgsz': 640, 'detect_interval': 0.1,
+                                      'jpeg_quality': 101, 'preview_fps': 10}]}},
+         r'performance.levels\[0\].jpeg_quality'),
+    ])
+    def test_errors_name_the_key(self, settings, message):
+        with pytest.raises(ConfigError, match=message):
+            validate(settings)
+
+    def test_not_an_object(self):
+        with pytest.raises(ConfigError):
+            validate([])
+
+    def test_unknown_keys_are_allowed(self):
+        assert validate({'camera': {'vendor': 'acme'}, 'custom': {'x': 1}})
+
+
+class TestLoadConfig:
+    def test_env_overrides_are_parsed_and_validated(self, tmp_path):
+        path = tmp_path / 'settings.json'
+        path.write_text('{"yolo": {"confidence": 0.5}}')
+        settings = load_config(str(path), environ={'SBS_YOLO__CONFIDENCE': '0.4',
+                                                   'SBS_SCALE__PORT': '/dev/ttyUSB0'})
+        assert settings['yolo']['confidence'] == 0.4
+        assert settings['scale']['port'] == '/dev/ttyUSB0'
+        with pytest.raises(ConfigError, match='camera.fps'):
+            load_config(str(path), environ={'SBS_CAMERA__FPS': '1000'})
+
+    def test_invalid_json(self, tmp_path):
+        path = tmp_path / 'settings.json'
+        path.write_text('{"camera": ')
+        with pytest.raises(ConfigError, match='settings.json'):
+            load_config(str(path), environ={})
+
+    def test_missing_file_gives_overrides_only(self, tmp_path):
+        assert load_config(str(tmp_path / 'none.json'), environ={}) == {}
+
+
+class TestReload:
+    def test_changed_keys_and_live_split(self):
+        old = {'yolo': {'confidence': 0.5, 'model': 'a.pt'}, 'barcode': {'enabled': True}}
+        new = {'yolo': {'confidence': 0.4, 'model': 'b.pt'}, 'barcode': {'enabled': False}}
+        keys = changed_keys(old, new)
+        assert keys == ['barcode.enabled', 'yolo.confidence', 'yolo.model']
+        assert [key for key in keys if is_live(key)] == ['barcode.enabled', 'yolo.confidence']
+
+    def test_rejected_reload_keeps_settings(self, tmp_path):
+        path = tmp_path / 'settings.json'
+        path.write_text('{"yolo": {"confidence": 0.5}}')
+        watcher = ConfigWatcher(str(path), settings={'yolo': {'confidence': 0.5}})
+        watcher.mtime = None
+        path.write_text('{"yolo": {"confidence": 5}}')
+        assert watcher.poll() is None
+        assert watcher.stats()['rejected'] == 1
+        assert watcher.settings == {'yolo': {'confidence': 0.5}}
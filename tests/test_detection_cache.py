@@ -0,0 +1,84 @@
+"""Tests for the dHash detection cache."""
+
+import cv2
+import numpy as np
+import pytest
+
+from src.detection_cache import DetectionCache, dhash, hamming
+
+
+def tray(seed=0):
+    """A 640x480 textured frame with a few coloured blobs."""
+    rng = np.random.default_rng(seed)
+    frame = cv2.resize(rng.integers(40, 220, (6, 8, 3), dtype=np.uint8), (640, 480),
+                       interpolation=cv2.INTER_CUBIC)
+    for _ in range(5):
+        center = (int(rng.integers(60, 580)), int(rng.integers(60, 420)))
+        cv2.circle(frame, center, int(rng.integers(20, 80)), [int(c) for c in rng.integers(0, 255, 3)], -1)
+    return frame
+
+
+def noisy(frame, seed=1):
+    rng = np.random.default_rng(seed)
+    return cv2.add(frame, rng.integers(0, 4, frame.shape, dtype=np.uint8))
+
+
+class TestHash:
+    def test_sensor_noise_stays_close(self):
+        assert hamming(dhash(tray()), dhash(noisy(tray()))) <= 4
+
+    def test_different_tray_is_far(self):
+        assert hamming(dhash(tray(0)), dhash(tray(7))) > 10
+
+    def test_roi_ignores_changes_outside(self):
+        frame = tray()
+        changed = frame.copy()
+        changed[:, :160] = 255
+        roi = (0.5, 0.0, 1.0, 1.0)
+        assert dhash(frame, roi) == dhash(changed, roi)
+        assert dhash(frame) != dhash(changed)
+
+
+class TestDetectionCache:
+    @pytest.fixture
+    def cache(self):
+        return DetectionCache(max_entries=2, max_distance=4, ttl=5.0)
+
+    def test_near_match_hits(self, cache):
+        cache.put(dhash(tray()), 'apple', context=640, now=0.0)
+        assert cache.get(dhash(noisy(tray())), context=640, now=1.0) == 'apple'
+        assert cache.stats()['hit_rate'] == 1.0
+
+    def test_distance_beyond_limit_misses(self, cache):
+        cache.put(0, 'apple', now=0.0)
+        assert cache.get(0b11111, now=1.0) is None
+        assert cache.get(0b1111, now=1.0) == 'apple'
+
+    def test_context_must_match(self, cache):
+        """A result computed at another inference size is not reused."""
+        cache.put(0, 'apple', context=640, now=0.0)
+        assert cache.get(0, context=320, now=1.0) is None
+
+    def test_closest_entry_wins(self, cache):
+        cache.put(0b1000, 'banana', now=0.0)
+        cache.put(0b11, 'apple', now=0.0)
+        assert cache.get(0b1, now=1.0) == 'apple'
+
+    def test_expired_entries_are_dropped(self, cache):
+        cache.put(0, 'apple', now=0.0)
+        assert cache.get(0, now=5.5) is None
+        assert (cache.stats()['expired'], cache.stats()['entries']) == (1, 0)
+
+    def test_least_recently_used_is_evicted(self, cache):
+        cache.put(0, 'apple', now=0.0)
+        cache.put(0xFFFF, 'banana', now=0.0)
+        cache.get(0, now=1.0)
+        cache.put(0xFFFF0000, 'orange', now=1.0)
+        assert cache.get(0xFFFF, now=1.0) is None
+        assert cache.get(0, now=1.0) == 'apple'
+        assert cache.stats()['evicted'] == 1
+
+    def test_disabled_always_misses(self):
+        cache = DetectionCache(enabled=False)
+        cache.put(0, 'apple')
+        assert cache.get(0) is None
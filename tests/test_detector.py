@@ -0,0 +1,75 @@
+"""Tests for YOLO result post-processing."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from src.detector import NO_PRODUCT, best_detection, build_class_lookup, select_detections
+
+
+CATALOG = ['apple', 'banana', 'orange']
+MAPPING = {'apple': 'apple', 'banana': 'banana', 'orange': 'orange', 'green apple': 'apple'}
+
+
+class _Boxes:
+    """The part of an ultralytics Boxes object the detector uses."""
+
+    def __init__(self, rows):
+        self.data = torch.tensor(rows, dtype=torch.float32).reshape(-1, 6)
+
+    def __len__(self):
+        return len(self.data)
+
+
+def result(*rows):
+    """A Results object with (x1, y1, x2, y2, conf, cls) rows."""
+    return SimpleNamespace(boxes=_Boxes(list(rows)))
+
+
+class TestClassLookup:
+    def test_coco_style_names(self):
+        names = {0: 'person', 46: 'Banana', 47: 'apple', 49: 'orange'}
+        lookup = build_class_lookup(names, MAPPING, CATALOG)
+        assert len(lookup) == 50
+        assert (lookup[46], lookup[47], lookup[49]) == (1, 0, 2)
+        assert lookup[0] == NO_PRODUCT and lookup[10] == NO_PRODUCT
+
+    def test_list_names_and_aliases(self):
+        lookup = build_class_lookup(['green apple', 'kiwi'], MAPPING, CATALOG)
+        assert list(lookup) == [0, NO_PRODUCT]
+
+    def test_mapped_product_missing_from_catalog(self):
+        lookup = build_class_lookup(['mango'], {'mango': 'mango'}, CATALOG)
+        assert list(lookup) == [NO_PRODUCT]
+
+
+class TestSelectDetections:
+    lookup = build_class_lookup({0: 'person', 1: 'apple', 2: 'banana'}, MAPPING, CATALOG)
+
+    def test_keeps_only_mapped_classes(self):
+        index, conf, boxes = select_detections(
+            result([0, 0, 10, 10, 0.9, 0], [5, 5, 20, 20, 0.7, 1], [1, 2, 3, 4, 0.6, 2]),
+            self.lookup, with_boxes=True)
+        assert list(index) == [0, 1]
+        assert np.allclose(conf, [0.7, 0.6])
+        assert boxes.tolist() == [[5, 5, 20, 20], [1, 2, 3, 4]]
+
+    def test_class_outside_table_is_dropped(self):
+        """A model swapped under the lookup cannot index past its end."""
+        index, conf = select_detections(result([0, 0, 1, 1, 0.9, 80], [0, 0, 1, 1, 0.5, 2]),
+                                        self.lookup)
+        assert list(index) == [1] and np.allclose(conf, [0.5])
+
+    def test_no_boxes(self):
+        for empty in (SimpleNamespace(boxes=None), result()):
+            index, conf, boxes = select_detections(empty, self.lookup, with_boxes=True)
+            assert (len(index), len(conf), boxes.shape) == (0, 0, (0, 4))
+
+
+class TestBestDetection:
+    def test_most_confident(self):
+        assert best_detection(np.array([0, 2, 1]), np.array([0.4, 0.8, 0.6])) == (2, 0.8)
+
+    def test_nothing_detected(self):
+        assert best_detection(np.empty(0, dtype=np.intp), np.empty(0)) == (NO_PRODUCT, 0.0)
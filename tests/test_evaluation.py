@@ -0,0 +1,76 @@
+"""Tests for offline detector evaluation scoring."""
+
+import json
+import os
+
+import numpy as np
+
+from src.detector import build_class_lookup
+from src.evaluation import NONE_LABEL, load_dataset, load_mapping, predict, recommend, score
+
+
+CATALOG = ['apple', 'banana']
+LOOKUP = build_class_lookup({0: 'person', 1: 'apple', 2: 'banana'},
+                            {'apple': 'apple', 'banana': 'banana'}, CATALOG)
+
+
+def detections(*boxes):
+    """(class_ids, confidences) arrays for one image."""
+    return (np.array([cls for cls, _ in boxes], dtype=np.intp),
+            np.array([conf for _, conf in boxes], dtype=np.float32))
+
+
+class TestPredict:
+    def test_most_confident_mapped_detection_wins(self):
+        images = [detections((0, 0.95), (1, 0.6), (2, 0.8)), detections((1, 0.7))]
+        assert predict(images, LOOKUP, CATALOG, 0.5) == ['banana', 'apple']
+
+    def test_below_threshold_or_unmapped_is_none(self):
+        images = [detections((2, 0.4)), detections((0, 0.9), (7, 0.9)), detections()]
+        assert predict(images, LOOKUP, CATALOG, 0.5) == [NONE_LABEL] * 3
+
+
+class TestScore:
+    def test_precision_recall_and_confusion(self):
+        labels = ['apple', 'apple', 'banana', 'none']
+        predictions = ['apple', 'banana', 'banana', 'banana']
+        result = score(labels, predictions)
+        assert result['classes'] == ['apple', 'banana', 'none']
+        assert result['per_product']['apple'] == {'precision': 1.0, 'recall': 0.5, 'support': 2}
+        assert result['per_product']['banana'] == {'precision': 0.3333, 'recall': 1.0, 'support': 1}
+        assert result['confusion_matrix'] == [[1, 1, 0], [0, 1, 0], [0, 1, 0]]
+        assert result['accuracy'] == 0.5
+
+    def test_predicted_product_without_images_is_not_averaged(self):
+        result = score(['apple', 'none'], ['apple', 'orange'])
+        assert result['per_product']['orange']['support'] == 0
+        assert result['macro_precision'] == 1.0
+
+
+class TestRecommend:
+    def config(self, p50, precision, recall, accuracy=0.9):
+        return {'latency': {'p50_ms': p50}, 'macro_precision': precision,
+                'macro_recall': recall, 'accuracy': accuracy}
+
+    def test_fastest_configuration_meeting_the_bar(self):
+        results = [self.config(40, 0.95, 0.9), self.config(15, 0.80, 0.9), self.config(25, 0.92, 0.88)]
+        assert recommend(results, min_precision=0.9, min_recall=0.85) is results[2]
+
+    def test_nothing_qualifies(self):
+        assert recommend([self.config(10, 0.5, 0.5)], min_precision=0.9) is None
+
+
+class TestDatasetLoading:
+    def test_folders_are_labels(self, tmp_path):
+        for label, name in (('Apple', 'a.jpg'), ('none', 'b.PNG'), ('none', 'notes.txt')):
+            (tmp_path / label).mkdir(exist_ok=True)
+            (tmp_path / label / name).write_bytes(b'')
+        samples = load_dataset(str(tmp_path))
+        assert [(os.path.basename(path), label) for path, label in samples] == [
+            ('a.jpg', 'apple'), ('b.PNG', 'none')]
+
+    def test_mapping_file_keys_are_lowercased(self, tmp_path):
+        path = tmp_path / 'aliases.json'
+        path.write_text(json.dumps({'Green Apple': 'apple'}))
+        assert load_mapping(str(path)) == ('aliases', {'green apple': 'apple'})
+        assert load_mapping('identity') == ('identity', None)
@@ -0,0 +1,136 @@
+"""Tests for the stock ledger."""
+
+import sqlite3
+
+import pytest
+
+from src.inventory import InventoryError, InventoryLedger, parse_stock_csv
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = InventoryLedger(str(tmp_path / 'inventory.db'))
+    yield ledger
+    ledger.close()
+
+
+class TestPieces:
+    def test_packaged_sale_decrements_pieces(self, ledger):
+        """A barcoded sale takes packs out of stock, whatever the scale read."""
+        ledger.stock_in([('orange_juice_1l', 24, 6, 'pc')])
+        stock = ledger.record_sale('orange_juice_1l', 0.0, pieces=2)
+        assert (stock['on_hand'], stock['unit']) == (22, 'pc')
+        assert 'on_hand_g' not in stock
+
+    def test_weighed_sale_decrements_grams(self, ledger):
+        ledger.stock_in([('apple', 5000, 1000)])
+        stock = ledger.record_sale('apple', 250.0)
+        assert (stock['on_hand_g'], stock['unit']) == (4750, 'g')
+
+    def test_unit_mismatch_with_stock_on_hand(self, ledger):
+        ledger.stock_in([('apple', 5000, None)])
+        with pytest.raises(InventoryError):
+            ledger.record_sale('apple', 0.0, pieces=1)
+
+    def test_mixed_unit_import_applies_nothing(self, ledger):
+        """A row in the wrong unit rejects the whole delivery, earlier rows included."""
+        ledger.stock_in([('apple', 5000, None)])
+        with pytest.raises(InventoryError):
+            ledger.stock_in([('banana', 1000, None, 'g'), ('apple', 3, None, 'pc')])
+        assert ledger.get('banana') is None
+        assert ledger.get('apple')['on_hand'] == 5000
+        assert [move['product'] for move in ledger.movements()] == ['apple']
+
+    def test_empty_product_switches_unit(self, ledger):
+        """A 0 g sale recorded before piece counts does not block piece sales."""
+        ledger.record_sale('orange_juice_1l', 0.0)
+        stock = ledger.record_sale('orange_juice_1l', 0.0, pieces=1)
+        assert (stock['on_hand'], stock['unit']) == (-1, 'pc')
+
+    def test_units_survive_reopen(self, tmp_path):
+        path = str(tmp_path / 'inventory.db')
+        ledger = InventoryLedger(path)
+        ledger.stock_in([('orange_juice_1l', 10, 2, 'pc')])
+        ledger.record_sale('orange_juice_1l', 0.0, pieces=3)
+        ledger.close()
+        ledger = InventoryLedger(path)
+        try:
+            assert ledger.get('orange_juice_1l')['on_hand'] == 7
+            assert ledger.movements('orange_juice_1l')[0]['unit'] == 'pc'
+        finally:
+            ledger.close()
+
+    def test_migrates_ledger_without_units(self, tmp_path):
+        path = str(tmp_path / 'inventory.db')
+        db = sqlite3.connect(path)
+        db.executescript('''
+            CREATE TABLE stock (product TEXT PRIMARY KEY, on_hand_g REAL NOT NULL DEFAULT 0,
+                                reorder_level_g REAL NOT NULL DEFAULT 0, updated TEXT);
+            CREATE TABLE movements (id INTEGER PRIMARY KEY, ts TEXT NOT NULL, product TEXT NOT NULL,
+                                    delta_g REAL NOT NULL, kind TEXT NOT NULL, station TEXT, ref TEXT);
+            INSERT INTO stock VALUES ('apple', 1200, 500, '2026-01-01');
+        ''')
+        db.close()
+        ledger = InventoryLedger(path)
+        try:
+            assert ledger.get('apple')['on_hand_g'] == 1200
+            assert ledger.get('apple')['unit'] == 'g'
+            assert ledger.get('apple')['tracked']
+        finally:
+            ledger.close()
+
+
+class TestLowStock:
+    @pytest.fixture
+    def alerts(self, tmp_path):
+        events = []
+        ledger = InventoryLedger(str(tmp_path / 'inventory.db'), default_reorder_level=500.0,
+                                 on_low_stock=events.append)
+        yield ledger, events
+        ledger.close()
+
+    def test_crossing_the_level_alerts_once(self, alerts):
+        ledger, events = alerts
+        ledger.stock_in([('apple', 1000, None)])
+        ledger.record_sale('apple', 600.0)
+        ledger.record_sale('apple', 100.0)
+        assert [event['on_hand'] for event in events] == [400]
+
+    def test_never_stocked_product_does_not_alert(self, alerts):
+        """Selling an item nobody stocked records the sale without a low-stock alert."""
+        ledger, events = alerts
+        stock = ledger.record_sale('mango', 300.0)
+        assert (stock['on_hand'], stock['tracked'], stock['low']) == (-300, False, False)
+        assert events == [] and ledger.levels(low_only=True) == []
+
+    def test_first_delivery_starts_tracking(self, alerts):
+        ledger, events = alerts
+        ledger.record_sale('mango', 300.0)
+        ledger.stock_in([('mango', 1000, None)])
+        ledger.record_sale('mango', 400.0)
+        assert [event['on_hand'] for event in events] == [300]
+
+    def test_tracking_survives_reopen(self, tmp_path):
+        path = str(tmp_path / 'inventory.db')
+        ledger = InventoryLedger(path)
+        ledger.record_sale('mango', 300.0)
+        ledger.stock_in([('apple', 100, 500)])
+        ledger.close()
+        ledger = InventoryLedger(path)
+        try:
+            assert not ledger.get('mango')['tracked']
+            assert [stock['product'] for stock in ledger.levels(low_only=True)] == ['apple']
+        finally:
+            ledger.close()
+
+
+class TestStockCsv:
+    def test_grams_kg_and_pieces(self):
+        rows = parse_stock_csv('product,grams,kg,pieces,reorder_level\n'
+                               'Apple,2500,,,500\nbanana,,1.5,,\njuice,,,12,3\n')
+        assert rows == [('apple', 2500.0, 500.0, 'g'), ('banana', 1500.0, None, 'g'),
+                        ('juice', 12.0, 3.0, 'pc')]
+
+    def test_missing_quantity_column(self):
+        with pytest.raises(InventoryError):
+            parse_stock_csv('product,reorder_level\napple,5\n')
@@ -0,0 +1,35 @@
+"""Tests for invoice rendering and the bulk re-render tool."""
+
+from src.billing import BillingEngine
+from src.invoice import MAX_JOB_HISTORY, InvoiceRenderer, InvoiceWorkerPool, rerender
+
+
+def make_invoices(directory, count):
+    engine = BillingEngine({'apple': {'price_per_kg': 150}})
+    renderer = InvoiceRenderer({}, str(directory))
+    bill = engine.compute_bill([{'fruit': 'apple', 'weight': 250}])
+    return [renderer.create_invoice(bill) for _ in range(count)]
+
+
+class TestRerender:
+    def test_more_invoices_than_job_history(self, tmp_path):
+        """Every invoice gets a result even after its job left the status history."""
+        make_invoices(tmp_path, MAX_JOB_HISTORY + 5)
+        results = rerender(str(tmp_path), formats=('txt',), workers=4)
+        assert len(results) == MAX_JOB_HISTORY + 5
+        assert all(result['state'] == 'done' for result in results)
+        assert len(list(tmp_path.glob('*.txt'))) == MAX_JOB_HISTORY + 5
+
+    def test_evicted_job_is_still_reported(self, tmp_path):
+        """on_done receives a job's final state even after it was evicted."""
+        invoice = make_invoices(tmp_path, 1)[0]
+        finished = []
+        pool = InvoiceWorkerPool(InvoiceRenderer({}, str(tmp_path)), workers=1,
+                                 on_done=finished.append)
+        pool.job_status.clear()  # as if MAX_JOB_HISTORY newer jobs had been submitted
+        pool.jobs.put(('job-0', invoice, ('txt',)))
+        pool.join()
+        pool.stop()
+        assert finished[0]['job_id'] == 'job-0'
+        assert finished[0]['invoice_id'] == invoice['invoice_id']
+        assert finished[0]['state'] == 'done'
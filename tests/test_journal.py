@@ -0,0 +1,121 @@
+"""Tests for the crash-safe readings journal."""
+
+import json
+import os
+
+import pytest
+
+from src import journal as journal_module
+from src.journal import JournalError, ReadingsJournal
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'readings.json')
+
+
+def open_journal(path, tmp_path, durable=True):
+    return ReadingsJournal(path, archive_dir=str(tmp_path / 'archive'), durable=durable)
+
+
+class TestRecovery:
+    def test_torn_tail_is_cut_and_kept(self, path, tmp_path):
+        """A half-written last record is removed on open and saved to .torn."""
+        journal = open_journal(path, tmp_path)
+        journal.append({'fruit': 'apple', 'weight': 100})
+        journal.append({'fruit': 'banana', 'weight': 200})
+        journal.close()
+        with open(path, 'ab') as f:
+            f.write(b'{"fruit": "orange", "wei')
+
+        journal = open_journal(path, tmp_path)
+        try:
+            assert journal.recovered_bytes == len(b'{"fruit": "orange", "wei')
+            assert [r['fruit'] for r in journal.read_all()] == ['apple', 'banana']
+            # Appends after recovery start on a clean line
+            journal.append({'fruit': 'kiwi', 'weight': 50})
+            assert [r['fruit'] for r in journal.read_all()] == ['apple', 'banana', 'kiwi']
+        finally:
+            journal.close()
+        with open(f"{path}.torn", 'rb') as f:
+            assert f.read() == b'{"fruit": "orange", "wei\n'
+
+    def test_zero_filled_tail(self, path, tmp_path):
+        """Zeros left by a crash after the file grew are dropped as well."""
+        with open(path, 'wb') as f:
+            f.write(json.dumps({'fruit': 'apple'}).encode() + b'\n' + b'\x00' * 64)
+        journal = open_journal(path, tmp_path)
+        try:
+            assert journal.recovered_bytes == 64
+            assert journal.read_all() == [{'fruit': 'apple'}]
+        finally:
+            journal.close()
+
+    def test_clean_file_untouched(self, path, tmp_path):
+        journal = open_journal(path, tmp_path)
+        journal.append({'fruit': 'apple'})
+        journal.close()
+        journal = open_journal(path, tmp_path)
+        try:
+            assert journal.recovered_bytes == 0
+        finally:
+            journal.close()
+
+
+class TestAppend:
+    def test_durable_append_is_synced(self, path, tmp_path):
+        journal = open_journal(path, tmp_path)
+        try:
+            seq = journal.append({'fruit': 'apple'})
+            assert journal.synced_seq >= seq
+            assert journal.stats()['unsynced'] == 0
+        finally:
+            journal.close()
+
+    def test_durable_fsync_runs_on_sync_thread(self, path, tmp_path, monkeypatch):
+        """The caller never fsyncs itself, so a green thread cannot block the hub."""
+        callers = []
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            callers.append(journal_module.threading.current_thread().name)
+            real_fsync(fd)
+
+        monkeypatch.setattr(journal_module.os, 'fsync', fsync)
+        journal = open_journal(path, tmp_path)
+        try:
+            journal.append({'fruit': 'apple'})
+            journal.append({'fruit': 'banana'})
+            assert callers and set(callers) == {'JournalSyncThread'}
+        finally:
+            journal.close()
+
+    def test_durable_append_fails_when_sync_times_out(self, path, tmp_path, monkeypatch):
+        failing = [True]
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            if failing[0]:
+                raise OSError('disk full')
+            real_fsync(fd)
+
+        monkeypatch.setattr(journal_module.os, 'fsync', fsync)
+        journal = ReadingsJournal(path, archive_dir=str(tmp_path / 'archive'), sync_timeout=0.2)
+        try:
+            with pytest.raises(JournalError, match='not synced'):
+                journal.append({'fruit': 'apple'})
+        finally:
+            failing[0] = False
+            journal.close()
+
+    def test_archive_starts_empty_journal(self, path, tmp_path):
+        journal = open_journal(path, tmp_path, durable=False)
+        try:
+            journal.append({'fruit': 'apple'})
+            archived = journal.archive()
+            assert journal.read_all() == []
+            with open(archived) as f:
+                assert json.loads(f.readline()) == {'fruit': 'apple'}
+            assert journal.archive() is None
+        finally:
+            journal.close()
@@ -0,0 +1,94 @@
+"""Tests for the load-testing harness helpers."""
+
+import requests
+
+from benchmarks.load_test import Recorder, Viewer, _call, compare, percentile, summarize
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        if self.body is None:
+            raise ValueError('not JSON')
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def request(self, method, url, **kwargs):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+class TestStatistics:
+    def test_nearest_rank_percentile(self):
+        values = list(range(1, 101))
+        assert (percentile(values, 50), percentile(values, 99), percentile(values, 100)) == (50, 99, 100)
+        assert percentile([7], 90) == 7
+        assert percentile([], 50) is None
+
+    def test_summary_in_milliseconds(self):
+        assert summarize([0.003, 0.001, 0.002]) == {'count': 3, 'p50': 2.0, 'p90': 3.0,
+                                                    'p99': 3.0, 'max': 3.0}
+        assert summarize([])['p50'] is None
+
+
+class TestCall:
+    def outcome(self, result):
+        recorder = Recorder()
+        _call(FakeSession(result), recorder, 'save', 'POST', 'http://station/save')
+        return dict(recorder.counts), len(recorder.samples['save'])
+
+    def test_success(self):
+        assert self.outcome(FakeResponse(200, {'success': True})) == ({'save.ok': 1}, 1)
+
+    def test_rejected_by_the_route(self):
+        """e.g. /save with an empty tray answers 200 with success=False."""
+        assert self.outcome(FakeResponse(200, {'success': False})) == ({'save.rejected': 1}, 1)
+
+    def test_http_error_and_connection_error(self):
+        assert self.outcome(FakeResponse(503, {})) == ({'save.errors': 1}, 1)
+        assert self.outcome(requests.ConnectionError()) == ({'save.errors': 1}, 0)
+
+
+class TestViewer:
+    def viewer(self):
+        viewer = Viewer('http://station', ['websocket'], Recorder())
+        viewer.emitted = []
+        viewer.client.emit = lambda event, *args: viewer.emitted.append(event)
+        return viewer
+
+    def delta(self, base, v):
+        return {'base': base, 'v': v, 'ts': 0.0, 'changes': {}}
+
+    def test_deltas_in_order_are_applied(self):
+        viewer = self.viewer()
+        viewer._on_snapshot({'v': 5, 'data': {}})
+        viewer._on_delta(self.delta(5, 6))
+        viewer._on_delta(self.delta(6, 7))
+        assert viewer.version == 7 and viewer.emitted == []
+
+    def test_gap_counts_dropped_and_resyncs(self):
+        viewer = self.viewer()
+        viewer._on_snapshot({'v': 5, 'data': {}})
+        viewer._on_delta(self.delta(8, 9))
+        viewer._on_delta(self.delta(9, 10))
+        counts = viewer.recorder.counts
+        assert (counts['dropped'], counts['resyncs'], counts['discarded']) == (3, 1, 1)
+        assert viewer.emitted == ['resync'] and viewer.version is None
+
+
+class TestCompare:
+    def test_change_against_baseline(self, capsys):
+        row = {'p50': 10.0, 'p99': 40.0}
+        results = {'http': {'save': row, 'bill': row, 'clear': row}, 'events': {'lag': row}}
+        baseline = {'http': {'save': {'p50': 8.0, 'p99': 50.0}}, 'events': {}}
+        compare(results, baseline)
+        save = next(line for line in capsys.readouterr().out.splitlines() if line.startswith('save'))
+        assert '+25%' in save and '-20%' in save
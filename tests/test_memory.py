@@ -0,0 +1,78 @@
+"""Tests for memory growth detection."""
+
+import time
+import tracemalloc
+
+import pytest
+
+from src.memory import MB, MemoryMonitor, detect_growth
+
+
+def series(values, interval=60.0, key='rss'):
+    return [{'time': i * interval, key: value} for i, value in enumerate(values)]
+
+
+class TestDetectGrowth:
+    def test_steady_leak_is_growing(self):
+        """20 MB per hour, sampled every minute for an hour."""
+        samples = series([100 * MB + i * MB / 3 for i in range(60)])
+        verdict = detect_growth(samples, limit_per_hour=5.0)
+        assert verdict['growing']
+        assert verdict['slope_per_hour'] == pytest.approx(20.0, rel=0.01)
+        assert verdict['increase'] > 0
+
+    def test_flat_noisy_series_is_not_growing(self):
+        samples = series([100 * MB + (i % 5) * MB for i in range(60)])
+        assert not detect_growth(samples, limit_per_hour=5.0)['growing']
+
+    def test_one_step_is_not_sustained_growth(self):
+        """A cache filling once raises the later thirds equally; the medians must keep rising."""
+        samples = series([100 * MB] * 20 + [150 * MB] * 40)
+        verdict = detect_growth(samples, limit_per_hour=5.0)
+        assert verdict['slope_per_hour'] > 5.0 and not verdict['growing']
+
+    def test_warmup_is_ignored(self):
+        """Model loading and first requests grow RSS for a while after startup."""
+        samples = series([100 * MB + min(i, 30) * MB for i in range(60)])
+        assert detect_growth(samples, limit_per_hour=5.0)['growing']
+        verdict = detect_growth(samples, limit_per_hour=5.0, warmup=1800.0)
+        assert not verdict['growing'] and verdict['samples'] == 30
+
+    def test_too_few_samples(self):
+        verdict = detect_growth(series([1, 2, 3, 4], key='threads'), 'threads', 1.0, 1)
+        assert verdict == {'growing': False, 'slope_per_hour': None, 'increase': None, 'samples': 4}
+
+    def test_thread_count_series(self):
+        samples = series(list(range(10, 40)), key='threads')
+        assert detect_growth(samples, 'threads', limit_per_hour=1.0, unit=1)['growing']
+
+    def test_missing_values_are_skipped(self):
+        samples = series([None] * 30)
+        assert detect_growth(samples)['samples'] == 0
+
+
+class TestMemoryMonitor:
+    def test_tick_respects_interval(self):
+        monitor = MemoryMonitor(interval=60.0)
+        monitor.tick()
+        monitor.tick(now=time.time() + 30)
+        assert len(monitor.history()) == 1
+        assert monitor.stats()['latest']['rss'] > 0
+
+    def test_history_is_bounded(self):
+        monitor = MemoryMonitor(history=3)
+        for _ in range(5):
+            monitor.sample()
+        monitor.resize(2)
+        assert len(monitor.history()) == 2
+
+    def test_tracemalloc_diff(self):
+        monitor = MemoryMonitor(tracemalloc_frames=1)
+        try:
+            retained = [bytearray(1024) for _ in range(200)]
+            monitor.sample()
+            assert monitor.diff(limit=5) and monitor.top(limit=5)
+            assert 'traced' in monitor.growth()
+        finally:
+            monitor.set_tracemalloc(0)
+        assert not tracemalloc.is_tracing() and retained
@@ -0,0 +1,12 @@
+"""Tests for the model registry."""
+
+import pytest
+
+from src.model_registry import ModelRegistry, RegistryError
+
+
+class TestVerify:
+    def test_empty_registry_has_no_active_model(self, tmp_path):
+        """verify() without a version on an empty registry raises RegistryError."""
+        with pytest.raises(RegistryError, match='No active model'):
+            ModelRegistry(str(tmp_path)).verify(None)
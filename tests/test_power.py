@@ -0,0 +1,80 @@
+"""Tests for the idle power-save state machine."""
+
+import threading
+import time
+
+import pytest
+
+from src.power import ACTIVE, IDLE, PowerManager
+
+
+@pytest.fixture
+def changes():
+    return []
+
+
+@pytest.fixture
+def power(changes):
+    return PowerManager(idle_after=30.0, weight_threshold=5.0, on_change=changes.append)
+
+
+def later(seconds):
+    return time.monotonic() + seconds
+
+
+class TestTransitions:
+    def test_goes_idle_after_quiet_period(self, power, changes):
+        power.weight(0.0, now=later(10))
+        assert power.state == ACTIVE
+        power.weight(0.0, now=later(31))
+        assert power.is_idle and changes == [IDLE]
+        assert not power.wait(0)
+
+    def test_connected_viewer_keeps_it_active(self, power):
+        power.client_connected()
+        power.weight(0.0, now=later(120))
+        assert power.state == ACTIVE
+
+    def test_countdown_starts_with_last_viewer_leaving(self, power):
+        power.client_connected()
+        power.client_disconnected()
+        power.weight(0.0, now=later(29))
+        assert power.state == ACTIVE
+        power.weight(0.0, now=later(31))
+        assert power.is_idle
+
+    def test_item_on_tray_keeps_it_active(self, power):
+        for offset in (10, 20, 40):
+            power.weight(250.0, now=later(offset))
+        assert power.state == ACTIVE
+
+    def test_weight_change_wakes(self, power, changes):
+        power.weight(1.0, now=later(31))
+        power.weight(3.0, now=later(32))
+        assert power.is_idle
+        power.weight(150.0, now=later(33))
+        assert power.state == ACTIVE and power.wait(0)
+        assert changes == [IDLE, ACTIVE] and power.stats()['last_wake_reason'] == 'weight'
+
+    def test_viewer_wakes_parked_thread(self, power):
+        power.weight(0.0, now=later(31))
+        woke = []
+        thread = threading.Thread(target=lambda: woke.append(power.wait(5)))
+        thread.start()
+        power.client_connected()
+        thread.join(5)
+        assert woke == [True] and power.stats()['last_wake_reason'] == 'viewer'
+
+    def test_disabled_never_idles_and_disabling_wakes(self, power):
+        power.weight(0.0, now=later(31))
+        power.set_enabled(False)
+        assert power.state == ACTIVE
+        power.weight(0.0, now=later(300))
+        assert power.state == ACTIVE
+
+    def test_idle_time_is_accounted(self, power):
+        start = later(31)
+        power.update(start)
+        power.activity('request', now=start + 12)
+        stats = power.stats()
+        assert (stats['idle_seconds'], stats['transitions']) == (12.0, 2)
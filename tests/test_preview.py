@@ -0,0 +1,77 @@
+"""Tests for the background preview encoder."""
+
+import base64
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from src.preview import PreviewEncoder, confidence_color
+
+
+def camera_frame(height=480, width=640):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+def decoded(data):
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+@pytest.fixture
+def encoder():
+    encoder = PreviewEncoder(width=320, backend='opencv')
+    yield encoder
+    encoder.stop()
+
+
+class TestEncode:
+    def test_downscales_to_preview_width(self, encoder):
+        image = decoded(encoder.encode(camera_frame(), [('apple', 0.9, (100, 100, 300, 300))], 150.0))
+        assert image.shape == (240, 320, 3)
+
+    def test_small_frame_keeps_its_size(self, encoder):
+        assert decoded(encoder.encode(camera_frame(120, 160))).shape == (120, 160, 3)
+
+    def test_source_frame_is_not_modified(self, encoder):
+        """The camera buffer is shared with detection; overlays go on a copy."""
+        frame = camera_frame(120, 160)
+        before = frame.copy()
+        encoder.encode(frame, [('apple', 0.9, (10, 10, 100, 100))], 150.0)
+        assert np.array_equal(frame, before)
+
+    def test_webp(self):
+        encoder = PreviewEncoder(width=320, fmt='webp')
+        try:
+            assert encoder.mime_type == 'image/webp'
+            assert decoded(encoder.encode(camera_frame())).shape == (240, 320, 3)
+        finally:
+            encoder.stop()
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            PreviewEncoder(fmt='gif')
+
+    def test_confidence_colours(self):
+        assert [confidence_color(c) for c in (0.9, 0.6, 0.3)] == [
+            (0, 255, 0), (0, 255, 255), (0, 165, 255)]
+
+
+class TestWorker:
+    def test_submitted_frame_is_encoded_in_background(self, encoder):
+        encoder.submit(camera_frame(), weight=120.0, quality=60)
+        deadline = time.monotonic() + 5
+        while encoder.get_latest()[0] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        seq, data = encoder.get_latest()
+        assert seq == 1
+        assert decoded(base64.b64decode(data)).shape == (240, 320, 3)
+        assert encoder.stats()['bytes_per_frame'] > 0
+
+    def test_latest_frame_wins(self, encoder):
+        """Frames not picked up yet are replaced, not queued."""
+        encoder.stop()
+        for _ in range(3):
+            encoder.submit(camera_frame(120, 160))
+        assert (encoder.submitted, encoder.dropped) == (3, 2)
@@ -0,0 +1,180 @@
+"""Tests for the scale connection, command channel and auto-zero."""
+
+from collections import deque
+
+import pytest
+import serial
+
+from src import scale
+from src.scale import CONNECTED, DISCONNECTED, AutoZero, ScaleConnection, parse_weight
+
+
+class FakeSerial:
+    """A scale on a serial port: replays scripted lines and records writes."""
+
+    ports = {}
+
+    def __init__(self, port, baud_rate, timeout=None):
+        if port not in self.ports:
+            raise serial.SerialException(f"could not open port {port}")
+        self.port = port
+        self.lines = self.ports[port]
+        self.written = []
+        self.is_open = True
+
+    def readline(self):
+        if not self.is_open:
+            raise serial.SerialException('device disconnected')
+        if not self.lines:
+            return b''
+        line = self.lines.popleft()
+        if isinstance(line, Exception):
+            raise line
+        return line.encode() + b'\r\n'
+
+    def write(self, data):
+        self.written.append(data)
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+
+
+@pytest.fixture
+def ports(monkeypatch):
+    FakeSerial.ports = {}
+    monkeypatch.setattr(scale.serial, 'Serial', FakeSerial)
+    monkeypatch.setattr(scale, 'candidate_ports', lambda preferred=None: sorted(FakeSerial.ports))
+    return FakeSerial.ports
+
+
+def connection(**kwargs):
+    options = dict(read_timeout=0.01, probe_time=0.1, backoff_initial=0.0)
+    options.update(kwargs)
+    return ScaleConnection(**options)
+
+
+class TestParseWeight:
+    @pytest.mark.parametrize('line, weight', [
+        ('Weight: 153.2 g', 153.2), ('Weight: -0.4 g', -0.4), ('Weight:12 g', 12.0),
+        ('HX711 Scale Ready', None), ('Tared!', None), ('', None)])
+    def test_lines(self, line, weight):
+        assert parse_weight(line) == weight
+
+
+class TestConnection:
+    def test_finds_the_port_with_the_banner(self, ports):
+        ports['/dev/ttyS0'] = deque(['garbage'])
+        ports['/dev/ttyUSB0'] = deque(['HX711 Scale Ready', 'Weight: 10.0 g'])
+        link = connection()
+        assert link.connect()
+        assert (link.state, link.active_port) == (CONNECTED, '/dev/ttyUSB0')
+        assert link.read_weight() == 10.0
+
+    def test_board_that_did_not_reset_is_found_by_its_readings(self, ports):
+        ports['/dev/ttyACM0'] = deque(['Weight: 3.5 g', 'Weight: 3.6 g'])
+        link = connection()
+        assert link.connect() and link.read_weight() == 3.6
+
+    def test_backoff_doubles_up_to_the_limit(self, ports):
+        link = connection(backoff_initial=1.0, backoff_max=3.0)
+        for _ in range(4):
+            assert not link.connect()
+        assert (link.state, link.backoff, link.failed_attempts) == (DISCONNECTED, 3.0, 4)
+
+    def test_unplugged_scale_reconnects(self, ports):
+        ports['/dev/ttyUSB0'] = deque(['HX711 Scale Ready', serial.SerialException('gone')])
+        link = connection()
+        link.connect()
+        assert link.read_weight() is None
+        assert link.state == DISCONNECTED
+        ports['/dev/ttyUSB0'] = deque(['HX711 Scale Ready', 'Weight: 7.0 g'])
+        assert link.read_weight() == 7.0
+        assert (link.connects, link.reconnects) == (2, 1)
+
+    def test_silent_scale_is_dropped(self, ports):
+        ports['/dev/ttyUSB0'] = deque(['HX711 Scale Ready'])
+        link = connection(stale_after=0.0)
+        link.connect()
+        assert link.read_weight() is None
+        assert link.state == DISCONNECTED and 'no readings' in link.last_error
+
+
+class TestCommands:
+    @pytest.fixture
+    def link(self, ports):
+        ports['/dev/ttyUSB0'] = deque(['HX711 Scale Ready'])
+        link = connection(stale_after=60.0)
+        link.connect()
+        return link
+
+    def test_tare_is_written_by_the_reading_thread(self, link, ports):
+        command = link.tare(timeout=1.0)
+        assert link.serial.written == []
+        ports['/dev/ttyUSB0'].extend(['Weight: 0.3 g', 'Tared!'])
+        link.read_weight()
+        assert link.serial.written == [b't'] and not command.done
+        link.read_weight()
+        assert command.wait(0) and command.reply == 'Tared!'
+        assert link.stats()['commands']['acknowledged'] == 1
+
+    def test_unacknowledged_command_times_out(self, link):
+        command = link.tare(timeout=0.0)
+        finished = []
+        command.add_callback(finished.append)
+        link.read_weight()
+        link.read_weight()
+        assert finished == [command] and not command.ok
+        assert "no 'Tared!'" in command.error
+
+    def test_command_without_scale_fails_at_once(self, ports):
+        command = connection().tare()
+        assert command.done and command.error == 'scale not connected'
+
+    def test_disconnect_fails_pending_commands(self, link):
+        command = link.tare(timeout=5.0)
+        link.read_weight()
+        link.disconnect('unplugged')
+        assert command.to_dict()['state'] == 'failed'
+        assert 'unplugged' in command.error
+
+
+class TestAutoZero:
+    def feed(self, tracker, weights, start=0.0, step=0.1):
+        now = start
+        for weight in weights:
+            result = tracker.update(weight, now=now)
+            now += step
+        return result, now
+
+    def test_empty_stable_tray_drifts_back_to_zero(self):
+        tracker = AutoZero(band=2.0, window=1.0, tolerance=0.3, rate=0.5)
+        result, _ = self.feed(tracker, [1.0] * 60)
+        assert tracker.zero == pytest.approx(1.0, abs=0.01)
+        assert result == pytest.approx(0.0, abs=0.01)
+
+    def test_correction_is_rate_limited(self):
+        tracker = AutoZero(window=1.0, rate=0.5)
+        self.feed(tracker, [1.5] * 21)
+        assert 0 < tracker.zero <= 0.5 * 1.2 + 1e-9
+
+    def test_load_on_the_tray_is_left_alone(self):
+        tracker = AutoZero(band=2.0, window=1.0)
+        result, _ = self.feed(tracker, [150.0] * 40)
+        assert (tracker.zero, result) == (0.0, 150.0)
+
+    def test_unstable_readings_are_left_alone(self):
+        tracker = AutoZero(band=2.0, window=1.0, tolerance=0.3)
+        self.feed(tracker, [0.0, 1.0] * 20)
+        assert tracker.zero == 0.0
+
+    def test_reset_after_tare(self):
+        tracker = AutoZero(window=1.0)
+        self.feed(tracker, [1.0] * 60)
+        tracker.reset()
+        assert tracker.update(0.2, now=100.0) == 0.2
+
+    def test_disabled_keeps_the_zero(self):
+        tracker = AutoZero(window=1.0, enabled=False)
+        result, _ = self.feed(tracker, [1.0] * 60)
+        assert (tracker.zero, result) == (0.0, 1.0)
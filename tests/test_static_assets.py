@@ -0,0 +1,90 @@
+"""Tests for the in-memory, precompressed static assets."""
+
+import gzip
+import os
+import re
+
+import pytest
+from flask import Flask
+
+from src.static_assets import (BROTLI_AVAILABLE, SOCKETIO_INTEGRITY, SOCKETIO_PATH, StaticAssets,
+                               integrity)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = b'console.log("dashboard");\n' * 40
+
+
+@pytest.fixture
+def assets(tmp_path):
+    (tmp_path / 'js').mkdir()
+    (tmp_path / 'js' / 'dashboard.js').write_bytes(SCRIPT)
+    (tmp_path / 'index.html').write_text('<script src="/static/js/dashboard.js"></script>')
+    return StaticAssets(str(tmp_path))
+
+
+@pytest.fixture
+def serve(assets):
+    app = Flask(__name__)
+
+    def serve(name, **headers):
+        with app.test_request_context(headers=headers):
+            return assets.response(name)
+    return serve
+
+
+class TestResponse:
+    def test_gzip_when_accepted(self, serve):
+        response = serve('js/dashboard.js', **{'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.get_data()) == SCRIPT
+
+    @pytest.mark.skipif(not BROTLI_AVAILABLE, reason='brotli not installed')
+    def test_brotli_preferred(self, serve):
+        response = serve('js/dashboard.js', **{'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == 'br'
+
+    @pytest.mark.parametrize('accept', [None, 'gzip;q=0, br;q=0'])
+    def test_identity_otherwise(self, serve, accept):
+        headers = {'Accept-Encoding': accept} if accept else {}
+        response = serve('js/dashboard.js', **headers)
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_data() == SCRIPT
+
+    def test_not_modified_for_matching_etag(self, serve, assets):
+        etag = serve('js/dashboard.js', **{'Accept-Encoding': 'gzip'}).headers['ETag']
+        response = serve('js/dashboard.js', **{'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304 and response.get_data() == b''
+        assert assets.not_modified == 1
+
+    def test_etag_differs_per_encoding(self, serve):
+        plain = serve('js/dashboard.js').headers['ETag']
+        response = serve('js/dashboard.js', **{'Accept-Encoding': 'gzip', 'If-None-Match': plain})
+        assert response.status_code == 200
+
+    def test_unknown_asset(self, serve):
+        assert serve('js/missing.js').status_code == 404
+
+
+class TestFingerprint:
+    def test_entry_page_points_at_versioned_url(self, serve, assets):
+        version = assets.assets['js/dashboard.js'].version
+        html = serve('index.html').get_data(as_text=True)
+        assert f'/static/js/dashboard.js?v={version}' in html
+        assert serve('index.html').headers['Cache-Control'] == 'no-cache'
+
+    def test_versioned_url_is_immutable(self, assets):
+        version = assets.assets['js/dashboard.js'].version
+        with Flask(__name__).test_request_context(f'/static/js/dashboard.js?v={version}'):
+            assert 'immutable' in assets.response('js/dashboard.js').headers['Cache-Control']
+
+
+class TestVendoredClient:
+    def test_matches_pinned_hash(self):
+        with open(os.path.join(ROOT, 'static', *SOCKETIO_PATH.split('/')), 'rb') as f:
+            assert integrity(f.read()) == SOCKETIO_INTEGRITY
+
+    def test_page_pins_the_same_hash(self):
+        with open(os.path.join(ROOT, 'static', 'index.html'), encoding='utf-8') as f:
+            html = f.read()
+        assert re.search(r'integrity="([^"]+)"', html).group(1) == SOCKETIO_INTEGRITY
+        assert 'cdn.socket.io' not in html
@@ -0,0 +1,108 @@
+"""Tests for the transaction outbox against the stand-in central server."""
+
+import sqlite3
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from src.sync import READING, CentralStore, SyncError, SyncOutbox, make_handler
+
+
+@pytest.fixture
+def central(tmp_path):
+    """Stand-in head-office server on a free port; yields (url, store)."""
+    store = CentralStore(str(tmp_path / 'central.db'))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(store))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/sync", store
+    server.shutdown()
+    server.server_close()
+
+
+def open_outbox(path, endpoint=None, **kwargs):
+    # The sender thread is left out so the tests drive sync_once themselves
+    outbox = SyncOutbox('station-1', path=path, max_bytes_per_second=0, **kwargs)
+    outbox.endpoint = endpoint
+    return outbox
+
+
+def drain(outbox):
+    while outbox.sync_once():
+        pass
+
+
+class TestResume:
+    def test_resumes_after_restart(self, tmp_path, central):
+        """A restarted outbox sends only what head office has not acknowledged."""
+        url, store = central
+        path = str(tmp_path / 'outbox.db')
+        outbox = open_outbox(path, url, batch_size=3)
+        for i in range(7):
+            outbox.append(READING, {'n': i})
+        assert outbox.sync_once() == 3
+        outbox.close()
+
+        outbox = open_outbox(path, url, batch_size=3)
+        try:
+            assert outbox.acked_id == 3
+            assert outbox.append(READING, {'n': 7}) == 8
+            drain(outbox)
+            assert outbox.stats()['backlog'] == 0
+            assert outbox.records_sent == 5
+        finally:
+            outbox.close()
+        assert store.summary() == [{'station': 'station-1', 'records': 8,
+                                    'first_id': 1, 'last_id': 8}]
+
+    def test_lost_ack_is_deduplicated(self, tmp_path, central):
+        """Entries resent after a lost acknowledgement are stored once."""
+        url, store = central
+        path = str(tmp_path / 'outbox.db')
+        outbox = open_outbox(path, url)
+        for i in range(5):
+            outbox.append(READING, {'n': i})
+        drain(outbox)
+        outbox.close()
+
+        db = sqlite3.connect(path)
+        with db:
+            db.execute("UPDATE sync_state SET value = '2' WHERE key = 'acked_id'")
+        db.close()
+
+        outbox = open_outbox(path, url)
+        try:
+            drain(outbox)
+            assert outbox.acked_id == 5
+        finally:
+            outbox.close()
+        assert store.summary()[0]['records'] == 5
+
+    def test_ids_continue_after_pruning(self, tmp_path, central):
+        """Acknowledged entries may be pruned without ids being reused."""
+        url, _ = central
+        path = str(tmp_path / 'outbox.db')
+        outbox = open_outbox(path, url, keep_acked=0)
+        for i in range(4):
+            outbox.append(READING, {'n': i})
+        drain(outbox)
+        outbox.close()
+
+        outbox = open_outbox(path, url, keep_acked=0)
+        try:
+            assert outbox.append(READING, {'n': 4}) == 5
+        finally:
+            outbox.close()
+
+
+class TestFailures:
+    def test_unreachable_endpoint_keeps_backlog(self, tmp_path):
+        outbox = open_outbox(str(tmp_path / 'outbox.db'), 'http://127.0.0.1:9/sync', timeout=1)
+        try:
+            outbox.append(READING, {'n': 0})
+            with pytest.raises(SyncError):
+                outbox.sync_once()
+            assert outbox.stats()['backlog'] == 1
+        finally:
+            outbox.close()
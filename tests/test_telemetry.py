@@ -0,0 +1,92 @@
+"""Tests for the delta telemetry channel."""
+
+import numpy as np
+
+from src.telemetry import FrameChangeDetector, TelemetryChannel
+
+
+class TestTelemetryChannel:
+    def test_first_delta_carries_every_field(self):
+        channel = TelemetryChannel(min_interval=0.1)
+        channel.update({'fruit': 'apple', 'weight': 150.0})
+        delta = channel.flush(now=10.0)
+        assert (delta['base'], delta['v']) == (0, 1)
+        assert delta['changes'] == {'fruit': 'apple', 'weight': 150.0}
+
+    def test_only_changed_fields_are_sent(self):
+        channel = TelemetryChannel(min_interval=0.1)
+        channel.update({'fruit': 'apple', 'weight': 150.0})
+        channel.flush(now=10.0)
+        channel.update({'fruit': 'apple', 'weight': 162.0})
+        assert channel.flush(now=11.0)['changes'] == {'weight': 162.0}
+
+    def test_jitter_within_tolerance_is_ignored(self):
+        channel = TelemetryChannel(min_interval=0.1)
+        channel.update({'weight': 150.0})
+        channel.flush(now=10.0)
+        assert not channel.update({'weight': 150.3})
+        assert channel.flush(now=11.0) is None
+
+    def test_change_reverted_before_flush_is_dropped(self):
+        channel = TelemetryChannel(min_interval=0.1)
+        channel.update({'fruit': 'apple'})
+        channel.flush(now=10.0)
+        channel.update({'fruit': 'banana'})
+        channel.update({'fruit': 'apple'})
+        assert not channel.has_pending()
+
+    def test_deltas_are_coalesced(self):
+        channel = TelemetryChannel(min_interval=0.5)
+        channel.update({'weight': 100.0})
+        channel.flush(now=10.0)
+        channel.update({'weight': 120.0})
+        assert channel.flush(now=10.2) is None
+        channel.update({'weight': 140.0})
+        assert channel.flush(now=10.5)['changes'] == {'weight': 140.0}
+
+    def test_versions_chain_and_snapshot_matches(self):
+        """A client applying every delta in order ends with the snapshot's state."""
+        channel = TelemetryChannel(min_interval=0.0)
+        client, version = {}, 0
+        for now, fields in enumerate([{'fruit': 'apple', 'weight': 10.0}, {'weight': 20.0},
+                                      {'fruit': 'banana'}]):
+            channel.update(fields)
+            delta = channel.flush(now=float(now))
+            assert delta['base'] == version
+            client.update(delta['changes'])
+            version = delta['v']
+        snapshot = channel.snapshot()
+        assert (snapshot['v'], snapshot['data']) == (version, client)
+
+    def test_force_queues_unchanged_fields(self):
+        channel = TelemetryChannel()
+        channel.update({'weight': 10.0})
+        channel.flush(now=10.0)
+        assert channel.update({'weight': 10.0}, force=True)
+        assert channel.stats()['pending_fields'] == 1
+
+
+class TestFrameChangeDetector:
+    def frame(self, level):
+        return np.full((480, 640, 3), level, dtype=np.uint8)
+
+    def test_static_picture_is_sent_once(self):
+        detector = FrameChangeDetector(threshold=3.0, max_age=10.0)
+        assert detector.changed(self.frame(100), now=0.0)
+        assert not detector.changed(self.frame(101), now=1.0)
+
+    def test_visible_change_is_sent(self):
+        detector = FrameChangeDetector(threshold=3.0)
+        detector.changed(self.frame(100), now=0.0)
+        assert detector.changed(self.frame(120), now=1.0)
+
+    def test_slow_drift_accumulates(self):
+        detector = FrameChangeDetector(threshold=3.0, max_age=100.0)
+        detector.changed(self.frame(100), now=0.0)
+        sent = [detector.changed(self.frame(100 + step), now=float(step)) for step in (1, 2, 3)]
+        assert sent == [False, False, True]
+
+    def test_refresh_after_max_age(self):
+        detector = FrameChangeDetector(max_age=10.0)
+        detector.changed(self.frame(100), now=0.0)
+        assert detector.changed(self.frame(100), now=10.0)
@@ -0,0 +1,90 @@
+"""Tests for pipeline span tracing."""
+
+import json
+import threading
+import time
+
+import pytest
+
+from src.tracing import NULL_SPAN, Tracer
+
+
+def spans(trace):
+    return [event for event in trace['traceEvents'] if event['ph'] == 'X']
+
+
+class TestTracer:
+    def test_span_is_exported_as_complete_event(self):
+        tracer = Tracer()
+        with tracer.span('detect', 12, imgsz=640) as span:
+            span.set(cache='miss')
+        (event,) = spans(tracer.export())
+        assert (event['name'], event['cat'], event['ph']) == ('detect', 'pipeline', 'X')
+        assert event['args'] == {'imgsz': 640, 'cache': 'miss', 'seq': 12}
+        assert event['dur'] >= 0
+
+    def test_exception_is_tagged_and_propagates(self):
+        tracer = Tracer()
+        with pytest.raises(KeyError):
+            with tracer.span('detect', 1):
+                raise KeyError('apple')
+        assert spans(tracer.export())[0]['args']['error'] == 'KeyError'
+
+    def test_sampling_keeps_whole_frames(self):
+        tracer = Tracer(sample_every=4)
+        for seq in range(8):
+            with tracer.span('camera.read', seq):
+                pass
+            with tracer.span('detect', seq):
+                pass
+        assert sorted({event['args']['seq'] for event in spans(tracer.export())}) == [0, 4]
+        assert tracer.span('detect', 5) is NULL_SPAN
+
+    def test_disabled_records_nothing(self):
+        tracer = Tracer(enabled=False)
+        lock = threading.Lock()
+        with tracer.span('detect', 0):
+            pass
+        assert tracer.lock(lock, 'wait lock', 0) is lock
+        assert tracer.stats()['recorded'] == 0
+
+    def test_lock_wait_is_recorded(self):
+        tracer = Tracer()
+        lock = threading.Lock()
+        with tracer.lock(lock, 'wait detection_lock', 3):
+            assert lock.locked()
+        assert not lock.locked()
+        assert spans(tracer.export())[0]['cat'] == 'lock'
+
+    def test_ring_buffer_keeps_newest(self):
+        tracer = Tracer(capacity=3)
+        for seq in range(5):
+            tracer.record('detect', 0.0, 1.0, seq)
+        assert [event['args']['seq'] for event in spans(tracer.export())] == [2, 3, 4]
+        tracer.resize(2)
+        assert [event['args']['seq'] for event in spans(tracer.export())] == [3, 4]
+        assert tracer.stats()['recorded'] == 5
+
+    def test_export_window(self):
+        tracer = Tracer()
+        now = time.perf_counter()
+        tracer.record('old', now - 30, now - 20, 1)
+        tracer.record('new', now - 1, now, 2)
+        assert [event['name'] for event in spans(tracer.export(seconds=10))] == ['new']
+
+    def test_threads_are_named(self):
+        tracer = Tracer()
+        thread = threading.Thread(target=lambda: tracer.record('emit', 0.0, 1.0), name='BroadcastThread')
+        thread.start()
+        thread.join()
+        names = [event['args']['name'] for event in tracer.export()['traceEvents']
+                 if event['name'] == 'thread_name']
+        assert names == ['BroadcastThread']
+
+    def test_dump_writes_chrome_trace(self, tmp_path):
+        tracer = Tracer()
+        tracer.record('detect', 0.0, 0.001, 7)
+        path = tmp_path / 'trace.json'
+        assert tracer.dump(str(path)) == 1
+        trace = json.loads(path.read_text())
+        assert trace['displayTimeUnit'] == 'ms' and len(spans(trace)) == 1